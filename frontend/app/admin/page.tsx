@@ -3,19 +3,20 @@
 import { useEffect, useState } from "react"
 import { useRouter } from "next/navigation"
 import ChessBackground from "@/components/ChessBackground"
-import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { useSessionToken } from "@/hooks/useSessionToken"
 import { Shield, PlusCircle, Trash2, Archive, ArrowLeft, List } from "lucide-react"
 
 export default function AdminMainMenuPage() {
   const router = useRouter()
-  const { initData } = useTelegramWebApp()
+  const { authToken, isAuthReady } = useSessionToken()
   const [authorized, setAuthorized] = useState<boolean | null>(null)
   const [error, setError] = useState<string | null>(null)
 
   useEffect(() => {
+    if (!isAuthReady) return
     const checkAdmin = async () => {
       try {
-        if (!initData) {
+        if (!authToken) {
           // Dev fallback: try admin check without Authorization
           try {
             const resp = await fetch("/api/admin/check")
@@ -29,7 +30,7 @@ export default function AdminMainMenuPage() {
           return
         }
         const resp = await fetch("/api/admin/check", {
-          headers: { Authorization: `Bearer ${initData}` },
+          headers: { Authorization: `Bearer ${authToken}` },
         })
         setAuthorized(resp.ok)
         if (!resp.ok) setError("Доступ запрещён")
@@ -40,7 +41,7 @@ export default function AdminMainMenuPage() {
       }
     }
     checkAdmin()
-  }, [initData])
+  }, [authToken, isAuthReady])
 
   return (
     <ChessBackground>
@@ -3,7 +3,8 @@
 import { useEffect, useState } from "react"
 import { useParams, useRouter } from "next/navigation"
 import ChessBackground from "@/components/ChessBackground"
-import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { useSessionToken } from "@/hooks/useSessionToken"
+import { newIdempotencyKey } from "@/lib/utils"
 
 type User = {
   id: number
@@ -26,7 +27,7 @@ export default function TournamentParticipantsPage() {
   const params = useParams<{ id: string }>()
   const tournamentId = Number(params.id)
   const router = useRouter()
-  const { initData } = useTelegramWebApp()
+  const { authToken } = useSessionToken()
 
   const [users, setUsers] = useState<User[]>([])
   const [participants, setParticipants] = useState<Participant[]>([])
@@ -36,6 +37,9 @@ export default function TournamentParticipantsPage() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
   const [adding, setAdding] = useState(false)
+  const [bulkCsv, setBulkCsv] = useState("")
+  const [bulkAdding, setBulkAdding] = useState(false)
+  const [bulkErrors, setBulkErrors] = useState<Array<{ row: number; error: string }>>([])
   const [starting, setStarting] = useState(false)
   const [seeding, setSeeding] = useState(false)
   const [seedInfo, setSeedInfo] = useState<string | null>(null)
@@ -86,7 +90,7 @@ export default function TournamentParticipantsPage() {
         method: "POST",
         headers: { 
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
         body: JSON.stringify({ 
           tournament_id: tournamentId, 
@@ -113,6 +117,43 @@ export default function TournamentParticipantsPage() {
     }
   }
 
+  // Массовая регистрация: все строки CSV одним запросом
+  const addParticipantsBulk = async () => {
+    if (!bulkCsv.trim()) return setError("Вставьте список участников")
+    setBulkAdding(true)
+    setError(null)
+    setBulkErrors([])
+    try {
+      const res = await fetch(`/api/tournaments/${tournamentId}/participants/bulk`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "text/csv",
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
+        },
+        body: bulkCsv,
+      })
+      const data = await res.json().catch(() => ({}))
+      if (res.status === 403) {
+        throw new Error("Недостаточно прав для добавления участников")
+      }
+      if (Array.isArray(data.created) && data.created.length > 0) {
+        setParticipants((prev) => [...prev, ...data.created])
+      }
+      if (Array.isArray(data.errors) && data.errors.length > 0) {
+        setBulkErrors(data.errors)
+      } else if (res.ok) {
+        setBulkCsv("")
+      }
+      if (!res.ok && !Array.isArray(data.errors)) {
+        throw new Error(data.error || "Не удалось добавить участников")
+      }
+    } catch (e) {
+      setError(e instanceof Error ? e.message : "Неизвестная ошибка")
+    } finally {
+      setBulkAdding(false)
+    }
+  }
+
   const startTour = async () => {
     if (!Number.isFinite(tournamentId)) return
     if (participants.length < 2) return setError("Добавьте минимум двух участников")
@@ -131,7 +172,8 @@ export default function TournamentParticipantsPage() {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          "Idempotency-Key": newIdempotencyKey(),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
         body: JSON.stringify({}),
       })
@@ -144,7 +186,8 @@ export default function TournamentParticipantsPage() {
       const pairRes = await fetch(`/api/tournaments/${tournamentId}/tours/${newTour.id}/pairings`, {
         method: "POST",
         headers: {
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          "Idempotency-Key": newIdempotencyKey(),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
       })
       if (!pairRes.ok) {
@@ -173,7 +216,7 @@ export default function TournamentParticipantsPage() {
     try {
       const res = await fetch(`/api/tournaments/${tournamentId}/tours`, {
         method: "DELETE",
-        headers: initData ? { Authorization: `Bearer ${initData}` } : undefined,
+        headers: authToken ? { Authorization: `Bearer ${authToken}` } : undefined,
       })
       if (!res.ok) {
         const err = await res.json().catch(() => ({}))
@@ -192,7 +235,7 @@ export default function TournamentParticipantsPage() {
     try {
       const res = await fetch(`/api/tournaments/${tournamentId}/tours/${tourId}`, {
         method: "DELETE",
-        headers: initData ? { Authorization: `Bearer ${initData}` } : undefined,
+        headers: authToken ? { Authorization: `Bearer ${authToken}` } : undefined,
       })
       if (!res.ok) {
         const err = await res.json().catch(() => ({}))
@@ -262,7 +305,7 @@ export default function TournamentParticipantsPage() {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
       })
       if (!res.ok) {
@@ -399,6 +442,32 @@ export default function TournamentParticipantsPage() {
               {adding ? "Добавление..." : "Добавить участника"}
             </button>
 
+            <div>
+              <label className="text-white block mb-2">Массовое добавление (CSV)</label>
+              <textarea
+                value={bulkCsv}
+                onChange={(e) => setBulkCsv(e.target.value)}
+                rows={5}
+                className="w-full bg-white/10 text-white p-3 rounded-lg outline-none font-mono text-sm"
+                placeholder={"@username,Никнейм\n123456789,Никнейм 2"}
+              />
+              <div className="text-white/60 text-xs mt-1">Строка: @username или Telegram ID, затем никнейм. Можно с заголовком user_id,telegram_id,username,nickname.</div>
+              {bulkErrors.length > 0 && (
+                <ul className="mt-2 text-sm text-red-300 space-y-1">
+                  {bulkErrors.map((e) => (
+                    <li key={e.row}>Строка {e.row + 1}: {e.error}</li>
+                  ))}
+                </ul>
+              )}
+              <button
+                onClick={addParticipantsBulk}
+                disabled={bulkAdding}
+                className="mt-2 w-full bg-blue-600/80 text-white py-3 rounded-lg font-bold hover:bg-blue-500 disabled:opacity-60"
+              >
+                {bulkAdding ? "Добавление..." : "Добавить списком"}
+              </button>
+            </div>
+
             <div className="mt-3 flex flex-col sm:flex-row gap-3">
               <button
                 onClick={seedUsers}
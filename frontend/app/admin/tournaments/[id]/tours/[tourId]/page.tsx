@@ -1,10 +1,11 @@
 "use client"
 
-import { useEffect, useState, useCallback } from "react"
+import { useEffect, useState, useCallback, useRef } from "react"
 import { useParams, useRouter } from "next/navigation"
 import ChessBackground from "@/components/ChessBackground"
 import ResultSelect from "@/components/ui/result-select"
-import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { useSessionToken } from "@/hooks/useSessionToken"
+import { newIdempotencyKey } from "@/lib/utils"
 import { ArrowLeft } from "lucide-react"
 
 type Match = {
@@ -32,7 +33,7 @@ export default function TourManagePage() {
   const tournamentId = Number(params.id)
   const tourId = Number(params.tourId)
   const router = useRouter()
-  const { initData } = useTelegramWebApp()
+  const { authToken } = useSessionToken()
   const [matches, setMatches] = useState<Match[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
@@ -47,6 +48,14 @@ export default function TourManagePage() {
   const [leaderboard, setLeaderboard] = useState<LeaderRow[]>([])
   const [lbLoading, setLbLoading] = useState<boolean>(false)
   const [lbError, setLbError] = useState<string | null>(null)
+  // Идёт полная загрузка лидерборда: дельты из событий в это время не применяем
+  const lbLoadingRef = useRef(false)
+  // Последняя загруженная таблица — чтобы решать про перезагрузку вне setLeaderboard
+  const leaderboardRef = useRef<LeaderRow[]>([])
+  // Запросы этой страницы, после которых лидерборд перезагружается целиком;
+  // дельты, пришедшие пока они выполняются, не применяем, а помечаем
+  const mutatingRef = useRef(0)
+  const skippedDeltaRef = useRef(false)
 
   const loadMatches = useCallback(async () => {
     setLoading(true)
@@ -99,11 +108,14 @@ export default function TourManagePage() {
   const generatePairings = async () => {
     setPairing(true)
     setError(null)
+    mutatingRef.current++
+    let reload = false
     try {
       const res = await fetch(`/api/tournaments/${tournamentId}/tours/${tourId}/pairings`, {
         method: "POST",
         headers: {
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          "Idempotency-Key": newIdempotencyKey(),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
       })
       if (!res.ok) {
@@ -119,11 +131,14 @@ export default function TourManagePage() {
       }
       const data = await res.json()
       setMatches(Array.isArray(data) ? data : [])
-      // После генерации пар обновим лидерборд (на случай байев и т.д.)
-      await loadLeaderboard()
+      // События приходят только с этого инстанса (без TOURNAMENT_EVENTS_REALTIME),
+      // поэтому после своей записи всегда перезагружаем лидерборд сами
+      reload = true
     } catch (e) {
       setError(e instanceof Error ? e.message : "Неизвестная ошибка")
     } finally {
+      mutatingRef.current--
+      if (reload || skippedDeltaRef.current) await loadLeaderboard()
       setPairing(false)
     }
   }
@@ -147,7 +162,8 @@ export default function TourManagePage() {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          "Idempotency-Key": newIdempotencyKey(),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
         body: JSON.stringify({}),
       })
@@ -160,7 +176,8 @@ export default function TourManagePage() {
       const pairRes = await fetch(`/api/tournaments/${tournamentId}/tours/${newTour.id}/pairings`, {
         method: "POST",
         headers: {
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          "Idempotency-Key": newIdempotencyKey(),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
       })
       if (!pairRes.ok) {
@@ -186,12 +203,14 @@ export default function TourManagePage() {
   const updateResult = async (matchId: number, result: string) => {
     setSaving(matchId)
     setError(null)
+    mutatingRef.current++
+    let reload = false
     try {
       const res = await fetch(`/api/tournaments/${tournamentId}/tours/${tourId}/matches`, {
         method: "PATCH",
         headers: {
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
         body: JSON.stringify({ matchId, result }),
       })
@@ -201,11 +220,12 @@ export default function TourManagePage() {
       }
       const updated = await res.json()
       setMatches((prev) => prev.map((m) => (m.id === matchId ? { ...m, ...updated } : m)))
-      // После сохранения результата — перезагрузим лидерборд для актуализации очков
-      await loadLeaderboard()
+      reload = true
     } catch (e) {
       setError(e instanceof Error ? e.message : "Неизвестная ошибка")
     } finally {
+      mutatingRef.current--
+      if (reload || skippedDeltaRef.current) await loadLeaderboard()
       setSaving(null)
     }
   }
@@ -213,16 +233,20 @@ export default function TourManagePage() {
   // Загрузка лидерборда турнира (динамические standings, если снапшот отсутствует)
   const loadLeaderboard = useCallback(async () => {
     if (!Number.isFinite(tournamentId)) return
+    lbLoadingRef.current = true
+    skippedDeltaRef.current = false
     setLbLoading(true)
     setLbError(null)
     try {
       const res = await fetch(`/api/tournaments/${tournamentId}/leaderboard`)
       if (!res.ok) throw new Error("Не удалось загрузить лидерборд")
       const rows = await res.json()
-      setLeaderboard(Array.isArray(rows) ? rows : [])
+      leaderboardRef.current = Array.isArray(rows) ? rows : []
+      setLeaderboard(leaderboardRef.current)
     } catch (e) {
       setLbError(e instanceof Error ? e.message : "Неизвестная ошибка")
     } finally {
+      lbLoadingRef.current = false
       setLbLoading(false)
     }
   }, [tournamentId])
@@ -231,14 +255,71 @@ export default function TourManagePage() {
     loadLeaderboard()
   }, [loadLeaderboard])
 
-  // Автообновление лидерборда раз в 10 секунд
-  useEffect(() => {
-    const id = setInterval(() => {
+  // Изменения очков из события standings_delta; если таблица ещё грузится
+  // или участник в ней не найден — просто перезагружаем её целиком.
+  // Пока идёт собственный запрос страницы, дельту не применяем: после него
+  // таблица перезагрузится, иначе очки посчитались бы дважды
+  const applyStandingsDelta = useCallback((changes: Array<{ participant_id: number; points: number }>) => {
+    if (mutatingRef.current > 0) {
+      skippedDeltaRef.current = true
+      return
+    }
+    const known = new Set(leaderboardRef.current.map((row) => row.participant_id))
+    if (lbLoadingRef.current || changes.some((c) => !known.has(c.participant_id))) {
       loadLeaderboard()
-    }, 10000)
-    return () => clearInterval(id)
+      return
+    }
+    const next = leaderboardRef.current.map((row) => {
+      const change = changes.find((c) => c.participant_id === row.participant_id)
+      return change ? { ...row, points: row.points + change.points } : row
+    })
+    next.sort((a, b) => (b.points !== a.points ? b.points - a.points : a.nickname.localeCompare(b.nickname)))
+    leaderboardRef.current = next.map((row, idx) => ({ ...row, rank: idx + 1 }))
+    setLeaderboard(leaderboardRef.current)
   }, [loadLeaderboard])
 
+  // Обновления в реальном времени (Server-Sent Events) вместо опроса;
+  // EventSource сам переподключается, после переподключения всё перезагружаем,
+  // т.к. события за время разрыва могли быть пропущены
+  useEffect(() => {
+    if (!Number.isFinite(tournamentId) || !Number.isFinite(tourId)) return
+    if (typeof EventSource === "undefined") {
+      const id = setInterval(() => {
+        loadLeaderboard()
+      }, 10000)
+      return () => clearInterval(id)
+    }
+
+    const source = new EventSource(`/api/tournaments/${tournamentId}/events`)
+    let opened = false
+    source.onopen = () => {
+      if (opened) {
+        loadMatches()
+        loadLeaderboard()
+        loadRoundNumber()
+      }
+      opened = true
+    }
+    source.addEventListener("result_updated", (e) => {
+      const { match } = JSON.parse((e as MessageEvent).data) as { match: Partial<Match> & { id: number; round_id: number } }
+      if (match.round_id !== tourId) return
+      setMatches((prev) => prev.map((m) => (m.id === match.id ? { ...m, ...match } : m)))
+    })
+    source.addEventListener("standings_delta", (e) => {
+      const { changes } = JSON.parse((e as MessageEvent).data) as { changes: Array<{ participant_id: number; points: number }> }
+      applyStandingsDelta(changes)
+    })
+    source.addEventListener("pairings_ready", (e) => {
+      const { roundId } = JSON.parse((e as MessageEvent).data) as { roundId: number }
+      if (roundId === tourId) loadMatches()
+      loadLeaderboard()
+    })
+    source.addEventListener("round_locked", () => {
+      loadRoundNumber()
+    })
+    return () => source.close()
+  }, [tournamentId, tourId, loadMatches, loadLeaderboard, loadRoundNumber, applyStandingsDelta])
+
   // Результаты выбираются через удобный выпадающий список ResultSelect
 
   const finalizeAndGoToResults = async () => {
@@ -249,7 +330,7 @@ export default function TourManagePage() {
       const res = await fetch(`/api/tournaments/${tournamentId}/finalize`, {
         method: "POST",
         headers: {
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
       })
       if (!res.ok) {
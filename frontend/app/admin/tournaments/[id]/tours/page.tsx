@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react"
 import { useParams, useRouter } from "next/navigation"
 import ChessBackground from "@/components/ChessBackground"
-import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { useSessionToken } from "@/hooks/useSessionToken"
 
 type Tour = {
   id: number
@@ -16,7 +16,7 @@ type Tour = {
 export default function TournamentToursPage() {
   const params = useParams<{ id: string }>()
   const router = useRouter()
-  const { initData } = useTelegramWebApp()
+  const { authToken } = useSessionToken()
   const tournamentId = Number(params.id)
   const [tours, setTours] = useState<Tour[]>([])
   const [loading, setLoading] = useState(true)
@@ -48,7 +48,7 @@ export default function TournamentToursPage() {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
       })
       if (!res.ok) {
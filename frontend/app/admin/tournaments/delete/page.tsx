@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react"
 import { useRouter } from "next/navigation"
 import ChessBackground from "@/components/ChessBackground"
-import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { useSessionToken } from "@/hooks/useSessionToken"
 import { Trash2, ArrowLeft } from "lucide-react"
 
 type DbTournament = {
@@ -15,7 +15,7 @@ type DbTournament = {
 
 export default function AdminDeleteTournamentPage() {
   const router = useRouter()
-  const { initData } = useTelegramWebApp()
+  const { authToken } = useSessionToken()
   const [tournaments, setTournaments] = useState<DbTournament[]>([])
   const [selectedId, setSelectedId] = useState<number | null>(null)
   const [loading, setLoading] = useState(true)
@@ -44,7 +44,7 @@ export default function AdminDeleteTournamentPage() {
 
   const handleDelete = async () => {
     if (!selectedId) return setError("Выберите турнир")
-    if (!initData) return setError("Откройте приложение через Telegram")
+    if (!authToken) return setError("Откройте приложение через Telegram")
     if (!confirm("Удалить выбранный турнир? Это действие необратимо.")) return
     setDeleting(true)
     setError(null)
@@ -52,7 +52,7 @@ export default function AdminDeleteTournamentPage() {
     try {
       const res = await fetch(`/api/tournaments/${selectedId}`, {
         method: "DELETE",
-        headers: { Authorization: `Bearer ${initData}` },
+        headers: { Authorization: `Bearer ${authToken}` },
       })
       if (!res.ok) {
         const err = await res.json().catch(() => ({}))
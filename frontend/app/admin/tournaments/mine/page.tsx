@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react"
 import { useRouter } from "next/navigation"
 import ChessBackground from "@/components/ChessBackground"
-import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { useSessionToken } from "@/hooks/useSessionToken"
 import { ArrowLeft, ListOrdered, Archive, ArchiveRestore, Trash2 } from "lucide-react"
 
 type DbTournament = {
@@ -17,7 +17,7 @@ type DbTournament = {
 
 export default function AdminMyTournamentsPage() {
   const router = useRouter()
-  const { initData } = useTelegramWebApp()
+  const { authToken, isAuthReady } = useSessionToken()
   const [tournaments, setTournaments] = useState<DbTournament[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
@@ -25,12 +25,13 @@ export default function AdminMyTournamentsPage() {
   const [actionMsg, setActionMsg] = useState<string | null>(null)
 
   useEffect(() => {
+    if (!isAuthReady) return
     const load = async () => {
       setLoading(true)
       setError(null)
       try {
         const res = await fetch("/api/tournaments/mine", {
-          headers: initData ? { Authorization: `Bearer ${initData}` } : undefined,
+          headers: authToken ? { Authorization: `Bearer ${authToken}` } : undefined,
         })
         if (!res.ok) throw new Error("Не удалось загрузить мои турниры")
         const data = await res.json()
@@ -42,7 +43,7 @@ export default function AdminMyTournamentsPage() {
       }
     }
     load()
-  }, [initData])
+  }, [authToken, isAuthReady])
 
   const filtered = tournaments.filter(t => {
     if (filter === "active") return Number(t.archived) === 0
@@ -57,7 +58,7 @@ export default function AdminMyTournamentsPage() {
         method: "PATCH",
         headers: {
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
         body: JSON.stringify({ archived: makeArchived ? 1 : 0 }),
       })
@@ -75,7 +76,7 @@ export default function AdminMyTournamentsPage() {
     try {
       const res = await fetch(`/api/tournaments/${t.id}`, {
         method: "DELETE",
-        headers: initData ? { Authorization: `Bearer ${initData}` } : undefined,
+        headers: authToken ? { Authorization: `Bearer ${authToken}` } : undefined,
       })
       if (!res.ok) throw new Error("Не удалось удалить турнир")
       setTournaments(prev => prev.filter(it => it.id !== t.id))
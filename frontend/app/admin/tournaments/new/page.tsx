@@ -3,12 +3,12 @@
 import { useEffect, useState } from "react"
 import { useRouter } from "next/navigation"
 import ChessBackground from "@/components/ChessBackground"
-import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { useSessionToken } from "@/hooks/useSessionToken"
 import { ArrowLeft, LogOut, Trash2 } from "lucide-react"
 
 export default function AdminCreateTournamentPage() {
   const router = useRouter()
-  const { initData } = useTelegramWebApp()
+  const { authToken } = useSessionToken()
   const [title, setTitle] = useState("My Tournament")
   const [format, setFormat] = useState("swiss_bbp_dutch")
   const [pointsWin, setPointsWin] = useState(1)
@@ -150,7 +150,7 @@ export default function AdminCreateTournamentPage() {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
         body: JSON.stringify({
           title,
@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react"
 import { useRouter } from "next/navigation"
 import ChessBackground from "@/components/ChessBackground"
-import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { useSessionToken } from "@/hooks/useSessionToken"
 import { ArrowLeft, List, CalendarDays, Archive, ArchiveRestore, Trash2, ListOrdered } from "lucide-react"
 
 type DbTournament = {
@@ -17,7 +17,7 @@ type DbTournament = {
 
 export default function AdminAllTournamentsPage() {
   const router = useRouter()
-  const { initData } = useTelegramWebApp()
+  const { authToken } = useSessionToken()
   const [tournaments, setTournaments] = useState<DbTournament[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
@@ -46,7 +46,7 @@ export default function AdminAllTournamentsPage() {
         method: "PATCH",
         headers: {
           "Content-Type": "application/json",
-          ...(initData ? { Authorization: `Bearer ${initData}` } : {}),
+          ...(authToken ? { Authorization: `Bearer ${authToken}` } : {}),
         },
         body: JSON.stringify({ archived: makeArchived ? 1 : 0 }),
       })
@@ -62,7 +62,7 @@ export default function AdminAllTournamentsPage() {
     try {
       const res = await fetch(`/api/tournaments/${t.id}`, {
         method: "DELETE",
-        headers: initData ? { Authorization: `Bearer ${initData}` } : undefined,
+        headers: authToken ? { Authorization: `Bearer ${authToken}` } : undefined,
       })
       if (!res.ok) throw new Error("Не удалось удалить турнир")
       setTournaments(prev => prev.filter(it => it.id !== t.id))
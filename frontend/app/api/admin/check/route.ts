@@ -1,7 +1,11 @@
 import { NextRequest, NextResponse } from "next/server"
 import { requireAdmin } from "@/lib/telegram"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET(req: NextRequest) {
+const log = createLogger("api/admin/check")
+
+export const GET = withRequestContext("/api/admin/check", async function GET(req: NextRequest) {
   // В dev-окружении разрешаем доступ без проверки, если TESTSTRICT не включен
   const isDev = process.env.NODE_ENV !== "production"
   const testStrict = String(process.env.TESTSTRICT || '').toLowerCase()
@@ -17,7 +21,7 @@ export async function GET(req: NextRequest) {
     }
     return NextResponse.json({ ok: true })
   } catch (e) {
-    console.error("Admin check failed:", e)
+    log.error("Admin check failed", { error: e })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -1,21 +1,40 @@
 import { NextRequest, NextResponse } from "next/server"
-import { getTelegramUserFromHeaders, validateTelegramWebAppData, parseTelegramWebAppData } from "@/lib/telegram"
+import { getTelegramUserFromHeaders, validateTelegramWebAppData, parseTelegramWebAppData, resolveUserRole, type TelegramUser } from "@/lib/telegram"
+import { createSessionToken, isSessionToken } from "@/lib/session"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET(req: NextRequest) {
+const log = createLogger("api/auth/telegram")
+
+// Exchange a validated Telegram user for a short-lived session token carrying
+// the role, so later requests can send "Bearer <token>" instead of initData.
+// Only initData is exchanged: a token cannot be traded for a fresh one, so a
+// session never outlives the auth_date limit of the initData it came from.
+async function issueSession(user: TelegramUser) {
+  const { role, userId, sessionVersion } = await resolveUserRole(user)
+  const { token, claims } = createSessionToken(user, role, userId, sessionVersion)
+  return { token, role, expiresAt: claims.exp }
+}
+
+export const GET = withRequestContext("/api/auth/telegram", async function GET(req: NextRequest) {
   try {
-    const user = getTelegramUserFromHeaders(req.headers)
+    const credential = (req.headers.get("authorization") || "").replace("Bearer ", "")
+    if (isSessionToken(credential)) {
+      return NextResponse.json({ ok: false, error: "Send Telegram initData to obtain a session token" }, { status: 400 })
+    }
+    const user = await getTelegramUserFromHeaders(req.headers)
     if (user) {
-      return NextResponse.json({ ok: true, user })
+      return NextResponse.json({ ok: true, user, session: await issueSession(user) })
     }
     // Explicit failure message to aid tests/dev diagnostics
     return NextResponse.json({ ok: false, error: "Authentication Failed: Invalid Telegram Web App initData" }, { status: 400 })
   } catch (e) {
-    console.error("Auth telegram GET failed:", e)
+    log.error("Auth telegram GET failed", { error: e })
     return NextResponse.json({ ok: false, error: "Internal server error" }, { status: 500 })
   }
-}
+})
 
-export async function POST(req: NextRequest) {
+export const POST = withRequestContext("/api/auth/telegram", async function POST(req: NextRequest) {
   try {
     const body = await req.json().catch(() => null) as { initData?: string }
     const initData = body?.initData
@@ -38,11 +57,11 @@ export async function POST(req: NextRequest) {
     }
 
     if (user) {
-      return NextResponse.json({ ok: true, user })
+      return NextResponse.json({ ok: true, user, session: await issueSession(user) })
     }
     return NextResponse.json({ ok: false, error: "Authentication Failed: Invalid Telegram Web App initData" }, { status: 400 })
   } catch (e) {
-    console.error("Auth telegram POST failed:", e)
+    log.error("Auth telegram POST failed", { error: e })
     return NextResponse.json({ ok: false, error: "Internal server error" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
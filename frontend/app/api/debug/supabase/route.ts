@@ -1,7 +1,8 @@
 import { NextResponse } from "next/server"
 import { supabase } from "@/lib/supabase"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET() {
+export const GET = withRequestContext("/api/debug/supabase", async function GET() {
   try {
     const env = {
       hasUrl: !!process.env.NEXT_PUBLIC_SUPABASE_URL,
@@ -40,4 +41,4 @@ export async function GET() {
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -1,8 +1,12 @@
 import { NextRequest, NextResponse } from "next/server"
 import { requireAdmin } from "@/lib/telegram"
 import { seedTestUsers } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function POST(request: NextRequest) {
+const log = createLogger("api/dev/seed-users")
+
+export const POST = withRequestContext("/api/dev/seed-users", async function POST(request: NextRequest) {
   try {
     const adminUser = await requireAdmin(request.headers)
     if (!adminUser) {
@@ -13,7 +17,7 @@ export async function POST(request: NextRequest) {
     const { inserted } = await result
     return NextResponse.json({ ok: true, inserted })
   } catch (e) {
-    console.error("Failed to seed users:", e)
+    log.error("Failed to seed users", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
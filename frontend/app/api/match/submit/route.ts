@@ -2,10 +2,15 @@ import { NextRequest, NextResponse } from "next/server"
 import { getTelegramUserFromHeaders } from "@/lib/telegram"
 import { updateMatchResult } from "@/lib/db"
 import { processMatchResultWithRatings } from "@/lib/rating/matchIntegration"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
 
-export async function POST(req: NextRequest) {
+const log = createLogger("api/match/submit")
+
+export const POST = withRequestContext("/api/match/submit", withIdempotency("/api/match/submit", async function POST(req: NextRequest) {
   try {
-    const user = getTelegramUserFromHeaders(req.headers)
+    const user = await getTelegramUserFromHeaders(req.headers)
     if (!user) {
       return NextResponse.json({ ok: false, error: "Authentication Failed: Invalid Telegram Web App initData" }, { status: 401 })
     }
@@ -34,19 +39,22 @@ export async function POST(req: NextRequest) {
       try {
         const ratingResult = await processMatchResultWithRatings(matchId, finalResult)
         if (ratingResult.success) {
-          console.log('Rating updates processed successfully:', ratingResult.ratingUpdates)
+          log.info("Rating updates processed", () => ({
+            matchId,
+            changes: ratingResult.ratingUpdates?.map((u) => [u.userId, u.change])
+          }), { sample: 0.1 })
         } else {
-          console.warn('Rating update failed:', ratingResult.error)
+          log.warn("Rating update failed", { matchId, error: ratingResult.error })
         }
       } catch (ratingError) {
-        console.error('Error processing rating updates:', ratingError)
+        log.error("Error processing rating updates", { error: ratingError })
         // Don't fail the entire request if rating update fails
       }
     }
 
     return NextResponse.json({ ok: true, match: updated })
   } catch (e) {
-    console.error("/api/match/submit failed:", e)
+    log.error("/api/match/submit failed", { error: e })
     return NextResponse.json({ ok: false, error: "Internal server error" }, { status: 500 })
   }
-}
\ No newline at end of file
+}))
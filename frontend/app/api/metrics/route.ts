@@ -0,0 +1,19 @@
+import { NextRequest, NextResponse } from "next/server"
+import { metrics } from "@/lib/metrics"
+import { withRequestContext } from "@/lib/requestContext"
+
+// GET /api/metrics - Prometheus text exposition of the process metrics
+// Set METRICS_TOKEN to require "Authorization: Bearer <token>"
+export const GET = withRequestContext("/api/metrics", async function GET(req: NextRequest) {
+  const token = process.env.METRICS_TOKEN
+  if (token && req.headers.get("authorization") !== `Bearer ${token}`) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
+  }
+
+  return new Response(metrics.render(), {
+    headers: {
+      "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+      "Cache-Control": "no-store",
+    },
+  })
+})
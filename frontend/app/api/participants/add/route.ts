@@ -2,8 +2,13 @@ import { NextRequest, NextResponse } from "next/server"
 import { addTournamentParticipant } from "@/lib/db"
 import { supabase } from "@/lib/supabase"
 import { requireAdmin } from "@/lib/telegram"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
 
-export async function POST(request: NextRequest) {
+const log = createLogger("api/participants/add")
+
+export const POST = withRequestContext("/api/participants/add", withIdempotency("/api/participants/add", async function POST(request: NextRequest) {
   try {
     // Check authorization - only admins can add participants
     const adminUser = await requireAdmin(request.headers)
@@ -54,7 +59,7 @@ export async function POST(request: NextRequest) {
     }
     return NextResponse.json(created, { status: 201 })
   } catch (e) {
-    console.error("Failed to add participant (alias):", e)
+    log.error("Failed to add participant (alias)", { error: e })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
\ No newline at end of file
+}))
\ No newline at end of file
@@ -6,12 +6,16 @@ import {
   updateUserProfile,
   type UserProfileData,
 } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+
+const log = createLogger("api/profile")
 
 // GET /api/profile - Get user profile (auto-creates if not exists)
-export async function GET(request: NextRequest) {
+export const GET = withRequestContext("/api/profile", async function GET(request: NextRequest) {
   try {
     // Get Telegram user from headers
-    const telegramUser = getTelegramUserFromHeaders(request.headers)
+    const telegramUser = await getTelegramUserFromHeaders(request.headers)
 
     if (!telegramUser) {
       return NextResponse.json(
@@ -25,7 +29,7 @@ export async function GET(request: NextRequest) {
 
     if (!user) {
       // Auto-create profile with Telegram data
-      console.log(`Auto-creating profile for Telegram user ${telegramUser.id}`)
+      log.info("Auto-creating profile", { telegramId: telegramUser.id })
       user = await createUser({
         telegram_id: telegramUser.id,
         username: telegramUser.username,
@@ -40,19 +44,19 @@ export async function GET(request: NextRequest) {
 
     return NextResponse.json({ user })
   } catch (error) {
-    console.error("Error fetching user profile:", error)
+    log.error("Error fetching user profile", { error })
     return NextResponse.json(
       { error: "Internal server error" },
       { status: 500 }
     )
   }
-}
+})
 
 // POST /api/profile - Create user profile
-export async function POST(request: NextRequest) {
+export const POST = withRequestContext("/api/profile", async function POST(request: NextRequest) {
   try {
     // Get Telegram user from headers
-    const telegramUser = getTelegramUserFromHeaders(request.headers)
+    const telegramUser = await getTelegramUserFromHeaders(request.headers)
 
     if (!telegramUser) {
       return NextResponse.json(
@@ -103,19 +107,19 @@ export async function POST(request: NextRequest) {
 
     return NextResponse.json({ user: newUser }, { status: 201 })
   } catch (error) {
-    console.error("Error creating user profile:", error)
+    log.error("Error creating user profile", { error })
     return NextResponse.json(
       { error: "Internal server error" },
       { status: 500 }
     )
   }
-}
+})
 
 // PUT /api/profile - Update user profile
-export async function PUT(request: NextRequest) {
+export const PUT = withRequestContext("/api/profile", async function PUT(request: NextRequest) {
   try {
     // Get Telegram user from headers
-    const telegramUser = getTelegramUserFromHeaders(request.headers)
+    const telegramUser = await getTelegramUserFromHeaders(request.headers)
 
     if (!telegramUser) {
       return NextResponse.json(
@@ -164,10 +168,10 @@ export async function PUT(request: NextRequest) {
 
     return NextResponse.json({ user: updatedUser })
   } catch (error) {
-    console.error("Error updating user profile:", error)
+    log.error("Error updating user profile", { error })
     return NextResponse.json(
       { error: "Internal server error" },
       { status: 500 }
     )
   }
-}
+})
@@ -5,6 +5,7 @@ import { GET as leaderboardGet } from '../leaderboard/route'
 import { GET as playerGet, PUT as playerPut } from '../player/[userId]/route'
 import { GET as historyGet } from '../history/[userId]/route'
 import { POST as predictPost } from '../predict/route'
+import { POST as matrixPost } from '../predict/matrix/route'
 
 // Mock dependencies
 vi.mock('@/lib/rating/ratingService', () => ({
@@ -142,6 +143,16 @@ describe('Rating API Endpoints', () => {
 
       expect(response.status).toBe(400)
     })
+
+    it('should reject offset paging', async () => {
+      const mockRequest = new NextRequest('http://localhost:3000/api/rating/leaderboard?limit=10&offset=100')
+
+      const response = await leaderboardGet(mockRequest)
+      const data = await response.json()
+
+      expect(response.status).toBe(400)
+      expect(data.error).toContain('cursor')
+    })
   })
 
   describe('GET /api/rating/player/[userId]', () => {
@@ -335,6 +346,22 @@ describe('Rating API Endpoints', () => {
     })
   })
 
+  describe('POST /api/rating/predict/matrix', () => {
+    it('should reject oversized requests with 413', async () => {
+      const post = (pairings: Array<[number, number]>) => matrixPost(new NextRequest('http://localhost:3000/api/rating/predict/matrix', {
+        method: 'POST',
+        body: JSON.stringify({ pairings }),
+        headers: { 'Content-Type': 'application/json' }
+      }))
+
+      const tooMany = Array.from({ length: 2001 }, (): [number, number] => [1, 2])
+      expect((await post(tooMany)).status).toBe(413)
+
+      const tooManyPlayers = Array.from({ length: 251 }, (_, i): [number, number] => [i * 2 + 1, i * 2 + 2])
+      expect((await post(tooManyPlayers)).status).toBe(413)
+    })
+  })
+
   describe('Error Handling', () => {
     it('should handle database errors gracefully', async () => {
       // Mock database error
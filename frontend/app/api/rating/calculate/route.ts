@@ -1,8 +1,13 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { ratingService } from '@/lib/rating/ratingService'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+import { withIdempotency } from '@/lib/idempotency'
+
+const log = createLogger('api/rating/calculate')
 
 // POST /api/rating/calculate - Calculate rating from match result
-export async function POST(request: NextRequest) {
+export const POST = withRequestContext('/api/rating/calculate', withIdempotency('/api/rating/calculate', async function POST(request: NextRequest) {
   try {
     const body = await request.json()
     const { whitePlayerId, blackPlayerId, result, matchId, tournamentId } = body
@@ -59,10 +64,10 @@ export async function POST(request: NextRequest) {
     })
 
   } catch (error) {
-    console.error('Error calculating rating:', error)
+    log.error('Error calculating rating', { error })
     return NextResponse.json(
       { error: 'Internal server error' },
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+}))
\ No newline at end of file
@@ -1,8 +1,18 @@
 import { NextRequest, NextResponse } from 'next/server'
-import { ratingService } from '@/lib/rating/ratingService'
+import { HISTORY_RANGES, decodeHistoryCursor, ratingHistorySeries } from '@/lib/rating/historySeries'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+
+const log = createLogger('api/rating/history/[userId]')
+
+const DEFAULT_POINTS = 200
+const MAX_POINTS = 1000
+const HOUR_MS = 60 * 60 * 1000
 
 // GET /api/rating/history/[userId] - Get player rating history
-export async function GET(
+// Downsampled to `points` chart points over `range` (7d/30d/90d/1y/all) or `from`/`to`;
+// pass `cursor` from pagination.nextCursor to continue past the first page of raw rows
+export const GET = withRequestContext('/api/rating/history/[userId]', async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ userId: string }> }
 ) {
@@ -10,8 +20,12 @@ export async function GET(
     const { userId: userIdParam } = await params
     const userId = parseInt(userIdParam)
     const { searchParams } = new URL(request.url)
-    const limit = parseInt(searchParams.get('limit') || '50')
-    const offset = parseInt(searchParams.get('offset') || '0')
+    const range = searchParams.get('range')
+    const cursor = searchParams.get('cursor')
+    const points = Math.min(
+      Math.max(parseInt(searchParams.get('points') || String(DEFAULT_POINTS)) || DEFAULT_POINTS, 3),
+      MAX_POINTS
+    )
 
     if (isNaN(userId)) {
       return NextResponse.json(
@@ -20,21 +34,74 @@ export async function GET(
       )
     }
 
-    const history = await ratingService.getRatingHistory(userId, limit)
-    
-    return NextResponse.json({ 
-      history,
+    if (range !== null && !Object.prototype.hasOwnProperty.call(HISTORY_RANGES, range)) {
+      return NextResponse.json(
+        { error: 'Invalid range' },
+        { status: 400 }
+      )
+    }
+
+    let from = parseTimestamp(searchParams.get('from'))
+    const to = parseTimestamp(searchParams.get('to'))
+    if (from === undefined || to === undefined) {
+      return NextResponse.json(
+        { error: 'Invalid from/to timestamp' },
+        { status: 400 }
+      )
+    }
+
+    const days = range ? HISTORY_RANGES[range] : null
+    if (!from && days) {
+      // Hour-aligned so the same range maps to the same cached series for a while
+      const start = Date.now() - days * 24 * HOUR_MS
+      from = new Date(Math.floor(start / HOUR_MS) * HOUR_MS).toISOString()
+    }
+
+    if (cursor) {
+      try {
+        decodeHistoryCursor(cursor)
+      } catch {
+        return NextResponse.json(
+          { error: 'Invalid cursor' },
+          { status: 400 }
+        )
+      }
+    }
+
+    const series = await ratingHistorySeries.get(userId, { from, to, points, cursor })
+    if (!series) {
+      throw new Error('Failed to load rating history')
+    }
+
+    return NextResponse.json({
+      history: series.points,
       pagination: {
-        limit,
-        offset,
-        total: history.length
+        points,
+        sourceRows: series.sourceRows,
+        cursor,
+        nextCursor: series.nextCursor,
+        hasMore: series.nextCursor !== null
+      },
+      filters: {
+        range,
+        from,
+        to
       }
     })
   } catch (error) {
-    console.error('Error getting rating history:', error)
+    log.error('Error getting rating history', { error })
     return NextResponse.json(
       { error: 'Internal server error' },
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+})
+
+/**
+ * ISO date or epoch milliseconds -> ISO string; null when absent, undefined when invalid
+ */
+function parseTimestamp(value: string | null): string | null | undefined {
+  if (!value) return null
+  const time = /^\d+$/.test(value) ? Number(value) : Date.parse(value)
+  return Number.isFinite(time) ? new Date(time).toISOString() : undefined
+}
@@ -1,41 +1,57 @@
 import { NextRequest, NextResponse } from 'next/server'
-import { ratingService } from '@/lib/rating/ratingService'
+import { ratingService, decodeLeaderboardCursor } from '@/lib/rating/ratingService'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+
+const log = createLogger('api/rating/leaderboard')
 
 // GET /api/rating/leaderboard - Get rating leaderboard
-export async function GET(request: NextRequest) {
+// Paged by keyset: pass `cursor` from the previous response's pagination.nextCursor.
+// `offset` is not accepted (400) so old clients fail loudly instead of getting page one
+export const GET = withRequestContext('/api/rating/leaderboard', async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url)
-    const limit = Math.min(parseInt(searchParams.get('limit') || '100'), 500)
-    const offset = parseInt(searchParams.get('offset') || '0')
-    const minGames = parseInt(searchParams.get('minGames') || '5')
+    if (searchParams.has('offset')) {
+      return NextResponse.json(
+        { error: 'offset is not supported; page with cursor (pagination.nextCursor)' },
+        { status: 400 }
+      )
+    }
+    const limit = Math.min(Math.max(parseInt(searchParams.get('limit') || '100') || 100, 1), 500)
+    const minGames = Math.max(parseInt(searchParams.get('minGames') || '5') || 0, 0)
+    const cursor = searchParams.get('cursor')
 
-    const leaderboard = await ratingService.getLeaderboard(limit)
-    
-    // Filter by minimum games if specified
-    const filteredLeaderboard = minGames > 0 
-      ? leaderboard.filter(player => player.games_count >= minGames)
-      : leaderboard
+    if (cursor) {
+      try {
+        decodeLeaderboardCursor(cursor)
+      } catch {
+        return NextResponse.json(
+          { error: 'Invalid cursor' },
+          { status: 400 }
+        )
+      }
+    }
 
-    // Apply pagination
-    const paginatedLeaderboard = filteredLeaderboard.slice(offset, offset + limit)
+    const page = await ratingService.getLeaderboardPage({ limit, minGames, cursor })
 
     return NextResponse.json({
-      leaderboard: paginatedLeaderboard,
+      leaderboard: page.entries,
       pagination: {
         limit,
-        offset,
-        total: filteredLeaderboard.length,
-        hasMore: offset + limit < filteredLeaderboard.length
+        cursor,
+        nextCursor: page.nextCursor,
+        hasMore: page.nextCursor !== null,
+        totalEstimate: page.totalEstimate
       },
       filters: {
         minGames
       }
     })
   } catch (error) {
-    console.error('Error getting leaderboard:', error)
+    log.error('Error getting leaderboard', { error })
     return NextResponse.json(
       { error: 'Internal server error' },
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+})
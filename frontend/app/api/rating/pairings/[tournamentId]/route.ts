@@ -2,9 +2,13 @@ import { NextRequest, NextResponse } from 'next/server'
 import { ratingPairingService } from '@/lib/rating/ratingPairingService'
 import { ratingService } from '@/lib/rating/ratingService'
 import { supabase } from '@/lib/supabase'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+
+const log = createLogger('api/rating/pairings/[tournamentId]')
 
 // GET /api/rating/pairings/[tournamentId] - Get rating-based pairings for tournament
-export async function GET(
+export const GET = withRequestContext('/api/rating/pairings/[tournamentId]', async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ tournamentId: string }> }
 ) {
@@ -26,7 +30,7 @@ export async function GET(
     // Get tournament participants
     const { data: participants } = await supabase
       .from('tournament_participants')
-      .select('*, user:users(*)')
+      .select('id, tournament_id, user_id, nickname, created_at')
       .eq('tournament_id', tournamentId)
 
     if (!participants || participants.length === 0) {
@@ -37,7 +41,7 @@ export async function GET(
     }
 
     // Get rating-based pairings
-    const pairings = await ratingPairingService.findRatingAwarePairings(
+    const { pairings, bye, unpaired } = await ratingPairingService.findRatingAwareRound(
       tournamentId,
       roundNumber,
       participants,
@@ -48,12 +52,16 @@ export async function GET(
       }
     )
 
+    // Ratings for every paired participant in one query
+    const ratings = await ratingService.getPlayerRatings(
+      pairings.flatMap((pairing) => [pairing.whiteParticipant.user_id, pairing.blackParticipant.user_id])
+    )
+
     return NextResponse.json({
-      pairings: await Promise.all(pairings.map(async (pairing) => {
-        // Get ratings for participants
-        const whiteRating = await ratingService.getPlayerRating(pairing.whiteParticipant.user_id)
-        const blackRating = await ratingService.getPlayerRating(pairing.blackParticipant.user_id)
-        
+      pairings: pairings.map((pairing) => {
+        const whiteRating = ratings.get(pairing.whiteParticipant.user_id)
+        const blackRating = ratings.get(pairing.blackParticipant.user_id)
+
         return {
           white: {
             id: pairing.whiteParticipant.id,
@@ -69,21 +77,25 @@ export async function GET(
           },
           ratingDifference: pairing.ratingDifference,
           qualityScore: pairing.qualityScore,
-          colorBalance: pairing.colorBalance
+          colorBalance: pairing.colorBalance,
+          meetsQualityThreshold: pairing.meetsQualityThreshold
         }
-      })),
+      }),
+      bye: bye ? { id: bye.id, userId: bye.user_id, nickname: bye.nickname } : null,
+      unpaired: unpaired.map((p) => ({ id: p.id, userId: p.user_id, nickname: p.nickname })),
       metadata: {
         totalPairings: pairings.length,
+        belowQualityThreshold: pairings.filter((p) => !p.meetsQualityThreshold).length,
         averageQualityScore: pairings.reduce((sum, p) => sum + p.qualityScore, 0) / pairings.length || 0,
         averageRatingDiff: pairings.reduce((sum, p) => sum + p.ratingDifference, 0) / pairings.length || 0
       }
     })
 
   } catch (error) {
-    console.error('Error getting rating pairings:', error)
+    log.error('Error getting rating pairings', { error })
     return NextResponse.json(
       { error: 'Internal server error' },
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
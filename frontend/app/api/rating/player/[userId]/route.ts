@@ -1,9 +1,13 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { ratingService } from '@/lib/rating/ratingService'
 import { supabase } from '@/lib/supabase'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+
+const log = createLogger('api/rating/player/[userId]')
 
 // GET /api/rating/player/[userId] - Get player rating
-export async function GET(
+export const GET = withRequestContext('/api/rating/player/[userId]', async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ userId: string }> }
 ) {
@@ -34,16 +38,16 @@ export async function GET(
 
     return NextResponse.json({ rating })
   } catch (error) {
-    console.error('Error getting player rating:', error)
+    log.error('Error getting player rating', { error })
     return NextResponse.json(
       { error: 'Internal server error' },
       { status: 500 }
     )
   }
-}
+})
 
 // PUT /api/rating/player/[userId] - Update player rating (admin only)
-export async function PUT(
+export const PUT = withRequestContext('/api/rating/player/[userId]', async function PUT(
   request: NextRequest,
   { params }: { params: Promise<{ userId: string }> }
 ) {
@@ -95,6 +99,7 @@ export async function PUT(
     if (error) {
       throw new Error(`Failed to update rating: ${error.message}`)
     }
+    ratingService.onRatingWritten(userId, data.rating, data.games_count)
 
     // Create history entry for manual adjustment
     await supabase.from('rating_history').insert({
@@ -111,10 +116,10 @@ export async function PUT(
 
     return NextResponse.json({ rating: data })
   } catch (error) {
-    console.error('Error updating player rating:', error)
+    log.error('Error updating player rating', { error })
     return NextResponse.json(
       { error: 'Internal server error' },
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
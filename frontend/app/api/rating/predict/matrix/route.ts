@@ -0,0 +1,133 @@
+import { NextRequest, NextResponse } from 'next/server'
+import {
+  computePredictionMatrix,
+  encodePredictionMatrix,
+  loadPredictionInputs,
+  lookupPairings,
+  predictionMatrices,
+  type PredictionMatrix
+} from '@/lib/rating/predictionMatrix'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+
+const log = createLogger('api/rating/predict/matrix')
+
+const round = (value: number) => Math.round(value * 10000) / 10000
+
+// Without a tournamentId the route builds an n x n matrix over the requested
+// players, so both the list and the distinct players are capped
+const MAX_PAIRINGS = 2000
+const MAX_PLAYERS = 500
+
+// GET /api/rating/predict/matrix?tournamentId=1&format=json|binary - Win/draw matrix for a tournament
+export const GET = withRequestContext('/api/rating/predict/matrix', async function GET(request: NextRequest) {
+  try {
+    const { searchParams } = new URL(request.url)
+    const tournamentId = parseInt(searchParams.get('tournamentId') || '')
+    const format = searchParams.get('format') || 'json'
+
+    if (isNaN(tournamentId)) {
+      return NextResponse.json(
+        { error: 'Valid tournamentId is required' },
+        { status: 400 }
+      )
+    }
+    if (format !== 'json' && format !== 'binary') {
+      return NextResponse.json(
+        { error: 'format must be json or binary' },
+        { status: 400 }
+      )
+    }
+
+    const matrix = await predictionMatrices.get(tournamentId)
+    if (!matrix) {
+      return NextResponse.json(
+        { error: 'Failed to compute predictions' },
+        { status: 500 }
+      )
+    }
+
+    if (format === 'binary') {
+      return new NextResponse(encodePredictionMatrix(matrix), {
+        headers: { 'Content-Type': 'application/octet-stream' }
+      })
+    }
+
+    // Flat row-major arrays; loss[i][j] = win[j * size + i]
+    return NextResponse.json({
+      tournamentId,
+      size: matrix.userIds.length,
+      userIds: Array.from(matrix.userIds),
+      win: Array.from(matrix.win, round),
+      draw: Array.from(matrix.draw, round)
+    })
+  } catch (error) {
+    log.error('Error building prediction matrix', { error })
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    )
+  }
+})
+
+// POST /api/rating/predict/matrix - Predict a list of pairings in one call
+export const POST = withRequestContext('/api/rating/predict/matrix', async function POST(request: NextRequest) {
+  try {
+    const body = await request.json().catch(() => null)
+    const pairings = body?.pairings
+    const tournamentId = body?.tournamentId !== undefined ? Number(body.tournamentId) : null
+
+    const valid = Array.isArray(pairings) && pairings.length > 0 && pairings.every(
+      (p: unknown) => Array.isArray(p) && p.length === 2 && p.every((id) => Number.isInteger(id) && id > 0)
+    )
+    if (!valid || (tournamentId !== null && isNaN(tournamentId))) {
+      return NextResponse.json(
+        { error: 'pairings must be a non-empty list of [player1, player2] user IDs' },
+        { status: 400 }
+      )
+    }
+
+    if (pairings.length > MAX_PAIRINGS) {
+      return NextResponse.json(
+        { error: `At most ${MAX_PAIRINGS} pairings per request` },
+        { status: 413 }
+      )
+    }
+
+    let matrix: PredictionMatrix | null
+    if (tournamentId !== null) {
+      matrix = await predictionMatrices.get(tournamentId)
+    } else {
+      const userIds = [...new Set((pairings as Array<[number, number]>).flat())]
+      if (userIds.length > MAX_PLAYERS) {
+        return NextResponse.json(
+          { error: `At most ${MAX_PLAYERS} distinct players per request without a tournamentId` },
+          { status: 413 }
+        )
+      }
+      matrix = computePredictionMatrix(await loadPredictionInputs(userIds))
+    }
+
+    if (!matrix) {
+      return NextResponse.json(
+        { error: 'Failed to compute predictions' },
+        { status: 500 }
+      )
+    }
+
+    const predictions = lookupPairings(matrix, pairings as Array<[number, number]>)
+    return NextResponse.json({
+      predictions,
+      metadata: {
+        requested: pairings.length,
+        missing: predictions.filter((p) => p === null).length
+      }
+    })
+  } catch (error) {
+    log.error('Error predicting pairings', { error })
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    )
+  }
+})
@@ -1,8 +1,12 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { ratingService } from '@/lib/rating/ratingService'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+
+const log = createLogger('api/rating/predict')
 
 // GET /api/rating/predict - Predict match outcome
-export async function GET(request: NextRequest) {
+export const GET = withRequestContext('/api/rating/predict', async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url)
     const player1Id = parseInt(searchParams.get('player1') || '0')
@@ -25,10 +29,10 @@ export async function GET(request: NextRequest) {
       }
     })
   } catch (error) {
-    console.error('Error predicting match outcome:', error)
+    log.error('Error predicting match outcome', { error })
     return NextResponse.json(
       { error: 'Internal server error' },
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -0,0 +1,81 @@
+import { NextRequest, NextResponse } from 'next/server'
+import { ratingRanks } from '@/lib/rating/rankIndex'
+import { supabase } from '@/lib/supabase'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+
+const log = createLogger('api/rating/rank/[userId]')
+
+const MAX_AROUND = 25
+
+// GET /api/rating/rank/[userId] - Player's leaderboard rank, percentile and neighbours
+export const GET = withRequestContext('/api/rating/rank/[userId]', async function GET(
+  request: NextRequest,
+  { params }: { params: Promise<{ userId: string }> }
+) {
+  try {
+    const { userId: userIdParam } = await params
+    const userId = parseInt(userIdParam)
+    const { searchParams } = new URL(request.url)
+    const around = Math.min(Math.max(parseInt(searchParams.get('around') || '2') || 0, 0), MAX_AROUND)
+
+    if (isNaN(userId)) {
+      return NextResponse.json(
+        { error: 'Invalid user ID' },
+        { status: 400 }
+      )
+    }
+
+    const index = await ratingRanks.get()
+    if (!index) {
+      throw new Error('Rating rank index is unavailable')
+    }
+
+    const rank = index.getRank(userId)
+    if (!rank) {
+      return NextResponse.json(
+        { error: 'Player is not ranked' },
+        { status: 404 }
+      )
+    }
+
+    const neighbours = index.around(userId, around)
+    const { data: users, error } = await supabase
+      .from('users')
+      .select('id, username, first_name, last_name')
+      .in('id', neighbours.map((n) => n.userId))
+
+    if (error) {
+      throw new Error(`Failed to load users: ${error.message}`)
+    }
+
+    const userById = new Map(((users || []) as Array<{
+      id: number
+      username: string | null
+      first_name: string
+      last_name: string
+    }>).map((u) => [u.id, u]))
+
+    return NextResponse.json({
+      userId,
+      rating: rank.rating,
+      rank: rank.rank,
+      total: rank.total,
+      percentile: Math.round(rank.percentile * 100) / 100,
+      neighbours: neighbours.map((n) => ({
+        id: n.userId,
+        username: userById.get(n.userId)?.username ?? null,
+        first_name: userById.get(n.userId)?.first_name ?? '',
+        last_name: userById.get(n.userId)?.last_name ?? '',
+        rating: n.rating,
+        rank: n.rank
+      }))
+    })
+  } catch (error) {
+    log.error('Error getting player rank', { error })
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    )
+  }
+})
@@ -1,8 +1,12 @@
 import { NextRequest, NextResponse } from 'next/server'
 import { ratingPairingService } from '@/lib/rating/ratingPairingService'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+
+const log = createLogger('api/rating/recommendations/[tournamentId]/[userId]')
 
 // GET /api/rating/recommendations/[tournamentId]/[userId] - Get pairing recommendations for user
-export async function GET(
+export const GET = withRequestContext('/api/rating/recommendations/[tournamentId]/[userId]', async function GET(
   request: NextRequest,
   { params }: { params: Promise<{ tournamentId: string; userId: string }> }
 ) {
@@ -36,10 +40,10 @@ export async function GET(
     })
 
   } catch (error) {
-    console.error('Error getting pairing recommendations:', error)
+    log.error('Error getting pairing recommendations', { error })
     return NextResponse.json(
       { error: 'Internal server error' },
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -1,6 +1,7 @@
 import { NextResponse } from "next/server"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET() {
+export const GET = withRequestContext("/api/simulate-google-calendar-failure", async function GET() {
   // Simulate an upstream Google Calendar failure
   return NextResponse.json({ error: "Simulated Google Calendar failure" }, { status: 500 })
-}
\ No newline at end of file
+})
\ No newline at end of file
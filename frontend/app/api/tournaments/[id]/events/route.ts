@@ -0,0 +1,74 @@
+import { NextRequest, NextResponse } from "next/server"
+import { formatServerSentEvent, tournamentEvents } from "@/lib/tournamentEvents"
+import { withRequestContext } from "@/lib/requestContext"
+
+// Long-lived stream: never prerender, and keep it on the Node runtime where
+// the in-process event bus lives
+export const dynamic = "force-dynamic"
+export const runtime = "nodejs"
+
+// Keeps proxies from closing an idle stream
+const HEARTBEAT_MS = 25_000
+// Reconnect delay suggested to EventSource when the stream ends
+const RETRY_MS = 3_000
+
+export const GET = withRequestContext("/api/tournaments/[id]/events", async function GET(
+  req: NextRequest,
+  ctx: { params: Promise<{ id: string }> }
+) {
+  const { id } = await ctx.params
+  const tournamentId = Number(id)
+  if (!Number.isFinite(tournamentId) || tournamentId <= 0) {
+    return NextResponse.json({ error: "Некорректный ID турнира" }, { status: 400 })
+  }
+
+  const encoder = new TextEncoder()
+  let cleanup = () => {}
+
+  const stream = new ReadableStream<Uint8Array>({
+    start(controller) {
+      const send = (chunk: string) => {
+        try {
+          controller.enqueue(encoder.encode(chunk))
+        } catch {
+          // Stream already closed
+          cleanup()
+        }
+      }
+
+      send(`retry: ${RETRY_MS}\n: connected\n\n`)
+      const unsubscribe = tournamentEvents.subscribe(tournamentId, (event) => send(formatServerSentEvent(event)))
+      const heartbeat = setInterval(() => send(": ping\n\n"), HEARTBEAT_MS)
+
+      let closed = false
+      cleanup = () => {
+        if (closed) return
+        closed = true
+        clearInterval(heartbeat)
+        unsubscribe()
+        req.signal.removeEventListener("abort", onAbort)
+      }
+      const onAbort = () => {
+        cleanup()
+        try {
+          controller.close()
+        } catch {
+          // Already closed
+        }
+      }
+      req.signal.addEventListener("abort", onAbort)
+    },
+    cancel() {
+      cleanup()
+    }
+  })
+
+  return new Response(stream, {
+    headers: {
+      "Content-Type": "text/event-stream; charset=utf-8",
+      "Cache-Control": "no-cache, no-transform",
+      "Connection": "keep-alive",
+      "X-Accel-Buffering": "no"
+    }
+  })
+})
@@ -0,0 +1,54 @@
+import { NextRequest, NextResponse } from "next/server"
+import { getTournamentById } from "@/lib/db"
+import { requireAdmin } from "@/lib/telegram"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { ARCHIVE_FORMATS, exportTournament, isArchiveFormat } from "@/lib/tournamentArchive"
+
+const log = createLogger("api/tournaments/[id]/export")
+
+// Streamed straight from the database; never prerendered
+export const dynamic = "force-dynamic"
+export const runtime = "nodejs"
+
+/**
+ * Download a tournament as ?format=jsonl (default), csv or trf. JSON Lines and
+ * CSV can be loaded back with POST /api/tournaments/import.
+ */
+export const GET = withRequestContext("/api/tournaments/[id]/export", async function GET(
+  req: NextRequest,
+  ctx: { params: Promise<{ id: string }> }
+) {
+  try {
+    const adminUser = await requireAdmin(req.headers)
+    if (!adminUser) {
+      return NextResponse.json({ error: "Forbidden" }, { status: 403 })
+    }
+    const { id } = await ctx.params
+    const tournamentId = Number(id)
+    if (!Number.isFinite(tournamentId)) {
+      return NextResponse.json({ error: "Invalid tournament id" }, { status: 400 })
+    }
+    const format = new URL(req.url).searchParams.get("format") ?? "jsonl"
+    if (!isArchiveFormat(format)) {
+      return NextResponse.json({ error: "format must be trf, jsonl or csv" }, { status: 400 })
+    }
+
+    const tournament = await getTournamentById(tournamentId)
+    if (!tournament) {
+      return NextResponse.json({ error: "Tournament not found" }, { status: 404 })
+    }
+
+    const { contentType, extension } = ARCHIVE_FORMATS[format]
+    return new Response(exportTournament(tournamentId, format), {
+      headers: {
+        "Content-Type": contentType,
+        "Content-Disposition": `attachment; filename="tournament-${tournamentId}.${extension}"`,
+        "Cache-Control": "no-store"
+      }
+    })
+  } catch (e) {
+    log.error("Failed to export tournament", { error: e })
+    return NextResponse.json({ error: "Internal server error" }, { status: 500 })
+  }
+})
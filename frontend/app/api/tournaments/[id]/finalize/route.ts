@@ -1,8 +1,13 @@
 import { NextRequest, NextResponse } from "next/server"
 import { requireAdmin } from "@/lib/telegram"
 import { getTournamentById, finalizeTournament } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
 
-export async function POST(request: NextRequest, { params }: { params: Promise<{ id: string }> }) {
+const log = createLogger("api/tournaments/[id]/finalize")
+
+export const POST = withRequestContext("/api/tournaments/[id]/finalize", withIdempotency("/api/tournaments/[id]/finalize", async function POST(request: NextRequest, { params }: { params: Promise<{ id: string }> }) {
   try {
     const adminUser = await requireAdmin(request.headers)
     if (!adminUser) {
@@ -26,7 +31,7 @@ export async function POST(request: NextRequest, { params }: { params: Promise<{
     }
     return NextResponse.json({ ok: true })
   } catch (e) {
-    console.error("Failed to finalize tournament:", e)
+    log.error("Failed to finalize tournament", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+}))
\ No newline at end of file
@@ -0,0 +1,90 @@
+import { NextRequest, NextResponse } from "next/server"
+import { standingsForecastService } from "@/lib/rating/forecastService"
+import type { ForecastResult } from "@/lib/rating/standingsForecast"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+
+const log = createLogger("api/tournaments/[id]/forecast")
+
+const MAX_ITERATIONS = 50000
+const MAX_BUDGET_MS = 10000
+
+function intParam(value: string | null, fallback: number, min: number, max: number): number {
+  const parsed = Number(value)
+  if (value === null || !Number.isFinite(parsed)) return fallback
+  return Math.min(max, Math.max(min, Math.floor(parsed)))
+}
+
+// GET /api/tournaments/[id]/forecast?iterations=5000&seed=1&budget=2000&top=3&stream=1
+// Monte Carlo chances to win / finish in the top N; stream=1 sends NDJSON partial results
+export const GET = withRequestContext("/api/tournaments/[id]/forecast", async function GET(req: NextRequest, ctx: { params: Promise<{ id: string }> }) {
+  try {
+    const { id } = await ctx.params
+    const tournamentId = Number(id)
+    if (!Number.isFinite(tournamentId)) {
+      return NextResponse.json({ error: "Некорректный ID турнира" }, { status: 400 })
+    }
+
+    const { searchParams } = new URL(req.url)
+    const options = {
+      iterations: intParam(searchParams.get("iterations"), 5000, 1, MAX_ITERATIONS),
+      seed: intParam(searchParams.get("seed"), 1, 0, 2 ** 31 - 1),
+      timeBudgetMs: intParam(searchParams.get("budget"), 2000, 50, MAX_BUDGET_MS),
+      topN: intParam(searchParams.get("top"), 3, 1, 100),
+    }
+
+    if (searchParams.get("stream") !== "1") {
+      const result = await standingsForecastService.forecast(tournamentId, options)
+      if (!result) {
+        return NextResponse.json({ error: "Не удалось построить прогноз" }, { status: 404 })
+      }
+      return NextResponse.json(result)
+    }
+
+    const encoder = new TextEncoder()
+    // Cancelled when the client disconnects; the worker is terminated then
+    const abort = new AbortController()
+    let closed = false
+    const stream = new ReadableStream({
+      async start(controller) {
+        const send = (payload: ForecastResult | { error: string }) => {
+          if (closed) return
+          try {
+            controller.enqueue(encoder.encode(JSON.stringify(payload) + "\n"))
+          } catch {
+            closed = true
+          }
+        }
+        try {
+          const result = await standingsForecastService.forecast(tournamentId, options, send, abort.signal)
+          if (abort.signal.aborted) return
+          send(result || { error: "Не удалось построить прогноз" })
+          if (!closed) {
+            closed = true
+            controller.close()
+          }
+        } catch (e) {
+          log.error("Failed to stream forecast", { error: e })
+          if (!closed) {
+            closed = true
+            controller.error(e)
+          }
+        }
+      },
+      cancel() {
+        closed = true
+        abort.abort()
+      },
+    })
+
+    return new Response(stream, {
+      headers: {
+        "Content-Type": "application/x-ndjson; charset=utf-8",
+        "Cache-Control": "no-store",
+      },
+    })
+  } catch (e) {
+    log.error("Failed to forecast standings", { error: e })
+    return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
+  }
+})
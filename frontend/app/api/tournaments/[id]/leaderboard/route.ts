@@ -1,29 +1,42 @@
 import { NextRequest, NextResponse } from "next/server"
-import { listLeaderboard, getStandings } from "@/lib/db"
+import { listLeaderboard, getStandings, getTournamentRevision } from "@/lib/db"
+import { etagMatches, notModified, revalidateHeaders, revisionETag } from "@/lib/etag"
+import { createLogger } from "@/lib/logger"
+import { timeSpan, withRequestContext } from "@/lib/requestContext"
 
-export async function GET(_req: NextRequest, ctx: { params: Promise<{ id: string }> }) {
+const log = createLogger("api/tournaments/[id]/leaderboard")
+
+export const GET = withRequestContext("/api/tournaments/[id]/leaderboard", async function GET(req: NextRequest, ctx: { params: Promise<{ id: string }> }) {
   try {
     const { id } = await ctx.params
     const tournamentId = Number(id)
     if (!Number.isFinite(tournamentId)) {
       return NextResponse.json({ error: "Некорректный ID турнира" }, { status: 400 })
     }
+
+    // Read before the data: a write in between only makes the ETag older
+    const revision = await getTournamentRevision(tournamentId)
+    const etag = revision === null ? null : revisionETag(`leaderboard-${tournamentId}`, revision)
+    if (etag && etagMatches(req.headers, etag)) {
+      return notModified(etag, { "Cache-Control": "no-cache" })
+    }
+
     const leaderboard = await listLeaderboard(tournamentId)
     if (Array.isArray(leaderboard) && leaderboard.length > 0) {
-      return NextResponse.json(leaderboard)
+      return NextResponse.json(leaderboard, { headers: revalidateHeaders(etag) })
     }
 
     // Fallback: compute standings dynamically when snapshot is absent
-    const standings = await getStandings(tournamentId)
+    const standings = await timeSpan("standings", () => getStandings(tournamentId))
     const rows = standings.map((s, idx) => ({
       participant_id: s.participant_id,
       nickname: s.nickname,
       points: s.points,
       rank: idx + 1,
     }))
-    return NextResponse.json(rows)
+    return NextResponse.json(rows, { headers: revalidateHeaders(etag) })
   } catch (e) {
-    console.error("Failed to get leaderboard:", e)
+    log.error("Failed to get leaderboard", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -0,0 +1,79 @@
+import { NextRequest, NextResponse } from "next/server"
+import { bulkAddTournamentParticipants, parseParticipantsCsv, type BulkParticipantEntry } from "@/lib/db"
+import { supabase } from "@/lib/supabase"
+import { CsvFormatError } from "@/lib/csv"
+import { requireAdmin } from "@/lib/telegram"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
+
+const log = createLogger("api/tournaments/[id]/participants/bulk")
+
+// Rows per request; larger fields go in several batches
+const MAX_ROWS = 500
+
+/**
+ * Register many participants in one request. The body is either JSON
+ * ({ participants: [{ user_id | telegram_id | username, nickname }] } or
+ * { csv: "..." }) or text/csv. Responds with the created participants and
+ * per-row errors; rows are numbered from 0 in submission order.
+ */
+export const POST = withRequestContext("/api/tournaments/[id]/participants/bulk", withIdempotency("/api/tournaments/[id]/participants/bulk", async function POST(request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
+  try {
+    const adminUser = await requireAdmin(request.headers)
+    if (!adminUser) {
+      return NextResponse.json({ error: "Forbidden" }, { status: 403 })
+    }
+    const { id } = await ctx.params
+    const tournamentId = Number(id)
+    if (!Number.isFinite(tournamentId)) {
+      return NextResponse.json({ error: "Invalid tournament id" }, { status: 400 })
+    }
+
+    let entries: BulkParticipantEntry[]
+    try {
+      if ((request.headers.get("content-type") || "").includes("text/csv")) {
+        entries = parseParticipantsCsv(await request.text())
+      } else {
+        const body = await request.json().catch(() => null) as { participants?: unknown; csv?: unknown } | null
+        if (body && typeof body.csv === "string") {
+          entries = parseParticipantsCsv(body.csv)
+        } else if (body && Array.isArray(body.participants)) {
+          // Each element is checked by bulkAddTournamentParticipants and
+          // reported as a row error when malformed
+          entries = body.participants as BulkParticipantEntry[]
+        } else {
+          return NextResponse.json({ error: "Передайте participants (массив) или csv" }, { status: 400 })
+        }
+      }
+    } catch (e) {
+      if (e instanceof CsvFormatError) {
+        return NextResponse.json({ error: `Некорректный CSV: ${e.message}` }, { status: 400 })
+      }
+      throw e
+    }
+
+    if (entries.length === 0) {
+      return NextResponse.json({ error: "Список участников пуст" }, { status: 400 })
+    }
+    if (entries.length > MAX_ROWS) {
+      return NextResponse.json({ error: `Не больше ${MAX_ROWS} участников за запрос` }, { status: 413 })
+    }
+
+    const { data: tournament } = await supabase
+      .from("tournaments")
+      .select("id, archived")
+      .eq("id", tournamentId)
+      .single()
+
+    if (!tournament || Number(tournament.archived) === 1) {
+      return NextResponse.json({ error: "tournament not found or invalid status" }, { status: 400 })
+    }
+
+    const result = await bulkAddTournamentParticipants(tournamentId, entries)
+    return NextResponse.json(result, { status: result.created.length > 0 ? 201 : 400 })
+  } catch (e) {
+    log.error("Failed to bulk add participants", { error: e })
+    return NextResponse.json({ error: "Internal server error" }, { status: 500 })
+  }
+}))
@@ -1,23 +1,34 @@
 import { NextRequest, NextResponse } from "next/server"
-import { addTournamentParticipant, listTournamentParticipants } from "@/lib/db"
+import { addTournamentParticipant, getTournamentRevision, listTournamentParticipants } from "@/lib/db"
+import { etagMatches, notModified, revalidateHeaders, revisionETag } from "@/lib/etag"
 import { requireAdmin } from "@/lib/telegram"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
 
-export async function GET(_: NextRequest, ctx: { params: Promise<{ id: string }> }) {
+const log = createLogger("api/tournaments/[id]/participants")
+
+export const GET = withRequestContext("/api/tournaments/[id]/participants", async function GET(req: NextRequest, ctx: { params: Promise<{ id: string }> }) {
   try {
     const { id } = await ctx.params
     const tournamentId = Number(id)
     if (!Number.isFinite(tournamentId)) {
       return NextResponse.json({ error: "Invalid tournament id" }, { status: 400 })
     }
+    const revision = await getTournamentRevision(tournamentId)
+    const etag = revision === null ? null : revisionETag(`participants-${tournamentId}`, revision)
+    if (etag && etagMatches(req.headers, etag)) {
+      return notModified(etag, { "Cache-Control": "no-cache" })
+    }
     const participants = await listTournamentParticipants(tournamentId)
-    return NextResponse.json(participants)
+    return NextResponse.json(participants, { headers: revalidateHeaders(etag) })
   } catch (e) {
-    console.error("Failed to list participants:", e)
+    log.error("Failed to list participants", { error: e })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
+})
 
-export async function POST(request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
+export const POST = withRequestContext("/api/tournaments/[id]/participants", withIdempotency("/api/tournaments/[id]/participants", async function POST(request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
   try {
     const adminUser = await requireAdmin(request.headers)
     if (!adminUser) {
@@ -42,7 +53,7 @@ export async function POST(request: NextRequest, ctx: { params: Promise<{ id: st
     }
     return NextResponse.json(created, { status: 201 })
   } catch (e) {
-    console.error("Failed to add participant:", e)
+    log.error("Failed to add participant", { error: e })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
+}))
@@ -1,8 +1,13 @@
 import { NextRequest, NextResponse } from "next/server"
 import { getTelegramUserFromHeaders } from "@/lib/telegram"
 import { listMatches, updateMatchResult } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
 
-export async function GET(
+const log = createLogger("api/tournaments/[id]/rounds/[roundId]/matches")
+
+export const GET = withRequestContext("/api/tournaments/[id]/rounds/[roundId]/matches", async function GET(
   _req: NextRequest,
   ctx: { params: Promise<{ id: string; roundId: string }> }
 ) {
@@ -15,14 +20,14 @@ export async function GET(
     const matches = await listMatches(roundIdNum)
     return NextResponse.json(matches)
   } catch (e) {
-    console.error("Failed to list matches:", e)
+    log.error("Failed to list matches", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
+})
 
-export async function PATCH(req: NextRequest) {
+export const PATCH = withRequestContext("/api/tournaments/[id]/rounds/[roundId]/matches", withIdempotency("/api/tournaments/[id]/rounds/[roundId]/matches", async function PATCH(req: NextRequest) {
   try {
-    const telegramUser = getTelegramUserFromHeaders(req.headers)
+    const telegramUser = await getTelegramUserFromHeaders(req.headers)
     if (!telegramUser) {
       return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
     }
@@ -38,7 +43,7 @@ export async function PATCH(req: NextRequest) {
     }
     return NextResponse.json(updated)
   } catch (e) {
-    console.error("Failed to update match:", e)
+    log.error("Failed to update match", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+}))
\ No newline at end of file
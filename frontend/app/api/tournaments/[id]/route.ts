@@ -1,8 +1,12 @@
 import { NextRequest, NextResponse } from "next/server"
 import { requireAdmin } from "@/lib/telegram"
 import { deleteTournament, getTournamentById, updateTournamentArchived } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET(_request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
+const log = createLogger("api/tournaments/[id]")
+
+export const GET = withRequestContext("/api/tournaments/[id]", async function GET(_request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
   try {
     const { id } = await ctx.params
     const tournamentId = Number(id)
@@ -17,12 +21,12 @@ export async function GET(_request: NextRequest, ctx: { params: Promise<{ id: st
 
     return NextResponse.json(tournament)
   } catch (e) {
-    console.error("Failed to get tournament:", e)
+    log.error("Failed to get tournament", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
+})
 
-export async function DELETE(request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
+export const DELETE = withRequestContext("/api/tournaments/[id]", async function DELETE(request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
   try {
     const adminUser = await requireAdmin(request.headers)
     if (!adminUser) {
@@ -46,12 +50,12 @@ export async function DELETE(request: NextRequest, ctx: { params: Promise<{ id:
     }
     return NextResponse.json({ ok: true })
   } catch (e) {
-    console.error("Failed to delete tournament:", e)
+    log.error("Failed to delete tournament", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
+})
 
-export async function PATCH(request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
+export const PATCH = withRequestContext("/api/tournaments/[id]", async function PATCH(request: NextRequest, ctx: { params: Promise<{ id: string }> }) {
   try {
     const adminUser = await requireAdmin(request.headers)
     if (!adminUser) {
@@ -81,7 +85,7 @@ export async function PATCH(request: NextRequest, ctx: { params: Promise<{ id: s
     }
     return NextResponse.json({ ok: true, id: tournamentId, archived })
   } catch (e) {
-    console.error("Failed to patch tournament:", e)
+    log.error("Failed to patch tournament", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -1,28 +1,40 @@
 import { NextRequest, NextResponse } from "next/server"
 import { getTelegramUserFromHeaders } from "@/lib/telegram"
-import { listMatches, updateMatchResult } from "@/lib/db"
+import { getTournamentRevision, listMatches, updateMatchResult } from "@/lib/db"
+import { etagMatches, notModified, revalidateHeaders, revisionETag } from "@/lib/etag"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
 
-export async function GET(
-  _req: NextRequest,
+const log = createLogger("api/tournaments/[id]/tours/[tourId]/matches")
+
+export const GET = withRequestContext("/api/tournaments/[id]/tours/[tourId]/matches", async function GET(
+  req: NextRequest,
   ctx: { params: Promise<{ id: string; tourId: string }> }
 ) {
   try {
-    const { tourId } = await ctx.params
+    const { id, tourId } = await ctx.params
     const tourIdNum = Number(tourId)
     if (!Number.isFinite(tourIdNum)) {
       return NextResponse.json({ error: "Некорректный тур" }, { status: 400 })
     }
+    const tournamentId = Number(id)
+    const revision = Number.isFinite(tournamentId) ? await getTournamentRevision(tournamentId) : null
+    const etag = revision === null ? null : revisionETag(`matches-${tournamentId}-${tourIdNum}`, revision)
+    if (etag && etagMatches(req.headers, etag)) {
+      return notModified(etag, { "Cache-Control": "no-cache" })
+    }
     const matches = await listMatches(tourIdNum)
-    return NextResponse.json(matches)
+    return NextResponse.json(matches, { headers: revalidateHeaders(etag) })
   } catch (e) {
-    console.error("Failed to list matches:", e)
+    log.error("Failed to list matches", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
+})
 
-export async function PATCH(req: NextRequest) {
+export const PATCH = withRequestContext("/api/tournaments/[id]/tours/[tourId]/matches", withIdempotency("/api/tournaments/[id]/tours/[tourId]/matches", async function PATCH(req: NextRequest) {
   try {
-    const telegramUser = getTelegramUserFromHeaders(req.headers)
+    const telegramUser = await getTelegramUserFromHeaders(req.headers)
     if (!telegramUser) {
       return NextResponse.json({ error: "Unauthorized" }, { status: 401 })
     }
@@ -38,7 +50,7 @@ export async function PATCH(req: NextRequest) {
     }
     return NextResponse.json(updated)
   } catch (e) {
-    console.error("Failed to update match:", e)
+    log.error("Failed to update match", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+}))
\ No newline at end of file
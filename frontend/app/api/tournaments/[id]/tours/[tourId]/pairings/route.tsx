@@ -3,15 +3,20 @@ import { ImageResponse } from 'next/og'
 import React from 'react'
 import {
   getTournamentById,
-  listTournamentParticipants,
+  listParticipantsLite,
   listMatches,
   getStandings,
   finalizeTournamentIfExceeded,
   type Match,
 } from '@/lib/db'
 import { generatePairingsWithBBP, getLastBbpReason } from '@/lib/bbp'
+import { createLogger } from '@/lib/logger'
+import { withRequestContext } from '@/lib/requestContext'
+import { withIdempotency } from '@/lib/idempotency'
 
-export async function POST(request: NextRequest, context: { params: Promise<{ id: string; tourId: string }> }) {
+const log = createLogger('api/tournaments/[id]/tours/[tourId]/pairings')
+
+export const POST = withRequestContext('/api/tournaments/[id]/tours/[tourId]/pairings', withIdempotency('/api/tournaments/[id]/tours/[tourId]/pairings', async function POST(request: NextRequest, context: { params: Promise<{ id: string; tourId: string }> }) {
   const { id, tourId } = await context.params
   const tournamentId = Number(id)
   const roundId = Number(tourId)
@@ -23,7 +28,7 @@ export async function POST(request: NextRequest, context: { params: Promise<{ id
     // Idempotence: if pairings already exist for this round, return them without regenerating
     const existing = await listMatches(roundId)
     if (existing && existing.length > 0) {
-      console.warn('[Pairings] Matches already exist for this round; skipping generation')
+      log.warn('Matches already exist for this round; skipping generation', { tournamentId, roundId, matches: existing.length })
       return NextResponse.json(existing, { status: 200 })
     }
 
@@ -32,7 +37,7 @@ export async function POST(request: NextRequest, context: { params: Promise<{ id
       return NextResponse.json({ error: 'Tournament not found' }, { status: 404 })
     }
 
-    const participants = await listTournamentParticipants(tournamentId)
+    const participants = await listParticipantsLite(tournamentId)
     if (participants.length < 2) {
       return NextResponse.json({ error: 'Need at least 2 participants to generate pairings' }, { status: 400 })
     }
@@ -130,12 +135,12 @@ export async function POST(request: NextRequest, context: { params: Promise<{ id
               })
             )
           } catch (e) {
-            console.error('[Pairings] Telegram sendPhoto failed:', e)
+            log.error('Telegram sendPhoto failed', { tournamentId, roundId, error: e })
           }
         })()
       }
     } catch (sErr) {
-      console.error('[Pairings] Screenshot generation/send failed:', sErr)
+      log.error('Screenshot generation/send failed', { tournamentId, roundId, error: sErr })
     }
 
     // Finalize tournament if exceeded rounds
@@ -143,7 +148,7 @@ export async function POST(request: NextRequest, context: { params: Promise<{ id
 
     return NextResponse.json(matches, { status: 201 })
   } catch (err) {
-    console.error('[Pairings] generation failed:', err)
+    log.error('Pairings generation failed', { tournamentId, roundId, error: err })
     return NextResponse.json({ error: 'Pairings generation failed' }, { status: 500 })
   }
-}
+}))
@@ -2,8 +2,12 @@ import { NextRequest, NextResponse } from "next/server"
 import { requireAdmin } from "@/lib/telegram"
 import { deleteRoundById } from "@/lib/db"
 import { supabase } from "@/lib/supabase"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function DELETE(
+const log = createLogger("api/tournaments/[id]/tours/[tourId]")
+
+export const DELETE = withRequestContext("/api/tournaments/[id]/tours/[tourId]", async function DELETE(
   req: NextRequest,
   ctx: { params: Promise<{ id: string; tourId: string }> }
 ) {
@@ -42,7 +46,7 @@ export async function DELETE(
 
     return NextResponse.json({ ok: true })
   } catch (e) {
-    console.error("Failed to delete tour:", e)
+    log.error("Failed to delete tour", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
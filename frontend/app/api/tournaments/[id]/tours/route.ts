@@ -1,9 +1,15 @@
 import { NextRequest, NextResponse } from "next/server"
 import { requireAdmin } from "@/lib/telegram"
-import { listRounds as listToursInternal, createRound as createTourInternal, getNextRoundNumber as getNextTourNumberInternal, deleteAllRoundsForTournament, getTournamentById } from "@/lib/db"
+import { listRounds as listToursInternal, createRound as createTourInternal, getNextRoundNumber as getNextTourNumberInternal, deleteAllRoundsForTournament, getTournamentById, getTournamentRevision } from "@/lib/db"
+import { etagMatches, notModified, revalidateHeaders, revisionETag } from "@/lib/etag"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
 
-export async function GET(
-  _req: NextRequest,
+const log = createLogger("api/tournaments/[id]/tours")
+
+export const GET = withRequestContext("/api/tournaments/[id]/tours", async function GET(
+  req: NextRequest,
   ctx: { params: Promise<{ id: string }> }
 ) {
   try {
@@ -12,15 +18,20 @@ export async function GET(
     if (!Number.isFinite(tournamentId)) {
       return NextResponse.json({ error: "Некорректный ID турнира" }, { status: 400 })
     }
+    const revision = await getTournamentRevision(tournamentId)
+    const etag = revision === null ? null : revisionETag(`tours-${tournamentId}`, revision)
+    if (etag && etagMatches(req.headers, etag)) {
+      return notModified(etag, { "Cache-Control": "no-cache" })
+    }
     const tours = await listToursInternal(tournamentId)
-    return NextResponse.json(tours)
+    return NextResponse.json(tours, { headers: revalidateHeaders(etag) })
   } catch (e) {
-    console.error("Failed to list tours:", e)
+    log.error("Failed to list tours", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
+})
 
-export async function POST(
+export const POST = withRequestContext("/api/tournaments/[id]/tours", withIdempotency("/api/tournaments/[id]/tours", async function POST(
   req: NextRequest,
   ctx: { params: Promise<{ id: string }> }
 ) {
@@ -58,12 +69,12 @@ export async function POST(
     const tour = await createTourInternal(tournamentId, nextNumber)
     return NextResponse.json(tour, { status: 201 })
   } catch (e) {
-    console.error("Failed to create tour:", e)
+    log.error("Failed to create tour", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
+}))
 
-export async function DELETE(
+export const DELETE = withRequestContext("/api/tournaments/[id]/tours", async function DELETE(
   req: NextRequest,
   ctx: { params: Promise<{ id: string }> }
 ) {
@@ -85,7 +96,7 @@ export async function DELETE(
     }
     return NextResponse.json({ ok: true })
   } catch (e) {
-    console.error("Failed to delete tours:", e)
+    log.error("Failed to delete tours", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -0,0 +1,118 @@
+// @vitest-environment node
+import { describe, it, expect, beforeAll } from 'vitest'
+import { NextRequest } from 'next/server'
+import { GET as leaderboardGet } from '../[id]/leaderboard/route'
+import { GET as participantsGet } from '../[id]/participants/route'
+import { GET as toursGet } from '../[id]/tours/route'
+import { GET as matchesGet } from '../[id]/tours/[tourId]/matches/route'
+import { supabase } from '@/lib/supabase'
+
+let tournamentId: number
+let roundId: number
+let participantIds: number[]
+
+function get(path: string, etag?: string) {
+  return new NextRequest(`http://localhost${path}`, { headers: etag ? { 'if-none-match': etag } : {} })
+}
+
+function supabaseCalls(response: Response): number {
+  return Number(/desc="(\d+) Supabase calls"/.exec(response.headers.get('Server-Timing') || '')?.[1])
+}
+
+beforeAll(async () => {
+  const { data: tournament } = await supabase.from('tournaments').insert({ title: 'ETag cup', rounds: 3 })
+  tournamentId = tournament.id
+
+  const { data: participants } = await supabase.from('tournament_participants').insert(
+    ['Anna', 'Boris', 'Vera', 'Gleb'].map((nickname, i) => ({ tournament_id: tournamentId, user_id: 95_000 + i, nickname }))
+  )
+  participantIds = participants.map((p: { id: number }) => p.id)
+
+  const { data: round } = await supabase.from('rounds').insert({ tournament_id: tournamentId, number: 1, status: 'paired' })
+  roundId = round.id
+  await supabase.from('matches').insert([
+    { round_id: roundId, white_participant_id: participantIds[0], black_participant_id: participantIds[1], board_no: 1, result: 'not_played', score_white: 0, score_black: 0 },
+    { round_id: roundId, white_participant_id: participantIds[2], black_participant_id: participantIds[3], board_no: 2, result: 'not_played', score_white: 0, score_black: 0 }
+  ])
+})
+
+describe('conditional GETs on tournament resources', () => {
+  it('answers a current client with 304 after only the revision lookup', async () => {
+    const params = { params: Promise.resolve({ id: String(tournamentId) }) }
+    const first = await leaderboardGet(get(`/api/tournaments/${tournamentId}/leaderboard`), params)
+    const etag = first.headers.get('etag')
+
+    expect(first.status).toBe(200)
+    expect(etag).toMatch(/^W\/"leaderboard-\d+\.\d+"$/)
+    expect(first.headers.get('cache-control')).toBe('no-cache')
+
+    const second = await leaderboardGet(
+      get(`/api/tournaments/${tournamentId}/leaderboard`, etag!),
+      { params: Promise.resolve({ id: String(tournamentId) }) }
+    )
+    expect(second.status).toBe(304)
+    expect(second.headers.get('etag')).toBe(etag)
+    expect(supabaseCalls(second)).toBe(1)
+  })
+
+  it('changes the ETag when a match result is written', async () => {
+    const path = `/api/tournaments/${tournamentId}/tours/${roundId}/matches`
+    const params = () => ({ params: Promise.resolve({ id: String(tournamentId), tourId: String(roundId) }) })
+    const before = await matchesGet(get(path), params())
+    const etag = before.headers.get('etag')!
+
+    expect((await matchesGet(get(path, etag), params())).status).toBe(304)
+
+    await supabase.from('matches').update({ result: 'white', score_white: 1 }).eq('round_id', roundId).eq('board_no', 1)
+
+    const after = await matchesGet(get(path, etag), params())
+    expect(after.status).toBe(200)
+    expect(after.headers.get('etag')).not.toBe(etag)
+    expect((await after.json())[0].result).toBe('white')
+  })
+
+  it('revalidates participants and tours after a registration or a new tour', async () => {
+    const params = () => ({ params: Promise.resolve({ id: String(tournamentId) }) })
+    const participants = await participantsGet(get(`/api/tournaments/${tournamentId}/participants`), params())
+    const tours = await toursGet(get(`/api/tournaments/${tournamentId}/tours`), params())
+    const participantsTag = participants.headers.get('etag')!
+    const toursTag = tours.headers.get('etag')!
+
+    expect(participantsTag).not.toBe(toursTag)
+
+    await supabase.from('tournament_participants').insert({ tournament_id: tournamentId, user_id: 95_010, nickname: 'Dasha' })
+    const changed = await participantsGet(get(`/api/tournaments/${tournamentId}/participants`, participantsTag), params())
+    expect(changed.status).toBe(200)
+    expect(await changed.json()).toHaveLength(5)
+
+    await supabase.from('rounds').insert({ tournament_id: tournamentId, number: 2, status: 'pending' })
+    const toursAfter = await toursGet(get(`/api/tournaments/${tournamentId}/tours`, toursTag), params())
+    expect(toursAfter.status).toBe(200)
+    expect(await toursAfter.json()).toHaveLength(2)
+  })
+
+  it('revalidates participants only when an embedded user column changes', async () => {
+    const { data: user } = await supabase.from('users').insert({ telegram_id: 95_020, username: 'etag_user', first_name: 'Egor', rating: 1500 })
+    await supabase.from('tournament_participants').insert({ tournament_id: tournamentId, user_id: user.id, nickname: 'Egor' })
+    const params = () => ({ params: Promise.resolve({ id: String(tournamentId) }) })
+    const etag = (await participantsGet(get(`/api/tournaments/${tournamentId}/participants`), params())).headers.get('etag')!
+
+    await supabase.from('users').update({ bio: 'Prefers blitz' }).eq('id', user.id)
+    await supabase.from('users').update({ rating: 1500 }).eq('id', user.id)
+    expect((await participantsGet(get(`/api/tournaments/${tournamentId}/participants`, etag), params())).status).toBe(304)
+
+    await supabase.from('users').update({ rating: 1512 }).eq('id', user.id)
+    expect((await participantsGet(get(`/api/tournaments/${tournamentId}/participants`, etag), params())).status).toBe(200)
+  })
+
+  it('does not bump other tournaments', async () => {
+    const { data: other } = await supabase.from('tournaments').insert({ title: 'Other cup', rounds: 1 })
+    const params = () => ({ params: Promise.resolve({ id: String(other.id) }) })
+    const first = await toursGet(get(`/api/tournaments/${other.id}/tours`), params())
+    const etag = first.headers.get('etag')!
+
+    await supabase.from('rounds').insert({ tournament_id: tournamentId, number: 3, status: 'pending' })
+
+    expect((await toursGet(get(`/api/tournaments/${other.id}/tours`, etag), params())).status).toBe(304)
+  })
+})
@@ -1,8 +1,13 @@
 import { NextResponse } from "next/server"
 import { fetchUpcomingEvents, calendarMetrics } from "@/lib/google-calendar/client"
-import { parseCalendarEvents } from "@/lib/google-calendar/parser"
+import { buildCalendarFeed } from "@/lib/google-calendar/parser"
+import { etagMatches, notModified } from "@/lib/etag"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET(req: Request) {
+const log = createLogger("api/tournaments/calendar")
+
+export const GET = withRequestContext("/api/tournaments/calendar", async function GET(req: Request) {
   const url = new URL(req.url)
   // Allow tests to simulate an upstream failure
   if (url.searchParams.get("simulateError") === "true") {
@@ -11,19 +16,25 @@ export async function GET(req: Request) {
 
   try {
     const events = await fetchUpcomingEvents(50)
-    const tournaments = parseCalendarEvents(events)
-    return NextResponse.json(tournaments, {
-      headers: {
-        'X-Calendar-Cache-Hits': String(calendarMetrics.cacheHits),
-        'X-Calendar-Cache-Misses': String(calendarMetrics.cacheMisses),
-        'X-Calendar-Cache-Stale': String(calendarMetrics.cacheStaleHits),
-        'X-Calendar-API-Calls': String(calendarMetrics.apiCalls),
-        'X-Calendar-API-Errors': String(calendarMetrics.apiErrors),
-        'X-Calendar-Last-Latency': String(calendarMetrics.lastApiLatencyMs),
-      },
+    const feed = buildCalendarFeed(events)
+    const headers = {
+      'X-Calendar-Cache-Hits': String(calendarMetrics.cacheHits),
+      'X-Calendar-Cache-Misses': String(calendarMetrics.cacheMisses),
+      'X-Calendar-Cache-Stale': String(calendarMetrics.cacheStaleHits),
+      'X-Calendar-API-Calls': String(calendarMetrics.apiCalls),
+      'X-Calendar-API-Errors': String(calendarMetrics.apiErrors),
+      'X-Calendar-Last-Latency': String(calendarMetrics.lastApiLatencyMs),
+      // Revalidate every time; an unchanged schedule is answered with 304
+      'Cache-Control': 'no-cache',
+    }
+    if (etagMatches(req.headers, feed.etag)) {
+      return notModified(feed.etag, headers)
+    }
+    return new Response(feed.body, {
+      headers: { ...headers, 'Content-Type': 'application/json', ETag: feed.etag },
     })
   } catch (e) {
-    console.error("Failed to fetch calendar tournaments:", e)
+    log.error("Failed to fetch calendar tournaments", { error: e })
     return NextResponse.json([], {
       headers: {
         'X-Calendar-API-Errors': String(calendarMetrics.apiErrors),
@@ -31,4 +42,4 @@ export async function GET(req: Request) {
       },
     })
   }
-}
+})
@@ -0,0 +1,42 @@
+import { NextRequest, NextResponse } from "next/server"
+import { requireAdmin } from "@/lib/telegram"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { importTournament, readArchive } from "@/lib/tournamentArchive"
+
+const log = createLogger("api/tournaments/import")
+
+export const dynamic = "force-dynamic"
+export const runtime = "nodejs"
+
+/**
+ * Load an export (JSON Lines, or CSV with ?format=csv or a text/csv body) as
+ * a new tournament. The body is read as a stream and inserted in batches.
+ * Not wrapped in withIdempotency: that buffers the whole body to fingerprint it.
+ */
+export const POST = withRequestContext("/api/tournaments/import", async function POST(request: NextRequest) {
+  try {
+    const adminUser = await requireAdmin(request.headers)
+    if (!adminUser) {
+      return NextResponse.json({ error: "Forbidden" }, { status: 403 })
+    }
+
+    const requested = new URL(request.url).searchParams.get("format")
+    const format = requested ?? ((request.headers.get("content-type") || "").includes("text/csv") ? "csv" : "jsonl")
+    if (format !== "jsonl" && format !== "csv") {
+      return NextResponse.json({ error: "format must be jsonl or csv (TRF exports cannot be imported)" }, { status: 400 })
+    }
+    if (!request.body) {
+      return NextResponse.json({ error: "Request body is empty" }, { status: 400 })
+    }
+
+    const result = await importTournament(readArchive(request.body, format), format)
+    if (!result.ok) {
+      return NextResponse.json({ error: result.error }, { status: 400 })
+    }
+    return NextResponse.json(result, { status: 201 })
+  } catch (e) {
+    log.error("Failed to import tournament", { error: e })
+    return NextResponse.json({ error: "Internal server error" }, { status: 500 })
+  }
+})
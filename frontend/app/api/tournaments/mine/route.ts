@@ -1,8 +1,12 @@
 import { NextRequest, NextResponse } from "next/server"
 import { requireAdmin } from "@/lib/telegram"
 import { listTournamentsByCreator } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET(request: NextRequest) {
+const log = createLogger("api/tournaments/mine")
+
+export const GET = withRequestContext("/api/tournaments/mine", async function GET(request: NextRequest) {
   try {
     const adminUser = await requireAdmin(request.headers)
     if (!adminUser) {
@@ -11,7 +15,7 @@ export async function GET(request: NextRequest) {
     const tournaments = await listTournamentsByCreator(adminUser.id)
     return NextResponse.json(tournaments)
   } catch (e) {
-    console.error("Failed to list my tournaments:", e)
+    log.error("Failed to list my tournaments", { error: e })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
@@ -1,18 +1,23 @@
 import { NextRequest, NextResponse } from "next/server"
 import { requireAdmin } from "@/lib/telegram"
 import { createTournament, listTournaments, type Tournament } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
+import { withIdempotency } from "@/lib/idempotency"
 
-export async function GET() {
+const log = createLogger("api/tournaments")
+
+export const GET = withRequestContext("/api/tournaments", async function GET() {
   try {
     const tournaments = await listTournaments()
     return NextResponse.json(tournaments)
   } catch (e) {
-    console.error("Failed to list tournaments:", e)
+    log.error("Failed to list tournaments", { error: e })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
+})
 
-export async function POST(request: NextRequest) {
+export const POST = withRequestContext("/api/tournaments", withIdempotency("/api/tournaments", async function POST(request: NextRequest) {
   try {
     const adminUser = await requireAdmin(request.headers)
     if (!adminUser) {
@@ -54,7 +59,7 @@ export async function POST(request: NextRequest) {
   }
   return NextResponse.json(created, { status: 201 })
   } catch (e) {
-    console.error("Failed to create tournament:", e)
+    log.error("Failed to create tournament", { error: e })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
+}))
@@ -1,7 +1,11 @@
 import { NextRequest, NextResponse } from "next/server"
 import { searchUsersByUsernameFragment } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET(req: NextRequest) {
+const log = createLogger("api/user/search")
+
+export const GET = withRequestContext("/api/user/search", async function GET(req: NextRequest) {
   try {
     const { searchParams } = new URL(req.url)
     const q = (searchParams.get("q") || "").trim()
@@ -15,7 +19,7 @@ export async function GET(req: NextRequest) {
     const users = await searchUsersByUsernameFragment(q, limit)
     return NextResponse.json({ users })
   } catch (e) {
-    console.error("User search (alias) failed:", e)
+    log.error("User search (alias) failed", { error: e })
     return NextResponse.json({ error: "Внутренняя ошибка" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
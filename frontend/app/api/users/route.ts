@@ -1,12 +1,16 @@
 import { NextResponse } from "next/server"
 import { getAllUsers } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET() {
+const log = createLogger("api/users")
+
+export const GET = withRequestContext("/api/users", async function GET() {
   try {
     const users = await getAllUsers()
     return NextResponse.json(users)
   } catch (e) {
-    console.error("Failed to list users:", e)
+    log.error("Failed to list users", { error: e })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
\ No newline at end of file
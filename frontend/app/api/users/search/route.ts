@@ -1,31 +1,26 @@
 import { NextRequest, NextResponse } from "next/server"
-import { supabase } from "@/lib/supabase"
+import { searchUsersByUsernameFragment } from "@/lib/db"
+import { createLogger } from "@/lib/logger"
+import { withRequestContext } from "@/lib/requestContext"
 
-export async function GET(request: NextRequest) {
+const log = createLogger("api/users/search")
+
+export const GET = withRequestContext("/api/users/search", async function GET(request: NextRequest) {
   try {
     const { searchParams } = new URL(request.url)
-    const query = searchParams.get('q') || ''
-    
+    const query = (searchParams.get('q') || '').trim()
+    const limitRaw = Number(searchParams.get('limit'))
+    const limit = Number.isFinite(limitRaw) && limitRaw > 0 ? Math.min(50, Math.floor(limitRaw)) : 10
+
     if (!query || query.length < 2) {
       return NextResponse.json({ users: [] })
     }
 
-    // Search by first name, last name, and username
-    const { data: users, error } = await supabase
-      .from('users')
-      .select('id, telegram_id, username, first_name, last_name, rating')
-      .or(`first_name.ilike.%${query}%,last_name.ilike.%${query}%,username.ilike.%${query}%`)
-      .order('first_name', { ascending: true })
-      .limit(10)
-
-    if (error) {
-      console.error("Error searching users:", error)
-      return NextResponse.json({ error: "Failed to search users" }, { status: 500 })
-    }
-
-    return NextResponse.json({ users: users || [] })
+    // Search by username, first name and last name, best matches first
+    const users = await searchUsersByUsernameFragment(query, limit)
+    return NextResponse.json({ users })
   } catch (error) {
-    console.error("Error in user search:", error)
+    log.error("Error in user search", { error })
     return NextResponse.json({ error: "Internal server error" }, { status: 500 })
   }
-}
\ No newline at end of file
+})
@@ -1,10 +1,11 @@
 "use client"
 
-import React, { useState } from "react"
+import React, { useRef, useState } from "react"
 import { useRouter } from "next/navigation"
 import { HoverButton } from "@/components/ui/hover-button"
 import ChessBackground from "@/components/ChessBackground"
 import { useTelegramWebApp } from "@/hooks/useTelegramWebApp"
+import { newIdempotencyKey } from "@/lib/utils"
 
 const ResultOptions = [
   { value: "white", label: "White wins" },
@@ -22,6 +23,8 @@ export default function MatchSubmitPage() {
   const [result, setResult] = useState<string>(ResultOptions[0].value)
   const [status, setStatus] = useState<string>("")
   const [loading, setLoading] = useState<boolean>(false)
+  // Retrying the same submission reuses its key, so the result is applied once
+  const pendingSubmit = useRef<{ payload: string; key: string } | null>(null)
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault()
@@ -37,6 +40,12 @@ export default function MatchSubmitPage() {
       return
     }
 
+    const payload = JSON.stringify({ matchId, result })
+    const attempt = pendingSubmit.current?.payload === payload
+      ? pendingSubmit.current
+      : { payload, key: newIdempotencyKey() }
+    pendingSubmit.current = attempt
+
     setLoading(true)
     try {
       const res = await fetch("/api/match/submit", {
@@ -44,14 +53,16 @@ export default function MatchSubmitPage() {
         headers: {
           "Content-Type": "application/json",
           "Authorization": `Bearer ${initData}`,
+          "Idempotency-Key": attempt.key,
         },
-        body: JSON.stringify({ matchId, result }),
+        body: payload,
       })
 
       const data = await res.json()
       if (!res.ok) {
         setStatus(data?.error || "Failed to submit match result")
       } else {
+        pendingSubmit.current = null
         setStatus("Match result submitted successfully.")
       }
     } catch (err) {
@@ -0,0 +1,65 @@
+-- Single-round-trip rating commit for a finished game
+-- Upserts both players' ratings and inserts both history rows in one atomic call
+-- (supabase.rpc('commit_match_ratings', { ratings, history }) from RatingService)
+
+CREATE OR REPLACE FUNCTION commit_match_ratings(ratings JSONB, history JSONB)
+RETURNS SETOF player_ratings
+LANGUAGE sql
+AS $$
+    WITH inserted_history AS (
+        INSERT INTO rating_history (
+            user_id, old_rating, new_rating, old_rd, new_rd, old_volatility, new_volatility,
+            rating_change, match_id, tournament_id, change_reason, opponent_id, opponent_rating, game_result
+        )
+        SELECT
+            h.user_id, h.old_rating, h.new_rating, h.old_rd, h.new_rd, h.old_volatility, h.new_volatility,
+            h.new_rating - h.old_rating, h.match_id, h.tournament_id, h.change_reason,
+            h.opponent_id, h.opponent_rating, h.game_result
+        FROM jsonb_to_recordset(history) AS h(
+            user_id INTEGER,
+            old_rating FLOAT,
+            new_rating FLOAT,
+            old_rd FLOAT,
+            new_rd FLOAT,
+            old_volatility FLOAT,
+            new_volatility FLOAT,
+            match_id INTEGER,
+            tournament_id INTEGER,
+            change_reason VARCHAR(50),
+            opponent_id INTEGER,
+            opponent_rating FLOAT,
+            game_result VARCHAR(10)
+        )
+        RETURNING id
+    )
+    INSERT INTO player_ratings (
+        user_id, rating, rd, volatility, games_count, wins_count, losses_count, draws_count,
+        last_game_at, rating_period_start
+    )
+    SELECT
+        r.user_id, r.rating, r.rd, r.volatility, r.games_count, r.wins_count, r.losses_count, r.draws_count,
+        r.last_game_at, COALESCE(r.rating_period_start, NOW())
+    FROM jsonb_to_recordset(ratings) AS r(
+        user_id INTEGER,
+        rating FLOAT,
+        rd FLOAT,
+        volatility FLOAT,
+        games_count INTEGER,
+        wins_count INTEGER,
+        losses_count INTEGER,
+        draws_count INTEGER,
+        last_game_at TIMESTAMP WITH TIME ZONE,
+        rating_period_start TIMESTAMP WITH TIME ZONE
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        rating = EXCLUDED.rating,
+        rd = EXCLUDED.rd,
+        volatility = EXCLUDED.volatility,
+        games_count = EXCLUDED.games_count,
+        wins_count = EXCLUDED.wins_count,
+        losses_count = EXCLUDED.losses_count,
+        draws_count = EXCLUDED.draws_count,
+        last_game_at = EXCLUDED.last_game_at,
+        last_updated = NOW()
+    RETURNING *;
+$$;
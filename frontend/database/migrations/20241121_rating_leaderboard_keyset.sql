@@ -0,0 +1,178 @@
+-- Indexed rating leaderboard with keyset pagination
+-- Replaces scans of the rating_leaderboard view for /api/rating/leaderboard.
+-- rating_leaderboard_entries is kept in step with player_ratings (and user names)
+-- by triggers, so every page is an index range scan on (rating DESC, user_id).
+
+-- ========================================
+-- Tables
+-- ========================================
+
+CREATE TABLE rating_leaderboard_entries (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    username TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    rating FLOAT NOT NULL,
+    rd FLOAT NOT NULL,
+    games_count INTEGER NOT NULL,
+    wins_count INTEGER NOT NULL DEFAULT 0,
+    losses_count INTEGER NOT NULL DEFAULT 0,
+    draws_count INTEGER NOT NULL DEFAULT 0,
+    win_rate NUMERIC NOT NULL DEFAULT 0,
+    last_game_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX idx_rating_leaderboard_entries_keyset
+    ON rating_leaderboard_entries (rating DESC, user_id) INCLUDE (games_count);
+
+-- Players per games_count, so filtered totals are a sum over a few buckets
+CREATE TABLE rating_leaderboard_games_histogram (
+    games_count INTEGER PRIMARY KEY,
+    players INTEGER NOT NULL DEFAULT 0
+);
+
+-- ========================================
+-- Incremental maintenance
+-- ========================================
+
+CREATE OR REPLACE FUNCTION bump_rating_leaderboard_histogram(games INTEGER, delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO rating_leaderboard_games_histogram (games_count, players)
+    VALUES (games, delta)
+    ON CONFLICT (games_count) DO UPDATE
+        SET players = rating_leaderboard_games_histogram.players + EXCLUDED.players;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_rating_leaderboard_entry()
+RETURNS TRIGGER AS $$
+DECLARE
+    target_user INTEGER;
+    old_games INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        target_user := OLD.user_id;
+    ELSE
+        target_user := NEW.user_id;
+    END IF;
+
+    SELECT games_count INTO old_games
+    FROM rating_leaderboard_entries
+    WHERE user_id = target_user;
+
+    IF old_games IS NOT NULL THEN
+        PERFORM bump_rating_leaderboard_histogram(old_games, -1);
+    END IF;
+
+    -- Only players with rated games are listed (same rule as the rating_leaderboard view)
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM rating_leaderboard_entries WHERE user_id = target_user;
+        RETURN NULL;
+    END IF;
+    IF NEW.games_count <= 0 THEN
+        DELETE FROM rating_leaderboard_entries WHERE user_id = target_user;
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO rating_leaderboard_entries (
+        user_id, username, first_name, last_name, rating, rd, games_count,
+        wins_count, losses_count, draws_count, win_rate, last_game_at
+    )
+    SELECT
+        NEW.user_id, u.username, u.first_name, u.last_name, NEW.rating, NEW.rd, NEW.games_count,
+        NEW.wins_count, NEW.losses_count, NEW.draws_count,
+        ROUND((NEW.wins_count::NUMERIC / NEW.games_count) * 100, 2),
+        NEW.last_game_at
+    FROM users u
+    WHERE u.id = NEW.user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        rating = EXCLUDED.rating,
+        rd = EXCLUDED.rd,
+        games_count = EXCLUDED.games_count,
+        wins_count = EXCLUDED.wins_count,
+        losses_count = EXCLUDED.losses_count,
+        draws_count = EXCLUDED.draws_count,
+        win_rate = EXCLUDED.win_rate,
+        last_game_at = EXCLUDED.last_game_at;
+
+    PERFORM bump_rating_leaderboard_histogram(NEW.games_count, 1);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_sync_rating_leaderboard_entry
+    AFTER INSERT OR UPDATE OR DELETE ON player_ratings
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_rating_leaderboard_entry();
+
+CREATE OR REPLACE FUNCTION sync_rating_leaderboard_names()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE rating_leaderboard_entries
+    SET username = NEW.username, first_name = NEW.first_name, last_name = NEW.last_name
+    WHERE user_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_sync_rating_leaderboard_names
+    AFTER UPDATE OF username, first_name, last_name ON users
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_rating_leaderboard_names();
+
+-- ========================================
+-- Backfill
+-- ========================================
+
+INSERT INTO rating_leaderboard_entries (
+    user_id, username, first_name, last_name, rating, rd, games_count,
+    wins_count, losses_count, draws_count, win_rate, last_game_at
+)
+SELECT
+    pr.user_id, u.username, u.first_name, u.last_name, pr.rating, pr.rd, pr.games_count,
+    pr.wins_count, pr.losses_count, pr.draws_count,
+    ROUND((pr.wins_count::NUMERIC / pr.games_count) * 100, 2),
+    pr.last_game_at
+FROM player_ratings pr
+JOIN users u ON u.id = pr.user_id
+WHERE pr.games_count > 0;
+
+INSERT INTO rating_leaderboard_games_histogram (games_count, players)
+SELECT games_count, COUNT(*)
+FROM rating_leaderboard_entries
+GROUP BY games_count;
+
+-- ========================================
+-- Read API (supabase.rpc)
+-- ========================================
+
+-- One page after the (after_rating, after_user_id) cursor, ordered by rating DESC, user_id
+CREATE OR REPLACE FUNCTION rating_leaderboard_page(
+    min_games INTEGER,
+    page_size INTEGER,
+    after_rating FLOAT DEFAULT NULL,
+    after_user_id INTEGER DEFAULT NULL
+)
+RETURNS SETOF rating_leaderboard_entries
+LANGUAGE sql STABLE
+AS $$
+    SELECT *
+    FROM rating_leaderboard_entries
+    WHERE games_count >= min_games
+      AND (
+          after_rating IS NULL
+          OR (rating <= after_rating AND (rating < after_rating OR user_id > after_user_id))
+      )
+    ORDER BY rating DESC, user_id
+    LIMIT page_size;
+$$;
+
+CREATE OR REPLACE FUNCTION rating_leaderboard_count(min_games INTEGER)
+RETURNS BIGINT
+LANGUAGE sql STABLE
+AS $$
+    SELECT COALESCE(SUM(players), 0)::BIGINT
+    FROM rating_leaderboard_games_histogram
+    WHERE games_count >= min_games;
+$$;
@@ -0,0 +1,140 @@
+-- Incremental player_rating_stats maintenance
+-- update_player_rating_stats() re-aggregated a player's whole rating_history on
+-- every insert. Stats are now folded in from each new history row in O(1); the
+-- running sums live in new columns. rebuild_player_rating_stats() replays
+-- history once for backfills and repairs.
+-- (In-memory equivalent: lib/rating/ratingStats.ts)
+
+-- ========================================
+-- Running totals
+-- ========================================
+
+ALTER TABLE player_rating_stats
+    ADD COLUMN IF NOT EXISTS wins_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS losses_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS draws_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS opponent_rating_sum FLOAT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS opponent_games INTEGER NOT NULL DEFAULT 0;
+
+-- current_streak: positive for a win streak, negative for a loss streak, 0 after a draw
+
+-- ========================================
+-- Incremental update
+-- ========================================
+
+CREATE OR REPLACE FUNCTION apply_rating_history_to_stats(h rating_history)
+RETURNS VOID AS $$
+DECLARE
+    is_win INTEGER := CASE WHEN h.game_result = 'win' THEN 1 ELSE 0 END;
+    is_loss INTEGER := CASE WHEN h.game_result = 'loss' THEN 1 ELSE 0 END;
+    is_draw INTEGER := CASE WHEN h.game_result = 'draw' THEN 1 ELSE 0 END;
+    has_opponent INTEGER := CASE WHEN h.opponent_rating IS NOT NULL THEN 1 ELSE 0 END;
+BEGIN
+    INSERT INTO player_rating_stats (
+        user_id, highest_rating, highest_rating_date, lowest_rating, lowest_rating_date,
+        best_win_opponent_rating, best_win_date,
+        current_streak, longest_win_streak, longest_loss_streak,
+        wins_count, losses_count, draws_count,
+        opponent_rating_sum, opponent_games, average_opponent_rating
+    )
+    VALUES (
+        h.user_id, h.new_rating, h.created_at, h.new_rating, h.created_at,
+        CASE WHEN is_win = 1 THEN h.opponent_rating END,
+        CASE WHEN is_win = 1 AND h.opponent_rating IS NOT NULL THEN h.created_at END,
+        is_win - is_loss, is_win, is_loss,
+        is_win, is_loss, is_draw,
+        COALESCE(h.opponent_rating, 0), has_opponent, h.opponent_rating
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        -- Latest date of the peak, earliest date of the low (as the full recompute did)
+        highest_rating_date = CASE
+            WHEN player_rating_stats.highest_rating IS NULL OR h.new_rating >= player_rating_stats.highest_rating
+            THEN h.created_at ELSE player_rating_stats.highest_rating_date END,
+        highest_rating = GREATEST(player_rating_stats.highest_rating, h.new_rating),
+        lowest_rating_date = CASE
+            WHEN player_rating_stats.lowest_rating IS NULL OR h.new_rating < player_rating_stats.lowest_rating
+            THEN h.created_at ELSE player_rating_stats.lowest_rating_date END,
+        lowest_rating = LEAST(player_rating_stats.lowest_rating, h.new_rating),
+        best_win_date = CASE
+            WHEN is_win = 1 AND h.opponent_rating IS NOT NULL
+                AND (player_rating_stats.best_win_opponent_rating IS NULL
+                     OR h.opponent_rating > player_rating_stats.best_win_opponent_rating)
+            THEN h.created_at ELSE player_rating_stats.best_win_date END,
+        best_win_opponent_rating = CASE
+            WHEN is_win = 1 AND h.opponent_rating IS NOT NULL
+            THEN GREATEST(player_rating_stats.best_win_opponent_rating, h.opponent_rating)
+            ELSE player_rating_stats.best_win_opponent_rating END,
+        current_streak = CASE
+            WHEN is_win = 1 THEN GREATEST(player_rating_stats.current_streak, 0) + 1
+            WHEN is_loss = 1 THEN LEAST(player_rating_stats.current_streak, 0) - 1
+            WHEN is_draw = 1 THEN 0
+            ELSE player_rating_stats.current_streak END,
+        longest_win_streak = CASE
+            WHEN is_win = 1 THEN GREATEST(player_rating_stats.longest_win_streak,
+                                          GREATEST(player_rating_stats.current_streak, 0) + 1)
+            ELSE player_rating_stats.longest_win_streak END,
+        longest_loss_streak = CASE
+            WHEN is_loss = 1 THEN GREATEST(player_rating_stats.longest_loss_streak,
+                                           1 - LEAST(player_rating_stats.current_streak, 0))
+            ELSE player_rating_stats.longest_loss_streak END,
+        wins_count = player_rating_stats.wins_count + is_win,
+        losses_count = player_rating_stats.losses_count + is_loss,
+        draws_count = player_rating_stats.draws_count + is_draw,
+        opponent_rating_sum = player_rating_stats.opponent_rating_sum + COALESCE(h.opponent_rating, 0),
+        opponent_games = player_rating_stats.opponent_games + has_opponent,
+        average_opponent_rating = CASE
+            WHEN has_opponent = 1
+            THEN (player_rating_stats.opponent_rating_sum + h.opponent_rating) / (player_rating_stats.opponent_games + 1)
+            ELSE player_rating_stats.average_opponent_rating END,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_stats_after_rating_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM apply_rating_history_to_stats(NEW);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- trigger_update_stats_after_rating_change already calls update_stats_after_rating_change()
+
+-- ========================================
+-- One-shot rebuild (NULL = every player)
+-- ========================================
+
+CREATE OR REPLACE FUNCTION rebuild_player_rating_stats(user_id_param INTEGER DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    h rating_history;
+    players INTEGER;
+BEGIN
+    DELETE FROM player_rating_stats
+    WHERE user_id_param IS NULL OR user_id = user_id_param;
+
+    FOR h IN
+        SELECT * FROM rating_history
+        WHERE user_id_param IS NULL OR user_id = user_id_param
+        ORDER BY user_id, created_at, id
+    LOOP
+        PERFORM apply_rating_history_to_stats(h);
+    END LOOP;
+
+    SELECT COUNT(DISTINCT user_id) INTO players
+    FROM rating_history
+    WHERE user_id_param IS NULL OR user_id = user_id_param;
+    RETURN players;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Kept for existing callers; now a single-player rebuild
+CREATE OR REPLACE FUNCTION update_player_rating_stats(user_id_param INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    PERFORM rebuild_player_rating_stats(user_id_param);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill the new running totals
+SELECT rebuild_player_rating_stats();
@@ -0,0 +1,13 @@
+-- Shared Google Calendar sync state
+-- One row per calendar: the events last synced and the events.list sync token
+-- to continue from. Every instance reads it on a cold start and after its own
+-- copy goes stale, so only changed events are fetched from Google.
+-- (Used by lib/google-calendar/sync.ts)
+
+CREATE TABLE IF NOT EXISTS calendar_sync_state (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    events JSONB NOT NULL DEFAULT '[]'::jsonb,
+    synced_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
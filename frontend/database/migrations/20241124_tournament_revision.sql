@@ -0,0 +1,110 @@
+-- Per-tournament revision for conditional GETs
+-- tournaments.revision is bumped by statement-level triggers on every write to
+-- the tournament or its participants, rounds, matches and leaderboard rows
+-- (and when a participant's name or rating changes). The leaderboard, tours,
+-- matches and participants endpoints derive their ETag from it, so a client
+-- that is up to date gets a 304 after one primary-key lookup.
+-- (In-memory equivalent: bumpMemoryRevisions in lib/supabase.ts)
+
+ALTER TABLE tournaments
+    ADD COLUMN IF NOT EXISTS revision BIGINT NOT NULL DEFAULT 0;
+
+-- ========================================
+-- Tournament row itself
+-- ========================================
+
+CREATE OR REPLACE FUNCTION bump_own_tournament_revision()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.revision = OLD.revision THEN
+        NEW.revision := OLD.revision + 1;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_tournament_revision ON tournaments;
+CREATE TRIGGER trigger_tournament_revision
+    BEFORE UPDATE ON tournaments
+    FOR EACH ROW EXECUTE FUNCTION bump_own_tournament_revision();
+
+-- ========================================
+-- Child tables: one bump per tournament per statement
+-- ========================================
+
+CREATE OR REPLACE FUNCTION bump_tournament_revisions()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'matches' THEN
+        IF TG_OP <> 'DELETE' THEN
+            UPDATE tournaments SET revision = revision + 1
+            WHERE id IN (SELECT r.tournament_id FROM new_rows m JOIN rounds r ON r.id = m.round_id);
+        END IF;
+        IF TG_OP <> 'INSERT' THEN
+            UPDATE tournaments SET revision = revision + 1
+            WHERE id IN (SELECT r.tournament_id FROM old_rows m JOIN rounds r ON r.id = m.round_id);
+        END IF;
+    ELSE
+        IF TG_OP <> 'DELETE' THEN
+            UPDATE tournaments SET revision = revision + 1
+            WHERE id IN (SELECT tournament_id FROM new_rows);
+        END IF;
+        IF TG_OP <> 'INSERT' THEN
+            UPDATE tournaments SET revision = revision + 1
+            WHERE id IN (SELECT tournament_id FROM old_rows);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables are per event, so each table gets an insert, update and delete trigger
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['tournament_participants', 'rounds', 'matches', 'leaderboard'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_revision_insert ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_revision_update ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trigger_revision_delete ON %I', t);
+        EXECUTE format(
+            'CREATE TRIGGER trigger_revision_insert AFTER INSERT ON %I
+             REFERENCING NEW TABLE AS new_rows
+             FOR EACH STATEMENT EXECUTE FUNCTION bump_tournament_revisions()', t);
+        EXECUTE format(
+            'CREATE TRIGGER trigger_revision_update AFTER UPDATE ON %I
+             REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+             FOR EACH STATEMENT EXECUTE FUNCTION bump_tournament_revisions()', t);
+        EXECUTE format(
+            'CREATE TRIGGER trigger_revision_delete AFTER DELETE ON %I
+             REFERENCING OLD TABLE AS old_rows
+             FOR EACH STATEMENT EXECUTE FUNCTION bump_tournament_revisions()', t);
+    END LOOP;
+END;
+$$;
+
+-- ========================================
+-- Users: participant lists embed their name and rating
+-- ========================================
+
+CREATE OR REPLACE FUNCTION bump_user_tournament_revisions()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE tournaments SET revision = revision + 1
+    WHERE id IN (SELECT tournament_id FROM tournament_participants WHERE user_id = NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only the embedded columns, and only when they actually change, so profile
+-- writes that touch other columns (bio, links, updated_at) keep ETags valid.
+-- Transition tables cannot be combined with a column list, hence a row trigger.
+DROP TRIGGER IF EXISTS trigger_revision_update ON users;
+CREATE TRIGGER trigger_revision_update
+    AFTER UPDATE OF username, first_name, last_name, rating ON users
+    FOR EACH ROW
+    WHEN (OLD.username IS DISTINCT FROM NEW.username
+       OR OLD.first_name IS DISTINCT FROM NEW.first_name
+       OR OLD.last_name IS DISTINCT FROM NEW.last_name
+       OR OLD.rating IS DISTINCT FROM NEW.rating)
+    EXECUTE FUNCTION bump_user_tournament_revisions();
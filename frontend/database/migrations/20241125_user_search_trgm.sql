@@ -0,0 +1,17 @@
+-- Trigram indexes for user search
+-- /api/users/search and /api/user/search are answered from an in-process
+-- index (lib/userSearch.ts); these indexes serve the database fallback used
+-- when that index cannot be seeded. Without them
+-- ILIKE '%fragment%' on users is a sequential scan on every keystroke.
+-- (gin_trgm_ops serves ILIKE directly, so the plain columns are indexed.)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm
+    ON users USING gin (username gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_users_first_name_trgm
+    ON users USING gin (first_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_users_last_name_trgm
+    ON users USING gin (last_name gin_trgm_ops);
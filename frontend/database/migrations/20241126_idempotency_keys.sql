@@ -0,0 +1,23 @@
+-- Idempotency keys for mutating API routes
+-- A request carrying an Idempotency-Key header first inserts a 'pending' row
+-- (the primary key makes that a claim); the response is stored on the row
+-- when it completes and replayed to retries until expires_at. A duplicate
+-- that finds a pending row polls it until the original finishes.
+-- (Used by lib/idempotency.ts)
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    -- Route pattern, request path and caller
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    -- sha256 of method and body; a reused key with another body is rejected
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'done')),
+    response_status INTEGER,
+    response_headers JSONB,
+    response_body TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
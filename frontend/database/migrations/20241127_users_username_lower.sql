@@ -0,0 +1,10 @@
+-- Case-insensitive username lookups
+-- Telegram usernames are case-insensitive, but users.username keeps the case
+-- Telegram sent. Bulk registration (bulkAddTournamentParticipants in
+-- lib/db.ts) resolves a batch of usernames with one
+-- `username_lower IN (...)` query against this generated column.
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS username_lower TEXT GENERATED ALWAYS AS (lower(username)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(username_lower);
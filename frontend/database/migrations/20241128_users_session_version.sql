@@ -0,0 +1,8 @@
+-- Session token revocation
+-- Tokens from /api/auth/telegram carry the role and the user's session_version
+-- at issue time (lib/session.ts). updateUserRole bumps the version, and tokens
+-- with an older one are rejected on every instance once its cached copy of
+-- the version expires.
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS session_version INTEGER NOT NULL DEFAULT 0;
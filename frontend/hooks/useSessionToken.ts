@@ -0,0 +1,91 @@
+"use client"
+
+import { useEffect, useRef, useState } from "react"
+import { useTelegramWebApp } from "./useTelegramWebApp"
+
+// Session token from /api/auth/telegram. initData is exchanged once per page
+// load and again shortly before the token expires; API calls send the token as
+// "Bearer <token>", so the server checks a signature instead of validating
+// initData and looking up the role on every request.
+
+// Renew this long before expiry, so requests in flight never carry a dead token
+const RENEW_BEFORE_MS = 60 * 1000
+
+interface Session {
+  token: string
+  // Unix seconds, from the token's exp claim
+  expiresAt: number
+}
+
+// Shared by every page of the app for the lifetime of the tab (not persisted:
+// a reload signs in again, which also picks up a changed role)
+let current: Session | null = null
+let pending: Promise<Session | null> | null = null
+
+function isFresh(session: Session | null): session is Session {
+  return !!session && session.expiresAt * 1000 - Date.now() > RENEW_BEFORE_MS
+}
+
+function exchange(initData: string): Promise<Session | null> {
+  if (!pending) {
+    pending = fetch("/api/auth/telegram", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ initData }),
+    })
+      .then(async (resp) => {
+        const body = await resp.json().catch(() => null)
+        if (!resp.ok || !body?.session?.token) return null
+        current = { token: body.session.token, expiresAt: body.session.expiresAt }
+        return current
+      })
+      .catch((e) => {
+        console.error("Session token exchange failed", e)
+        return null
+      })
+      .finally(() => {
+        pending = null
+      })
+  }
+  return pending
+}
+
+export function useSessionToken() {
+  const { initData } = useTelegramWebApp()
+  const initDataRef = useRef(initData)
+  initDataRef.current = initData
+  const hasInitData = !!initData
+
+  const [session, setSession] = useState<Session | null>(() => (isFresh(current) ? current : null))
+  const [isAuthReady, setIsAuthReady] = useState(() => isFresh(current))
+
+  useEffect(() => {
+    if (!hasInitData) return
+    let cancelled = false
+    let timer: ReturnType<typeof setTimeout> | undefined
+
+    const schedule = (next: Session) => {
+      timer = setTimeout(renew, Math.max(0, next.expiresAt * 1000 - Date.now() - RENEW_BEFORE_MS))
+    }
+
+    async function renew() {
+      const next = isFresh(current) ? current : await exchange(initDataRef.current)
+      if (cancelled) return
+      setSession(next)
+      setIsAuthReady(true)
+      if (next) schedule(next)
+    }
+
+    renew()
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [hasInitData])
+
+  return {
+    // Until a token is issued (or when the exchange failed) initData still works
+    authToken: session?.token || initData,
+    isAuthReady: isAuthReady || !hasInitData,
+  }
+}
@@ -0,0 +1,130 @@
+// @vitest-environment node
+import { describe, it, expect } from 'vitest'
+import { bulkAddTournamentParticipants, parseParticipantsCsv, type BulkParticipantEntry } from '../db'
+import { countQueries } from '../requestContext'
+import { supabase } from '../supabase'
+
+let telegramId = 930_000
+
+async function seedUsers(count: number) {
+  const { data } = await supabase.from('users').insert(Array.from({ length: count }, () => {
+    const id = ++telegramId
+    return { telegram_id: id, username: `Bulk${id}`, first_name: 'Bulk', last_name: String(id) }
+  }))
+  return (Array.isArray(data) ? data : [data]) as Array<{ id: number; telegram_id: number; username: string }>
+}
+
+async function seedTournament() {
+  const { data } = await supabase.from('tournaments').insert({ title: 'Bulk open', rounds: 5 })
+  return data.id as number
+}
+
+describe('bulkAddTournamentParticipants', () => {
+  it('registers 100 players with a query count independent of the field size', async () => {
+    const tournamentId = await seedTournament()
+    const users = await seedUsers(100)
+    const entries = users.map((user, i) => (
+      i % 3 === 0 ? { user_id: user.id, nickname: `N${i}` }
+        : i % 3 === 1 ? { telegram_id: String(user.telegram_id), nickname: `N${i}` }
+          : { username: `@${user.username.toLowerCase()}`, nickname: `N${i}` }
+    ))
+
+    const { result, queryCount, repeated } = await countQueries(() => bulkAddTournamentParticipants(tournamentId, entries))
+
+    expect(result.errors).toEqual([])
+    expect(result.created).toHaveLength(100)
+    // Existing participants, one lookup per key type, one insert
+    expect(queryCount).toBeLessThanOrEqual(5)
+    expect(repeated).toEqual([])
+  })
+
+  it('reports per-row errors and inserts the rest', async () => {
+    const tournamentId = await seedTournament()
+    const [first, second, third] = await seedUsers(3)
+    await supabase.from('tournament_participants').insert({ tournament_id: tournamentId, user_id: first.id, nickname: 'Taken' })
+
+    const result = await bulkAddTournamentParticipants(tournamentId, [
+      { user_id: first.id, nickname: 'Again' },
+      { user_id: second.id, nickname: 'Taken' },
+      { username: 'nobody_here', nickname: 'Ghost' },
+      { user_id: second.id, nickname: 'Second' },
+      { user_id: third.id, nickname: 'Second' },
+      { nickname: 'Anonymous' },
+      { user_id: third.id, nickname: ' ' }
+    ])
+
+    expect(result.created.map((p) => p.nickname)).toEqual(['Second'])
+    expect(result.errors.map((e) => e.row)).toEqual([0, 1, 2, 4, 5, 6])
+    expect(result.errors[0].error).toContain('уже зарегистрирован')
+    expect(result.errors[1].error).toContain('Taken')
+  })
+
+  it('matches usernames case-insensitively', async () => {
+    const tournamentId = await seedTournament()
+    const [user] = await seedUsers(1)
+    await supabase.from('users').update({ username: `JohnDoe${user.telegram_id}` }).eq('id', user.id)
+
+    const result = await bulkAddTournamentParticipants(tournamentId, [
+      { username: `@johndoe${user.telegram_id}`, nickname: 'John' }
+    ])
+
+    expect(result.errors).toEqual([])
+    expect(result.created[0].user_id).toBe(user.id)
+  })
+
+  it('rejects malformed ids per row without failing the batch', async () => {
+    const tournamentId = await seedTournament()
+    const [first, second] = await seedUsers(2)
+
+    const result = await bulkAddTournamentParticipants(tournamentId, [
+      { telegram_id: 'not-a-number', nickname: 'Bad' },
+      { telegram_id: String(first.telegram_id), nickname: 'First' },
+      { user_id: 1.5, nickname: 'Half' },
+      { user_id: String(second.id), nickname: 'Second' }
+    ])
+
+    expect(result.created.map((p) => p.nickname)).toEqual(['First', 'Second'])
+    expect(result.errors).toEqual([
+      { row: 0, error: expect.stringContaining('telegram_id') },
+      { row: 2, error: expect.stringContaining('user_id') }
+    ])
+  })
+
+  it('reports rows that are not objects with a string nickname', async () => {
+    const tournamentId = await seedTournament()
+    const [user] = await seedUsers(1)
+
+    const result = await bulkAddTournamentParticipants(tournamentId, [
+      null,
+      { user_id: user.id, nickname: 5 },
+      'Anna',
+      { user_id: user.id, nickname: 'Valid' }
+    ] as unknown as BulkParticipantEntry[])
+
+    expect(result.created.map((p) => p.nickname)).toEqual(['Valid'])
+    expect(result.errors).toEqual([
+      { row: 0, error: expect.stringContaining('объектом') },
+      { row: 1, error: 'Никнейм должен быть строкой' },
+      { row: 2, error: expect.stringContaining('объектом') }
+    ])
+  })
+})
+
+describe('parseParticipantsCsv', () => {
+  it('reads headered and bare lines', () => {
+    expect(parseParticipantsCsv('user_id,nickname\n12,Anna\n')).toEqual([
+      { user_id: 12, telegram_id: null, username: null, nickname: 'Anna' }
+    ])
+    expect(parseParticipantsCsv('@boris; Boris\r\n123456;"Vera V"')).toEqual([
+      { username: '@boris', nickname: 'Boris' },
+      { telegram_id: '123456', nickname: 'Vera V' }
+    ])
+  })
+
+  it('keeps quoted delimiters and quotes inside a cell', () => {
+    expect(parseParticipantsCsv('username,nickname\n@john,"Smith, Jr"\n@ann,"Ann ""The Rook"""')).toEqual([
+      { user_id: null, telegram_id: null, username: '@john', nickname: 'Smith, Jr' },
+      { user_id: null, telegram_id: null, username: '@ann', nickname: 'Ann "The Rook"' }
+    ])
+  })
+})
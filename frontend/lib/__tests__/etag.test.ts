@@ -0,0 +1,21 @@
+import { describe, it, expect } from 'vitest'
+import { etagMatches, notModified } from '../etag'
+
+describe('etag helpers', () => {
+  it('matches If-None-Match lists, weak tags and *', () => {
+    const etag = '"abc"'
+    expect(etagMatches(new Headers(), etag)).toBe(false)
+    expect(etagMatches(new Headers({ 'if-none-match': '"abc"' }), etag)).toBe(true)
+    expect(etagMatches(new Headers({ 'if-none-match': '"x", W/"abc"' }), etag)).toBe(true)
+    expect(etagMatches(new Headers({ 'if-none-match': '*' }), etag)).toBe(true)
+    expect(etagMatches(new Headers({ 'if-none-match': '"abcd"' }), etag)).toBe(false)
+  })
+
+  it('builds an empty 304 with the ETag', async () => {
+    const response = notModified('"abc"', { 'Cache-Control': 'no-cache' })
+    expect(response.status).toBe(304)
+    expect(response.headers.get('etag')).toBe('"abc"')
+    expect(response.headers.get('cache-control')).toBe('no-cache')
+    expect(await response.text()).toBe('')
+  })
+})
@@ -0,0 +1,79 @@
+// @vitest-environment node
+import { describe, it, expect, beforeEach } from 'vitest'
+import { withIdempotency, idempotency } from '../idempotency'
+
+let key = 0
+let calls = 0
+
+const handler = withIdempotency('/api/test', async function POST(req: Request) {
+  calls++
+  const body = await req.json() as { delayMs?: number; status?: number }
+  if (body.delayMs) await new Promise((resolve) => setTimeout(resolve, body.delayMs))
+  return Response.json({ call: calls }, { status: body.status ?? 201 })
+})
+
+function post(body: object, idempotencyKey?: string) {
+  return new Request('http://localhost/api/test', {
+    method: 'POST',
+    headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+    body: JSON.stringify(body)
+  })
+}
+
+beforeEach(() => {
+  calls = 0
+  key++
+  idempotency.clear()
+})
+
+describe('withIdempotency', () => {
+  it('replays the first response to a retry with the same key', async () => {
+    const first = await handler(post({}, `retry-${key}`))
+    const retry = await handler(post({}, `retry-${key}`))
+
+    expect(calls).toBe(1)
+    expect(retry.status).toBe(201)
+    expect(await retry.json()).toEqual(await first.json())
+    expect(retry.headers.get('idempotent-replayed')).toBe('true')
+  })
+
+  it('makes an in-flight duplicate wait for the original', async () => {
+    const [a, b] = await Promise.all([
+      handler(post({ delayMs: 20 }, `inflight-${key}`)),
+      handler(post({ delayMs: 20 }, `inflight-${key}`))
+    ])
+
+    expect(calls).toBe(1)
+    expect(await a.json()).toEqual({ call: 1 })
+    expect(await b.json()).toEqual({ call: 1 })
+  })
+
+  it('rejects a reused key with a different body', async () => {
+    await handler(post({ a: 1 }, `mismatch-${key}`))
+    const reused = await handler(post({ a: 2 }, `mismatch-${key}`))
+
+    expect(reused.status).toBe(422)
+    expect(calls).toBe(1)
+  })
+
+  it('runs requests without a key every time and does not keep server errors', async () => {
+    await handler(post({}))
+    await handler(post({}))
+    expect(calls).toBe(2)
+
+    await handler(post({ status: 503 }, `error-${key}`))
+    const retried = await handler(post({ status: 503 }, `error-${key}`))
+    expect(calls).toBe(4)
+    expect(retried.headers.get('idempotent-replayed')).toBeNull()
+  })
+
+  it('replays from the shared table on another instance', async () => {
+    await handler(post({}, `shared-${key}`))
+    // A fresh instance only has the idempotency_keys row
+    idempotency.clear()
+    const replayed = await handler(post({}, `shared-${key}`))
+
+    expect(replayed.headers.get('idempotent-replayed')).toBe('true')
+    expect(calls).toBe(1)
+  })
+})
@@ -0,0 +1,86 @@
+import { describe, it, expect, beforeEach, afterEach } from 'vitest'
+import { createLogger, flushLogs, runWithLogContext, setLogLevel, setLogSink } from '../logger'
+
+describe('logger', () => {
+  let lines: Array<Record<string, unknown>>
+  let restore: ReturnType<typeof setLogSink>
+
+  beforeEach(() => {
+    flushLogs()
+    lines = []
+    restore = setLogSink((chunk) => {
+      for (const line of chunk.split('\n')) {
+        if (line) lines.push(JSON.parse(line))
+      }
+    })
+    setLogLevel('info')
+  })
+
+  afterEach(() => {
+    flushLogs()
+    setLogSink(restore)
+  })
+
+  it('buffers records until flushed and serializes errors', () => {
+    const log = createLogger('test')
+    log.error('Failed to load', { error: new Error('boom'), id: 7 })
+
+    expect(lines).toHaveLength(0)
+    flushLogs()
+
+    expect(lines).toHaveLength(1)
+    expect(lines[0]).toMatchObject({ level: 'error', scope: 'test', msg: 'Failed to load', id: 7 })
+    expect((lines[0].error as { message: string }).message).toBe('boom')
+  })
+
+  it('skips records below the level without evaluating lazy fields', () => {
+    const log = createLogger('test')
+    let evaluated = 0
+    log.debug('Hot path', () => {
+      evaluated++
+      return { big: 'object' }
+    })
+    flushLogs()
+
+    expect(lines).toHaveLength(0)
+    expect(evaluated).toBe(0)
+  })
+
+  it('samples per call site and reports skipped calls', () => {
+    const log = createLogger('test')
+    for (let i = 0; i < 25; i++) {
+      log.info('Sampled', { i }, { sample: 0.1 })
+    }
+    log.info('Not sampled')
+    flushLogs()
+
+    const sampled = lines.filter((line) => line.msg === 'Sampled')
+    expect(sampled).toHaveLength(2)
+    expect(sampled[0]).toMatchObject({ i: 9, sampled_out: 9 })
+    expect(lines.filter((line) => line.msg === 'Not sampled')).toHaveLength(1)
+  })
+
+  it('attaches the request context', async () => {
+    const log = createLogger('test').child({ component: 'submit' })
+    await runWithLogContext({ requestId: 'req-1' }, async () => {
+      await Promise.resolve()
+      log.warn('Inside request')
+    })
+    log.warn('Outside request')
+    flushLogs()
+
+    expect(lines[0]).toMatchObject({ requestId: 'req-1', component: 'submit' })
+    expect(lines[1].requestId).toBeUndefined()
+  })
+
+  it('drops the oldest records when the buffer is full', () => {
+    const log = createLogger('test')
+    for (let i = 0; i < 1100; i++) log.info('Burst', { i })
+    flushLogs()
+
+    const burst = lines.filter((line) => line.msg === 'Burst')
+    expect(burst).toHaveLength(1024)
+    expect(burst[0].i).toBe(76)
+    expect(lines.find((line) => line.msg === 'Log records dropped')).toMatchObject({ dropped: 76 })
+  })
+})
@@ -0,0 +1,58 @@
+import { describe, it, expect } from 'vitest'
+import { metrics } from '../metrics'
+import { supabase } from '../supabase'
+
+describe('metrics registry', () => {
+  it('renders counters and histograms in Prometheus text format', () => {
+    const requests = metrics.counter('test_requests_total', 'Test requests', ['route', 'status'])
+    requests.inc({ route: '/a', status: 200 })
+    requests.inc({ route: '/a', status: 200 }, 2)
+    requests.inc({ route: 'quote"d', status: 500 })
+
+    const latency = metrics.histogram('test_latency_seconds', 'Test latency', ['route'])
+    latency.observe(0.5, { route: '/a' })
+    latency.observe(40, { route: '/a' })
+    latency.observe(60_000, { route: '/a' })
+
+    const text = metrics.render()
+    expect(text).toContain('# TYPE test_requests_total counter')
+    expect(text).toContain('test_requests_total{route="/a",status="200"} 3')
+    expect(text).toContain('test_requests_total{route="quote\\"d",status="500"} 1')
+    expect(text).toContain('# TYPE test_latency_seconds histogram')
+    expect(text).toContain('test_latency_seconds_bucket{route="/a",le="0.001"} 1')
+    expect(text).toContain('test_latency_seconds_bucket{route="/a",le="0.05"} 2')
+    expect(text).toContain('test_latency_seconds_bucket{route="/a",le="30"} 2')
+    expect(text).toContain('test_latency_seconds_bucket{route="/a",le="+Inf"} 3')
+    expect(text).toContain('test_latency_seconds_count{route="/a"} 3')
+  })
+
+  it('keeps percentiles within the slot resolution', () => {
+    const latency = metrics.histogram('test_percentile_seconds', 'Percentile test')
+    for (let ms = 1; ms <= 1000; ms++) latency.observe(ms)
+
+    for (const p of [50, 90, 99]) {
+      const expected = p * 10
+      expect(latency.percentile(p)).toBeGreaterThanOrEqual(expected)
+      expect(latency.percentile(p)).toBeLessThanOrEqual(expected * 1.125 + 0.001)
+    }
+  })
+
+  it('reads callback metrics only when rendering', () => {
+    let reads = 0
+    metrics.observe('test_callback_total', 'Callback test', 'counter', () => ++reads)
+    expect(reads).toBe(0)
+    expect(metrics.render()).toContain('test_callback_total 1')
+  })
+
+  it('counts Supabase calls by table and operation', async () => {
+    const queries = metrics.counter('supabase_queries_total', '', ['table', 'op', 'status'])
+    const before = queries.get({ table: 'tournaments', op: 'select', status: 'ok' })
+    const inserts = queries.get({ table: 'tournaments', op: 'insert', status: 'ok' })
+
+    await supabase.from('tournaments').insert({ title: 'Metrics cup' })
+    await supabase.from('tournaments').select('*').eq('title', 'Metrics cup')
+
+    expect(queries.get({ table: 'tournaments', op: 'insert', status: 'ok' })).toBe(inserts + 1)
+    expect(queries.get({ table: 'tournaments', op: 'select', status: 'ok' })).toBe(before + 1)
+  })
+})
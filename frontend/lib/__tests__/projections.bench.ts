@@ -0,0 +1,85 @@
+import { bench, describe, beforeAll } from 'vitest'
+
+// Standings inputs for a 200-player, 6-round tournament: full rows ('*' and
+// users(*)) against the lite projections, against the in-memory store with a
+// simulated 2ms round trip. Each query's result is encoded and decoded as JSON,
+// which stands in for the PostgREST response; payload sizes are printed once.
+// Run with: npm run bench -- projections
+process.env.MEM_SUPABASE_LATENCY_MS = process.env.MEM_SUPABASE_LATENCY_MS || '2'
+
+const { supabase } = await import('../supabase')
+const { listMatchesForRounds, listParticipantsLite } = await import('../db')
+
+let tournamentId = 0
+let roundIds: number[] = []
+
+function overTheWire<T>(data: T): { data: T; bytes: number } {
+  const body = JSON.stringify(data)
+  return { data: JSON.parse(body) as T, bytes: Buffer.byteLength(body) }
+}
+
+async function fullRows() {
+  const { data: participants } = await supabase
+    .from('tournament_participants')
+    .select('*, user:users(*)')
+    .eq('tournament_id', tournamentId)
+    .order('created_at', { ascending: true })
+  const { data: matches } = await supabase.from('matches').select('*').in('round_id', roundIds)
+  return overTheWire(participants).bytes + overTheWire(matches).bytes
+}
+
+async function liteRows() {
+  const participants = await listParticipantsLite(tournamentId)
+  const matches = await listMatchesForRounds(roundIds)
+  return overTheWire(participants).bytes + overTheWire(matches).bytes
+}
+
+describe('participants and matches of a 200-player tournament', () => {
+  beforeAll(async () => {
+    const { data: tournament } = await supabase.from('tournaments').insert({ title: 'Projection bench', rounds: 7 })
+    tournamentId = tournament.id
+
+    const { data: users } = await supabase.from('users').insert(Array.from({ length: 200 }, (_, i) => ({
+      telegram_id: 940_000 + i,
+      username: `bench${i}`,
+      first_name: 'Player',
+      last_name: String(i),
+      rating: 1200 + i,
+      chesscom_url: `https://www.chess.com/member/bench${i}`,
+      lichess_url: `https://lichess.org/@/bench${i}`,
+      bio: 'Club player since school, prefers the Caro-Kann and long time controls. '.repeat(6)
+    })))
+    const { data: participants } = await supabase.from('tournament_participants').insert(users.map((user: { id: number }, i: number) => ({
+      tournament_id: tournamentId,
+      user_id: user.id,
+      nickname: `Bench${i}`
+    })))
+    for (let number = 1; number <= 6; number++) {
+      const { data: round } = await supabase.from('rounds').insert({ tournament_id: tournamentId, number, status: 'locked' })
+      roundIds.push(round.id)
+      await supabase.from('matches').insert(Array.from({ length: 100 }, (_, board) => ({
+        round_id: round.id,
+        white_participant_id: participants[board * 2].id,
+        black_participant_id: participants[board * 2 + 1].id,
+        board_no: board + 1,
+        result: 'white',
+        score_white: 1,
+        score_black: 0,
+        source: 'manual',
+        notes: null
+      })))
+    }
+
+    const before = await fullRows()
+    const after = await liteRows()
+    console.log(`payload: ${before} bytes with full rows, ${after} bytes with lite projections`)
+  })
+
+  bench('full rows (select *, users(*))', async () => {
+    await fullRows()
+  })
+
+  bench('lite projections', async () => {
+    await liteRows()
+  })
+})
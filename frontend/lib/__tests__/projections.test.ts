@@ -0,0 +1,138 @@
+// @vitest-environment node
+import { describe, it, expect, beforeAll } from 'vitest'
+import { listMatchesForRounds, listParticipantsLite } from '../db'
+import { supabase } from '../supabase'
+
+// Column projections on the hot paths, and the in-memory client honouring
+// select clauses the way PostgREST does
+
+let telegramId = 930_000
+let tournamentId: number
+let roundIds: number[]
+
+function payloadBytes(data: unknown): number {
+  return Buffer.byteLength(JSON.stringify(data))
+}
+
+beforeAll(async () => {
+  const { data: tournament } = await supabase.from('tournaments').insert({ title: 'Projection open', rounds: 7 })
+  tournamentId = tournament.id
+
+  const { data: users } = await supabase.from('users').insert(Array.from({ length: 200 }, (_, i) => ({
+    telegram_id: ++telegramId,
+    username: `proj${telegramId}`,
+    first_name: 'Player',
+    last_name: String(i),
+    rating: 1200 + i,
+    chesscom_url: `https://www.chess.com/member/proj${telegramId}`,
+    lichess_url: `https://lichess.org/@/proj${telegramId}`,
+    bio: 'Club player since school, prefers the Caro-Kann and long time controls. '.repeat(6)
+  })))
+  const { data: participants } = await supabase.from('tournament_participants').insert(users.map((user: { id: number }, i: number) => ({
+    tournament_id: tournamentId,
+    user_id: user.id,
+    nickname: `Proj${String(i).padStart(3, '0')}`
+  })))
+
+  roundIds = []
+  for (let number = 1; number <= 6; number++) {
+    const { data: round } = await supabase.from('rounds').insert({ tournament_id: tournamentId, number, status: 'locked' })
+    roundIds.push(round.id)
+    await supabase.from('matches').insert(Array.from({ length: 100 }, (_, board) => ({
+      round_id: round.id,
+      white_participant_id: participants[board * 2].id,
+      black_participant_id: participants[board * 2 + 1].id,
+      board_no: board + 1,
+      result: 'draw',
+      score_white: 0.5,
+      score_black: 0.5,
+      source: 'manual',
+      notes: null
+    })))
+  }
+})
+
+describe('in-memory select clauses', () => {
+  it('returns only the selected columns, under their aliases', async () => {
+    const { data } = await supabase
+      .from('tournament_participants')
+      .select('id, name:nickname')
+      .eq('tournament_id', tournamentId)
+      .limit(1)
+      .single()
+
+    expect(Object.keys(data).sort()).toEqual(['id', 'name'])
+    expect(data.name).toBe('Proj000')
+  })
+
+  it('embeds the referenced row as an object and the referencing rows as an array', async () => {
+    const { data: participant } = await supabase
+      .from('tournament_participants')
+      .select('nickname, user:users(rating, username)')
+      .eq('tournament_id', tournamentId)
+      .eq('nickname', 'Proj005')
+      .single()
+    expect(participant.user).toEqual({ rating: 1205, username: expect.stringMatching(/^proj/) })
+
+    const { data: round } = await supabase
+      .from('rounds')
+      .select('number, matches(board_no)')
+      .eq('id', roundIds[0])
+      .single()
+    expect(round.matches).toHaveLength(100)
+    expect(round.matches[0]).toEqual({ board_no: 1 })
+  })
+
+  it('follows a hinted column and drops rows with an empty !inner embed', async () => {
+    const { data: match } = await supabase
+      .from('matches')
+      .select('id, white:tournament_participants!white_participant_id(nickname), rounds!inner(tournament_id)')
+      .eq('round_id', roundIds[0])
+      .eq('board_no', 1)
+      .single()
+    expect(match.white).toEqual({ nickname: 'Proj000' })
+    expect(match.rounds).toEqual({ tournament_id: tournamentId })
+
+    const { data: rounds } = await supabase
+      .from('rounds')
+      .select('id, matches!inner(id)')
+      .eq('tournament_id', tournamentId)
+    expect(rounds).toHaveLength(6)
+    await supabase.from('rounds').insert({ tournament_id: tournamentId, number: 7, status: 'pending' })
+    const { data: played } = await supabase
+      .from('rounds')
+      .select('id, matches!inner(id)')
+      .eq('tournament_id', tournamentId)
+    expect(played).toHaveLength(6)
+  })
+})
+
+describe('lite projections for a 200-player tournament', () => {
+  it('keeps what pairing and standings read', async () => {
+    const participants = await listParticipantsLite(tournamentId)
+
+    expect(participants).toHaveLength(200)
+    expect(participants[3]).toEqual({ id: expect.any(Number), user_id: expect.any(Number), nickname: 'Proj003', rating: 1203 })
+
+    const matches = await listMatchesForRounds(roundIds)
+    expect(matches).toHaveLength(600)
+    expect(Object.keys(matches[0]).sort()).toEqual(
+      ['black_participant_id', 'id', 'result', 'round_id', 'score_black', 'score_white', 'white_participant_id']
+    )
+  })
+
+  it('sends a fraction of the full-row payload', async () => {
+    const { data: fullParticipants } = await supabase
+      .from('tournament_participants')
+      .select('*, user:users(*)')
+      .eq('tournament_id', tournamentId)
+    const { data: fullMatches } = await supabase.from('matches').select('*').in('round_id', roundIds)
+
+    const participantsLite = payloadBytes(await listParticipantsLite(tournamentId))
+    const matchesLite = payloadBytes(await listMatchesForRounds(roundIds))
+
+    // Mostly the bio and profile links
+    expect(participantsLite).toBeLessThan(payloadBytes(fullParticipants) / 5)
+    expect(matchesLite).toBeLessThan(payloadBytes(fullMatches))
+  })
+})
@@ -0,0 +1,118 @@
+// @vitest-environment node
+import { describe, it, expect } from 'vitest'
+import { NextRequest } from 'next/server'
+import { GET as leaderboardGet } from '@/app/api/tournaments/[id]/leaderboard/route'
+import { getStandings, simpleSwissPairings } from '../db'
+import { countQueries } from '../requestContext'
+import { ratingPairingService } from '../rating/ratingPairingService'
+import { supabase } from '../supabase'
+
+// Query budgets for hot paths. A loop that queries per player or per round
+// makes the count grow with the tournament and fails these.
+
+let telegramId = 910_000
+
+async function seedTournament(players: number, playedRounds: number) {
+  const { data: tournament } = await supabase.from('tournaments').insert({
+    title: `Budget ${players}`,
+    rounds: playedRounds + 1,
+    points_win: 1,
+    points_loss: 0,
+    points_draw: 0.5,
+    bye_points: 1,
+    forbid_repeat_bye: 1
+  })
+
+  const { data: users } = await supabase.from('users').insert(Array.from({ length: players }, (_, i) => ({
+    telegram_id: ++telegramId,
+    username: `budget${telegramId}`,
+    first_name: 'Player',
+    last_name: String(i),
+    rating: 1200 + i * 5
+  })))
+  await supabase.from('player_ratings').insert(users.map((user: { id: number }, i: number) => ({
+    user_id: user.id,
+    rating: 1200 + i * 5,
+    rd: 80,
+    volatility: 0.06,
+    games_count: playedRounds
+  })))
+  const { data: participants } = await supabase.from('tournament_participants').insert(users.map((user: { id: number }, i: number) => ({
+    tournament_id: tournament.id,
+    user_id: user.id,
+    nickname: `P${String(i).padStart(3, '0')}`
+  })))
+
+  for (let number = 1; number <= playedRounds; number++) {
+    const { data: round } = await supabase.from('rounds').insert({ tournament_id: tournament.id, number, status: 'locked' })
+    const matches = []
+    for (let i = 0; i + 1 < participants.length; i += 2) {
+      matches.push({
+        round_id: round.id,
+        white_participant_id: participants[i].id,
+        black_participant_id: participants[i + 1].id,
+        board_no: i / 2 + 1,
+        result: 'white',
+        score_white: 1,
+        score_black: 0
+      })
+    }
+    await supabase.from('matches').insert(matches)
+  }
+  const { data: nextRound } = await supabase.from('rounds').insert({ tournament_id: tournament.id, number: playedRounds + 1, status: 'pending' })
+
+  return { tournamentId: tournament.id as number, roundId: nextRound.id as number, participants }
+}
+
+describe('query budgets', () => {
+  it('folds standings for 100 players in 3 queries', async () => {
+    const { tournamentId } = await seedTournament(100, 4)
+
+    const { result, queryCount, repeated } = await countQueries(() => getStandings(tournamentId))
+
+    expect(result).toHaveLength(100)
+    expect(result[0].points).toBe(4)
+    expect(queryCount).toBeLessThanOrEqual(3)
+    expect(repeated).toEqual([])
+  })
+
+  it('serves the leaderboard for 100 players within 5 queries', async () => {
+    const { tournamentId } = await seedTournament(100, 3)
+
+    const response = await leaderboardGet(
+      new NextRequest(`http://localhost/api/tournaments/${tournamentId}/leaderboard`),
+      { params: Promise.resolve({ id: String(tournamentId) }) }
+    )
+
+    expect(await response.json()).toHaveLength(100)
+    // Revision, snapshot lookup, then participants + rounds + matches for the fallback
+    const calls = Number(/desc="(\d+) Supabase calls"/.exec(response.headers.get('Server-Timing') || '')?.[1])
+    expect(calls).toBeLessThanOrEqual(5)
+  })
+
+  it('pairs a Swiss round with a query count independent of the field size', async () => {
+    const small = await seedTournament(10, 3)
+    const large = await seedTournament(100, 3)
+
+    const smallRun = await countQueries(() => simpleSwissPairings(small.tournamentId, small.roundId))
+    const largeRun = await countQueries(() => simpleSwissPairings(large.tournamentId, large.roundId))
+
+    expect(largeRun.result).toHaveLength(50)
+    expect(largeRun.queryCount).toBe(smallRun.queryCount)
+    expect(largeRun.queryCount).toBeLessThanOrEqual(10)
+  })
+
+  it('loads pairing ratings with a query count independent of the field size', async () => {
+    const small = await seedTournament(10, 1)
+    const large = await seedTournament(100, 1)
+
+    const smallRun = await countQueries(() =>
+      ratingPairingService.findRatingAwareRound(small.tournamentId, 2, small.participants))
+    const largeRun = await countQueries(() =>
+      ratingPairingService.findRatingAwareRound(large.tournamentId, 2, large.participants))
+
+    expect(largeRun.result.pairings).toHaveLength(50)
+    expect(largeRun.queryCount).toBe(smallRun.queryCount)
+    expect(largeRun.repeated).toEqual([])
+  })
+})
@@ -0,0 +1,82 @@
+// @vitest-environment node
+import { describe, it, expect, afterEach } from 'vitest'
+import { flushLogs, getLogContext, setLogSink } from '../logger'
+import { getRequestContext, timeSpan, withRequestContext } from '../requestContext'
+import { supabase } from '../supabase'
+
+function request(headers: Record<string, string> = {}) {
+  return new Request('http://localhost/api/test', { method: 'GET', headers })
+}
+
+describe('withRequestContext', () => {
+  const savedThreshold = process.env.SLOW_REQUEST_LOG_MS
+
+  afterEach(() => {
+    if (savedThreshold === undefined) delete process.env.SLOW_REQUEST_LOG_MS
+    else process.env.SLOW_REQUEST_LOG_MS = savedThreshold
+  })
+
+  it('reports Supabase calls and spans in Server-Timing', async () => {
+    const handler = withRequestContext('/api/test', async (_req: Request) => {
+      await supabase.from('tournaments').select('*')
+      await timeSpan('bbp', async () => {
+        await supabase.from('matches').select('*').eq('round_id', 1)
+      })
+      return Response.json({ ok: true })
+    })
+
+    const response = await handler(request())
+    const header = response.headers.get('Server-Timing') || ''
+
+    expect(header).toMatch(/^db;dur=[\d.]+;desc="2 Supabase calls"/)
+    expect(header).toMatch(/bbp;dur=[\d.]+/)
+    expect(header).toMatch(/total;dur=[\d.]+$/)
+  })
+
+  it('keeps requests apart and exposes the request id to the logger', async () => {
+    const handler = withRequestContext('/api/test', async (_req: Request, calls: number) => {
+      for (let i = 0; i < calls; i++) {
+        await supabase.from('users').select('*')
+      }
+      return Response.json({
+        queries: getRequestContext()?.queryCount,
+        requestId: getLogContext()?.requestId
+      })
+    })
+
+    const [one, three] = await Promise.all([
+      handler(request({ 'x-request-id': 'req-a' }), 1),
+      handler(request({ 'x-request-id': 'req-b' }), 3)
+    ])
+
+    expect(await one.json()).toEqual({ queries: 1, requestId: 'req-a' })
+    expect(await three.json()).toEqual({ queries: 3, requestId: 'req-b' })
+    expect(getRequestContext()).toBeUndefined()
+  })
+
+  it('logs slow requests with their query list when enabled', async () => {
+    process.env.SLOW_REQUEST_LOG_MS = '0'
+    const lines: Array<Record<string, unknown>> = []
+    flushLogs()
+    const restore = setLogSink((chunk) => {
+      for (const line of chunk.split('\n')) {
+        if (line) lines.push(JSON.parse(line))
+      }
+    })
+
+    try {
+      const handler = withRequestContext('/api/slow', async () => {
+        await supabase.from('tournament_participants').select('*').eq('tournament_id', 1)
+        return new Response(null, { status: 204 })
+      })
+      await handler()
+      flushLogs()
+    } finally {
+      setLogSink(restore)
+    }
+
+    const slow = lines.find((line) => line.msg === 'Slow request')
+    expect(slow).toMatchObject({ route: '/api/slow', status: 204, queryCount: 1 })
+    expect((slow?.queries as string[])[0]).toMatch(/^select tournament_participants eq\(tournament_id\) [\d.]+ms$/)
+  })
+})
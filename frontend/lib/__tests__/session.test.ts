@@ -0,0 +1,84 @@
+// @vitest-environment node
+import { describe, it, expect, vi, afterEach } from 'vitest'
+import { NextRequest } from 'next/server'
+import { GET as authGet } from '@/app/api/auth/telegram/route'
+import { createSessionToken, verifySessionToken, SESSION_TTL_SECONDS, SESSION_VERSION_CACHE_MS } from '../session'
+import { getSessionFromHeaders } from '../telegram'
+import { updateUserRole } from '../db'
+import { supabase } from '../supabase'
+
+const user = { id: 5001, first_name: 'Anna', username: 'anna' }
+
+describe('session tokens', () => {
+  afterEach(() => {
+    vi.useRealTimers()
+  })
+
+  it('round-trips claims and rejects tampering', async () => {
+    const { token } = createSessionToken(user, 'admin', 17)
+    const claims = await verifySessionToken(token)
+
+    expect(claims).toMatchObject({ sub: 5001, uid: 17, role: 'admin', username: 'anna' })
+
+    const [prefix, body, signature] = token.split('.')
+    const forged = Buffer.from(JSON.stringify({ ...claims, role: 'admin', sub: 1 })).toString('base64url')
+    expect(await verifySessionToken(`${prefix}.${forged}.${signature}`)).toBeNull()
+    expect(await verifySessionToken(`${prefix}.${body}.${signature.slice(1)}`)).toBeNull()
+    expect(await verifySessionToken('not-a-token')).toBeNull()
+  })
+
+  it('expires after the TTL', async () => {
+    vi.useFakeTimers({ toFake: ['Date'] })
+    const { token } = createSessionToken(user, 'user')
+
+    vi.advanceTimersByTime((SESSION_TTL_SECONDS - 1) * 1000)
+    expect(await verifySessionToken(token)).not.toBeNull()
+    vi.advanceTimersByTime(2000)
+    expect(await verifySessionToken(token)).toBeNull()
+  })
+
+  it('revokes earlier tokens of a user when their role changes', async () => {
+    await supabase.from('users').insert({ telegram_id: 5004, first_name: 'Gleb', last_name: 'G', rating: 800, role: 'admin' })
+    const gleb = { id: 5004, first_name: 'Gleb' }
+    const before = createSessionToken(gleb, 'admin').token
+    const other = createSessionToken({ id: 5002, first_name: 'Boris' }, 'admin').token
+
+    expect(await updateUserRole(gleb.id, 'user')).toBe(true)
+
+    expect(await verifySessionToken(before)).toBeNull()
+    expect(await verifySessionToken(other)).not.toBeNull()
+    expect((await verifySessionToken(createSessionToken(gleb, 'user', null, 1).token))?.role).toBe('user')
+  })
+
+  it('picks up a role change made on another instance once the cached version expires', async () => {
+    vi.useFakeTimers({ toFake: ['Date'] })
+    await supabase.from('users').insert({ telegram_id: 5005, first_name: 'Dina', last_name: 'D', rating: 800, role: 'admin' })
+    const { token } = createSessionToken({ id: 5005, first_name: 'Dina' }, 'admin')
+    expect(await verifySessionToken(token)).not.toBeNull()
+
+    // Another instance ran updateUserRole: only the database has the new version
+    await supabase.from('users').update({ role: 'user', session_version: 1 }).eq('telegram_id', 5005)
+
+    expect(await verifySessionToken(token)).not.toBeNull()
+    vi.advanceTimersByTime(SESSION_VERSION_CACHE_MS)
+    expect(await verifySessionToken(token)).toBeNull()
+  })
+
+  it('is read from the Authorization header', async () => {
+    const { token } = createSessionToken({ id: 5003, first_name: 'Vera' }, 'moderator')
+    const headers = new Headers({ authorization: `Bearer ${token}` })
+
+    expect((await getSessionFromHeaders(headers))?.role).toBe('moderator')
+    expect(await getSessionFromHeaders(new Headers({ authorization: 'Bearer user=%7B%7D&hash=abc' }))).toBeNull()
+  })
+
+  it('is only issued for initData, not exchanged for a fresh token', async () => {
+    const initData = `user=${encodeURIComponent(JSON.stringify({ id: 5006, first_name: 'Egor' }))}&auth_date=1&hash=abc`
+    const issued = await authGet(new NextRequest('http://localhost/api/auth/telegram', { headers: { authorization: `Bearer ${initData}` } }))
+    const { session } = await issued.json()
+    expect(issued.status).toBe(200)
+
+    const refreshed = await authGet(new NextRequest('http://localhost/api/auth/telegram', { headers: { authorization: `Bearer ${session.token}` } }))
+    expect(refreshed.status).toBe(400)
+  })
+})
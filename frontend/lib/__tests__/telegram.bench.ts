@@ -0,0 +1,34 @@
+import { bench, describe } from 'vitest'
+import crypto from 'crypto'
+import { clearTelegramAuthCache, validateTelegramWebAppData } from '../telegram'
+
+// initData verification throughput. Run with: npm run bench -- telegram
+const BOT_TOKEN = '123456:bench-token'
+
+function signInitData(queryId: string): string {
+  const params = new URLSearchParams({
+    auth_date: String(Math.floor(Date.now() / 1000)),
+    query_id: queryId,
+    user: JSON.stringify({ id: 42, first_name: 'Bench', last_name: 'User', username: 'bench', language_code: 'ru' })
+  })
+  const dataCheckString = [...params].map(([key, value]) => `${key}=${value}`).sort().join('\n')
+  const secretKey = crypto.createHmac('sha256', 'WebAppData').update(BOT_TOKEN).digest()
+  params.set('hash', crypto.createHmac('sha256', secretKey).update(dataCheckString).digest('hex'))
+  return params.toString()
+}
+
+const repeated = signInitData('AAHdF6IQAAAAAN0XohDhrOrc')
+const distinct = Array.from({ length: 2000 }, (_, i) => signInitData(`AAH${i}`))
+let next = 0
+
+describe('validateTelegramWebAppData', () => {
+  bench('same initData on every request (cached)', () => {
+    validateTelegramWebAppData(repeated, BOT_TOKEN)
+  })
+
+  bench('new initData on every request (full verification)', () => {
+    validateTelegramWebAppData(distinct[next++ % distinct.length], BOT_TOKEN)
+  }, {
+    setup: () => clearTelegramAuthCache()
+  })
+})
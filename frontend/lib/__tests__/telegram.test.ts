@@ -0,0 +1,56 @@
+import { describe, it, expect, beforeEach, vi } from 'vitest'
+import crypto from 'crypto'
+import { clearTelegramAuthCache, validateTelegramWebAppData } from '../telegram'
+
+const BOT_TOKEN = '123456:test-token'
+
+function signInitData(fields: Record<string, string>, botToken = BOT_TOKEN): string {
+  const params = new URLSearchParams(fields)
+  const dataCheckString = [...params].map(([key, value]) => `${key}=${value}`).sort().join('\n')
+  const secretKey = crypto.createHmac('sha256', 'WebAppData').update(botToken).digest()
+  params.set('hash', crypto.createHmac('sha256', secretKey).update(dataCheckString).digest('hex'))
+  return params.toString()
+}
+
+function initData(authDate: number) {
+  return signInitData({
+    auth_date: String(authDate),
+    query_id: 'AAE',
+    user: JSON.stringify({ id: 42, first_name: 'Test' })
+  })
+}
+
+describe('validateTelegramWebAppData', () => {
+  beforeEach(() => {
+    clearTelegramAuthCache()
+    vi.useRealTimers()
+  })
+
+  it('accepts signed initData and rejects tampering', () => {
+    const data = initData(Math.floor(Date.now() / 1000))
+
+    expect(validateTelegramWebAppData(data, BOT_TOKEN)?.id).toBe(42)
+    expect(validateTelegramWebAppData(data.replace('query_id=AAE', 'query_id=AAF'), BOT_TOKEN)).toBeNull()
+    expect(validateTelegramWebAppData(data, '123456:other-token')).toBeNull()
+    expect(validateTelegramWebAppData(data.replace(/hash=[0-9a-f]+/, 'hash=abc'), BOT_TOKEN)).toBeNull()
+  })
+
+  it('serves repeat checks from cache without recomputing the HMAC', () => {
+    const data = initData(Math.floor(Date.now() / 1000))
+    expect(validateTelegramWebAppData(data, BOT_TOKEN)).not.toBeNull()
+
+    const hmac = vi.spyOn(crypto, 'createHmac')
+    expect(validateTelegramWebAppData(data, BOT_TOKEN)?.id).toBe(42)
+    expect(hmac).not.toHaveBeenCalled()
+    hmac.mockRestore()
+  })
+
+  it('stops trusting cached initData once auth_date expires', () => {
+    vi.useFakeTimers()
+    const data = initData(Math.floor(Date.now() / 1000))
+    expect(validateTelegramWebAppData(data, BOT_TOKEN)).not.toBeNull()
+
+    vi.advanceTimersByTime(86401 * 1000)
+    expect(validateTelegramWebAppData(data, BOT_TOKEN)).toBeNull()
+  })
+})
@@ -0,0 +1,163 @@
+// @vitest-environment node
+import { describe, it, expect, beforeAll } from 'vitest'
+import { exportTournament, importTournament, readArchive, type ArchiveFormat } from '../tournamentArchive'
+import { supabase } from '../supabase'
+
+// More participants than one export page, so the keyset paging is exercised
+const PLAYERS = 1200
+
+let tournamentId: number
+
+function download(id: number, format: ArchiveFormat): Promise<string> {
+  return new Response(exportTournament(id, format)).text()
+}
+
+function upload(text: string, format: 'jsonl' | 'csv') {
+  return importTournament(readArchive(new Response(text).body!, format), format)
+}
+
+beforeAll(async () => {
+  const { data: tournament } = await supabase.from('tournaments').insert({
+    title: 'Archive "Open", 2024',
+    format: 'swiss_bbp_dutch',
+    points_win: 1,
+    points_loss: 0,
+    points_draw: 0.5,
+    bye_points: 1,
+    rounds: 3,
+    archived: 1
+  })
+  tournamentId = tournament.id
+
+  const { data: users } = await supabase.from('users').insert(Array.from({ length: PLAYERS }, (_, i) => ({
+    telegram_id: 960_000 + i,
+    username: `archive${i}`,
+    first_name: 'Player',
+    last_name: String(i),
+    rating: 1000 + i
+  })))
+  const { data: participants } = await supabase.from('tournament_participants').insert(users.map((user: { id: number }, i: number) => ({
+    tournament_id: tournamentId,
+    user_id: user.id,
+    nickname: i === 0 ? 'Smith, "Jr"' : `Archive${i}`
+  })))
+
+  for (const number of [1, 2]) {
+    const { data: round } = await supabase.from('rounds').insert({
+      tournament_id: tournamentId,
+      number,
+      status: 'locked',
+      paired_at: '2024-11-20T10:00:00.000Z',
+      locked_at: '2024-11-20T12:00:00.000Z'
+    })
+    await supabase.from('matches').insert(Array.from({ length: PLAYERS / 2 }, (_, board) => ({
+      round_id: round.id,
+      white_participant_id: participants[board * 2].id,
+      black_participant_id: board === 0 && number === 2 ? null : participants[board * 2 + 1].id,
+      board_no: board + 1,
+      result: board === 0 && number === 2 ? 'bye' : ['white', 'black', 'draw'][board % 3],
+      score_white: board === 0 && number === 2 ? 1 : [1, 0, 0.5][board % 3],
+      score_black: board === 0 && number === 2 ? 0 : [0, 1, 0.5][board % 3],
+      source: 'manual',
+      notes: board === 1 ? 'Adjourned,\nthen "agreed" draw' : board === 2 ? '' : null
+    })))
+  }
+
+  await supabase.from('leaderboard').insert(participants.slice(0, 3).map((p: { id: number; nickname: string }, i: number) => ({
+    tournament_id: tournamentId,
+    participant_id: p.id,
+    nickname: p.nickname,
+    points: 2 - i * 0.5,
+    rank: i + 1
+  })))
+})
+
+describe('tournament archive', () => {
+  it('round-trips JSON Lines byte for byte', async () => {
+    const exported = await download(tournamentId, 'jsonl')
+    const lines = exported.trimEnd().split('\n')
+
+    expect(lines).toHaveLength(1 + PLAYERS + 2 + PLAYERS + 3)
+    expect(JSON.parse(lines[0])).toMatchObject({ type: 'tournament', title: 'Archive "Open", 2024', archived: 1 })
+    expect(JSON.parse(lines[1])).toMatchObject({ type: 'participant', no: 1, nickname: 'Smith, "Jr"', telegram_id: 960_000 })
+
+    const result = await upload(exported, 'jsonl')
+    expect(result).toEqual({ ok: true, tournamentId: expect.any(Number), participants: PLAYERS, rounds: 2, matches: PLAYERS, standings: 3 })
+    if (!result.ok) return
+
+    expect(result.tournamentId).not.toBe(tournamentId)
+    expect(await download(result.tournamentId, 'jsonl')).toBe(exported)
+  })
+
+  it('round-trips CSV, keeping nulls, empty strings and quoted newlines apart', async () => {
+    const exported = await download(tournamentId, 'csv')
+    const result = await upload(exported, 'csv')
+    expect(result.ok).toBe(true)
+    if (!result.ok) return
+
+    expect(await download(result.tournamentId, 'csv')).toBe(exported)
+
+    const { data: rounds } = await supabase.from('rounds').select('id').eq('tournament_id', result.tournamentId)
+    const { data: notes } = await supabase
+      .from('matches')
+      .select('board_no, notes')
+      .in('round_id', rounds.map((r: { id: number }) => r.id))
+      .lte('board_no', 3)
+      .order('board_no', { ascending: true })
+    expect(notes.slice(0, 6).map((m: { notes: string | null }) => m.notes)).toEqual([
+      null, null, 'Adjourned,\nthen "agreed" draw', 'Adjourned,\nthen "agreed" draw', '', ''
+    ])
+  })
+
+  it('writes TRF-16 player lines with their round results', async () => {
+    const trf = await download(tournamentId, 'trf')
+    const lines = trf.trimEnd().split('\n')
+
+    expect(lines[0]).toBe('012 Archive "Open", 2024')
+    expect(lines).toContain(`062 ${PLAYERS}`)
+    expect(lines).toContain('XXR 3')
+    const players = lines.filter((line) => line.startsWith('001 '))
+    expect(players).toHaveLength(PLAYERS)
+
+    const first = players.find((line) => line.slice(4, 8) === '   1')!
+    expect(first.slice(14, 47)).toBe('Smith, "Jr"'.padEnd(33))
+    expect(first.slice(48, 52)).toBe('1000')
+    expect(first.slice(80, 84)).toBe(' 2.0')
+    expect(first.slice(85, 89)).toBe('   1')
+    // Won against player 2 with white (round 1 from column 92), then a bye
+    expect(first.slice(89, 99)).toBe('     2 w 1')
+    expect(first.slice(91, 95)).toBe('   2')
+    expect(first.slice(99)).toBe('  0000 - U')
+
+    const second = players.find((line) => line.slice(4, 8) === '   2')!
+    expect(second.slice(80, 84)).toBe(' 0.0')
+    expect(second.slice(89, 99)).toBe('     1 b 0')
+  })
+
+  it('rejects a broken archive and leaves nothing behind', async () => {
+    const exported = await download(tournamentId, 'jsonl')
+    const broken = exported.replace('"black":2,', '"black":99999,')
+    const { data: before } = await supabase.from('tournaments').select('id').eq('title', 'Archive "Open", 2024')
+
+    const result = await upload(broken, 'jsonl')
+
+    expect(result).toEqual({ ok: false, error: expect.stringContaining('unknown participant 99999') })
+    const { data: after } = await supabase.from('tournaments').select('id').eq('title', 'Archive "Open", 2024')
+    expect(after).toHaveLength(before.length)
+  })
+
+  it('reports records out of order and unknown users', async () => {
+    const outOfOrder = await upload([
+      JSON.stringify({ type: 'tournament', title: 'Order cup' }),
+      JSON.stringify({ type: 'round', number: 1, status: 'locked' }),
+      JSON.stringify({ type: 'participant', no: 1, nickname: 'Late', user_id: 1, telegram_id: null })
+    ].join('\n'), 'jsonl')
+    expect(outOfOrder).toEqual({ ok: false, error: 'participant records must come before round records' })
+
+    const unknownUser = await upload([
+      JSON.stringify({ type: 'tournament', title: 'Ghost cup' }),
+      JSON.stringify({ type: 'participant', no: 1, nickname: 'Ghost', user_id: 1, telegram_id: 1 })
+    ].join('\n'), 'jsonl')
+    expect(unknownUser).toEqual({ ok: false, error: 'participant 1 (Ghost): user not found' })
+  })
+})
@@ -0,0 +1,135 @@
+// @vitest-environment node
+import { describe, it, expect } from 'vitest'
+import { NextRequest } from 'next/server'
+import { GET as eventsGet } from '@/app/api/tournaments/[id]/events/route'
+import { TournamentEventBus, formatServerSentEvent, tournamentEvents, type TournamentEvent, type TournamentEventAdapter } from '../tournamentEvents'
+import { updateMatchResult } from '../db'
+import { supabase } from '../supabase'
+
+async function seedMatch() {
+  const { data: tournament } = await supabase.from('tournaments').insert({
+    title: 'Events cup',
+    rounds: 1,
+    points_win: 1,
+    points_loss: 0,
+    points_draw: 0.5,
+    bye_points: 1
+  })
+  const { data: participants } = await supabase.from('tournament_participants').insert([
+    { tournament_id: tournament.id, user_id: 97_001, nickname: 'White' },
+    { tournament_id: tournament.id, user_id: 97_002, nickname: 'Black' }
+  ])
+  const { data: round } = await supabase.from('rounds').insert({ tournament_id: tournament.id, number: 1, status: 'paired' })
+  const { data: match } = await supabase.from('matches').insert({
+    round_id: round.id,
+    white_participant_id: participants[0].id,
+    black_participant_id: participants[1].id,
+    board_no: 1,
+    result: 'not_played',
+    score_white: 0,
+    score_black: 0
+  })
+  return { tournamentId: tournament.id as number, roundId: round.id as number, matchId: match.id as number, white: participants[0].id as number, black: participants[1].id as number }
+}
+
+describe('TournamentEventBus', () => {
+  it('delivers to the tournament subscribers until they unsubscribe', () => {
+    const bus = new TournamentEventBus()
+    const received: TournamentEvent[] = []
+    const other: TournamentEvent[] = []
+    const unsubscribe = bus.subscribe(1, (event) => received.push(event))
+    bus.subscribe(2, (event) => other.push(event))
+
+    bus.publish({ type: 'round_locked', tournamentId: 1, roundId: 10 })
+    unsubscribe()
+    unsubscribe()
+    bus.publish({ type: 'round_locked', tournamentId: 1, roundId: 11 })
+
+    expect(received).toEqual([{ type: 'round_locked', tournamentId: 1, roundId: 10 }])
+    expect(other).toEqual([])
+    expect(bus.subscriberCount(1)).toBe(0)
+  })
+
+  it('forwards to the adapter and delivers what the adapter receives', () => {
+    const bus = new TournamentEventBus()
+    const forwarded: TournamentEvent[] = []
+    let remote: ((event: TournamentEvent) => void) | null = null
+    const adapter: TournamentEventAdapter = {
+      publish: (event) => { forwarded.push(event) },
+      subscribe: (listener) => {
+        remote = listener
+        return () => { remote = null }
+      }
+    }
+    bus.setAdapter(adapter)
+    const received: TournamentEvent[] = []
+    bus.subscribe(5, (event) => received.push(event))
+
+    bus.publish({ type: 'pairings_ready', tournamentId: 5, roundId: 1, matchCount: 4 })
+    remote!({ type: 'round_locked', tournamentId: 5, roundId: 1 })
+
+    expect(forwarded).toHaveLength(1)
+    expect(received.map((event) => event.type)).toEqual(['pairings_ready', 'round_locked'])
+
+    bus.setAdapter(null)
+    expect(remote).toBeNull()
+  })
+
+  it('formats events for the SSE wire', () => {
+    expect(formatServerSentEvent({ type: 'round_locked', tournamentId: 3, roundId: 7 }))
+      .toBe('event: round_locked\ndata: {"type":"round_locked","tournamentId":3,"roundId":7}\n\n')
+  })
+})
+
+describe('match result events', () => {
+  it('publishes the result, the points it moved and the round lock', async () => {
+    const { tournamentId, roundId, matchId, white, black } = await seedMatch()
+    const received: TournamentEvent[] = []
+    const unsubscribe = tournamentEvents.subscribe(tournamentId, (event) => received.push(event))
+
+    await updateMatchResult(matchId, 'white')
+    // Correction: white win -> draw moves -0.5 / +0.5
+    await updateMatchResult(matchId, 'draw')
+    unsubscribe()
+
+    const results = received.filter((event) => event.type === 'result_updated')
+    expect(results).toHaveLength(2)
+    expect(results[1]).toMatchObject({ roundId, match: { id: matchId, result: 'draw', score_white: 0.5, score_black: 0.5 } })
+
+    const deltas = received.filter((event) => event.type === 'standings_delta')
+    expect(deltas).toEqual([
+      { type: 'standings_delta', tournamentId, changes: [{ participant_id: white, points: 1 }] },
+      { type: 'standings_delta', tournamentId, changes: [{ participant_id: white, points: -0.5 }, { participant_id: black, points: 0.5 }] }
+    ])
+    expect(received.some((event) => event.type === 'round_locked' && event.roundId === roundId)).toBe(true)
+  })
+})
+
+describe('GET /api/tournaments/[id]/events', () => {
+  it('streams published events and unsubscribes on disconnect', async () => {
+    const controller = new AbortController()
+    const response = await eventsGet(
+      new NextRequest('http://localhost/api/tournaments/4242/events', { signal: controller.signal }),
+      { params: Promise.resolve({ id: '4242' }) }
+    )
+    expect(response.headers.get('content-type')).toContain('text/event-stream')
+
+    const reader = response.body!.getReader()
+    const decoder = new TextDecoder()
+    expect(decoder.decode((await reader.read()).value)).toContain('retry: 3000')
+
+    tournamentEvents.publish({ type: 'round_locked', tournamentId: 4242, roundId: 1 })
+    expect(decoder.decode((await reader.read()).value)).toContain('event: round_locked')
+
+    controller.abort()
+    expect(tournamentEvents.subscriberCount(4242)).toBe(0)
+  })
+
+  it('rejects a malformed id', async () => {
+    const response = await eventsGet(
+      new NextRequest('http://localhost/api/tournaments/abc/events'),
+      { params: Promise.resolve({ id: 'abc' }) }
+    )
+    expect(response.status).toBe(400)
+  })
+})
@@ -0,0 +1,69 @@
+// @vitest-environment node
+import { describe, it, expect } from 'vitest'
+import { UserSearchIndex, userSearch, type SearchableUser } from '../userSearch'
+import { createUser, updateUserProfile } from '../db'
+
+const users: SearchableUser[] = [
+  { id: 1, telegram_id: 101, username: 'ivan_petrov', first_name: 'Иван', last_name: 'Петров' },
+  { id: 2, telegram_id: 102, username: 'ivan', first_name: 'Ivan', last_name: 'Sidorov' },
+  { id: 3, telegram_id: 103, username: 'magnus', first_name: 'Magnus', last_name: 'Carlsen' },
+  { id: 4, telegram_id: 104, username: 'grandivan', first_name: 'Пётр', last_name: 'Иванов' },
+  { id: 5, telegram_id: 105, username: null, first_name: 'Alexandra', last_name: 'Kosteniuk' }
+]
+
+describe('UserSearchIndex', () => {
+  const index = new UserSearchIndex(users)
+
+  it('ranks exact and prefix username matches before substrings', () => {
+    expect(index.search('ivan').map((u) => u.id)).toEqual([2, 1, 4])
+    expect(index.search('@Ivan', 1).map((u) => u.id)).toEqual([2])
+  })
+
+  it('matches name prefixes, several words and ё', () => {
+    // Иван is trigram-similar to Иванов, so it follows the prefix match
+    expect(index.search('иванов').map((u) => u.id)).toEqual([4, 1])
+    expect(index.search('петр').map((u) => u.id)).toEqual([4, 1])
+    expect(index.search('иван пет').map((u) => u.id)).toEqual([1, 4])
+    expect(index.search('alex').map((u) => u.id)).toEqual([5])
+  })
+
+  it('finds misspelt names through trigrams', () => {
+    expect(index.search('carlsan').map((u) => u.id)).toEqual([3])
+    expect(index.search('zzzz')).toEqual([])
+  })
+
+  it('follows renames', () => {
+    const copy = new UserSearchIndex(users)
+    copy.patchByTelegramId(103, { last_name: 'Nielsen' })
+    expect(copy.search('carlsen')).toEqual([])
+    expect(copy.search('niel').map((u) => u.id)).toEqual([3])
+    copy.remove(3)
+    expect(copy.search('magnus')).toEqual([])
+    expect(copy.size).toBe(4)
+  })
+})
+
+describe('userSearch', () => {
+  it('sees users created and renamed through lib/db', async () => {
+    await userSearch.search('warmup')
+    const created = await createUser({
+      telegram_id: 940_001,
+      username: 'typeahead_tester',
+      first_name: 'Zinaida',
+      last_name: 'Kvashnina',
+      rating: 1500
+    })
+    expect((await userSearch.search('typeahead')).map((u) => u.id)).toContain(created!.id)
+
+    await updateUserProfile(940_001, { first_name: 'Zoya', last_name: 'Kvashnina' })
+    expect((await userSearch.search('zoya')).map((u) => u.id)).toContain(created!.id)
+    expect(await userSearch.search('zinaida')).toEqual([])
+  })
+
+  it('shares one lookup between identical concurrent searches', async () => {
+    userSearch.clear()
+    const [a, b] = [userSearch.search('Typeahead'), userSearch.search('typeahead ')]
+    expect(a).toBe(b)
+    expect((await a).length).toBeGreaterThan(0)
+  })
+})
@@ -2,8 +2,18 @@ import { spawn } from 'child_process'
 import { promises as fs, existsSync } from 'fs'
 import * as path from 'path'
 import * as os from 'os'
-import { getTournamentById, listTournamentParticipants, listRounds, listMatches, simpleSwissPairings, type Tournament, type TournamentParticipant, type Round, type Match, type User } from './db'
+import { getTournamentById, listParticipantsLite, listRounds, listMatches, listMatchesForRounds, simpleSwissPairings, type Tournament, type ParticipantLite, type Round, type Match } from './db'
 import { supabase } from './supabase'
+import { createLogger } from './logger'
+import { metrics } from './metrics'
+import { timeSpan } from './requestContext'
+import { tournamentEvents } from './tournamentEvents'
+
+const log = createLogger('bbp')
+
+const bbpRuns = metrics.counter('bbp_runs_total', 'generatePairingsWithBBP calls by outcome', ['outcome'])
+// prepare: DB reads and TRF build before the engine starts; engine: one binary run; insert: writing the pairings
+const bbpStageDuration = metrics.histogram('bbp_stage_duration_seconds', 'BBP pairing time per stage', ['stage'])
 
 /**
  * BBP Pairings integration harness.
@@ -107,7 +117,7 @@ function toOneDecimal(n: number | undefined | null): string {
  */
 async function buildBbpTrfx(
   tournament: Tournament,
-  participants: Array<TournamentParticipant & { user: User }>,
+  participants: ParticipantLite[],
   prevRounds: Round[],
   currentRoundNum: number,
 ): Promise<string> {
@@ -148,33 +158,29 @@ async function buildBbpTrfx(
     .filter(r => (r.number || 0) < currentRoundNum)
     .map(r => r.id!)
   const pointsByParticipant = new Map<number, number>()
-  for (const p of participants) pointsByParticipant.set(p.id!, 0)
-
-  for (const rid of prevIds) {
-    const matches = await listMatches(rid)
-    for (const m of matches) {
-      if (typeof m.white_participant_id === 'number') {
-        pointsByParticipant.set(
-          m.white_participant_id,
-          (pointsByParticipant.get(m.white_participant_id) || 0) + (m.score_white || 0)
-        )
-      }
-      if (typeof m.black_participant_id === 'number') {
-        pointsByParticipant.set(
-          m.black_participant_id,
-          (pointsByParticipant.get(m.black_participant_id) || 0) + (m.score_black || 0)
-        )
-      }
+  for (const p of participants) pointsByParticipant.set(p.id, 0)
+
+  for (const m of await listMatchesForRounds(prevIds)) {
+    if (typeof m.white_participant_id === 'number') {
+      pointsByParticipant.set(
+        m.white_participant_id,
+        (pointsByParticipant.get(m.white_participant_id) || 0) + (m.score_white || 0)
+      )
+    }
+    if (typeof m.black_participant_id === 'number') {
+      pointsByParticipant.set(
+        m.black_participant_id,
+        (pointsByParticipant.get(m.black_participant_id) || 0) + (m.score_black || 0)
+      )
     }
   }
 
-  // Players: use position order as IDs, include nickname or user full name
+  // Players: use position order as IDs, named by their tournament nickname
   let pos = 1
   for (const p of participants) {
-    const rating = p.user?.rating ?? null
-    const name = p.nickname || `${p.user?.first_name || ''} ${p.user?.last_name || ''}`.trim() || (p.user?.username || `Player${pos}`)
-    const score = pointsByParticipant.get(p.id!) || 0
-    lines.push(make001Line(pos, name, rating, score))
+    const name = p.nickname || `Player${pos}`
+    const score = pointsByParticipant.get(p.id) || 0
+    lines.push(make001Line(pos, name, p.rating, score))
     pos += 1
   }
 
@@ -320,29 +326,37 @@ async function runBbpBinary(trfPath: string, outPath: string, listPath: string,
  * Attempt to generate pairings with BBP Pairings and insert them into DB.
  * Returns inserted Match[] on success, or null on failure.
  */
-export async function generatePairingsWithBBP(tournamentId: number, roundId: number): Promise<Match[] | null> {
+export function generatePairingsWithBBP(tournamentId: number, roundId: number): Promise<Match[] | null> {
+  return timeSpan('bbp', () => runBbpPairings(tournamentId, roundId))
+}
+
+async function runBbpPairings(tournamentId: number, roundId: number): Promise<Match[] | null> {
   lastBbpReason = undefined
   const cfg = resolveBbpBinary()
   if (!cfg.ok || !cfg.bin) {
     lastBbpReason = cfg.reason || 'not configured'
-    console.warn(`[BBP] Skipping: ${lastBbpReason}`)
+    log.warn('Skipping', { reason: lastBbpReason })
     // Проверяем, запущены ли в serverless окружении (Vercel)
     const isServerless = process.env.VERCEL === '1' || process.env.NODE_ENV === 'production'
     if (isServerless && !cfg.bin?.includes('mock')) {
-      console.warn('[BBP] В serverless окружении рекомендуется использовать bbp-mock.js')
+      log.warn('В serverless окружении рекомендуется использовать bbp-mock.js')
       lastBbpReason = 'BBP бинарник недоступен в serverless окружении. Используйте bbp-mock.js для генерации пар.'
     }
+    bbpRuns.inc({ outcome: 'skipped' })
     return null
   }
 
+  const stopPrepare = bbpStageDuration.startTimer({ stage: 'prepare' })
+
   const tournament = await getTournamentById(tournamentId)
   if (!tournament) {
     lastBbpReason = 'Tournament not found'
-    console.error('[BBP] Tournament not found')
+    log.error('Tournament not found', { tournamentId })
+    bbpRuns.inc({ outcome: 'failed' })
     return null
   }
 
-  const participants = await listTournamentParticipants(tournamentId)
+  const participants = await listParticipantsLite(tournamentId)
   const prevRounds = await listRounds(tournamentId)
   const currentRoundNum = (prevRounds.find(r => r.id === roundId)?.number) ?? 1
 
@@ -350,15 +364,16 @@ export async function generatePairingsWithBBP(tournamentId: number, roundId: num
   try {
     const existing = await listMatches(roundId)
     if (existing && existing.length > 0) {
-      console.warn('[BBP] Matches already exist for round; skipping generation')
+      log.warn('Matches already exist for round; skipping generation')
+      bbpRuns.inc({ outcome: 'existing' })
       return existing as unknown as Match[]
     }
   } catch (e) {
-    console.warn('[BBP] Failed to check existing matches:', e)
+    log.warn('Failed to check existing matches', { error: e })
   }
 
   // Build positional map (1-based index)
-  const posToParticipantId: number[] = participants.map(p => p.id!)
+  const posToParticipantId: number[] = participants.map(p => p.id)
 
   // Если указан bbp-mock.js в переменной окружения — не запускаем отдельный процесс,
   // а используем встроенный генератор швейцарских пар.
@@ -371,11 +386,14 @@ export async function generatePairingsWithBBP(tournamentId: number, roundId: num
       const swiss = await simpleSwissPairings(tournamentId, roundId)
       if (!swiss || swiss.length === 0) {
         lastBbpReason = 'Mock BBP produced no matches'
+        bbpRuns.inc({ outcome: 'empty' })
         return null
       }
+      bbpRuns.inc({ outcome: 'mock' })
       return swiss
     } catch (e) {
       lastBbpReason = e instanceof Error ? e.message : String(e)
+      bbpRuns.inc({ outcome: 'failed' })
       return null
     }
   }
@@ -400,16 +418,21 @@ export async function generatePairingsWithBBP(tournamentId: number, roundId: num
   const timeoutMs = Number(process.env.BBP_TIMEOUT_MS || 6000)
   const retries = Math.max(0, Math.min(2, Number(process.env.BBP_RETRIES || 1)))
   let outText = ''
+  stopPrepare()
   for (let attempt = 0; attempt <= retries; attempt++) {
+    const stopEngine = bbpStageDuration.startTimer({ stage: 'engine' })
     try {
       const res = await runBbpBinary(trfPath, outPath, listPath, cfg.bin, systemFlag, timeoutMs)
+      stopEngine()
       outText = res.outText
       break
     } catch (err: unknown) {
+      stopEngine()
       const message = err instanceof Error ? err.message : String(err)
       lastBbpReason = `Attempt ${attempt + 1} failed: ${message}`
-      console.error('[BBP] Execution failed:', message)
+      log.error('Execution failed', { tournamentId, roundId, attempt: attempt + 1, error: message })
       if (attempt === retries) {
+        bbpRuns.inc({ outcome: 'failed' })
         return null
       }
       await new Promise(r => setTimeout(r, 300 + attempt * 300))
@@ -420,7 +443,8 @@ export async function generatePairingsWithBBP(tournamentId: number, roundId: num
   const parsed = parseBbpOutFile(outText)
   if (!parsed.pairs || parsed.pairs.length === 0) {
     lastBbpReason = 'No pairs parsed from output'
-    console.warn('[BBP] No pairs parsed from output')
+    log.warn('No pairs parsed from output')
+    bbpRuns.inc({ outcome: 'empty' })
     const devFallback = process.env.BBP_DEV_SWISS_FALLBACK
     const isDev = process.env.NODE_ENV !== 'production'
     if (isDev && devFallback && (devFallback === '1' || devFallback.toLowerCase() === 'true' || devFallback.toLowerCase() === 'yes')) {
@@ -435,37 +459,45 @@ export async function generatePairingsWithBBP(tournamentId: number, roundId: num
   }
 
   // Insert matches according to parsed pairs
+  const stopInsert = bbpStageDuration.startTimer({ stage: 'insert' })
   let board = 1
-  const inserted: Match[] = []
+  const rows: Array<Omit<Match, 'id'>> = []
 
   for (const pair of parsed.pairs) {
     const whiteId = posToParticipantId[pair.whitePos - 1]
     const blackId = pair.blackPos ? posToParticipantId[pair.blackPos - 1] : null
     if (!whiteId) continue
 
+    rows.push({
+      round_id: roundId,
+      white_participant_id: whiteId,
+      black_participant_id: blackId ?? null,
+      board_no: board,
+      result: 'not_played',
+      score_white: 0,
+      score_black: 0,
+      source: 'bbp'
+    })
+    board += 1
+  }
+
+  // All boards in one insert
+  const inserted: Match[] = []
+  if (rows.length > 0) {
     const { data, error } = await supabase
       .from('matches')
-      .insert({
-        round_id: roundId,
-        white_participant_id: whiteId,
-        black_participant_id: blackId ?? null,
-        board_no: board,
-        result: 'not_played',
-        score_white: 0,
-        score_black: 0,
-        source: 'bbp'
-      })
+      .insert(rows)
       .select()
-      .single()
 
     if (error) {
-      console.error('[BBP] Error inserting match:', error)
-      continue
+      log.error('Error inserting matches', { tournamentId, roundId, error })
+    } else if (data) {
+      inserted.push(...((Array.isArray(data) ? data : [data]) as Match[]))
+      tournamentEvents.publish({ type: 'pairings_ready', tournamentId, roundId, matchCount: inserted.length })
     }
-
-    if (data) inserted.push(data as Match)
-    board += 1
   }
+  stopInsert()
+  bbpRuns.inc({ outcome: 'ok' })
 
   return inserted
 }
@@ -0,0 +1,81 @@
+// CSV reading shared by the tournament archive import and bulk participant
+// registration
+
+export class CsvFormatError extends Error {}
+
+/**
+ * Incremental RFC 4180 reader; an unquoted empty cell reads as null, a quoted
+ * one as ''. Feed text with push() and finish with end(); each returns the
+ * rows completed so far
+ */
+export class CsvReader {
+  constructor(private readonly delimiter = ',') {}
+
+  private row: Array<string | null> = []
+  private cell = ''
+  private quoted = false
+  private inQuotes = false
+  private quoteSeen = false
+
+  push(text: string): Array<Array<string | null>> {
+    const rows: Array<Array<string | null>> = []
+    for (let i = 0; i < text.length; i++) {
+      const ch = text[i]
+      if (this.inQuotes) {
+        if (this.quoteSeen) {
+          this.quoteSeen = false
+          if (ch === '"') {
+            this.cell += '"'
+            continue
+          }
+          // That quote closed the cell; handle ch outside it
+          this.inQuotes = false
+        } else if (ch === '"') {
+          this.quoteSeen = true
+          continue
+        } else {
+          this.cell += ch
+          continue
+        }
+      }
+      if (ch === '"' && this.cell === '' && !this.quoted) {
+        this.inQuotes = true
+        this.quoted = true
+      } else if (ch === this.delimiter) {
+        this.endCell()
+      } else if (ch === '\n') {
+        this.endCell()
+        this.endRow(rows)
+      } else if (ch !== '\r') {
+        this.cell += ch
+      }
+    }
+    return rows
+  }
+
+  end(): Array<Array<string | null>> {
+    const rows: Array<Array<string | null>> = []
+    if (this.inQuotes && !this.quoteSeen) {
+      throw new CsvFormatError('CSV ends inside a quoted cell')
+    }
+    this.inQuotes = false
+    this.quoteSeen = false
+    if (this.row.length > 0 || this.cell !== '' || this.quoted) {
+      this.endCell()
+      this.endRow(rows)
+    }
+    return rows
+  }
+
+  private endCell(): void {
+    this.row.push(this.quoted || this.cell !== '' ? this.cell : null)
+    this.cell = ''
+    this.quoted = false
+  }
+
+  private endRow(rows: Array<Array<string | null>>): void {
+    // Blank lines carry no record
+    if (this.row.length > 1 || this.row[0] !== null) rows.push(this.row)
+    this.row = []
+  }
+}
@@ -1,4 +1,13 @@
 import { supabase } from './supabase'
+import { CsvReader } from './csv'
+import { ratingIndexes } from './rating/ratingIndex'
+import { predictionMatrices } from './rating/predictionMatrix'
+import { revokeSessions } from './session'
+import { createLogger } from './logger'
+import { tournamentEvents } from './tournamentEvents'
+import { userSearch, type UserSearchHit } from './userSearch'
+
+const log = createLogger('db')
 
 // Types matching our database schema
 export interface User {
@@ -12,6 +21,7 @@ export interface User {
   lichess_url?: string | null
   bio?: string | null
   role?: string
+  session_version?: number
   created_at?: string
   updated_at?: string
 }
@@ -82,6 +92,26 @@ export interface Match {
   notes?: string | null
 }
 
+// Projections for hot paths (pairing, standings, forecasts): only the columns
+// they read, instead of '*' and the whole user profile (bio, links) per row
+
+// User columns shown next to a participant
+export type UserSummary = Pick<User, 'id' | 'telegram_id' | 'username' | 'first_name' | 'last_name' | 'rating'>
+const USER_SUMMARY_COLUMNS = 'id, telegram_id, username, first_name, last_name, rating'
+
+export interface ParticipantLite {
+  id: number
+  user_id: number
+  nickname: string
+  // The profile rating pairing orders by (null without a user row)
+  rating: number | null
+}
+const PARTICIPANT_LITE_COLUMNS = 'id, user_id, nickname, user:users(rating)'
+
+export type MatchLite = Required<Pick<Match, 'id'>> &
+  Pick<Match, 'round_id' | 'white_participant_id' | 'black_participant_id' | 'result' | 'score_white' | 'score_black'>
+const MATCH_LITE_COLUMNS = 'id, round_id, white_participant_id, black_participant_id, result, score_white, score_black'
+
 // ===== USER FUNCTIONS =====
 
 export async function getUserById(userId: number): Promise<User | null> {
@@ -93,7 +123,7 @@ export async function getUserById(userId: number): Promise<User | null> {
 
   if (error) {
     if (error.code === 'PGRST116') return null // Not found
-    console.error('Error getting user by id:', error)
+    log.error('Error getting user by id', { error })
     return null
   }
 
@@ -109,7 +139,7 @@ export async function getUserByTelegramId(telegramId: number): Promise<User | nu
 
   if (error) {
     if (error.code === 'PGRST116') return null // Not found
-    console.error('Error getting user by telegram_id:', error)
+    log.error('Error getting user by telegram_id', { error })
     return null
   }
 
@@ -134,10 +164,11 @@ export async function createUser(user: User): Promise<User | null> {
     .single()
 
   if (error) {
-    console.error('Error creating user:', error)
+    log.error('Error creating user', { error })
     return null
   }
 
+  userSearch.upsert(data as User & { id: number })
   return data as User
 }
 
@@ -158,10 +189,34 @@ export async function updateUserProfile(
     .eq('telegram_id', telegramId)
 
   if (error) {
-    console.error('Error updating user profile:', error)
+    log.error('Error updating user profile', { error })
     return false
   }
 
+  userSearch.patchByTelegramId(telegramId, {
+    first_name: profileData.first_name,
+    last_name: profileData.last_name,
+    rating: profileData.rating || 800
+  })
+  return true
+}
+
+export async function updateUserRole(telegramId: number, role: string): Promise<boolean> {
+  // Session tokens carry the role; a new session version makes the user sign
+  // in again to pick it up (see lib/session.ts)
+  const existing = await getUserByTelegramId(telegramId)
+  const sessionVersion = (existing?.session_version ?? 0) + 1
+  const { error } = await supabase
+    .from('users')
+    .update({ role, session_version: sessionVersion })
+    .eq('telegram_id', telegramId)
+
+  if (error) {
+    log.error('Error updating user role', { error })
+    return false
+  }
+
+  revokeSessions(telegramId, sessionVersion)
   return true
 }
 
@@ -193,30 +248,22 @@ export async function getAllUsers(): Promise<User[]> {
     .order('created_at', { ascending: false })
 
   if (error) {
-    console.error('Error getting all users:', error)
+    log.error('Error getting all users', { error })
     return []
   }
 
   return (data || []) as User[]
 }
 
-export async function searchUsersByUsernameFragment(fragment: string, limit = 8): Promise<User[]> {
+/**
+ * Typeahead search over username, first and last name, best matches first
+ * (served from the in-process index in lib/userSearch.ts)
+ */
+export async function searchUsersByUsernameFragment(fragment: string, limit = 8): Promise<UserSearchHit[]> {
   const q = (fragment || '').trim()
   if (!q) return []
 
-  const { data, error } = await supabase
-    .from('users')
-    .select('*')
-    .ilike('username', `%${q}%`)
-    .order('created_at', { ascending: false })
-    .limit(limit)
-
-  if (error) {
-    console.error('Error searching users by username fragment:', error)
-    return []
-  }
-
-  return (data || []) as User[]
+  return userSearch.search(q, limit)
 }
 
 export async function seedTestUsers(count = 20): Promise<{ inserted: number }> {
@@ -227,7 +274,7 @@ export async function seedTestUsers(count = 20): Promise<{ inserted: number }> {
     const role = i <= 5 ? 'admin' : i <= 10 ? 'moderator' : 'user'
     const tgId = baseId + i
 
-    const { error } = await supabase
+    const { data, error } = await supabase
       .from('users')
       .insert({
         telegram_id: tgId,
@@ -244,9 +291,11 @@ export async function seedTestUsers(count = 20): Promise<{ inserted: number }> {
       })
       .select()
     if (error) {
-      console.error(`Seed user insert failed for tgId=${tgId}:`, error)
+      log.error('Seed user insert failed', { tgId, error })
     } else {
       inserted++
+      const row = Array.isArray(data) ? data[0] : data
+      if (row) userSearch.upsert(row)
     }
   }
 
@@ -285,7 +334,7 @@ export async function createTournament(t: Tournament): Promise<Tournament | null
     .single()
 
   if (error) {
-    console.error('Error creating tournament:', error)
+    log.error('Error creating tournament', { error })
     return null
   }
 
@@ -299,7 +348,7 @@ export async function listTournaments(): Promise<Tournament[]> {
     .order('created_at', { ascending: false })
 
   if (error) {
-    console.error('Error listing tournaments:', error)
+    log.error('Error listing tournaments', { error })
     return []
   }
 
@@ -314,7 +363,7 @@ export async function listTournamentsByCreator(telegramId: number): Promise<Tour
     .order('created_at', { ascending: false })
 
   if (error) {
-    console.error('Error listing tournaments by creator:', error)
+    log.error('Error listing tournaments by creator', { error })
     return []
   }
 
@@ -329,13 +378,35 @@ export async function getTournamentById(id: number): Promise<Tournament | null>
     .single()
 
   if (error) {
-    console.error('Error getting tournament by id:', error)
+    log.error('Error getting tournament by id', { error })
     return null
   }
 
   return data as Tournament
 }
 
+/**
+ * The tournament's revision, bumped on every write to it or its participants,
+ * rounds, matches and leaderboard (see 20241124_tournament_revision.sql).
+ * Null when unknown (missing tournament or column), so callers skip caching.
+ */
+export async function getTournamentRevision(id: number): Promise<number | null> {
+  const { data, error } = await supabase
+    .from('tournaments')
+    .select('revision')
+    .eq('id', id)
+    .single()
+
+  if (error) {
+    if (error.code !== 'PGRST116') {
+      log.warn('Error getting tournament revision', { error }, { sample: 0.1 })
+    }
+    return null
+  }
+
+  return Number((data as { revision?: number }).revision ?? 0)
+}
+
 export async function deleteTournament(id: number): Promise<boolean> {
   const { error } = await supabase
     .from('tournaments')
@@ -343,10 +414,13 @@ export async function deleteTournament(id: number): Promise<boolean> {
     .eq('id', id)
 
   if (error) {
-    console.error('Error deleting tournament:', error)
+    log.error('Error deleting tournament', { error })
     return false
   }
 
+  ratingIndexes.invalidate(id)
+  predictionMatrices.invalidate(id)
+
   return true
 }
 
@@ -357,7 +431,7 @@ export async function updateTournamentArchived(id: number, archived: number): Pr
     .eq('id', id)
 
   if (error) {
-    console.error('Error updating tournament archived status:', error)
+    log.error('Error updating tournament archived status', { error })
     return false
   }
 
@@ -375,7 +449,7 @@ export async function addTournamentParticipant(tp: TournamentParticipant): Promi
     .single()
 
   if (!user) {
-    console.error('User not found')
+    log.error('User not found', { userId: tp.user_id })
     return null
   }
 
@@ -390,25 +464,235 @@ export async function addTournamentParticipant(tp: TournamentParticipant): Promi
     .single()
 
   if (error) {
-    console.error('Error adding tournament participant:', error)
+    log.error('Error adding tournament participant', { error })
     return null
   }
 
+  ratingIndexes.invalidate(tp.tournament_id)
+  predictionMatrices.invalidate(tp.tournament_id)
+
   return data as TournamentParticipant
 }
 
-export async function listTournamentParticipants(tournamentId: number): Promise<Array<TournamentParticipant & { user: User }>> {
+// ===== BULK REGISTRATION =====
+
+/**
+ * One row of a bulk registration: the user by id, Telegram id or username,
+ * and the nickname to register under
+ */
+export interface BulkParticipantEntry {
+  user_id?: number | string | null
+  telegram_id?: number | string | null
+  username?: string | null
+  nickname: string
+}
+
+export interface BulkRegistrationResult {
+  created: TournamentParticipant[]
+  // `row` is the index into the submitted entries
+  errors: Array<{ row: number; error: string }>
+}
+
+function normalizeUsername(username: string): string {
+  return username.trim().replace(/^@/, '').toLowerCase()
+}
+
+// A positive integer id from JSON or CSV input, or null
+function parseUserIdValue(value: unknown): number | null {
+  const parsed = typeof value === 'number' ? value : typeof value === 'string' && /^\s*\d+\s*$/.test(value) ? Number(value) : NaN
+  return Number.isSafeInteger(parsed) && parsed > 0 ? parsed : null
+}
+
+// Entries come straight from JSON bodies: anything but an object with a
+// string nickname is reported for its row and never dereferenced
+function bulkEntryError(entry: unknown): string | null {
+  if (!entry || typeof entry !== 'object' || Array.isArray(entry)) {
+    return 'Строка должна быть объектом { user_id | telegram_id | username, nickname }'
+  }
+  const { nickname } = entry as { nickname?: unknown }
+  if (nickname !== undefined && nickname !== null && typeof nickname !== 'string') {
+    return 'Никнейм должен быть строкой'
+  }
+  return typeof nickname === 'string' && nickname.trim() ? null : 'Не указан никнейм'
+}
+
+type BulkUserKey =
+  | { column: 'id' | 'telegram_id'; value: number }
+  | { column: 'username_lower'; value: string }
+  | { error: string }
+
+/**
+ * The users column and value a bulk registration row is resolved by.
+ * Usernames are matched on users.username_lower (Telegram usernames are
+ * case-insensitive; the stored ones keep Telegram's case)
+ */
+function bulkUserKey(entry: BulkParticipantEntry): BulkUserKey {
+  const given = (value: unknown) => value !== undefined && value !== null && value !== ''
+  if (given(entry.user_id)) {
+    const id = parseUserIdValue(entry.user_id)
+    return id === null ? { error: 'Некорректный user_id: нужно целое положительное число' } : { column: 'id', value: id }
+  }
+  if (given(entry.telegram_id)) {
+    const telegramId = parseUserIdValue(entry.telegram_id)
+    return telegramId === null
+      ? { error: 'Некорректный telegram_id: нужно целое положительное число' }
+      : { column: 'telegram_id', value: telegramId }
+  }
+  if (typeof entry.username === 'string' && normalizeUsername(entry.username)) {
+    return { column: 'username_lower', value: normalizeUsername(entry.username) }
+  }
+  return { error: 'Не указан пользователь (user_id, telegram_id или username)' }
+}
+
+/**
+ * Register many participants at once: existing registrations and the users
+ * are loaded with one query per key type, nickname uniqueness
+ * (uniq_tournament_participants_tournament_nickname) is checked in memory and
+ * the valid rows go in as one insert. Rows that fail are reported, not thrown.
+ */
+export async function bulkAddTournamentParticipants(tournamentId: number, entries: BulkParticipantEntry[]): Promise<BulkRegistrationResult> {
+  const errors: BulkRegistrationResult['errors'] = []
+  if (entries.length === 0) return { created: [], errors }
+
+  const { data: existingRows, error: existingError } = await supabase
+    .from('tournament_participants')
+    .select('user_id, nickname')
+    .eq('tournament_id', tournamentId)
+
+  if (existingError) {
+    log.error('Error loading participants for bulk registration', { tournamentId, error: existingError })
+    return { created: [], errors: entries.map((_, row) => ({ row, error: 'Не удалось загрузить участников турнира' })) }
+  }
+
+  // Malformed rows and keys are reported per row and never reach a query
+  const keys = entries.map((entry): BulkUserKey => {
+    const error = bulkEntryError(entry)
+    return error ? { error } : bulkUserKey(entry)
+  })
+  const values = { id: new Set<number | string>(), telegram_id: new Set<number | string>(), username_lower: new Set<number | string>() }
+  for (const key of keys) {
+    if (!('error' in key)) values[key.column].add(key.value)
+  }
+
+  const resolved = { id: new Map<number | string, number>(), telegram_id: new Map<number | string, number>(), username_lower: new Map<number | string, number>() }
+  const failed = new Set<keyof typeof values>()
+  await Promise.all((Object.keys(values) as Array<keyof typeof values>).map(async (column) => {
+    if (values[column].size === 0) return
+    const { data, error } = await supabase
+      .from('users')
+      .select(`id, ${column}`)
+      .in(column, Array.from(values[column]))
+    if (error) {
+      log.error('Error resolving users for bulk registration', { tournamentId, column, error })
+      failed.add(column)
+      return
+    }
+    for (const user of (data || []) as Array<Record<string, unknown> & { id: number }>) {
+      const value = user[column]
+      if (value === null || value === undefined) continue
+      resolved[column].set(column === 'username_lower' ? String(value) : Number(value), user.id)
+    }
+  }))
+
+  const rows = existingRows as Array<{ user_id: number; nickname: string }> | null
+  const takenNicknames = new Set((rows || []).map((row) => row.nickname))
+  const registeredUsers = new Set((rows || []).map((row) => row.user_id))
+  const pending: Array<{ row: number; tournament_id: number; user_id: number; nickname: string }> = []
+
+  entries.forEach((entry, row) => {
+    const key = keys[row]
+    if ('error' in key) {
+      errors.push({ row, error: key.error })
+      return
+    }
+    if (failed.has(key.column)) {
+      errors.push({ row, error: 'Не удалось проверить пользователя, повторите запрос' })
+      return
+    }
+
+    const nickname = entry.nickname.trim()
+    const userId = resolved[key.column].get(key.value)
+    if (!userId) {
+      errors.push({ row, error: 'Пользователь не найден' })
+    } else if (registeredUsers.has(userId)) {
+      errors.push({ row, error: 'Пользователь уже зарегистрирован в турнире' })
+    } else if (takenNicknames.has(nickname)) {
+      errors.push({ row, error: `Ник «${nickname}» уже занят` })
+    } else {
+      registeredUsers.add(userId)
+      takenNicknames.add(nickname)
+      pending.push({ row, tournament_id: tournamentId, user_id: userId, nickname })
+    }
+  })
+
+  if (pending.length === 0) return { created: [], errors }
+
   const { data, error } = await supabase
     .from('tournament_participants')
-    .select(`
-      *,
-      user:users(*)
-    `)
+    .insert(pending.map(({ tournament_id, user_id, nickname }) => ({ tournament_id, user_id, nickname })))
+    .select()
+
+  if (error) {
+    // A concurrent registration took a nickname: the statement is all-or-nothing
+    log.error('Error bulk adding tournament participants', { tournamentId, count: pending.length, error })
+    for (const { row } of pending) errors.push({ row, error: 'Не удалось добавить участника (возможно, ник занят)' })
+    errors.sort((a, b) => a.row - b.row)
+    return { created: [], errors }
+  }
+
+  ratingIndexes.invalidate(tournamentId)
+  predictionMatrices.invalidate(tournamentId)
+
+  errors.sort((a, b) => a.row - b.row)
+  return { created: (Array.isArray(data) ? data : [data]) as TournamentParticipant[], errors }
+}
+
+/**
+ * Parse CSV registrations (RFC 4180, so quoted cells may hold the delimiter):
+ * `nickname` plus one of `user_id`, `telegram_id` or `username` per line. A
+ * header line names the columns; without one the columns are `user, nickname`,
+ * where a user starting with @ or a letter is a username and a number a
+ * Telegram id. Throws CsvFormatError when a quoted cell is not closed.
+ */
+export function parseParticipantsCsv(text: string): BulkParticipantEntry[] {
+  const firstLine = text.slice(0, text.search(/\r?\n|$/))
+  const delimiter = firstLine.includes(';') && !firstLine.includes(',') ? ';' : ','
+  const reader = new CsvReader(delimiter)
+  const lines = [...reader.push(text), ...reader.end()]
+    .map((cells) => cells.map((cell) => (cell ?? '').trim()))
+    .filter((cells) => cells.some((cell) => cell.length > 0))
+  if (lines.length === 0) return []
+
+  const header = lines[0].map((cell) => cell.toLowerCase())
+  const hasHeader = header.includes('nickname')
+  const column = (name: string) => header.indexOf(name)
+
+  return (hasHeader ? lines.slice(1) : lines).map((cells) => {
+    if (hasHeader) {
+      const cell = (name: string) => (column(name) >= 0 ? cells[column(name)] || '' : '')
+      return {
+        user_id: cell('user_id') ? Number(cell('user_id')) : null,
+        telegram_id: cell('telegram_id') || null,
+        username: cell('username') || null,
+        nickname: cell('nickname')
+      }
+    }
+    const [user = '', nickname = ''] = cells
+    return /^\d+$/.test(user)
+      ? { telegram_id: user, nickname }
+      : { username: user, nickname }
+  })
+}
+
+export async function listTournamentParticipants(tournamentId: number): Promise<Array<TournamentParticipant & { user: UserSummary }>> {
+  const { data, error } = await supabase
+    .from('tournament_participants')
+    .select(`id, tournament_id, user_id, nickname, created_at, user:users(${USER_SUMMARY_COLUMNS})`)
     .eq('tournament_id', tournamentId)
     .order('created_at', { ascending: true })
 
   if (error) {
-    console.error('Error listing tournament participants:', error)
+    log.error('Error listing tournament participants', { error })
     return []
   }
 
@@ -418,7 +702,7 @@ export async function listTournamentParticipants(tournamentId: number): Promise<
     user_id: number
     nickname: string
     created_at: string
-    user?: User
+    user?: UserSummary | null
   }>
 
   return rows.map((row) => ({
@@ -427,7 +711,31 @@ export async function listTournamentParticipants(tournamentId: number): Promise<
     user_id: row.user_id,
     nickname: row.nickname,
     created_at: row.created_at,
-    user: (row.user as User) || ({} as User)
+    user: row.user || ({} as UserSummary)
+  }))
+}
+
+/**
+ * Participants in registration order with just what pairing and standings use
+ */
+export async function listParticipantsLite(tournamentId: number): Promise<ParticipantLite[]> {
+  const { data, error } = await supabase
+    .from('tournament_participants')
+    .select(PARTICIPANT_LITE_COLUMNS)
+    .eq('tournament_id', tournamentId)
+    .order('created_at', { ascending: true })
+
+  if (error) {
+    log.error('Error listing tournament participants', { error })
+    return []
+  }
+
+  const rows = (data || []) as Array<{ id: number; user_id: number; nickname: string; user?: { rating: number | null } | null }>
+  return rows.map((row) => ({
+    id: row.id,
+    user_id: row.user_id,
+    nickname: row.nickname,
+    rating: row.user?.rating ?? null
   }))
 }
 
@@ -463,7 +771,7 @@ export async function createRound(tournamentId: number, number?: number): Promis
     .single()
 
   if (error) {
-    console.error('Error creating round:', error)
+    log.error('Error creating round', { error })
     return null
   }
 
@@ -478,7 +786,7 @@ export async function listRounds(tournamentId: number): Promise<Round[]> {
     .order('number', { ascending: true })
 
   if (error) {
-    console.error('Error listing rounds:', error)
+    log.error('Error listing rounds', { error })
     return []
   }
 
@@ -499,7 +807,7 @@ export async function listMatches(roundId: number): Promise<Array<Match & { whit
     .order('board_no', { ascending: true })
 
   if (error) {
-    console.error('Error listing matches:', error)
+    log.error('Error listing matches', { error })
     return []
   }
 
@@ -517,6 +825,25 @@ export async function listMatches(roundId: number): Promise<Array<Match & { whit
   }))
 }
 
+/**
+ * Matches of several rounds in one query (for folding scores across rounds)
+ */
+export async function listMatchesForRounds(roundIds: number[]): Promise<MatchLite[]> {
+  if (roundIds.length === 0) return []
+  const { data, error } = await supabase
+    .from('matches')
+    .select(MATCH_LITE_COLUMNS)
+    .in('round_id', roundIds)
+    .order('board_no', { ascending: true })
+
+  if (error) {
+    log.error('Error listing matches for rounds', { error })
+    return []
+  }
+
+  return (data || []) as MatchLite[]
+}
+
 async function getTournamentScoring(tournamentId: number) {
   const tournament = await getTournamentById(tournamentId)
   return tournament || { points_win: 1, points_loss: 0, points_draw: 0.5, bye_points: 0 }
@@ -534,30 +861,25 @@ export async function simpleSwissPairings(tournamentId: number, roundId: number)
 
   // Get tournament config for scoring and bye rules
   const tournament = await getTournamentById(tournamentId)
-  const scoring = await getTournamentScoring(tournamentId)
+  const scoring = tournament || { points_win: 1, points_loss: 0, points_draw: 0.5, bye_points: 0 }
   const forbidRepeatBye = tournament?.forbid_repeat_bye ? 1 : 0
 
   // Determine ordering of participants (rating-aware)
   let ids: number[] = []
 
   // Build rating map for tournament participants
-  const participantsExt = await listTournamentParticipants(tournamentId)
+  const participantsExt = await listParticipantsLite(tournamentId)
   if (!participantsExt || participantsExt.length === 0) return []
 
-  const effectiveRating = (u: User | undefined) => {
-    if (!u) return 0
-    return u.rating || 0
-  }
-
   const ratingMap = new Map<number, number>()
   for (const p of participantsExt) {
-    if (p.id) ratingMap.set(p.id, effectiveRating(p.user))
+    ratingMap.set(p.id, p.rating || 0)
   }
 
   if (currentRoundNum <= 1) {
     // First round: sort by rating (ascending) so adjacent players have close ratings
-    const sortedByRating = [...participantsExt].sort((a, b) => effectiveRating(a.user) - effectiveRating(b.user))
-    ids = sortedByRating.map((p) => p.id!)
+    const sortedByRating = [...participantsExt].sort((a, b) => (a.rating || 0) - (b.rating || 0))
+    ids = sortedByRating.map((p) => p.id)
   } else {
     // Subsequent rounds: group by points and sort within each group by rating to pair close ratings
     const standings = await getStandings(tournamentId)
@@ -587,13 +909,10 @@ export async function simpleSwissPairings(tournamentId: number, roundId: number)
     const prevIds = (prevRounds || [])
       .filter(r => (r.number || 0) < currentRoundNum)
       .map(r => r.id!)
-    for (const rid of prevIds) {
-      const prevMatches = await listMatches(rid)
-      for (const m of prevMatches) {
-        // Treat matches with missing black participant as bye, regardless of result label
-        if ((m.black_participant_id === null || m.result === 'bye') && m.white_participant_id) {
-          hadBye.add(m.white_participant_id)
-        }
+    for (const m of await listMatchesForRounds(prevIds)) {
+      // Treat matches with missing black participant as bye, regardless of result label
+      if ((m.black_participant_id === null || m.result === 'bye') && m.white_participant_id) {
+        hadBye.add(m.white_participant_id)
       }
     }
   }
@@ -622,50 +941,46 @@ export async function simpleSwissPairings(tournamentId: number, roundId: number)
   }
 
   // Pair remaining players sequentially
+  const rows: Array<Omit<Match, 'id'>> = []
   for (let i = 0; i < ids.length; i += 2) {
-    const w = ids[i]
-    const b = ids[i + 1]
-
-    const { data } = await supabase
-      .from('matches')
-      .insert({
-        round_id: roundId,
-        white_participant_id: w,
-        black_participant_id: b,
-        board_no: board,
-        result: 'not_played',
-        score_white: 0,
-        score_black: 0,
-        source: 'system'
-      })
-      .select()
-      .single()
-
-    if (data) {
-      matches.push(data as Match)
-    }
+    rows.push({
+      round_id: roundId,
+      white_participant_id: ids[i],
+      black_participant_id: ids[i + 1],
+      board_no: board,
+      result: 'not_played',
+      score_white: 0,
+      score_black: 0,
+      source: 'system'
+    })
     board += 1
   }
 
   // Add bye if needed: automatically assign a win to the player with a bye
   if (byeId) {
-    const { data } = await supabase
+    rows.push({
+      round_id: roundId,
+      white_participant_id: byeId,
+      black_participant_id: null,
+      board_no: board,
+      result: 'bye',
+      score_white: scoring.bye_points,
+      score_black: 0,
+      source: 'system'
+    })
+  }
+
+  // All boards in one insert
+  if (rows.length > 0) {
+    const { data, error } = await supabase
       .from('matches')
-      .insert({
-        round_id: roundId,
-        white_participant_id: byeId,
-        black_participant_id: null,
-        board_no: board,
-        result: 'bye',
-        score_white: scoring.bye_points,
-        score_black: 0,
-        source: 'system'
-      })
+      .insert(rows)
       .select()
-      .single()
 
-    if (data) {
-      matches.push(data as Match)
+    if (error) {
+      log.error('Error inserting pairings', { roundId, error })
+    } else if (data) {
+      matches.push(...((Array.isArray(data) ? data : [data]) as Match[]))
     }
   }
 
@@ -674,27 +989,68 @@ export async function simpleSwissPairings(tournamentId: number, roundId: number)
     .from('rounds')
     .update({ status: 'paired', paired_at: new Date().toISOString() })
     .eq('id', roundId)
+  tournamentEvents.publish({ type: 'pairings_ready', tournamentId, roundId, matchCount: matches.length })
 
   return matches
 }
 
+// rounds!inner(tournament_id) embeds the round as an object (an array in
+// older clients); the in-memory client has no embeds, so look the round up
+async function tournamentIdOfMatch(match: { round_id: number; rounds?: unknown }): Promise<number> {
+  const embedded = (Array.isArray(match.rounds) ? match.rounds[0] : match.rounds) as { tournament_id?: number } | undefined
+  if (embedded?.tournament_id) return Number(embedded.tournament_id)
+
+  const { data } = await supabase
+    .from('rounds')
+    .select('tournament_id')
+    .eq('id', match.round_id)
+    .single()
+  return Number(data?.tournament_id) || 0
+}
+
+// Live updates for /api/tournaments/[id]/events: the new result and the
+// points it moved (the difference to the previous scores)
+function publishResultUpdate(tournamentId: number, before: Match, after: Match) {
+  if (!after || !tournamentId) return
+  tournamentEvents.publish({
+    type: 'result_updated',
+    tournamentId,
+    roundId: after.round_id,
+    match: {
+      id: after.id!,
+      round_id: after.round_id,
+      white_participant_id: after.white_participant_id,
+      black_participant_id: after.black_participant_id,
+      result: after.result,
+      score_white: after.score_white,
+      score_black: after.score_black
+    }
+  })
+
+  const changes: Array<{ participant_id: number; points: number }> = []
+  const whiteDelta = (after.score_white || 0) - (before.score_white || 0)
+  const blackDelta = (after.score_black || 0) - (before.score_black || 0)
+  if (after.white_participant_id && whiteDelta !== 0) changes.push({ participant_id: after.white_participant_id, points: whiteDelta })
+  if (after.black_participant_id && blackDelta !== 0) changes.push({ participant_id: after.black_participant_id, points: blackDelta })
+  if (changes.length > 0) {
+    tournamentEvents.publish({ type: 'standings_delta', tournamentId, changes })
+  }
+}
+
 export async function updateMatchResult(matchId: number, result: string): Promise<Match | null> {
   // Get match and tournament info
   const { data: match } = await supabase
     .from('matches')
-    .select('id, round_id, rounds!inner(tournament_id)')
+    .select('id, round_id, white_participant_id, black_participant_id, score_white, score_black, rounds!inner(tournament_id)')
     .eq('id', matchId)
     .single()
 
   if (!match) {
-    console.error('Match not found')
+    log.error('Match not found', { matchId })
     return null
   }
 
-  const tournamentId = (() => {
-    const r = (match as { rounds?: Array<{ tournament_id: number }> }).rounds
-    return Array.isArray(r) && r.length > 0 ? r[0].tournament_id : 0
-  })()
+  const tournamentId = await tournamentIdOfMatch(match as { round_id: number; rounds?: unknown })
   const scoring = await getTournamentScoring(tournamentId)
 
   let sw = 0, sb = 0
@@ -735,10 +1091,12 @@ export async function updateMatchResult(matchId: number, result: string): Promis
     .single()
 
   if (error) {
-    console.error('Error updating match result:', error)
+    log.error('Error updating match result', { matchId, error })
     return null
   }
 
+  publishResultUpdate(tournamentId, match as Match, data as Match)
+
   // After updating the result, check if the round has all matches finished
   try {
     const roundId = (match as { round_id?: number }).round_id ?? 0
@@ -756,23 +1114,20 @@ export async function updateMatchResult(matchId: number, result: string): Promis
           .from('rounds')
           .update({ status: 'locked', locked_at: new Date().toISOString() })
           .eq('id', roundId)
+        tournamentEvents.publish({ type: 'round_locked', tournamentId, roundId })
 
         // Trigger finalization check based on locked rounds
-        const tournamentId2 = (() => {
-          const r = (match as { rounds?: Array<{ tournament_id: number }> }).rounds
-          return Array.isArray(r) && r.length > 0 ? r[0].tournament_id : 0
-        })()
-        if (Number.isFinite(tournamentId2)) {
+        if (tournamentId) {
           try {
-            await finalizeTournamentIfExceeded(tournamentId2)
+            await finalizeTournamentIfExceeded(tournamentId)
           } catch (fErr) {
-            console.error('Finalization after round lock failed:', fErr)
+            log.error('Finalization after round lock failed', { error: fErr })
           }
         }
       }
     }
   } catch (postErr) {
-    console.error('Post-update round lock check failed:', postErr)
+    log.error('Post-update round lock check failed', { error: postErr })
   }
 
   return data as Match
@@ -780,33 +1135,36 @@ export async function updateMatchResult(matchId: number, result: string): Promis
 
 // ===== STANDINGS =====
 
+/**
+ * Points per participant id, folded from match scores in one pass instead of
+ * a query per participant and round
+ */
+export function sumMatchPoints(
+  matches: Array<Pick<MatchLite, 'white_participant_id' | 'black_participant_id' | 'score_white' | 'score_black'>>
+): Map<number, number> {
+  const points = new Map<number, number>()
+  for (const match of matches) {
+    if (match.white_participant_id) {
+      points.set(match.white_participant_id, (points.get(match.white_participant_id) || 0) + (match.score_white || 0))
+    }
+    if (match.black_participant_id) {
+      points.set(match.black_participant_id, (points.get(match.black_participant_id) || 0) + (match.score_black || 0))
+    }
+  }
+  return points
+}
+
 export async function getStandings(tournamentId: number): Promise<Array<{ participant_id: number; nickname: string; points: number }>> {
-  const participants = await listTournamentParticipants(tournamentId)
+  const participants = await listParticipantsLite(tournamentId)
   const rounds = await listRounds(tournamentId)
+  const matches = await listMatchesForRounds(rounds.map((round) => round.id!))
+  const points = sumMatchPoints(matches)
 
-  const standings = await Promise.all(
-    participants.map(async (p) => {
-      let points = 0
-
-      for (const round of rounds) {
-        const matches = await listMatches(round.id!)
-
-        for (const match of matches) {
-          if (match.white_participant_id === p.id) {
-            points += match.score_white
-          } else if (match.black_participant_id === p.id) {
-            points += match.score_black
-          }
-        }
-      }
-
-      return {
-        participant_id: p.id!,
-        nickname: p.nickname,
-        points
-      }
-    })
-  )
+  const standings = participants.map((p) => ({
+    participant_id: p.id,
+    nickname: p.nickname,
+    points: points.get(p.id) || 0
+  }))
 
   standings.sort((a, b) => {
     if (b.points !== a.points) {
@@ -834,7 +1192,7 @@ export async function finalizeTournamentIfExceeded(tournamentId: number): Promis
     .order('number', { ascending: true })
 
   if (rErr) {
-    console.error('Failed to list rounds for finalization:', rErr)
+    log.error('Failed to list rounds for finalization', { error: rErr })
     return false
   }
 
@@ -858,16 +1216,16 @@ export async function finalizeTournamentIfExceeded(tournamentId: number): Promis
         .select()
 
       if (lbErr) {
-        console.error('Failed to insert leaderboard snapshot:', lbErr)
+        log.error('Failed to insert leaderboard snapshot', { error: lbErr })
         // Proceed without leaderboard snapshot (e.g., table missing). We'll still archive.
       }
     } else {
-      console.warn('No standings to snapshot; finalizing without leaderboard entries')
+      log.warn('No standings to snapshot; finalizing without leaderboard entries')
     }
 
     const archivedOk = await updateTournamentArchived(tournamentId, 1)
     if (!archivedOk) {
-      console.error('Failed to mark tournament archived after finalization')
+      log.error('Failed to mark tournament archived after finalization')
       return false
     }
 
@@ -901,16 +1259,16 @@ export async function finalizeTournament(tournamentId: number): Promise<boolean>
       .select()
 
     if (lbErr) {
-      console.error('Failed to insert leaderboard snapshot (manual):', lbErr)
+      log.error('Failed to insert leaderboard snapshot (manual)', { error: lbErr })
       // Proceed without leaderboard snapshot (e.g., table missing). We'll still archive.
     }
   } else {
-    console.warn('No standings to snapshot; manual finalization will archive without leaderboard entries')
+    log.warn('No standings to snapshot; manual finalization will archive without leaderboard entries')
   }
 
   const archivedOk = await updateTournamentArchived(tournamentId, 1)
   if (!archivedOk) {
-    console.error('Failed to mark tournament archived after manual finalization')
+    log.error('Failed to mark tournament archived after manual finalization')
     return false
   }
 
@@ -926,7 +1284,7 @@ export async function listLeaderboard(tournamentId: number): Promise<Array<{ par
     .order('rank', { ascending: true })
 
   if (error) {
-    console.error('Error listing leaderboard:', error)
+    log.error('Error listing leaderboard', { error })
     return []
   }
 
@@ -944,7 +1302,7 @@ export async function deleteAllRoundsForTournament(tournamentId: number): Promis
       .eq('tournament_id', tournamentId)
 
     if (roundsErr) {
-      console.error('Error fetching rounds to delete:', roundsErr)
+      log.error('Error fetching rounds to delete', { error: roundsErr })
       return false
     }
 
@@ -958,7 +1316,7 @@ export async function deleteAllRoundsForTournament(tournamentId: number): Promis
         .delete()
         .in('round_id', roundIds)
       if (matchesErr) {
-        console.error('Error deleting matches:', matchesErr)
+        log.error('Error deleting matches', { error: matchesErr })
         return false
       }
     }
@@ -970,13 +1328,13 @@ export async function deleteAllRoundsForTournament(tournamentId: number): Promis
       .eq('tournament_id', tournamentId)
 
     if (delRoundsErr) {
-      console.error('Error deleting rounds:', delRoundsErr)
+      log.error('Error deleting rounds', { error: delRoundsErr })
       return false
     }
 
     return true
   } catch (err) {
-    console.error('Error in deleteAllRoundsForTournament:', err)
+    log.error('Error in deleteAllRoundsForTournament', { error: err })
     return false
   }
 }
@@ -991,7 +1349,7 @@ export async function deleteRoundById(roundId: number): Promise<boolean> {
       .eq('round_id', roundId)
 
     if (matchesErr) {
-      console.error('Error deleting matches for round:', matchesErr)
+      log.error('Error deleting matches for round', { error: matchesErr })
       return false
     }
 
@@ -1002,13 +1360,13 @@ export async function deleteRoundById(roundId: number): Promise<boolean> {
       .eq('id', roundId)
 
     if (roundErr) {
-      console.error('Error deleting round:', roundErr)
+      log.error('Error deleting round', { error: roundErr })
       return false
     }
 
     return true
   } catch (e) {
-    console.error('Failed to delete round by id:', e)
+    log.error('Failed to delete round by id', { error: e })
     return false
   }
 }
@@ -0,0 +1,36 @@
+// Conditional GET helpers for route handlers
+
+/**
+ * Whether the request's If-None-Match already names `etag` (weak comparison)
+ */
+export function etagMatches(headers: Headers, etag: string): boolean {
+  const header = headers.get('if-none-match')
+  if (!header) return false
+  if (header.trim() === '*') return true
+
+  const strip = (tag: string) => tag.trim().replace(/^W\//, '')
+  const wanted = strip(etag)
+  return header.split(',').some((tag) => strip(tag) === wanted)
+}
+
+/**
+ * Empty 304 response carrying the ETag and any extra headers
+ */
+export function notModified(etag: string, headers: Record<string, string> = {}): Response {
+  return new Response(null, { status: 304, headers: { ...headers, ETag: etag } })
+}
+
+/**
+ * Weak ETag for a response derived from a revision counter
+ */
+export function revisionETag(resource: string, revision: number): string {
+  return `W/"${resource}.${revision}"`
+}
+
+/**
+ * Headers that make clients revalidate every time (answered with 304 while
+ * `etag` still matches); none when there is no ETag
+ */
+export function revalidateHeaders(etag: string | null): Record<string, string> {
+  return etag ? { ETag: etag, 'Cache-Control': 'no-cache' } : {}
+}
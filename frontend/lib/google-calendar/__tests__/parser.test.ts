@@ -0,0 +1,46 @@
+import { describe, it, expect } from 'vitest'
+import { buildCalendarFeed, parseCalendarEvent } from '../parser'
+
+function event(id: string, etag: string, summary = `Tournament ${id}`) {
+  return {
+    id,
+    etag,
+    summary,
+    location: 'Club',
+    start: { dateTime: '2025-10-15T18:00:00+03:00' },
+    end: { dateTime: '2025-10-15T21:00:00+03:00' }
+  }
+}
+
+describe('calendar parser', () => {
+  it('formats like toLocale*String with the shared formatters', () => {
+    const tournament = parseCalendarEvent(event('fmt', '"1"'))
+    const start = new Date('2025-10-15T18:00:00+03:00')
+    const end = new Date('2025-10-15T21:00:00+03:00')
+    const time = (d: Date) => d.toLocaleTimeString('ru-RU', { hour: '2-digit', minute: '2-digit' })
+
+    expect(tournament?.date).toBe(start.toLocaleDateString('ru-RU', { day: 'numeric', month: 'long', year: 'numeric' }))
+    expect(tournament?.time).toBe(`${time(start)} - ${time(end)}`)
+    expect(parseCalendarEvent({ ...event('all-day', '"1"'), start: { date: '2025-10-15' }, end: undefined })?.time)
+      .toBe('Весь день')
+  })
+
+  it('reuses parsed cards until the event etag changes', () => {
+    const first = parseCalendarEvent(event('cached', '"1"'))
+    expect(parseCalendarEvent(event('cached', '"1"'))).toBe(first)
+
+    const changed = parseCalendarEvent(event('cached', '"2"', 'Renamed'))
+    expect(changed).not.toBe(first)
+    expect(changed?.title).toBe('Renamed')
+  })
+
+  it('keeps the feed body and ETag while the schedule is unchanged', () => {
+    const feed = buildCalendarFeed([event('a', '"1"'), event('b', '"1"')])
+    expect(JSON.parse(feed.body).map((t: { id: string }) => t.id)).toEqual(['a', 'b'])
+    expect(buildCalendarFeed([event('a', '"1"'), event('b', '"1"')])).toBe(feed)
+
+    const updated = buildCalendarFeed([event('a', '"1"'), event('b', '"2"', 'Moved')])
+    expect(updated.etag).not.toBe(feed.etag)
+    expect(buildCalendarFeed([event('b', '"2"', 'Moved')]).etag).not.toBe(updated.etag)
+  })
+})
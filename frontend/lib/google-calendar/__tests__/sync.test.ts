@@ -0,0 +1,196 @@
+// @vitest-environment node
+import http from 'http'
+import type { AddressInfo } from 'net'
+import { describe, it, expect, beforeAll, afterAll, beforeEach } from 'vitest'
+import { listCalendarEvents } from '../client'
+import { CalendarSync, createCalendarMetrics } from '../sync'
+import { supabase } from '../../supabase'
+
+// Local stand-in for the Calendar API events.list endpoint
+type StubResponse = { status: number; body: unknown }
+
+let server: http.Server
+let requests: Array<{ syncToken: string | null; pageToken: string | null }>
+let respond: (query: URLSearchParams) => StubResponse
+const savedEnv = { ...process.env }
+
+function event(id: string, startInHours: number) {
+  const start = Date.now() + startInHours * 60 * 60 * 1000
+  return {
+    id,
+    status: 'confirmed',
+    summary: `Tournament ${id}`,
+    start: { dateTime: new Date(start).toISOString() },
+    end: { dateTime: new Date(start + 2 * 60 * 60 * 1000).toISOString() }
+  }
+}
+
+let calendarCount = 0
+const nextCalendarId = () => `stub-calendar-${++calendarCount}@example.com`
+
+beforeAll(async () => {
+  server = http.createServer((req, res) => {
+    const url = new URL(req.url || '/', 'http://stub')
+    if (!/^\/calendar\/v3\/calendars\/[^/]+\/events$/.test(url.pathname)) {
+      res.writeHead(404).end()
+      return
+    }
+    requests.push({ syncToken: url.searchParams.get('syncToken'), pageToken: url.searchParams.get('pageToken') })
+    const { status, body } = respond(url.searchParams)
+    res.writeHead(status, { 'content-type': 'application/json' }).end(JSON.stringify(body))
+  })
+  await new Promise<void>((resolve) => server.listen(0, '127.0.0.1', resolve))
+
+  const { port } = server.address() as AddressInfo
+  process.env.GOOGLE_CALENDAR_API_ROOT = `http://127.0.0.1:${port}/`
+  process.env.GOOGLE_CALENDAR_API_KEY = 'test-key'
+  delete process.env.GOOGLE_SERVICE_ACCOUNT_KEY
+})
+
+afterAll(async () => {
+  process.env = savedEnv
+  await new Promise((resolve) => server.close(resolve))
+})
+
+beforeEach(() => {
+  requests = []
+})
+
+describe('CalendarSync', () => {
+  it('does a paged full sync, then pulls only changes with the sync token', async () => {
+    const calendarId = nextCalendarId()
+    respond = (query) => {
+      if (query.get('syncToken') === 'sync-1') {
+        return { status: 200, body: { items: [{ id: 'b', status: 'cancelled' }, event('c', 48)], nextSyncToken: 'sync-2' } }
+      }
+      if (query.get('pageToken') === 'page-2') {
+        return { status: 200, body: { items: [event('a', 2)], nextSyncToken: 'sync-1' } }
+      }
+      return { status: 200, body: { items: [event('b', 24), event('past', -72)], nextPageToken: 'page-2' } }
+    }
+
+    let ttl = 60_000
+    const metrics = createCalendarMetrics()
+    const sync = new CalendarSync(listCalendarEvents, metrics, () => ttl)
+
+    const first = await sync.getUpcoming(calendarId, 10)
+    expect(first.map((e) => e.id)).toEqual(['a', 'b'])
+    expect(requests).toEqual([
+      { syncToken: null, pageToken: null },
+      { syncToken: null, pageToken: 'page-2' }
+    ])
+
+    // Fresh: no request
+    await sync.getUpcoming(calendarId, 10)
+    expect(requests).toHaveLength(2)
+
+    // Stale: served immediately, refreshed in the background
+    ttl = 0
+    const stale = await sync.getUpcoming(calendarId, 10)
+    expect(stale.map((e) => e.id)).toEqual(['a', 'b'])
+    await sync.refresh(calendarId)
+    expect(requests[2]).toEqual({ syncToken: 'sync-1', pageToken: null })
+
+    ttl = 60_000
+    const updated = await sync.getUpcoming(calendarId, 10)
+    expect(updated.map((e) => e.id)).toEqual(['a', 'c'])
+    expect(metrics).toMatchObject({ fullSyncs: 1, incrementalSyncs: 1, cacheMisses: 1, cacheStaleHits: 1, cacheHits: 2 })
+  })
+
+  it('falls back to a full sync when the sync token has expired', async () => {
+    const calendarId = nextCalendarId()
+    respond = (query) => query.get('syncToken')
+      ? { status: 410, body: { error: { code: 410, message: 'Sync token is no longer valid' } } }
+      : { status: 200, body: { items: [event('a', 5)], nextSyncToken: 'sync-1' } }
+
+    let ttl = 60_000
+    const metrics = createCalendarMetrics()
+    const sync = new CalendarSync(listCalendarEvents, metrics, () => ttl)
+    await sync.getUpcoming(calendarId, 10)
+
+    ttl = 0
+    await sync.refresh(calendarId)
+
+    expect(requests.map((r) => r.syncToken)).toEqual([null, 'sync-1', null])
+    expect(metrics).toMatchObject({ fullSyncs: 2, syncTokenResets: 1, apiErrors: 0 })
+  })
+
+  it('starts a cold instance from the shared state without calling Google', async () => {
+    const calendarId = nextCalendarId()
+    respond = () => ({ status: 200, body: { items: [event('a', 5), event('b', 6)], nextSyncToken: 'sync-1' } })
+
+    await new CalendarSync(listCalendarEvents, createCalendarMetrics(), () => 60_000).getUpcoming(calendarId, 10)
+    expect(requests).toHaveLength(1)
+
+    const metrics = createCalendarMetrics()
+    const coldStart = new CalendarSync(listCalendarEvents, metrics, () => 60_000)
+    const events = await coldStart.getUpcoming(calendarId, 1)
+
+    expect(events.map((e) => e.id)).toEqual(['a'])
+    expect(requests).toHaveLength(1)
+    expect(metrics).toMatchObject({ sharedStateLoads: 1, cacheHits: 1, apiCalls: 0 })
+  })
+
+  it('keeps serving the stale copy while Google is failing', async () => {
+    const calendarId = nextCalendarId()
+    let failing = false
+    respond = () => failing
+      ? { status: 500, body: { error: { code: 500, message: 'Backend Error' } } }
+      : { status: 200, body: { items: [event('a', 5)], nextSyncToken: 'sync-1' } }
+
+    let ttl = 60_000
+    const metrics = createCalendarMetrics()
+    const sync = new CalendarSync(listCalendarEvents, metrics, () => ttl)
+    await sync.getUpcoming(calendarId, 10)
+
+    failing = true
+    ttl = 0
+    const stale = await sync.getUpcoming(calendarId, 10)
+    await expect(sync.refresh(calendarId)).rejects.toBeTruthy()
+
+    expect(stale.map((e) => e.id)).toEqual(['a'])
+    expect(metrics.apiErrors).toBeGreaterThan(0)
+    expect(metrics.lastStatus).toBe(500)
+  })
+  it('stores only events that have not ended', async () => {
+    const calendarId = nextCalendarId()
+    let ended = false
+    respond = (query) => query.get('syncToken')
+      ? { status: 200, body: { items: ended ? [event('b', -5)] : [], nextSyncToken: 'sync-2' } }
+      : { status: 200, body: { items: [event('a', 5), event('b', 6), event('past', -72)], nextSyncToken: 'sync-1' } }
+
+    let ttl = 60_000
+    const sync = new CalendarSync(listCalendarEvents, createCalendarMetrics(), () => ttl)
+    await sync.getUpcoming(calendarId, 10)
+    const stored = async () => {
+      const { data } = await supabase.from('calendar_sync_state').select('events').eq('calendar_id', calendarId).single()
+      return (data.events as Array<{ id: string }>).map((e) => e.id).sort()
+    }
+    expect(await stored()).toEqual(['a', 'b'])
+
+    // An incremental change moves b into the past
+    ended = true
+    ttl = 0
+    await sync.refresh(calendarId)
+    expect(await stored()).toEqual(['a'])
+  })
+
+  it('keeps a partial sync at the page limit and starts over next time', async () => {
+    const calendarId = nextCalendarId()
+    let page = 0
+    respond = () => ({ status: 200, body: { items: [event(`e${++page}`, page)], nextPageToken: `page-${page + 1}` } })
+
+    let ttl = 60_000
+    const metrics = createCalendarMetrics()
+    const sync = new CalendarSync(listCalendarEvents, metrics, () => ttl)
+    const events = await sync.getUpcoming(calendarId, 3)
+
+    expect(events.map((e) => e.id)).toEqual(['e1', 'e2', 'e3'])
+    expect(metrics).toMatchObject({ fullSyncs: 1, truncatedSyncs: 1, apiErrors: 0 })
+
+    ttl = 0
+    await sync.refresh(calendarId)
+    expect(metrics.fullSyncs).toBe(2)
+    expect(requests.every((r) => r.syncToken === null)).toBe(true)
+  })
+})
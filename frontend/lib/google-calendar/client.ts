@@ -1,19 +1,31 @@
 import { google, calendar_v3 } from "googleapis"
-type Event = calendar_v3.Schema$Event
-type CacheEntry = { data: Event[]; expiresAt: number }
-const cache = new Map<string, CacheEntry>()
-export const calendarMetrics = {
-  cacheHits: 0,
-  cacheMisses: 0,
-  cacheStaleHits: 0,
-  apiCalls: 0,
-  apiErrors: 0,
-  lastApiLatencyMs: 0,
-  totalEventsFetched: 0,
-  lastErrorAt: 0,
-  lastErrorMessage: '',
-  lastStatus: 0,
+import { CalendarSync, createCalendarMetrics } from "./sync"
+import { metrics } from "@/lib/metrics"
+
+export const calendarMetrics = createCalendarMetrics()
+
+// Exported on /api/metrics; read only when scraped
+const calendarCounters: Array<[keyof typeof calendarMetrics, string, string]> = [
+  ["cacheHits", "calendar_cache_hits_total", "Upcoming-events reads served fresh from memory"],
+  ["cacheMisses", "calendar_cache_misses_total", "Upcoming-events reads that waited for a sync"],
+  ["cacheStaleHits", "calendar_cache_stale_hits_total", "Upcoming-events reads served stale while refreshing"],
+  ["apiCalls", "calendar_api_calls_total", "Google Calendar events.list requests"],
+  ["apiErrors", "calendar_api_errors_total", "Failed Google Calendar syncs"],
+  ["fullSyncs", "calendar_full_syncs_total", "Full calendar syncs"],
+  ["incrementalSyncs", "calendar_incremental_syncs_total", "Incremental (sync token) calendar syncs"],
+  ["syncTokenResets", "calendar_sync_token_resets_total", "Sync tokens rejected by Google (410)"],
+  ["sharedStateLoads", "calendar_shared_state_loads_total", "Sync states adopted from calendar_sync_state"],
+  ["truncatedSyncs", "calendar_truncated_syncs_total", "Syncs cut short at the events.list page limit"],
+]
+for (const [key, name, help] of calendarCounters) {
+  metrics.observe(name, help, "counter", () => calendarMetrics[key] as number)
 }
+metrics.observe(
+  "calendar_last_api_latency_seconds",
+  "Duration of the last Google Calendar sync",
+  "gauge",
+  () => calendarMetrics.lastApiLatencyMs / 1000
+)
 
 /**
  * Get Google Calendar client
@@ -31,7 +43,7 @@ export function getCalendarClient() {
       scopes: ["https://www.googleapis.com/auth/calendar.readonly"],
     })
 
-    return google.calendar({ version: "v3", auth })
+    return google.calendar({ version: "v3", auth, rootUrl: process.env.GOOGLE_CALENDAR_API_ROOT })
   }
 
   // Option 2: API Key (simpler, but only for public calendars)
@@ -39,6 +51,8 @@ export function getCalendarClient() {
     return google.calendar({
       version: "v3",
       auth: process.env.GOOGLE_CALENDAR_API_KEY,
+      // Alternative API root, e.g. a local events.list stub in tests
+      rootUrl: process.env.GOOGLE_CALENDAR_API_ROOT,
     })
   }
 
@@ -47,51 +61,28 @@ export function getCalendarClient() {
   )
 }
 
+/**
+ * events.list through the configured Google client
+ */
+export async function listCalendarEvents(params: calendar_v3.Params$Resource$Events$List) {
+  const response = await getCalendarClient().events.list(params)
+  return response.data
+}
+
+const calendarSync = new CalendarSync(
+  listCalendarEvents,
+  calendarMetrics,
+  () => Number(process.env.GCAL_CACHE_TTL_MS || 300_000)
+)
+
 /**
  * Fetch upcoming events from Google Calendar
+ * Served from the synced copy; stale copies are refreshed in the background
  */
 export async function fetchUpcomingEvents(maxResults: number = 10) {
-  const calendar = getCalendarClient()
   const calendarId = process.env.GOOGLE_CALENDAR_ID
   if (!calendarId) {
     throw new Error("GOOGLE_CALENDAR_ID not set in environment variables")
   }
-  const key = `${calendarId}|${maxResults}`
-  const now = Date.now()
-  const ttlMs = Number(process.env.GCAL_CACHE_TTL_MS || 300_000)
-  const cached = cache.get(key)
-  if (cached && cached.expiresAt > now) {
-    calendarMetrics.cacheHits++
-    calendarMetrics.totalEventsFetched += cached.data.length
-    return cached.data
-  }
-  calendarMetrics.cacheMisses++
-  const started = Date.now()
-  try {
-    calendarMetrics.apiCalls++
-    const response = await calendar.events.list({
-      calendarId,
-      timeMin: new Date().toISOString(),
-      maxResults,
-      singleEvents: true,
-      orderBy: "startTime",
-    })
-    const items = response.data.items || []
-    calendarMetrics.lastApiLatencyMs = Date.now() - started
-    calendarMetrics.totalEventsFetched += items.length
-    cache.set(key, { data: items, expiresAt: now + ttlMs })
-    return items
-  } catch (error: unknown) {
-    calendarMetrics.apiErrors++
-    calendarMetrics.lastApiLatencyMs = Date.now() - started
-    calendarMetrics.lastErrorAt = Date.now()
-    calendarMetrics.lastErrorMessage = String((error as Error)?.message || error)
-    const errCode = (error as { code?: number } | null)?.code
-    calendarMetrics.lastStatus = Number(errCode || 0)
-    if (cached) {
-      calendarMetrics.cacheStaleHits++
-      return cached.data
-    }
-    throw error
-  }
+  return calendarSync.getUpcoming(calendarId, maxResults)
 }
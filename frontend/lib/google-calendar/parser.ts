@@ -1,5 +1,24 @@
+import { createHash } from "crypto"
 import { calendar_v3 } from "googleapis"
 import { Tournament } from "@/components/tournaments/tournament-card"
+import { createLogger } from "@/lib/logger"
+
+const log = createLogger("google-calendar/parser")
+
+// Built once: toLocaleDateString/toLocaleTimeString create a formatter per call
+const dateFormatter = new Intl.DateTimeFormat("ru-RU", {
+  day: "numeric",
+  month: "long",
+  year: "numeric",
+})
+const timeFormatter = new Intl.DateTimeFormat("ru-RU", {
+  hour: "2-digit",
+  minute: "2-digit",
+})
+
+// Parsed cards by event id; reused while the event's etag is unchanged
+const MAX_PARSED_EVENTS = 2000
+const parsedEvents = new Map<string, { etag: string; tournament: Tournament | null }>()
 
 /**
  * Parse Google Calendar event to Tournament object
@@ -14,6 +33,22 @@ import { Tournament } from "@/components/tournaments/tournament-card"
 export function parseCalendarEvent(
   event: calendar_v3.Schema$Event
 ): Tournament | null {
+  if (event.id && event.etag) {
+    const cached = parsedEvents.get(event.id)
+    if (cached && cached.etag === event.etag) {
+      return cached.tournament
+    }
+    const tournament = buildTournament(event)
+    if (parsedEvents.size >= MAX_PARSED_EVENTS) {
+      parsedEvents.delete(parsedEvents.keys().next().value as string)
+    }
+    parsedEvents.set(event.id, { etag: event.etag, tournament })
+    return tournament
+  }
+  return buildTournament(event)
+}
+
+function buildTournament(event: calendar_v3.Schema$Event): Tournament | null {
   try {
     if (!event.id || !event.summary) {
       return null
@@ -29,25 +64,13 @@ export function parseCalendarEvent(
       : null
 
     // Format date (e.g., "15 октября 2025")
-    const formattedDate = startDate.toLocaleDateString("ru-RU", {
-      day: "numeric",
-      month: "long",
-      year: "numeric",
-    })
+    const formattedDate = dateFormatter.format(startDate)
 
     // Format time (e.g., "18:00 - 21:00")
     let formattedTime = ""
     if (event.start?.dateTime) {
-      const startTime = startDate.toLocaleTimeString("ru-RU", {
-        hour: "2-digit",
-        minute: "2-digit",
-      })
-      const endTime = endDate
-        ? endDate.toLocaleTimeString("ru-RU", {
-            hour: "2-digit",
-            minute: "2-digit",
-          })
-        : ""
+      const startTime = timeFormatter.format(startDate)
+      const endTime = endDate ? timeFormatter.format(endDate) : ""
       formattedTime = endTime ? `${startTime} - ${endTime}` : startTime
     } else {
       formattedTime = "Весь день"
@@ -75,7 +98,7 @@ export function parseCalendarEvent(
       description: event.description || undefined,
     }
   } catch (error) {
-    console.error("Error parsing calendar event:", error)
+    log.error("Error parsing calendar event", { error })
     return null
   }
 }
@@ -90,3 +113,30 @@ export function parseCalendarEvents(
     .map(parseCalendarEvent)
     .filter((tournament): tournament is Tournament => tournament !== null)
 }
+
+export interface CalendarFeed {
+  // Serialized Tournament[]
+  body: string
+  etag: string
+}
+
+let lastFeed: { key: string; feed: CalendarFeed } | null = null
+
+/**
+ * Response body and ETag for a list of events; rebuilt only when an event
+ * was added, removed or changed (its etag), otherwise the previous one is reused
+ */
+export function buildCalendarFeed(events: calendar_v3.Schema$Event[]): CalendarFeed {
+  const key = events.map((event) => `${event.id}:${event.etag ?? event.updated ?? ""}`).join("|")
+  if (lastFeed && lastFeed.key === key) {
+    return lastFeed.feed
+  }
+
+  const body = JSON.stringify(parseCalendarEvents(events))
+  const feed = {
+    body,
+    etag: `"${createHash("sha1").update(body).digest("base64url")}"`,
+  }
+  lastFeed = { key, feed }
+  return feed
+}
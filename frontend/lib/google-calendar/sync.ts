@@ -0,0 +1,363 @@
+import { calendar_v3 } from "googleapis"
+import { after } from "next/server"
+import { supabase } from "@/lib/supabase"
+import { createLogger } from "@/lib/logger"
+
+const log = createLogger("google-calendar/sync")
+
+type Event = calendar_v3.Schema$Event
+
+// Events per events.list page and a guard against endless pagination; a sync
+// that hits the guard keeps what it read and starts over with a full sync next
+// time
+const PAGE_SIZE = 250
+const MAX_PAGES = 40
+const SYNC_TABLE = "calendar_sync_state"
+
+export interface EventsPage {
+  items?: Event[] | null
+  nextPageToken?: string | null
+  nextSyncToken?: string | null
+}
+
+export type ListEvents = (params: calendar_v3.Params$Resource$Events$List) => Promise<EventsPage>
+
+export interface CalendarMetrics {
+  cacheHits: number
+  cacheMisses: number
+  cacheStaleHits: number
+  apiCalls: number
+  apiErrors: number
+  lastApiLatencyMs: number
+  totalEventsFetched: number
+  lastErrorAt: number
+  lastErrorMessage: string
+  lastStatus: number
+  fullSyncs: number
+  incrementalSyncs: number
+  syncTokenResets: number
+  eventsChanged: number
+  backgroundRefreshes: number
+  sharedStateLoads: number
+  truncatedSyncs: number
+}
+
+export function createCalendarMetrics(): CalendarMetrics {
+  return {
+    cacheHits: 0,
+    cacheMisses: 0,
+    cacheStaleHits: 0,
+    apiCalls: 0,
+    apiErrors: 0,
+    lastApiLatencyMs: 0,
+    totalEventsFetched: 0,
+    lastErrorAt: 0,
+    lastErrorMessage: "",
+    lastStatus: 0,
+    fullSyncs: 0,
+    incrementalSyncs: 0,
+    syncTokenResets: 0,
+    eventsChanged: 0,
+    backgroundRefreshes: 0,
+    sharedStateLoads: 0,
+    truncatedSyncs: 0,
+  }
+}
+
+interface SyncState {
+  calendarId: string
+  // Every known event by id, as the sync token last described them
+  events: Map<string, Event>
+  // Confirmed events ordered by start, recomputed after each sync
+  ordered: Event[]
+  syncToken: string | null
+  syncedAt: number
+}
+
+interface SyncRow {
+  calendar_id: string
+  sync_token: string | null
+  events: Event[]
+  synced_at: string
+}
+
+function eventTime(time: calendar_v3.Schema$EventDateTime | undefined): number {
+  const value = time?.dateTime || time?.date
+  return value ? Date.parse(value) : NaN
+}
+
+// Same rule as timeMin: an event is upcoming until it has ended
+function hasEnded(event: Event, now: number): boolean {
+  return eventTime(event.end ?? event.start) <= now
+}
+
+/**
+ * Drop events that have already ended, so the stored set stays bounded by
+ * what is still upcoming (incremental syncs also report changes to past events)
+ */
+function dropEnded(events: Map<string, Event>, now: number): Map<string, Event> {
+  for (const [id, event] of events) {
+    if (hasEnded(event, now)) events.delete(id)
+  }
+  return events
+}
+
+function orderEvents(events: Map<string, Event>): Event[] {
+  return Array.from(events.values())
+    .filter((event) => event.status !== "cancelled")
+    .sort((a, b) => (eventTime(a.start) || 0) - (eventTime(b.start) || 0))
+}
+
+function errorStatus(error: unknown): number {
+  const e = error as { code?: unknown; status?: unknown; response?: { status?: number } } | null
+  return Number(e?.response?.status ?? e?.status ?? e?.code ?? 0) || 0
+}
+
+/**
+ * Calendar events kept in sync with Google through events.list sync tokens.
+ *
+ * Reads are stale-while-revalidate: within the TTL they are served from memory,
+ * after it the stale events are served while one background refresh pulls only
+ * the changes since the last sync token. The events and token are also stored
+ * in the calendar_sync_state row, so a cold instance starts from the state
+ * another instance saved instead of a full Google fetch.
+ */
+export class CalendarSync {
+  private states = new Map<string, SyncState>()
+  private refreshes = new Map<string, Promise<SyncState>>()
+  private restores = new Map<string, Promise<SyncState | null>>()
+
+  constructor(
+    private readonly listEvents: ListEvents,
+    private readonly metrics: CalendarMetrics,
+    private readonly ttlMs: () => number
+  ) {}
+
+  /**
+   * Upcoming (not yet ended) events ordered by start time
+   */
+  async getUpcoming(calendarId: string, maxResults: number): Promise<Event[]> {
+    let state = this.states.get(calendarId) ?? await this.restore(calendarId)
+
+    if (state && Date.now() - state.syncedAt < this.ttlMs()) {
+      this.metrics.cacheHits++
+    } else if (state) {
+      this.metrics.cacheStaleHits++
+      this.metrics.backgroundRefreshes++
+      const refreshing = this.refresh(calendarId).then(
+        () => undefined,
+        (error) => log.warn("Background calendar refresh failed", { calendarId, error })
+      )
+      try {
+        // Keeps a serverless function alive until the refresh has finished
+        after(refreshing)
+      } catch {
+        // Outside a request (scripts, tests) the process is not cut short
+      }
+    } else {
+      this.metrics.cacheMisses++
+      state = await this.refresh(calendarId)
+    }
+
+    const now = Date.now()
+    const upcoming: Event[] = []
+    for (const event of state.ordered) {
+      if (upcoming.length >= maxResults) break
+      if (!hasEnded(event, now)) upcoming.push(event)
+    }
+    this.metrics.totalEventsFetched += upcoming.length
+    return upcoming
+  }
+
+  /**
+   * Pull changes now; concurrent callers share one refresh
+   */
+  refresh(calendarId: string): Promise<SyncState> {
+    let pending = this.refreshes.get(calendarId)
+    if (!pending) {
+      pending = this.sync(calendarId).finally(() => this.refreshes.delete(calendarId))
+      this.refreshes.set(calendarId, pending)
+    }
+    return pending
+  }
+
+  private restore(calendarId: string): Promise<SyncState | null> {
+    let pending = this.restores.get(calendarId)
+    if (!pending) {
+      pending = this.readShared(calendarId).then((state) => {
+        this.restores.delete(calendarId)
+        if (state && !this.states.has(calendarId)) {
+          this.states.set(calendarId, state)
+          this.metrics.sharedStateLoads++
+        }
+        return this.states.get(calendarId) ?? null
+      })
+      this.restores.set(calendarId, pending)
+    }
+    return pending
+  }
+
+  private async sync(calendarId: string): Promise<SyncState> {
+    const local = this.states.get(calendarId) ?? null
+    // Another instance may have synced since this one last did
+    const shared = await this.readShared(calendarId)
+    const base = shared && (!local || shared.syncedAt > local.syncedAt) ? shared : local
+
+    if (base && Date.now() - base.syncedAt < this.ttlMs()) {
+      if (base === shared) this.metrics.sharedStateLoads++
+      this.states.set(calendarId, base)
+      return base
+    }
+
+    const started = Date.now()
+    let next: SyncState
+    try {
+      next = base?.syncToken
+        ? await this.pullChanges(base)
+        : await this.fullSync(calendarId)
+    } catch (error: unknown) {
+      if (errorStatus(error) === 410 && base?.syncToken) {
+        // Sync token expired or invalidated: start over with a full sync
+        this.metrics.syncTokenResets++
+        try {
+          next = await this.fullSync(calendarId)
+        } catch (retryError: unknown) {
+          this.recordError(retryError, started)
+          throw retryError
+        }
+      } else {
+        this.recordError(error, started)
+        throw error
+      }
+    }
+    this.metrics.lastApiLatencyMs = Date.now() - started
+    this.metrics.lastStatus = 200
+
+    this.states.set(calendarId, next)
+    await this.writeShared(next, shared !== null)
+    return next
+  }
+
+  private async fullSync(calendarId: string): Promise<SyncState> {
+    this.metrics.fullSyncs++
+    // timeMin bounds the initial read to events that have not ended. The
+    // incremental requests cannot repeat it (syncToken excludes timeMin and
+    // orderBy), so the changes they bring are pruned and ordered locally
+    const now = Date.now()
+    const { items, syncToken } = await this.fetchPages({
+      calendarId,
+      singleEvents: true,
+      timeMin: new Date(now).toISOString()
+    })
+    const events = new Map<string, Event>()
+    for (const event of items) {
+      if (event.id && event.status !== "cancelled") events.set(event.id, event)
+    }
+    dropEnded(events, now)
+    this.metrics.eventsChanged += events.size
+    return { calendarId, events, ordered: orderEvents(events), syncToken, syncedAt: now }
+  }
+
+  private async pullChanges(base: SyncState): Promise<SyncState> {
+    this.metrics.incrementalSyncs++
+    const { items, syncToken } = await this.fetchPages({
+      calendarId: base.calendarId,
+      singleEvents: true,
+      syncToken: base.syncToken as string
+    })
+    const events = new Map(base.events)
+    for (const event of items) {
+      if (!event.id) continue
+      if (event.status === "cancelled") events.delete(event.id)
+      else events.set(event.id, event)
+    }
+    const now = Date.now()
+    dropEnded(events, now)
+    this.metrics.eventsChanged += items.length
+    return {
+      calendarId: base.calendarId,
+      events,
+      ordered: orderEvents(events),
+      // Null after a truncated pull: the next sync is a full one
+      syncToken,
+      syncedAt: now
+    }
+  }
+
+  private async fetchPages(
+    params: calendar_v3.Params$Resource$Events$List
+  ): Promise<{ items: Event[]; syncToken: string | null }> {
+    const items: Event[] = []
+    let pageToken: string | undefined
+    for (let page = 0; page < MAX_PAGES; page++) {
+      this.metrics.apiCalls++
+      const response = await this.listEvents({ ...params, maxResults: PAGE_SIZE, pageToken })
+      items.push(...(response.items || []))
+      if (!response.nextPageToken) {
+        return { items, syncToken: response.nextSyncToken ?? null }
+      }
+      pageToken = response.nextPageToken
+    }
+    // Serve what was read rather than fail the request; without a sync token
+    // the next refresh starts over with a full sync
+    this.metrics.truncatedSyncs++
+    log.warn("Calendar events.list page limit reached; keeping a partial sync", {
+      calendarId: params.calendarId,
+      pages: MAX_PAGES,
+      events: items.length
+    })
+    return { items, syncToken: null }
+  }
+
+  private recordError(error: unknown, started: number): void {
+    this.metrics.apiErrors++
+    this.metrics.lastApiLatencyMs = Date.now() - started
+    this.metrics.lastErrorAt = Date.now()
+    this.metrics.lastErrorMessage = String((error as Error)?.message || error)
+    this.metrics.lastStatus = errorStatus(error)
+  }
+
+  private async readShared(calendarId: string): Promise<SyncState | null> {
+    try {
+      const { data, error } = await supabase
+        .from(SYNC_TABLE)
+        .select("calendar_id, sync_token, events, synced_at")
+        .eq("calendar_id", calendarId)
+        .single()
+      if (error || !data) return null
+
+      const row = data as SyncRow
+      const events = new Map<string, Event>()
+      for (const event of row.events || []) {
+        if (event.id) events.set(event.id, event)
+      }
+      return {
+        calendarId,
+        events,
+        ordered: orderEvents(events),
+        syncToken: row.sync_token,
+        syncedAt: Date.parse(row.synced_at) || 0
+      }
+    } catch (error) {
+      log.error("Error reading calendar sync state", { calendarId, error })
+      return null
+    }
+  }
+
+  private async writeShared(state: SyncState, exists: boolean): Promise<void> {
+    const row = {
+      sync_token: state.syncToken,
+      events: Array.from(state.events.values()),
+      synced_at: new Date(state.syncedAt).toISOString()
+    }
+    try {
+      const { error } = exists
+        ? await supabase.from(SYNC_TABLE).update(row).eq("calendar_id", state.calendarId)
+        : await supabase.from(SYNC_TABLE).insert({ calendar_id: state.calendarId, ...row })
+      if (error) throw error
+    } catch (error) {
+      // Another instance may have inserted the row first; the next sync updates it
+      log.warn("Error saving calendar sync state", { calendarId: state.calendarId, error })
+    }
+  }
+}
@@ -0,0 +1,305 @@
+import { createHash } from 'crypto'
+import { supabase } from './supabase'
+import { createLogger } from './logger'
+import { metrics } from './metrics'
+import { getTelegramUserFromHeaders } from './telegram'
+
+// Idempotency-Key support for mutating routes. Telegram webviews retry
+// requests on flaky networks; a retried POST carrying the same key gets the
+// first response replayed instead of running the mutation again (a second
+// Glicko-2 update, an extra round...). Keys are scoped to the route and the
+// caller. Completed responses are kept in memory and in the idempotency_keys
+// table for IDEMPOTENCY_TTL_HOURS (default 24); a duplicate that arrives while
+// the original is still running waits for it, on this instance through the
+// shared promise and across instances by polling the claimed row.
+
+const log = createLogger('idempotency')
+
+const TABLE = 'idempotency_keys'
+const MAX_KEY_LENGTH = 255
+// Completed responses kept in memory; the oldest are dropped past this
+const MAX_LOCAL_ENTRIES = 1000
+// How long a duplicate waits for an original running on another instance
+const WAIT_FOR_ORIGINAL_MS = 10_000
+const POLL_INTERVAL_MS = 250
+// A pending claim older than this belongs to a request that died; it is taken over
+const STALE_CLAIM_MS = 60_000
+// Share of claims that also delete expired rows
+const PURGE_PROBABILITY = 0.01
+// Only these headers are stored and replayed
+const REPLAYED_HEADERS = ['content-type', 'location', 'etag']
+
+const idempotentRequests = metrics.counter(
+  'idempotent_requests_total',
+  'Requests carrying an Idempotency-Key, by route and outcome (executed, replayed, waited, mismatch, busy)',
+  ['route', 'outcome']
+)
+
+function ttlMs(): number {
+  const hours = Number(process.env.IDEMPOTENCY_TTL_HOURS)
+  return (Number.isFinite(hours) && hours > 0 ? hours : 24) * 60 * 60 * 1000
+}
+
+export interface StoredResponse {
+  status: number
+  headers: Record<string, string>
+  body: string
+}
+
+interface IdempotencyRow {
+  fingerprint: string
+  status: 'pending' | 'done'
+  response_status: number | null
+  response_headers: Record<string, string> | null
+  response_body: string | null
+  created_at: string
+  expires_at: string
+}
+
+type ClaimOutcome =
+  | { type: 'claimed' }
+  | { type: 'replay'; response: StoredResponse }
+  | { type: 'mismatch' }
+  | { type: 'busy' }
+
+function sleep(ms: number): Promise<void> {
+  return new Promise((resolve) => setTimeout(resolve, ms))
+}
+
+function errorResponse(status: number, error: string, headers: Record<string, string> = {}): Response {
+  return Response.json({ error }, { status, headers })
+}
+
+function replay(stored: StoredResponse): Response {
+  return new Response(stored.body, {
+    status: stored.status,
+    headers: { ...stored.headers, 'Idempotent-Replayed': 'true' }
+  })
+}
+
+async function capture(response: Response): Promise<StoredResponse> {
+  const headers: Record<string, string> = {}
+  for (const name of REPLAYED_HEADERS) {
+    const value = response.headers.get(name)
+    if (value !== null) headers[name] = value
+  }
+  return { status: response.status, headers, body: await response.clone().text() }
+}
+
+/**
+ * Runs requests at most once per (scope, key): in memory, then through a
+ * claimed row in idempotency_keys. If that table cannot be reached the request
+ * still runs, protected only within this instance.
+ */
+export class IdempotencyStore {
+  private inflight = new Map<string, { fingerprint: string; result: Promise<StoredResponse | null> }>()
+  private completed = new Map<string, { fingerprint: string; response: StoredResponse; expiresAt: number }>()
+
+  async run(route: string, scope: string, key: string, fingerprint: string, execute: () => Promise<Response>): Promise<Response> {
+    const id = `${scope}\n${key}`
+
+    const local = this.completed.get(id)
+    if (local && local.expiresAt > Date.now()) {
+      if (local.fingerprint !== fingerprint) return this.mismatch(route)
+      idempotentRequests.inc({ route, outcome: 'replayed' })
+      return replay(local.response)
+    }
+    if (local) this.completed.delete(id)
+
+    const running = this.inflight.get(id)
+    if (running) {
+      if (running.fingerprint !== fingerprint) return this.mismatch(route)
+      const stored = await running.result
+      if (stored) {
+        idempotentRequests.inc({ route, outcome: 'waited' })
+        return replay(stored)
+      }
+      // The original failed without a result worth keeping: this one may try
+      return this.run(route, scope, key, fingerprint, execute)
+    }
+
+    let settle!: (stored: StoredResponse | null) => void
+    const result = new Promise<StoredResponse | null>((resolve) => { settle = resolve })
+    this.inflight.set(id, { fingerprint, result })
+    try {
+      const claim = await this.claim(scope, key, fingerprint, Date.now() + WAIT_FOR_ORIGINAL_MS)
+      if (claim.type === 'replay') {
+        this.remember(id, fingerprint, claim.response)
+        settle(claim.response)
+        idempotentRequests.inc({ route, outcome: 'replayed' })
+        return replay(claim.response)
+      }
+      if (claim.type === 'mismatch') {
+        settle(null)
+        return this.mismatch(route)
+      }
+      if (claim.type === 'busy') {
+        settle(null)
+        idempotentRequests.inc({ route, outcome: 'busy' })
+        return errorResponse(409, 'A request with this Idempotency-Key is still being processed', { 'Retry-After': '1' })
+      }
+
+      idempotentRequests.inc({ route, outcome: 'executed' })
+      const response = await execute()
+      if (response.status >= 500) {
+        // Server errors are not replayed, so a retry can still succeed
+        await this.release(scope, key)
+        settle(null)
+        return response
+      }
+      const stored = await capture(response)
+      this.remember(id, fingerprint, stored)
+      await this.save(scope, key, stored)
+      settle(stored)
+      return response
+    } catch (error) {
+      await this.release(scope, key)
+      settle(null)
+      throw error
+    } finally {
+      this.inflight.delete(id)
+    }
+  }
+
+  clear(): void {
+    this.completed.clear()
+  }
+
+  private mismatch(route: string): Response {
+    idempotentRequests.inc({ route, outcome: 'mismatch' })
+    return errorResponse(422, 'Idempotency-Key was already used with a different request')
+  }
+
+  private remember(id: string, fingerprint: string, response: StoredResponse): void {
+    this.completed.delete(id)
+    this.completed.set(id, { fingerprint, response, expiresAt: Date.now() + ttlMs() })
+    while (this.completed.size > MAX_LOCAL_ENTRIES) {
+      this.completed.delete(this.completed.keys().next().value as string)
+    }
+  }
+
+  /**
+   * Insert the pending row; if it exists, replay or wait on whoever holds it
+   */
+  private async claim(scope: string, key: string, fingerprint: string, deadline: number): Promise<ClaimOutcome> {
+    try {
+      const { error } = await supabase.from(TABLE).insert({
+        scope,
+        key,
+        fingerprint,
+        status: 'pending',
+        expires_at: new Date(Date.now() + ttlMs()).toISOString()
+      })
+      if (!error) {
+        if (Math.random() < PURGE_PROBABILITY) void this.purgeExpired()
+        return { type: 'claimed' }
+      }
+      if (error.code !== '23505') {
+        log.warn('Idempotency store unavailable, running without it', { error }, { sample: 0.1 })
+        return { type: 'claimed' }
+      }
+
+      for (;;) {
+        const { data: row } = await supabase
+          .from(TABLE)
+          .select('fingerprint, status, response_status, response_headers, response_body, created_at, expires_at')
+          .eq('scope', scope)
+          .eq('key', key)
+          .single()
+
+        if (Date.now() >= deadline) return { type: 'busy' }
+        // Released by a failed original: claim again
+        if (!row) return this.claim(scope, key, fingerprint, deadline)
+
+        const claimed = row as IdempotencyRow
+        const expired = Date.parse(claimed.expires_at) <= Date.now()
+        const stale = claimed.status === 'pending' && Date.now() - Date.parse(claimed.created_at) > STALE_CLAIM_MS
+        if (expired || stale) {
+          await supabase.from(TABLE).delete().eq('scope', scope).eq('key', key).eq('created_at', claimed.created_at)
+          return this.claim(scope, key, fingerprint, deadline)
+        }
+        if (claimed.fingerprint !== fingerprint) return { type: 'mismatch' }
+        if (claimed.status === 'done') {
+          return {
+            type: 'replay',
+            response: {
+              status: claimed.response_status ?? 200,
+              headers: claimed.response_headers ?? {},
+              body: claimed.response_body ?? ''
+            }
+          }
+        }
+        await sleep(POLL_INTERVAL_MS)
+      }
+    } catch (error) {
+      log.warn('Idempotency store unavailable, running without it', { error }, { sample: 0.1 })
+      return { type: 'claimed' }
+    }
+  }
+
+  private async purgeExpired(): Promise<void> {
+    try {
+      await supabase.from(TABLE).delete().lte('expires_at', new Date().toISOString())
+    } catch (error) {
+      log.warn('Error purging expired idempotency keys', { error })
+    }
+  }
+
+  private async save(scope: string, key: string, stored: StoredResponse): Promise<void> {
+    try {
+      const { error } = await supabase
+        .from(TABLE)
+        .update({
+          status: 'done',
+          response_status: stored.status,
+          response_headers: stored.headers,
+          response_body: stored.body,
+          expires_at: new Date(Date.now() + ttlMs()).toISOString()
+        })
+        .eq('scope', scope)
+        .eq('key', key)
+      if (error) throw error
+    } catch (error) {
+      log.warn('Error saving idempotent response', { scope, error })
+    }
+  }
+
+  private async release(scope: string, key: string): Promise<void> {
+    try {
+      await supabase.from(TABLE).delete().eq('scope', scope).eq('key', key).eq('status', 'pending')
+    } catch (error) {
+      log.warn('Error releasing idempotency claim', { scope, error })
+    }
+  }
+}
+
+export const idempotency = new IdempotencyStore()
+
+/**
+ * Honour an Idempotency-Key header on a route handler; requests without one
+ * run as before. `route` is the route pattern, as for withRequestContext.
+ */
+export function withIdempotency<A extends unknown[]>(
+  route: string,
+  handler: (...args: A) => Promise<Response>
+): (...args: A) => Promise<Response> {
+  return async (...args: A) => {
+    const req = args[0] as Request
+    const key = req?.headers?.get('idempotency-key')?.trim()
+    if (!key) return handler(...args)
+    if (key.length > MAX_KEY_LENGTH) {
+      return errorResponse(400, `Idempotency-Key must be at most ${MAX_KEY_LENGTH} characters`)
+    }
+
+    // Same key from another user or for another tournament is a different request
+    const caller = (await getTelegramUserFromHeaders(req.headers))?.id ?? 'anonymous'
+    const scope = `${route} ${new URL(req.url).pathname} ${caller}`
+    const fingerprint = createHash('sha256')
+      .update(req.method)
+      .update('\n')
+      .update(await req.clone().text())
+      .digest('hex')
+
+    return idempotency.run(route, scope, key, fingerprint, () => handler(...args))
+  }
+}
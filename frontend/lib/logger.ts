@@ -0,0 +1,245 @@
+import { AsyncLocalStorage } from 'async_hooks'
+import { randomUUID } from 'crypto'
+
+// Structured JSON-lines logger. A log call only checks the level and the call
+// site's sample counter and pushes the record into a bounded ring buffer;
+// formatting and the stdout/stderr write happen in one batch on setImmediate.
+// When the buffer overflows the oldest records are dropped (and counted).
+
+export type LogLevel = 'debug' | 'info' | 'warn' | 'error'
+
+export type LogFields = Record<string, unknown>
+
+export interface LogOptions {
+  // Keep about this fraction (0..1] of the calls from this call site
+  sample?: number
+}
+
+export interface LogContext {
+  requestId?: string
+  [key: string]: unknown
+}
+
+type LogSink = (chunk: string, stream: 'stdout' | 'stderr') => void
+
+interface LogRecord {
+  time: number
+  level: LogLevel
+  scope: string
+  message: string
+  fields: LogFields | undefined
+  context: LogContext | undefined
+  skipped: number
+}
+
+const LEVELS: Record<LogLevel, number> = { debug: 10, info: 20, warn: 30, error: 40 }
+const BUFFER_SIZE = 1024
+
+const contextStorage = new AsyncLocalStorage<LogContext>()
+
+let threshold = LEVELS[(process.env.LOG_LEVEL as LogLevel) || 'info'] ?? LEVELS.info
+
+const buffer: Array<LogRecord | undefined> = new Array(BUFFER_SIZE)
+let head = 0
+let size = 0
+let dropped = 0
+let flushScheduled = false
+
+// Calls seen per sampled call site ("scope|message")
+const sampleCounters = new Map<string, number>()
+
+let sink: LogSink = (chunk, stream) => {
+  const target = typeof process !== 'undefined' ? process[stream] : undefined
+  if (target?.write) {
+    target.write(chunk)
+  } else {
+    console.log(chunk.trimEnd())
+  }
+}
+
+export function setLogLevel(level: LogLevel): void {
+  threshold = LEVELS[level]
+}
+
+/**
+ * Replace the output (tests); returns the previous sink
+ */
+export function setLogSink(next: LogSink): LogSink {
+  const previous = sink
+  sink = next
+  return previous
+}
+
+/**
+ * Run `fn` with fields (e.g. requestId) attached to every record logged inside it
+ */
+export function runWithLogContext<T>(context: LogContext, fn: () => T): T {
+  return contextStorage.run(context, fn)
+}
+
+export function getLogContext(): LogContext | undefined {
+  return contextStorage.getStore()
+}
+
+/**
+ * Request id from the incoming headers, or a new one
+ */
+export function requestIdFrom(headers: Headers): string {
+  return headers.get('x-request-id') || headers.get('x-vercel-id') || randomUUID()
+}
+
+function enqueue(record: LogRecord): void {
+  if (size === BUFFER_SIZE) {
+    head = (head + 1) % BUFFER_SIZE
+    size--
+    dropped++
+  }
+  buffer[(head + size) % BUFFER_SIZE] = record
+  size++
+
+  if (!flushScheduled) {
+    flushScheduled = true
+    setImmediate(flushLogs)
+  }
+}
+
+function serializeValue(_key: string, value: unknown): unknown {
+  if (value instanceof Error) {
+    return { name: value.name, message: value.message, stack: value.stack }
+  }
+  if (typeof value === 'bigint') return value.toString()
+  return value
+}
+
+function formatRecord(record: LogRecord): string {
+  const entry: LogFields = {
+    time: new Date(record.time).toISOString(),
+    level: record.level,
+    scope: record.scope,
+    msg: record.message,
+    ...record.context,
+    ...record.fields
+  }
+  if (record.skipped > 0) entry.sampled_out = record.skipped
+  try {
+    return JSON.stringify(entry, serializeValue)
+  } catch {
+    // Circular or otherwise unserializable fields
+    return JSON.stringify({ time: entry.time, level: record.level, scope: record.scope, msg: record.message, unserializable: true })
+  }
+}
+
+/**
+ * Write everything buffered so far (runs automatically; exported for tests and shutdown)
+ */
+export function flushLogs(): void {
+  flushScheduled = false
+  if (size === 0 && dropped === 0) return
+
+  let out = ''
+  let err = ''
+  while (size > 0) {
+    const record = buffer[head] as LogRecord
+    buffer[head] = undefined
+    head = (head + 1) % BUFFER_SIZE
+    size--
+    const line = formatRecord(record) + '\n'
+    if (LEVELS[record.level] >= LEVELS.warn) err += line
+    else out += line
+  }
+  if (dropped > 0) {
+    err += JSON.stringify({ time: new Date().toISOString(), level: 'warn', scope: 'logger', msg: 'Log records dropped', dropped }) + '\n'
+    dropped = 0
+  }
+
+  try {
+    if (out) sink(out, 'stdout')
+    if (err) sink(err, 'stderr')
+  } catch {
+    // Logging must never break the caller
+  }
+}
+
+if (typeof process !== 'undefined' && typeof process.once === 'function') {
+  process.once('beforeExit', flushLogs)
+}
+
+export class Logger {
+  constructor(
+    private readonly scope: string,
+    private readonly bindings: LogFields | undefined = undefined
+  ) {}
+
+  /**
+   * Logger that adds `bindings` to every record
+   */
+  child(bindings: LogFields): Logger {
+    return new Logger(this.scope, { ...this.bindings, ...bindings })
+  }
+
+  isEnabled(level: LogLevel): boolean {
+    return LEVELS[level] >= threshold
+  }
+
+  debug(message: string, fields?: LogFields | (() => LogFields), options?: LogOptions): void {
+    this.write('debug', message, fields, options)
+  }
+
+  info(message: string, fields?: LogFields | (() => LogFields), options?: LogOptions): void {
+    this.write('info', message, fields, options)
+  }
+
+  warn(message: string, fields?: LogFields | (() => LogFields), options?: LogOptions): void {
+    this.write('warn', message, fields, options)
+  }
+
+  error(message: string, fields?: LogFields | (() => LogFields), options?: LogOptions): void {
+    this.write('error', message, fields, options)
+  }
+
+  /**
+   * `message` is a constant per call site and doubles as its sampling key;
+   * pass `fields` as a function when building them costs anything
+   */
+  private write(
+    level: LogLevel,
+    message: string,
+    fields: LogFields | (() => LogFields) | undefined,
+    options: LogOptions | undefined
+  ): void {
+    if (LEVELS[level] < threshold) return
+
+    let skipped = 0
+    const rate = options?.sample
+    if (rate !== undefined && rate < 1) {
+      const every = rate > 0 ? Math.round(1 / rate) : Infinity
+      const key = `${this.scope}|${message}`
+      const seen = (sampleCounters.get(key) ?? 0) + 1
+      if (seen < every) {
+        sampleCounters.set(key, seen)
+        return
+      }
+      sampleCounters.set(key, 0)
+      skipped = seen - 1
+    }
+
+    try {
+      const resolved = typeof fields === 'function' ? fields() : fields
+      enqueue({
+        time: Date.now(),
+        level,
+        scope: this.scope,
+        message,
+        fields: this.bindings ? { ...this.bindings, ...resolved } : resolved,
+        context: contextStorage.getStore(),
+        skipped
+      })
+    } catch {
+      // A throwing field thunk must not break the caller
+    }
+  }
+}
+
+export function createLogger(scope: string): Logger {
+  return new Logger(scope)
+}
@@ -0,0 +1,271 @@
+// Process-wide metrics registry. Recording is a map lookup plus an add; nothing
+// is formatted until /api/metrics renders the Prometheus text exposition.
+
+export type MetricLabels = Record<string, string | number>
+
+type MetricType = 'counter' | 'gauge' | 'histogram'
+
+// Exposed histogram buckets (milliseconds; rendered in seconds)
+const EXPORT_BOUNDS_MS = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+// HDR-style recording: values in microseconds, 8 linear sub-buckets per power
+// of two, so any recorded value is known to within 12.5%
+const SUB_BUCKETS = 8
+const SLOT_COUNT = SUB_BUCKETS + (32 - 3) * SUB_BUCKETS
+
+function slotOf(valueMs: number): number {
+  const us = Math.min(Math.max(Math.round(valueMs * 1000), 0), 0xffffffff) >>> 0
+  if (us < SUB_BUCKETS) return us
+  const exponent = 31 - Math.clz32(us)
+  return SUB_BUCKETS + (exponent - 3) * SUB_BUCKETS + ((us >>> (exponent - 3)) - SUB_BUCKETS)
+}
+
+// Exclusive upper bound of a slot, in microseconds
+function slotUpperUs(slot: number): number {
+  if (slot < SUB_BUCKETS) return slot + 1
+  const shift = Math.floor((slot - SUB_BUCKETS) / SUB_BUCKETS)
+  const sub = (slot - SUB_BUCKETS) % SUB_BUCKETS
+  return (SUB_BUCKETS + sub + 1) * 2 ** shift
+}
+
+function labelKey(labelNames: readonly string[], labels: MetricLabels | undefined): string {
+  if (labelNames.length === 0 || !labels) return ''
+  if (labelNames.length === 1) return String(labels[labelNames[0]] ?? '')
+  return labelNames.map((name) => String(labels[name] ?? '')).join('\u0001')
+}
+
+function escapeLabel(value: string): string {
+  return value.replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"')
+}
+
+function formatLabels(labelNames: readonly string[], key: string, extra?: string): string {
+  const values = labelNames.length > 1 ? key.split('\u0001') : [key]
+  const parts = labelNames.map((name, i) => `${name}="${escapeLabel(values[i] ?? '')}"`)
+  if (extra) parts.push(extra)
+  return parts.length ? `{${parts.join(',')}}` : ''
+}
+
+function formatValue(value: number): string {
+  if (Number.isNaN(value)) return 'NaN'
+  if (value === Infinity) return '+Inf'
+  if (value === -Infinity) return '-Inf'
+  return String(value)
+}
+
+abstract class Metric {
+  abstract readonly type: MetricType
+
+  constructor(
+    readonly name: string,
+    readonly help: string,
+    readonly labelNames: readonly string[]
+  ) {}
+
+  abstract render(lines: string[]): void
+
+  protected header(lines: string[]): void {
+    lines.push(`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} ${this.type}`)
+  }
+}
+
+export class Counter extends Metric {
+  readonly type = 'counter'
+  private values = new Map<string, number>()
+
+  inc(labels?: MetricLabels, value: number = 1): void {
+    const key = labelKey(this.labelNames, labels)
+    this.values.set(key, (this.values.get(key) ?? 0) + value)
+  }
+
+  get(labels?: MetricLabels): number {
+    return this.values.get(labelKey(this.labelNames, labels)) ?? 0
+  }
+
+  render(lines: string[]): void {
+    this.header(lines)
+    for (const [key, value] of this.values) {
+      lines.push(`${this.name}${formatLabels(this.labelNames, key)} ${formatValue(value)}`)
+    }
+  }
+}
+
+export class Gauge extends Metric {
+  readonly type = 'gauge'
+  private values = new Map<string, number>()
+
+  set(value: number, labels?: MetricLabels): void {
+    this.values.set(labelKey(this.labelNames, labels), value)
+  }
+
+  inc(labels?: MetricLabels, value: number = 1): void {
+    const key = labelKey(this.labelNames, labels)
+    this.values.set(key, (this.values.get(key) ?? 0) + value)
+  }
+
+  dec(labels?: MetricLabels, value: number = 1): void {
+    this.inc(labels, -value)
+  }
+
+  get(labels?: MetricLabels): number {
+    return this.values.get(labelKey(this.labelNames, labels)) ?? 0
+  }
+
+  render(lines: string[]): void {
+    this.header(lines)
+    for (const [key, value] of this.values) {
+      lines.push(`${this.name}${formatLabels(this.labelNames, key)} ${formatValue(value)}`)
+    }
+  }
+}
+
+interface HistogramSeries {
+  slots: Float64Array
+  count: number
+  sumMs: number
+}
+
+/**
+ * Latency histogram; observe() takes milliseconds, the exposition is in seconds
+ */
+export class Histogram extends Metric {
+  readonly type = 'histogram'
+  private series = new Map<string, HistogramSeries>()
+
+  observe(valueMs: number, labels?: MetricLabels): void {
+    const key = labelKey(this.labelNames, labels)
+    let series = this.series.get(key)
+    if (!series) {
+      series = { slots: new Float64Array(SLOT_COUNT), count: 0, sumMs: 0 }
+      this.series.set(key, series)
+    }
+    series.slots[slotOf(valueMs)]++
+    series.count++
+    series.sumMs += valueMs
+  }
+
+  /**
+   * Stop function for a timing started now; it records and returns the elapsed ms
+   */
+  startTimer(labels?: MetricLabels): (extraLabels?: MetricLabels) => number {
+    const started = performance.now()
+    return (extraLabels) => {
+      const elapsed = performance.now() - started
+      this.observe(elapsed, extraLabels ? { ...labels, ...extraLabels } : labels)
+      return elapsed
+    }
+  }
+
+  count(labels?: MetricLabels): number {
+    return this.series.get(labelKey(this.labelNames, labels))?.count ?? 0
+  }
+
+  /**
+   * Approximate percentile (0-100) in milliseconds, within the 12.5% slot resolution
+   */
+  percentile(p: number, labels?: MetricLabels): number {
+    const series = this.series.get(labelKey(this.labelNames, labels))
+    if (!series || series.count === 0) return 0
+    const rank = Math.max(1, Math.ceil((p / 100) * series.count))
+    let seen = 0
+    for (let slot = 0; slot < SLOT_COUNT; slot++) {
+      seen += series.slots[slot]
+      if (seen >= rank) return slotUpperUs(slot) / 1000
+    }
+    return slotUpperUs(SLOT_COUNT - 1) / 1000
+  }
+
+  render(lines: string[]): void {
+    this.header(lines)
+    for (const [key, series] of this.series) {
+      // Cumulative counts per exported bound, at slot resolution
+      let slot = 0
+      let cumulative = 0
+      for (const boundMs of EXPORT_BOUNDS_MS) {
+        const boundUs = boundMs * 1000
+        while (slot < SLOT_COUNT && slotUpperUs(slot) <= boundUs) {
+          cumulative += series.slots[slot]
+          slot++
+        }
+        lines.push(`${this.name}_bucket${formatLabels(this.labelNames, key, `le="${boundMs / 1000}"`)} ${cumulative}`)
+      }
+      lines.push(
+        `${this.name}_bucket${formatLabels(this.labelNames, key, 'le="+Inf"')} ${series.count}`,
+        `${this.name}_sum${formatLabels(this.labelNames, key)} ${series.sumMs / 1000}`,
+        `${this.name}_count${formatLabels(this.labelNames, key)} ${series.count}`
+      )
+    }
+  }
+}
+
+/**
+ * Value read from elsewhere (e.g. an existing stats object) only when scraped
+ */
+class CallbackMetric extends Metric {
+  constructor(
+    name: string,
+    help: string,
+    readonly type: 'counter' | 'gauge',
+    private readonly read: () => number
+  ) {
+    super(name, help, [])
+  }
+
+  render(lines: string[]): void {
+    let value: number
+    try {
+      value = this.read()
+    } catch {
+      return
+    }
+    this.header(lines)
+    lines.push(`${this.name} ${formatValue(value)}`)
+  }
+}
+
+class MetricsRegistry {
+  private metrics = new Map<string, Metric>()
+
+  counter(name: string, help: string, labelNames: readonly string[] = []): Counter {
+    return this.register(name, () => new Counter(name, help, labelNames)) as Counter
+  }
+
+  gauge(name: string, help: string, labelNames: readonly string[] = []): Gauge {
+    return this.register(name, () => new Gauge(name, help, labelNames)) as Gauge
+  }
+
+  histogram(name: string, help: string, labelNames: readonly string[] = []): Histogram {
+    return this.register(name, () => new Histogram(name, help, labelNames)) as Histogram
+  }
+
+  /**
+   * Expose a value that is already tracked elsewhere; `read` runs per scrape
+   */
+  observe(name: string, help: string, type: 'counter' | 'gauge', read: () => number): void {
+    this.metrics.set(name, new CallbackMetric(name, help, type, read))
+  }
+
+  /**
+   * Prometheus text exposition format (version 0.0.4)
+   */
+  render(): string {
+    const lines: string[] = []
+    for (const metric of this.metrics.values()) {
+      metric.render(lines)
+    }
+    return lines.join('\n') + '\n'
+  }
+
+  // Same metric when a module is evaluated again (dev reloads, tests)
+  private register(name: string, create: () => Metric): Metric {
+    let metric = this.metrics.get(name)
+    if (!metric) {
+      metric = create()
+      this.metrics.set(name, metric)
+    }
+    return metric
+  }
+}
+
+// One registry per process, even if this module is bundled into several routes
+const globalRegistry = globalThis as typeof globalThis & { __APP_METRICS__?: MetricsRegistry }
+export const metrics = globalRegistry.__APP_METRICS__ ??= new MetricsRegistry()
@@ -0,0 +1,85 @@
+// @vitest-environment node
+import { describe, it, expect, beforeAll } from 'vitest'
+import { StandingsForecastService } from '../forecastService'
+import { runForecast } from '../standingsForecast'
+import { forecastWorkerSource } from '../forecastWorker'
+import { getStandings } from '../../db'
+import { metrics } from '../../metrics'
+import { supabase } from '../../supabase'
+
+let tournamentId: number
+
+beforeAll(async () => {
+  const { data: tournament } = await supabase.from('tournaments').insert({
+    title: 'Forecast cup',
+    format: 'swiss_bbp_dutch',
+    points_win: 1,
+    points_loss: 0,
+    points_draw: 0.5,
+    bye_points: 1,
+    rounds: 4
+  })
+  tournamentId = tournament.id
+
+  const { data: users } = await supabase.from('users').insert(Array.from({ length: 6 }, (_, i) => ({
+    telegram_id: 970_000 + i,
+    username: `forecast${i}`,
+    first_name: 'Player',
+    last_name: String(i),
+    rating: 1400 + i * 100
+  })))
+  const { data: participants } = await supabase.from('tournament_participants').insert(users.map((user: { id: number }, i: number) => ({
+    tournament_id: tournamentId,
+    user_id: user.id,
+    nickname: `Forecast${i}`
+  })))
+
+  const { data: round } = await supabase.from('rounds').insert({ tournament_id: tournamentId, number: 1, status: 'locked' })
+  await supabase.from('matches').insert([0, 1, 2].map((board) => ({
+    round_id: round.id,
+    white_participant_id: participants[board * 2].id,
+    black_participant_id: participants[board * 2 + 1].id,
+    board_no: board + 1,
+    result: ['white', 'draw', 'black'][board],
+    score_white: [1, 0.5, 0][board],
+    score_black: [0, 0.5, 1][board],
+    source: 'manual'
+  })))
+})
+
+describe('StandingsForecastService', () => {
+  it('simulates on a worker thread', async () => {
+    const runs = metrics.counter('forecast_runs_total', '', ['runner'])
+    const worker = runs.get({ runner: 'worker' })
+    const inline = runs.get({ runner: 'inline' })
+    const partials: number[] = []
+
+    const result = await new StandingsForecastService().forecast(
+      tournamentId,
+      { seed: 3, iterations: 600, chunkSize: 250, timeBudgetMs: 10000 },
+      (partial) => partials.push(partial.iterations)
+    )
+
+    expect(runs.get({ runner: 'worker' })).toBe(worker + 1)
+    expect(runs.get({ runner: 'inline' })).toBe(inline)
+    expect(partials).toEqual([250, 500])
+    expect(result).toMatchObject({ iterations: 600, complete: true, seed: 3 })
+  })
+
+  it('starts from the points getStandings reports', async () => {
+    const result = await new StandingsForecastService().forecast(tournamentId, { seed: 3, iterations: 100, timeBudgetMs: 10000 })
+    const standings = await getStandings(tournamentId)
+
+    const current = new Map(result!.players.map((p) => [p.participantId, p.currentPoints]))
+    for (const row of standings) {
+      expect(current.get(row.participant_id)).toBe(row.points)
+    }
+  })
+
+  it('builds a worker source that only uses the simulation functions', () => {
+    const source = forecastWorkerSource()
+
+    expect(source).toContain(`const ${runForecast.name} = `)
+    expect(() => new Function('require', source)).not.toThrow()
+  })
+})
@@ -0,0 +1,50 @@
+import { describe, it, expect } from 'vitest'
+import { downsampleHistory, lttbIndexes } from '../historySeries'
+
+function history(count: number, rating: (i: number) => number) {
+  const start = Date.parse('2024-01-01T00:00:00Z')
+  return Array.from({ length: count }, (_, i) => ({
+    id: i + 1,
+    created_at: new Date(start + i * 3600 * 1000).toISOString(),
+    new_rating: rating(i),
+    new_rd: 350 - i * 0.05,
+    new_volatility: 0.06,
+    rating_change: i === 0 ? 0 : rating(i) - rating(i - 1)
+  }))
+}
+
+describe('lttbIndexes', () => {
+  it('keeps the endpoints and returns exactly the threshold', () => {
+    const x = Array.from({ length: 1000 }, (_, i) => i)
+    const y = x.map((i) => Math.sin(i / 30) * 100)
+    const kept = lttbIndexes(x, [y], 50)
+
+    expect(kept).toHaveLength(50)
+    expect(kept[0]).toBe(0)
+    expect(kept[kept.length - 1]).toBe(999)
+    expect(kept.every((index, k) => k === 0 || index > kept[k - 1])).toBe(true)
+  })
+
+  it('keeps a single-point spike', () => {
+    const x = Array.from({ length: 500 }, (_, i) => i)
+    const y = x.map((i) => (i === 321 ? 400 : 0))
+
+    expect(lttbIndexes(x, [y], 20)).toContain(321)
+  })
+
+  it('returns every index when the series is already small', () => {
+    expect(lttbIndexes([1, 2, 3], [[1, 2, 3]], 10)).toEqual([0, 1, 2])
+  })
+})
+
+describe('downsampleHistory', () => {
+  it('folds every game into some point and keeps the latest rating', () => {
+    const rows = history(3000, (i) => 1500 + Math.round(Math.sin(i / 50) * 80))
+    const points = downsampleHistory(rows, 200)
+
+    expect(points).toHaveLength(200)
+    expect(points.reduce((sum, p) => sum + p.matches_played, 0)).toBe(3000)
+    expect(points[points.length - 1].rating).toBe(rows[rows.length - 1].new_rating)
+    expect(points[1].rating_change).toBe(points[1].rating - points[0].rating)
+  })
+})
@@ -0,0 +1,55 @@
+import { describe, it, expect, beforeAll } from 'vitest'
+import { RatingService } from '@/lib/rating/ratingService'
+import { supabase } from '@/lib/supabase'
+
+describe('RatingService.getLeaderboardPage', () => {
+  const service = new RatingService()
+  const ratings = [1800, 1700, 1700, 1700, 1600, 1550, 1500, 1500, 1450, 1400, 1300]
+
+  beforeAll(async () => {
+    const { data: users } = await supabase.from('users').insert(ratings.map((_, i) => ({
+      telegram_id: 7000 + i,
+      username: `leader${i}`,
+      first_name: 'Player',
+      last_name: String(i)
+    })))
+
+    await supabase.from('player_ratings').insert(users.map((user: { id: number }, i: number) => ({
+      user_id: user.id,
+      rating: ratings[i],
+      rd: 80,
+      volatility: 0.06,
+      // Every third player is below the default minGames filter
+      games_count: i % 3 === 0 ? 2 : 10,
+      wins_count: 1,
+      losses_count: 1,
+      draws_count: 0
+    })))
+  })
+
+  it('walks every page by cursor in (rating DESC, user_id) order', async () => {
+    const seen: Array<{ id: number; rating: number; global_rank: number }> = []
+    let cursor: string | null = null
+    do {
+      const page = await service.getLeaderboardPage({ limit: 3, cursor })
+      expect(page.entries.length).toBeLessThanOrEqual(3)
+      expect(page.totalEstimate).toBe(ratings.length)
+      seen.push(...page.entries)
+      cursor = page.nextCursor
+    } while (cursor)
+
+    expect(seen.map((e) => e.rating)).toEqual([...ratings].sort((a, b) => b - a))
+    expect(new Set(seen.map((e) => e.id)).size).toBe(ratings.length)
+    // RANK(): ties share a rank, ranks keep counting across page boundaries
+    expect(seen.map((e) => e.global_rank)).toEqual([1, 2, 2, 2, 5, 6, 7, 7, 9, 10, 11])
+  })
+
+  it('filters by games_count in the query, not on the returned page', async () => {
+    const page = await service.getLeaderboardPage({ limit: 100, minGames: 5 })
+
+    expect(page.entries).toHaveLength(7)
+    expect(page.entries.every((e) => e.games_count >= 5)).toBe(true)
+    expect(page.totalEstimate).toBe(7)
+    expect(page.nextCursor).toBeNull()
+  })
+})
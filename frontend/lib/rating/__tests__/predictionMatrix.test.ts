@@ -0,0 +1,86 @@
+// @vitest-environment node
+import { describe, it, expect } from 'vitest'
+import { Glicko2 } from 'glicko2'
+import {
+  computePredictionMatrix,
+  encodePredictionMatrix,
+  estimateDrawProbability,
+  lookupPairings,
+  predictionMatrices
+} from '../predictionMatrix'
+import { supabase } from '../../supabase'
+
+const players = [
+  { user_id: 1, rating: 1500, rd: 350 },
+  { user_id: 2, rating: 1720, rd: 80 },
+  { user_id: 3, rating: 1310, rd: 150 },
+  { user_id: 4, rating: 2105, rd: 60 }
+]
+
+describe('computePredictionMatrix', () => {
+  it('matches glicko2 predictions for every pair', () => {
+    const glicko = new Glicko2({ tau: 0.5, rating: 1500, rd: 350, vol: 0.06 })
+    const matrix = computePredictionMatrix(players)
+    const n = players.length
+
+    for (let i = 0; i < n; i++) {
+      for (let j = 0; j < n; j++) {
+        if (i === j) continue
+        const p1 = glicko.makePlayer(players[i].rating, players[i].rd, 0.06)
+        const p2 = glicko.makePlayer(players[j].rating, players[j].rd, 0.06)
+        const draw = estimateDrawProbability(players[i].rating, players[j].rating)
+
+        expect(matrix.win[i * n + j]).toBeCloseTo(p1.predict(p2) * (1 - draw), 5)
+        expect(matrix.draw[i * n + j]).toBeCloseTo(draw, 6)
+        expect(matrix.win[i * n + j] + matrix.draw[i * n + j] + matrix.win[j * n + i]).toBeCloseTo(1, 5)
+      }
+    }
+  })
+
+  it('looks up pairings and flags unknown players', () => {
+    const matrix = computePredictionMatrix(players)
+    const [known, unknown] = lookupPairings(matrix, [[4, 3], [4, 99]])
+
+    expect(known?.player1WinProbability).toBeGreaterThan(known!.player2WinProbability)
+    expect(known?.drawProbability).toBeCloseTo(0.3, 6)
+    expect(unknown).toBeNull()
+  })
+
+  it('encodes a compact little-endian buffer', () => {
+    const matrix = computePredictionMatrix(players)
+    const buffer = encodePredictionMatrix(matrix)
+    const n = players.length
+
+    expect(buffer.byteLength).toBe(4 + 4 * n + 8 * n * n)
+    const view = new DataView(buffer)
+    expect(view.getInt32(0, true)).toBe(n)
+    expect(view.getInt32(4 + 4, true)).toBe(2)
+    expect(new Float32Array(buffer, 4 + 4 * n, n * n)).toEqual(matrix.win)
+    expect(new Float32Array(buffer, 4 + 4 * n + 4 * n * n, n * n)).toEqual(matrix.draw)
+  })
+})
+
+describe('predictionMatrices', () => {
+  it('rebuilds when a participant without a rating gets one', async () => {
+    const { data: tournament } = await supabase.from('tournaments').insert({ title: 'Matrix cup', rounds: 3 })
+    const { data: users } = await supabase.from('users').insert([0, 1].map((i) => ({
+      telegram_id: 980_000 + i,
+      username: `matrix${i}`,
+      first_name: 'Player',
+      last_name: String(i)
+    })))
+    await supabase.from('tournament_participants').insert(users.map((user: { id: number }, i: number) => ({
+      tournament_id: tournament.id,
+      user_id: user.id,
+      nickname: `Matrix${i}`
+    })))
+    await supabase.from('player_ratings').insert({ user_id: users[0].id, rating: 1600, rd: 80, volatility: 0.06 })
+
+    expect(Array.from((await predictionMatrices.get(tournament.id))!.userIds)).toEqual([users[0].id])
+
+    await supabase.from('player_ratings').insert({ user_id: users[1].id, rating: 1500, rd: 350, volatility: 0.06 })
+    predictionMatrices.invalidateUser(users[1].id)
+
+    expect(Array.from((await predictionMatrices.get(tournament.id))!.userIds)).toEqual([users[0].id, users[1].id])
+  })
+})
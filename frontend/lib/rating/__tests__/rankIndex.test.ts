@@ -0,0 +1,54 @@
+import { describe, it, expect } from 'vitest'
+import { RatingRankIndex } from '../rankIndex'
+
+function build(ratings: number[]) {
+  return new RatingRankIndex(ratings.map((rating, i) => ({ userId: i + 1, rating })))
+}
+
+describe('RatingRankIndex', () => {
+  it('ranks like RANK() over rating DESC', () => {
+    const index = build([1500, 1700, 1500.5, 1500, 2100, 900])
+
+    expect(index.getRank(5)).toEqual({ userId: 5, rating: 2100, rank: 1, total: 6, percentile: (100 * 5) / 6 })
+    expect(index.getRank(3)!.rank).toBe(3)
+    expect(index.getRank(1)!.rank).toBe(4)
+    expect(index.getRank(4)!.rank).toBe(4)
+    expect(index.getRank(4)!.percentile).toBeCloseTo((100 * 1) / 6)
+    expect(index.getRank(6)!.percentile).toBe(0)
+    expect(index.getRank(99)).toBeNull()
+  })
+
+  it('returns neighbours in leaderboard order', () => {
+    const index = build([1500, 1700, 1500.5, 1500, 2100, 900])
+
+    expect(index.around(3, 1).map(p => p.userId)).toEqual([2, 3, 1])
+    expect(index.around(5, 2).map(p => p.userId)).toEqual([5, 2, 3])
+    expect(index.around(6, 1).map(p => p.rank)).toEqual([4, 6])
+  })
+
+  it('matches a full sort after many updates', () => {
+    const index = build([])
+    const expected = new Map<number, number>()
+    let seed = 7
+    for (let step = 0; step < 2000; step++) {
+      seed = (seed * 1103515245 + 12345) % 2147483648
+      const userId = 1 + (Math.floor(seed / 65536) % 60)
+      if (step % 7 === 0) {
+        index.removeRating(userId)
+        expected.delete(userId)
+        continue
+      }
+      const rating = 1000 + (Math.floor(seed / 1024) % 40) * 12.5
+      index.setRating(userId, rating)
+      expected.set(userId, rating)
+    }
+
+    const sorted = [...expected].sort((a, b) => b[1] - a[1] || a[0] - b[0])
+    expect(index.total).toBe(sorted.length)
+    sorted.forEach(([userId, rating], position) => {
+      expect(index.at(position)).toEqual({ userId, rating })
+      expect(index.positionOf(userId)).toBe(position)
+      expect(index.getRank(userId)!.rank).toBe(1 + sorted.filter(([, r]) => r > rating).length)
+    })
+  })
+})
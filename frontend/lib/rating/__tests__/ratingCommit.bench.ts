@@ -0,0 +1,57 @@
+import { bench, describe, beforeAll } from 'vitest'
+
+// Per-result latency against the in-memory store with a simulated 2ms round trip.
+// Run with: npm run bench -- ratingCommit
+process.env.MEM_SUPABASE_LATENCY_MS = process.env.MEM_SUPABASE_LATENCY_MS || '2'
+
+const { supabase } = await import('../../supabase')
+const { ratingService } = await import('../ratingService')
+
+const WHITE = 1
+const BLACK = 2
+
+// The query sequence of the previous write path: two reads in
+// processMatchResultWithRatings, two initialize checks, then two updates and
+// two history inserts, all awaited one after another
+async function sequentialWrite() {
+  for (const userId of [WHITE, BLACK]) {
+    await supabase.from('player_ratings').select('*').eq('user_id', userId).single()
+  }
+  const current = []
+  for (const userId of [WHITE, BLACK]) {
+    const { data } = await supabase.from('player_ratings').select('*').eq('user_id', userId).single()
+    current.push(data)
+  }
+  for (const row of current) {
+    await supabase.from('player_ratings')
+      .update({ rating: row.rating + 1, games_count: row.games_count + 1 })
+      .eq('user_id', row.user_id)
+      .select()
+      .single()
+  }
+  for (const row of current) {
+    await supabase.from('rating_history')
+      .insert({ user_id: row.user_id, old_rating: row.rating, new_rating: row.rating + 1 })
+      .select()
+      .single()
+  }
+}
+
+describe('rating write per finished game', () => {
+  beforeAll(async () => {
+    await supabase.from('users').insert([
+      { id: WHITE, telegram_id: 1001, first_name: 'White', last_name: 'Player', rating: 1500 },
+      { id: BLACK, telegram_id: 1002, first_name: 'Black', last_name: 'Player', rating: 1500 }
+    ])
+    // Create both rating rows up front so every iteration is an update
+    await ratingService.commitMatchResult({ whitePlayerId: WHITE, blackPlayerId: BLACK, result: 'draw', matchId: 0, tournamentId: 0 })
+  })
+
+  bench('sequential (8 round trips)', async () => {
+    await sequentialWrite()
+  })
+
+  bench('commitMatchResult (2 round trips)', async () => {
+    await ratingService.commitMatchResult({ whitePlayerId: WHITE, blackPlayerId: BLACK, result: 'white', matchId: 0, tournamentId: 0 })
+  })
+})
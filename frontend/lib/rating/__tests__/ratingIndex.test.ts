@@ -0,0 +1,50 @@
+import { describe, it, expect } from 'vitest'
+import { SortedRatingIndex } from '../ratingIndex'
+
+function build(ratings: Array<number | null>) {
+  return new SortedRatingIndex(ratings.map((rating, i) => ({ userId: i + 1, name: `Player ${i + 1}`, rating })))
+}
+
+describe('SortedRatingIndex', () => {
+  it('returns the nearest ratings first and skips the excluded user', () => {
+    const index = build([1500, 1400, 1620, 1480, 2000, null])
+
+    expect(index.length).toBe(5)
+    expect(index.nearest(1500, 3, 1).map(p => p.userId)).toEqual([4, 2, 3])
+    expect(index.nearest(1500, 10, 1)).toHaveLength(4)
+    expect(index.nearest(3000, 2).map(p => p.rating)).toEqual([2000, 1620])
+    expect(index.nearest(0, 1)[0]).toEqual({ userId: 2, name: 'Player 2', rating: 1400 })
+  })
+
+  it('keeps the order when ratings change', () => {
+    const index = build([1500, 1400, 1620, null])
+
+    index.setRating(2, 1700)
+    index.setRating(4, 1450)
+    expect(index.getRating(4)).toBe(1450)
+    expect(index.nearest(1000, 10).map(p => p.userId)).toEqual([4, 1, 3, 2])
+
+    index.removeRating(3)
+    expect(index.getRating(3)).toBeNull()
+    expect(index.nearest(1620, 1)[0].userId).toBe(2)
+  })
+
+  it('matches a full sort after many updates', () => {
+    const index = build([])
+    const expected = new Map<number, number>()
+    let seed = 3
+    for (let step = 0; step < 500; step++) {
+      seed = (seed * 1103515245 + 12345) % 2147483648
+      const userId = 1 + (Math.floor(seed / 65536) % 40)
+      const rating = 1000 + (Math.floor(seed / 1024) % 1200)
+      index.setRating(userId, rating)
+      expected.set(userId, rating)
+    }
+
+    const target = 1600
+    const byDistance = [...expected.values()].sort((a, b) => Math.abs(a - target) - Math.abs(b - target))
+    const got = index.nearest(target, 10).map(p => Math.abs(p.rating - target))
+    expect(got).toEqual(byDistance.slice(0, 10).map(r => Math.abs(r - target)))
+    expect(index.length).toBe(expected.size)
+  })
+})
@@ -0,0 +1,40 @@
+import { bench, describe } from 'vitest'
+import { RatingPairingService, pairKey } from '../ratingPairingService'
+import { TOURNAMENT_RATING_CONFIGS } from '../types'
+import type { TournamentParticipant } from '../../db'
+
+function buildField(size: number) {
+  let seed = 1
+  const random = () => {
+    seed = (seed * 1103515245 + 12345) % 2147483648
+    return seed / 2147483648
+  }
+  const sorted = Array.from({ length: size }, () => 800 + Math.floor(random() * 1600)).sort((a, b) => b - a)
+  const participants: TournamentParticipant[] = sorted.map((_, i) => ({
+    id: i + 1,
+    tournament_id: 1,
+    user_id: i + 1,
+    nickname: `player${i + 1}`
+  }))
+  const ratings = new Map(participants.map((p, i) => [p.user_id, sorted[i]]))
+
+  // A few earlier rounds between rating neighbours
+  const played = new Set<string>()
+  for (let k = 0; k < size * 3; k++) {
+    const i = 1 + Math.floor(random() * (size - 1))
+    played.add(pairKey(i, Math.min(size, i + 1 + Math.floor(random() * 4))))
+  }
+  return { participants, ratings, history: { played, hadBye: new Set<number>() } }
+}
+
+describe('generateOptimalPairings', () => {
+  const service = new RatingPairingService()
+  const config = TOURNAMENT_RATING_CONFIGS.classical
+
+  for (const size of [100, 1000, 1001]) {
+    const { participants, ratings, history } = buildField(size)
+    bench(`${size} players`, () => {
+      service.generateOptimalPairings(participants, ratings, config, history)
+    })
+  }
+})
@@ -26,6 +26,21 @@ vi.mock('@/lib/supabase', () => ({
             error: null
           }))
         })),
+        in: vi.fn((_column: string, userIds: number[]) => ({
+          data: userIds.map(userId => ({
+            user_id: userId,
+            rating: 1500,
+            rd: 350,
+            volatility: 0.06,
+            games_count: 0,
+            wins_count: 0,
+            losses_count: 0,
+            draws_count: 0,
+            rating_period_start: new Date().toISOString(),
+            last_updated: new Date().toISOString()
+          })),
+          error: null
+        })),
         order: vi.fn(() => ({
           limit: vi.fn(() => ({
             data: [],
@@ -74,6 +89,10 @@ vi.mock('@/lib/supabase', () => ({
           }))
         }))
       }))
+    })),
+    rpc: vi.fn((_fn: string, args: { ratings: unknown[] }) => ({
+      data: args.ratings,
+      error: null
     }))
   }
 }))
@@ -157,6 +176,27 @@ describe('RatingService', () => {
     })
   })
 
+  describe('commitMatchResult', () => {
+    it('writes both ratings and history rows in a single call', async () => {
+      const result = await ratingService.updateRatingFromMatch({
+        whitePlayerId: 1,
+        blackPlayerId: 2,
+        result: 'white',
+        matchId: 10,
+        tournamentId: 3
+      })
+
+      expect(supabase.rpc).toHaveBeenCalledTimes(1)
+      const [fn, args] = vi.mocked(supabase.rpc).mock.calls[0]
+      expect(fn).toBe('commit_match_ratings')
+      expect(args.ratings.map((r: { user_id: number }) => r.user_id)).toEqual([1, 2])
+      expect(args.history.map((h: { game_result: string }) => h.game_result)).toEqual(['win', 'loss'])
+      expect(result?.commit?.white.after.rating).toBeGreaterThan(1500)
+      expect(result?.commit?.black.after.rating).toBeLessThan(1500)
+      expect(result?.commit?.black.history.rating_change).toBeLessThan(0)
+    })
+  })
+
   describe('predictMatchOutcome', () => {
     it('should predict higher win probability for higher rated player', async () => {
       const player1Id = 1
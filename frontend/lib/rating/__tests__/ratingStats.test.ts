@@ -0,0 +1,89 @@
+import { describe, it, expect } from 'vitest'
+import { applyRatingHistoryToStats, rebuildRatingStats, type PlayerRatingStats, type StatsHistoryRow } from '../ratingStats'
+import { supabase } from '@/lib/supabase'
+
+function row(i: number, newRating: number, result: string | null, opponentRating: number | null = 1500): StatsHistoryRow {
+  return {
+    user_id: 1,
+    new_rating: newRating,
+    opponent_rating: opponentRating,
+    game_result: result,
+    created_at: new Date(Date.UTC(2024, 0, 1, 0, i)).toISOString()
+  }
+}
+
+describe('applyRatingHistoryToStats', () => {
+  it('tracks streaks, counts and extremes', () => {
+    const rows = [
+      row(0, 1510, 'win', 1600),
+      row(1, 1520, 'win', 1450),
+      row(2, 1505, 'loss'),
+      row(3, 1490, 'loss'),
+      row(4, 1475, 'loss'),
+      row(5, 1480, 'draw'),
+      row(6, 1520, 'win', 1700),
+      row(7, 1400, null, null)
+    ]
+    const stats = rebuildRatingStats(rows)!
+
+    expect(stats.wins_count).toBe(3)
+    expect(stats.losses_count).toBe(3)
+    expect(stats.draws_count).toBe(1)
+    expect(stats.current_streak).toBe(1)
+    expect(stats.longest_win_streak).toBe(2)
+    expect(stats.longest_loss_streak).toBe(3)
+    expect(stats.highest_rating).toBe(1520)
+    expect(stats.highest_rating_date).toBe(rows[6].created_at)
+    expect(stats.lowest_rating).toBe(1400)
+    expect(stats.best_win_opponent_rating).toBe(1700)
+    expect(stats.best_win_date).toBe(rows[6].created_at)
+    expect(stats.average_opponent_rating).toBeCloseTo((1600 + 1450 + 1500 * 4 + 1700) / 7)
+  })
+
+  it('matches a full recompute at every step', () => {
+    const results = ['win', 'loss', 'draw']
+    const rows: StatsHistoryRow[] = []
+    let stats: PlayerRatingStats | null = null
+    let seed = 11
+    for (let i = 0; i < 300; i++) {
+      seed = (seed * 1103515245 + 12345) % 2147483648
+      rows.push(row(i, 1200 + (Math.floor(seed / 65536) % 600), results[Math.floor(seed / 1024) % 3], 1000 + (seed % 1000)))
+      stats = applyRatingHistoryToStats(stats, rows[i])
+
+      const ratings = rows.map((r) => r.new_rating)
+      expect(stats.highest_rating).toBe(Math.max(...ratings))
+      expect(stats.lowest_rating).toBe(Math.min(...ratings))
+      expect(stats.wins_count).toBe(rows.filter((r) => r.game_result === 'win').length)
+    }
+    expect(stats).toEqual(rebuildRatingStats(rows))
+  })
+})
+
+describe('in-memory player_rating_stats trigger', () => {
+  it('updates stats on history insert and rebuilds to the same result', async () => {
+    const userId = 4242
+    for (const [i, result] of ['win', 'win', 'loss'].entries()) {
+      await supabase.from('rating_history').insert({
+        user_id: userId,
+        old_rating: 1500 + i * 10,
+        new_rating: 1510 + i * 10,
+        old_rd: 200,
+        new_rd: 190,
+        old_volatility: 0.06,
+        new_volatility: 0.06,
+        change_reason: 'match_result',
+        opponent_rating: 1500,
+        game_result: result
+      })
+    }
+
+    const { data: incremental } = await supabase.from('player_rating_stats').select('*').eq('user_id', userId).single()
+    expect(incremental.wins_count).toBe(2)
+    expect(incremental.current_streak).toBe(-1)
+
+    const { data: rebuilt } = await supabase.rpc('rebuild_player_rating_stats', { user_id_param: userId })
+    expect(rebuilt).toBe(1)
+    const { data: after } = await supabase.from('player_rating_stats').select('*').eq('user_id', userId).single()
+    expect({ ...after, id: undefined, updated_at: undefined }).toEqual({ ...incremental, id: undefined, updated_at: undefined })
+  })
+})
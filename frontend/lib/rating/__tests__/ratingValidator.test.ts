@@ -1,5 +1,6 @@
-import { describe, it, expect } from 'vitest'
+import { describe, it, expect, vi } from 'vitest'
 import { RatingValidator } from '@/lib/rating/ratingValidator'
+import { supabase } from '@/lib/supabase'
 
 describe('RatingValidator Security Tests', () => {
   let validator: RatingValidator
@@ -232,4 +233,44 @@ describe('RatingValidator Security Tests', () => {
       expect(result.reasons).toContain('Suspicious match patterns detected')
     })
   })
-})
\ No newline at end of file
+})
+
+describe('RatingValidator history window', () => {
+  it('answers every history check from one cached query', async () => {
+    const validator = new RatingValidator()
+    const now = Date.now()
+    await supabase.from('rating_history').insert(Array.from({ length: 4 }, (_, i) => ({
+      user_id: 901,
+      rating_change: 80,
+      created_at: new Date(now - i * 30_000).toISOString()
+    })))
+
+    const fromSpy = vi.spyOn(supabase, 'from')
+    const historyQueries = () => fromSpy.mock.calls.filter(([table]) => table === 'rating_history').length
+
+    const first = await validator.validateRatingUpdate(901, 1500, 1510, {})
+    await validator.validateRatingUpdate(901, 1510, 1520, {})
+
+    expect(historyQueries()).toBe(1)
+    expect(first.warnings).toContain('Слишком частые обновления рейтинга')
+    expect(first.warnings.some(w => w.startsWith('Быстрое изменение рейтинга'))).toBe(true)
+
+    validator.invalidateHistory(901)
+    await validator.validateRatingUpdate(901, 1520, 1530, {})
+    expect(historyQueries()).toBe(2)
+
+    fromSpy.mockRestore()
+  })
+
+  it('does not keep a window that was loading when it was invalidated', async () => {
+    const validator = new RatingValidator()
+    const inFlight = validator.validateRatingUpdate(902, 1500, 1510, {})
+    // A rating commit lands while the first window is still loading
+    await supabase.from('rating_history').insert({ user_id: 902, rating_change: 10, created_at: new Date().toISOString() })
+    validator.invalidateHistory(902)
+    await inFlight
+
+    const next = await validator.validateRatingUpdate(902, 1510, 1520, {})
+    expect(next.warnings).toContain('Слишком частые обновления рейтинга')
+  })
+})
@@ -0,0 +1,98 @@
+import { describe, it, expect } from 'vitest'
+import { computePredictionMatrix } from '../predictionMatrix'
+import { ForecastSimulation, runForecast, type ForecastInput } from '../standingsForecast'
+
+function buildInput(overrides: Partial<ForecastInput> = {}): ForecastInput {
+  const ratings = [2300, 1900, 1800, 1700, 1600, 1500, 1400, 1300]
+  const matrix = computePredictionMatrix(ratings.map((rating, i) => ({ user_id: i + 1, rating, rd: 60 })))
+  return {
+    players: ratings.map((rating, i) => ({ participantId: i + 1, nickname: `p${i + 1}`, points: 0, rating })),
+    win: matrix.win,
+    draw: matrix.draw,
+    played: [],
+    byes: [],
+    pending: [],
+    remainingRounds: 3,
+    scoring: { win: 1, draw: 0.5, loss: 0, bye: 1 },
+    pairing: 'swiss',
+    topN: 3,
+    ...overrides
+  }
+}
+
+describe('ForecastSimulation', () => {
+  it('is reproducible for a fixed seed', () => {
+    const first = new ForecastSimulation(buildInput(), 42)
+    const second = new ForecastSimulation(buildInput(), 42)
+    first.run(500)
+    second.run(500)
+
+    expect(first.snapshot(true)).toEqual(second.snapshot(true))
+  })
+
+  it('produces consistent probabilities and conserves points', () => {
+    const simulation = new ForecastSimulation(buildInput({ pending: [[0, 1]] }), 7)
+    simulation.run(2000)
+    const { players } = simulation.snapshot(true)
+
+    const sum = (pick: (p: typeof players[number]) => number) => players.reduce((acc, p) => acc + pick(p), 0)
+    expect(sum(p => p.winProbability)).toBeCloseTo(1, 6)
+    expect(sum(p => p.topProbability)).toBeCloseTo(3, 6)
+    // One pending game plus three rounds of four games, one point each
+    expect(sum(p => p.expectedPoints)).toBeCloseTo(13, 6)
+    expect(players[0].participantId).toBe(1)
+  })
+
+  it('gives the bye point once per round for odd fields', () => {
+    const players = buildInput().players.slice(0, 7)
+    const matrix = computePredictionMatrix(players.map(p => ({ user_id: p.participantId, rating: p.rating, rd: 60 })))
+    const odd = buildInput({ players, win: matrix.win, draw: matrix.draw, remainingRounds: 2 })
+    const simulation = new ForecastSimulation(odd, 5)
+    simulation.run(500)
+
+    const total = simulation.snapshot(true).players.reduce((acc, p) => acc + p.expectedPoints, 0)
+    expect(total).toBeCloseTo(2 * 4, 6)
+  })
+})
+
+describe('runForecast', () => {
+  it('streams partial results until the iteration target', async () => {
+    const partials: number[] = []
+    const result = await runForecast(
+      buildInput(),
+      { seed: 1, iterations: 1000, timeBudgetMs: 10000, chunkSize: 250 },
+      (partial) => partials.push(partial.iterations)
+    )
+
+    expect(partials).toEqual([250, 500, 750])
+    expect(result.iterations).toBe(1000)
+    expect(result.complete).toBe(true)
+  })
+
+  it('stops at the time budget and reports an incomplete result', async () => {
+    const result = await runForecast(
+      buildInput(),
+      { seed: 1, iterations: Number.MAX_SAFE_INTEGER, timeBudgetMs: 50, chunkSize: 100 }
+    )
+
+    expect(result.complete).toBe(false)
+    expect(result.iterations).toBeGreaterThan(0)
+  })
+
+  it('stops between chunks once aborted', async () => {
+    const abort = new AbortController()
+    const partials: number[] = []
+    const run = runForecast(
+      buildInput(),
+      { seed: 1, iterations: 1000, timeBudgetMs: 10000, chunkSize: 250 },
+      (partial) => {
+        partials.push(partial.iterations)
+        abort.abort()
+      },
+      abort.signal
+    )
+
+    await expect(run).rejects.toThrow()
+    expect(partials).toEqual([250])
+  })
+})
@@ -0,0 +1,157 @@
+import { describe, it, expect } from 'vitest'
+import { maxWeightMatching, type WeightedEdge } from '../weightedMatching'
+import { RatingPairingService, pairKey } from '../ratingPairingService'
+import { TOURNAMENT_RATING_CONFIGS } from '../types'
+import type { TournamentParticipant } from '../../db'
+
+function matchingWeight(edges: WeightedEdge[], mate: number[]): number {
+  return edges.reduce((sum, [i, j, w]) => sum + (mate[i] === j ? w : 0), 0)
+}
+
+// Exhaustive search over all matchings, for small graphs only
+function bruteForceWeight(n: number, edges: WeightedEdge[], maxCardinality: boolean): number {
+  let best = { size: 0, weight: 0 }
+  const used = new Array(n).fill(false)
+  const walk = (k: number, size: number, weight: number) => {
+    if (k === edges.length) {
+      const better = maxCardinality
+        ? size > best.size || (size === best.size && weight > best.weight)
+        : weight > best.weight
+      if (better) best = { size, weight }
+      return
+    }
+    walk(k + 1, size, weight)
+    const [i, j, w] = edges[k]
+    if (!used[i] && !used[j]) {
+      used[i] = used[j] = true
+      walk(k + 1, size + 1, weight + w)
+      used[i] = used[j] = false
+    }
+  }
+  walk(0, 0, 0)
+  return best.weight
+}
+
+function seededRandom(seed: number) {
+  return () => {
+    seed = (seed * 1103515245 + 12345) % 2147483648
+    return seed / 2147483648
+  }
+}
+
+describe('maxWeightMatching', () => {
+  it('handles empty and single-edge graphs', () => {
+    expect(maxWeightMatching([])).toEqual([])
+    expect(maxWeightMatching([[0, 1, 1]])).toEqual([1, 0])
+  })
+
+  it('prefers heavier matchings unless max cardinality is requested', () => {
+    const edges: WeightedEdge[] = [[0, 1, 1], [1, 2, 3], [2, 3, 1]]
+    expect(maxWeightMatching(edges)).toEqual([-1, 2, 1, -1])
+    expect(maxWeightMatching(edges, true)).toEqual([1, 0, 3, 2])
+  })
+
+  it('resolves nested odd cycles (blossoms)', () => {
+    const edges: WeightedEdge[] = [[0, 1, 8], [0, 2, 9], [1, 2, 10], [2, 3, 7], [0, 5, 5], [3, 4, 6]]
+    expect(maxWeightMatching(edges)).toEqual([5, 2, 1, 4, 3, 0])
+  })
+
+  it('matches brute force on random graphs', () => {
+    const random = seededRandom(42)
+    for (let trial = 0; trial < 200; trial++) {
+      const n = 2 + Math.floor(random() * 7)
+      const edges: WeightedEdge[] = []
+      for (let i = 0; i < n; i++) {
+        for (let j = i + 1; j < n; j++) {
+          if (random() < 0.6) edges.push([i, j, 1 + Math.floor(random() * 20)])
+        }
+      }
+      const maxCardinality = trial % 2 === 0
+      const mate = maxWeightMatching(edges, maxCardinality)
+      expect(matchingWeight(edges, mate)).toBe(bruteForceWeight(n, edges, maxCardinality))
+    }
+  })
+})
+
+describe('RatingPairingService.generateOptimalPairings', () => {
+  const service = new RatingPairingService()
+  const config = TOURNAMENT_RATING_CONFIGS.classical
+
+  function field(ratings: number[]) {
+    const participants: TournamentParticipant[] = ratings.map((_, i) => ({
+      id: i + 1,
+      tournament_id: 1,
+      user_id: 100 + i,
+      nickname: `player${i + 1}`
+    }))
+    return { participants, ratings: new Map(participants.map((p, i) => [p.user_id, ratings[i]])) }
+  }
+
+  it('pairs neighbours by rating and gives white to the higher rating', () => {
+    const { participants, ratings } = field([2000, 1990, 1600, 1590])
+    const result = service.generateOptimalPairings(participants, ratings, config)
+
+    expect(result.bye).toBeNull()
+    expect(result.unpaired).toHaveLength(0)
+    expect(result.pairings.map(p => [p.whiteParticipant.id, p.blackParticipant.id])).toEqual([[1, 2], [3, 4]])
+  })
+
+  it('never repeats a pairing and gives the bye to the lowest eligible player', () => {
+    const { participants, ratings } = field([2100, 2050, 2000, 1950, 1900, 1850, 1800])
+    const history = {
+      played: new Set([pairKey(1, 2), pairKey(3, 4)]),
+      hadBye: new Set([7])
+    }
+    const result = service.generateOptimalPairings(participants, ratings, config, history)
+
+    expect(result.bye?.id).toBe(6)
+    expect(result.unpaired).toHaveLength(0)
+    expect(result.pairings).toHaveLength(3)
+    for (const p of result.pairings) {
+      expect(history.played.has(pairKey(p.whiteParticipant.id!, p.blackParticipant.id!))).toBe(false)
+    }
+  })
+
+  it('never pairs players further apart than the rating range', () => {
+    // classical: ratingRange.max = 250
+    const { participants, ratings } = field([2000, 1990, 1500, 1200])
+    const result = service.generateOptimalPairings(participants, ratings, config)
+
+    expect(result.pairings.map(p => [p.whiteParticipant.id, p.blackParticipant.id])).toEqual([[1, 2]])
+    expect(result.unpaired.map(p => p.id)).toEqual([3, 4])
+  })
+
+  it('offers sparse candidates on both sides of a player in a large field', () => {
+    // 150 players 10 points apart (sparse mode); the lowest-rated player has
+    // already met the 11 players just above it, so every opponent it can still
+    // get is higher-rated and further up the sorted list
+    const { participants, ratings } = field(Array.from({ length: 150 }, (_, i) => 2500 - i * 10))
+    const played = new Set<string>()
+    for (let id = 139; id < 150; id++) played.add(pairKey(id, 150))
+    const result = service.generateOptimalPairings(participants, ratings, config, { played, hadBye: new Set() })
+
+    expect(result.pairings).toHaveLength(75)
+    expect(result.unpaired).toHaveLength(0)
+    for (const p of result.pairings) {
+      expect(p.ratingDifference).toBeLessThanOrEqual(config.ratingRange.max)
+      expect(played.has(pairKey(p.whiteParticipant.id!, p.blackParticipant.id!))).toBe(false)
+    }
+  })
+
+  it('pairs a large field without rematches', () => {
+    const random = seededRandom(7)
+    const sorted = Array.from({ length: 301 }, () => 1000 + Math.floor(random() * 1400)).sort((a, b) => b - a)
+    const { participants, ratings } = field(sorted)
+    const played = new Set<string>()
+    for (let i = 1; i < participants.length; i += 2) played.add(pairKey(i, i + 1))
+
+    const result = service.generateOptimalPairings(participants, ratings, config, { played, hadBye: new Set() })
+
+    expect(result.pairings).toHaveLength(150)
+    expect(result.bye).not.toBeNull()
+    expect(result.unpaired).toHaveLength(0)
+    for (const p of result.pairings) {
+      expect(played.has(pairKey(p.whiteParticipant.id!, p.blackParticipant.id!))).toBe(false)
+    }
+  })
+})
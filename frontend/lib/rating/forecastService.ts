@@ -0,0 +1,278 @@
+import { Worker } from 'worker_threads'
+import { supabase } from '../supabase'
+import { getTournamentById, listParticipantsLite, sumMatchPoints, type MatchLite } from '../db'
+import { computePredictionMatrix, loadPredictionInputs } from './predictionMatrix'
+import {
+  DEFAULT_FORECAST_OPTIONS,
+  runForecast,
+  type ForecastInput,
+  type ForecastOptions,
+  type ForecastResult
+} from './standingsForecast'
+import { forecastWorkerSource } from './forecastWorker'
+import { createLogger } from '../logger'
+import { metrics } from '../metrics'
+
+const log = createLogger('rating/forecastService')
+
+// runner="inline" means the worker could not be started and simulations ran
+// on the request thread
+const forecastRuns = metrics.counter('forecast_runs_total', 'Standings forecast simulations by runner', ['runner'])
+
+const DEFAULT_RATING = 1500
+const DEFAULT_RD = 350
+const MAX_CACHED_FORECASTS = 100
+
+/**
+ * FNV-1a hash, used to fingerprint the round/match state of a tournament
+ */
+function hashState(text: string): string {
+  let hash = 0x811c9dc5
+  for (let i = 0; i < text.length; i++) {
+    hash ^= text.charCodeAt(i)
+    hash = Math.imul(hash, 0x01000193)
+  }
+  return (hash >>> 0).toString(16)
+}
+
+export class StandingsForecastService {
+  // Completed forecasts keyed by tournament, round state and options
+  private cache = new Map<string, ForecastResult>()
+  // The inline fallback is logged once; the counter tracks every run
+  private fallbackLogged = false
+
+  /**
+   * Forecast final standings; partial results are passed to `onProgress`.
+   * Aborting `signal` stops the simulation and resolves to null
+   */
+  async forecast(
+    tournamentId: number,
+    options: Partial<ForecastOptions> & { topN?: number } = {},
+    onProgress?: (partial: ForecastResult) => void,
+    signal?: AbortSignal
+  ): Promise<ForecastResult | null> {
+    try {
+      const { topN = 3, ...overrides } = options
+      const state = await this.loadState(tournamentId, topN)
+      if (!state) {
+        return null
+      }
+
+      const runOptions: ForecastOptions = { ...DEFAULT_FORECAST_OPTIONS, ...overrides }
+      const key = [tournamentId, state.stateKey, runOptions.seed, runOptions.iterations, topN].join('|')
+      const cached = this.cache.get(key)
+      if (cached) {
+        return cached
+      }
+
+      const result = await this.runInWorker(state.input, runOptions, onProgress, signal)
+
+      // Budget-limited runs depend on machine speed, so only complete ones are reused
+      if (result.complete) {
+        if (this.cache.size >= MAX_CACHED_FORECASTS) {
+          this.cache.delete(this.cache.keys().next().value as string)
+        }
+        this.cache.set(key, result)
+      }
+      return result
+    } catch (error) {
+      if (!signal?.aborted) {
+        log.error('Error forecasting standings', { error })
+      }
+      return null
+    }
+  }
+
+  /**
+   * Snapshot standings, history and ratings into a simulation input
+   */
+  private async loadState(
+    tournamentId: number,
+    topN: number
+  ): Promise<{ input: ForecastInput; stateKey: string } | null> {
+    const tournament = await getTournamentById(tournamentId)
+    if (!tournament) {
+      return null
+    }
+
+    const participants = await listParticipantsLite(tournamentId)
+
+    // Rounds and matches are read once; points are folded from the same
+    // matches the simulation starts from, as getStandings does
+    const { data: rounds, error: roundsError } = await supabase
+      .from('rounds')
+      .select('id, number, status')
+      .eq('tournament_id', tournamentId)
+      .order('number', { ascending: true })
+
+    if (roundsError) {
+      throw new Error(`Failed to load rounds: ${roundsError.message}`)
+    }
+
+    const roundRows = (rounds || []) as Array<{ id: number; number: number; status: string }>
+    let matchRows: MatchLite[] = []
+
+    if (roundRows.length > 0) {
+      const { data: matches, error: matchesError } = await supabase
+        .from('matches')
+        .select('id, round_id, white_participant_id, black_participant_id, result, score_white, score_black')
+        .in('round_id', roundRows.map((r) => r.id))
+
+      if (matchesError) {
+        throw new Error(`Failed to load matches: ${matchesError.message}`)
+      }
+      matchRows = matches || []
+    }
+
+    const index = new Map<number, number>()
+    participants.forEach((p, i) => index.set(p.id, i))
+    const pointsOf = sumMatchPoints(matchRows)
+
+    const ratingRows = await loadPredictionInputs(participants.map((p) => p.user_id))
+    const ratingOf = new Map(ratingRows.map((r) => [r.user_id, r]))
+    const inputs = participants.map((p) => ratingOf.get(p.user_id) ||
+      { user_id: p.user_id, rating: DEFAULT_RATING, rd: DEFAULT_RD })
+    const matrix = computePredictionMatrix(inputs)
+
+    const lockedRounds = new Set(roundRows.filter((r) => r.status === 'locked').map((r) => r.id))
+    const played: Array<[number, number]> = []
+    const pending: Array<[number, number]> = []
+    const byes: number[] = []
+    for (const m of matchRows) {
+      const white = m.white_participant_id !== null ? index.get(m.white_participant_id) : undefined
+      const black = m.black_participant_id !== null ? index.get(m.black_participant_id) : undefined
+      if (white === undefined) continue
+      if (black === undefined || m.result === 'bye') {
+        byes.push(white)
+        continue
+      }
+      played.push([white, black])
+      if (!lockedRounds.has(m.round_id) && (!m.result || m.result === 'not_played')) {
+        pending.push([white, black])
+      }
+    }
+
+    const stateKey = hashState(
+      roundRows.map((r) => `${r.id}:${r.status}`).join(',') + '/' +
+      matchRows
+        .slice()
+        .sort((a, b) => a.id - b.id)
+        .map((m) => `${m.id}:${m.white_participant_id}:${m.black_participant_id}:${m.result}`)
+        .join(',') + '/' +
+      inputs.map((r) => `${r.user_id}:${r.rating}:${r.rd}`).join(',')
+    )
+
+    return {
+      stateKey,
+      input: {
+        players: participants.map((p, i) => ({
+          participantId: p.id,
+          nickname: p.nickname,
+          points: pointsOf.get(p.id) ?? 0,
+          rating: inputs[i].rating
+        })),
+        win: matrix.win,
+        draw: matrix.draw,
+        played,
+        byes,
+        pending,
+        remainingRounds: Math.max(0, (tournament.rounds || 0) - roundRows.length),
+        scoring: {
+          win: tournament.points_win,
+          draw: tournament.points_draw,
+          loss: tournament.points_loss,
+          bye: tournament.bye_points
+        },
+        pairing: (tournament.format || '').includes('swiss') ? 'swiss' : 'rating',
+        topN
+      }
+    }
+  }
+
+  /**
+   * Simulate on a worker thread; fall back to chunked inline runs when the
+   * worker cannot be started. Aborting `signal` terminates the worker
+   */
+  private runInWorker(
+    input: ForecastInput,
+    options: ForecastOptions,
+    onProgress?: (partial: ForecastResult) => void,
+    signal?: AbortSignal
+  ): Promise<ForecastResult> {
+    return new Promise((resolve, reject) => {
+      if (signal?.aborted) {
+        reject(signal.reason)
+        return
+      }
+
+      const runInline = (error: unknown) => {
+        forecastRuns.inc({ runner: 'inline' })
+        if (!this.fallbackLogged) {
+          this.fallbackLogged = true
+          log.warn('Forecast worker unavailable, simulating inline', { error })
+        }
+        runForecast(input, options, onProgress, signal).then(resolve, reject)
+      }
+
+      let worker: Worker
+      try {
+        worker = new Worker(forecastWorkerSource(), { eval: true })
+      } catch (error) {
+        runInline(error)
+        return
+      }
+
+      let started = false
+      let settled = false
+      const settle = (error: unknown, result?: ForecastResult) => {
+        if (settled) return
+        settled = true
+        clearTimeout(timer)
+        signal?.removeEventListener('abort', onAbort)
+        worker.terminate()
+        if (error) reject(error)
+        else resolve(result!)
+      }
+      const onAbort = () => settle(signal!.reason)
+      signal?.addEventListener('abort', onAbort, { once: true })
+
+      const timer = setTimeout(() => {
+        settle(new Error('Forecast worker timed out'))
+      }, options.timeBudgetMs + 5000)
+
+      worker.on('message', (message: { type: string; result?: ForecastResult; message?: string }) => {
+        if (!started) {
+          started = true
+          forecastRuns.inc({ runner: 'worker' })
+        }
+        if (message.type === 'progress') {
+          // A throwing listener would otherwise escape as an uncaught exception
+          try {
+            onProgress?.(message.result!)
+          } catch (error) {
+            settle(error)
+          }
+          return
+        }
+        if (message.type === 'done') settle(null, message.result!)
+        else settle(new Error(message.message))
+      })
+
+      worker.on('error', (error) => {
+        if (started || settled) {
+          settle(error)
+          return
+        }
+        // Failed while starting: nothing ran yet, simulate inline
+        settled = true
+        clearTimeout(timer)
+        signal?.removeEventListener('abort', onAbort)
+        runInline(error)
+      })
+
+      worker.postMessage({ input, options })
+    })
+  }
+}
+
+export const standingsForecastService = new StandingsForecastService()
@@ -0,0 +1,36 @@
+import { createRng, ForecastSimulation, runForecast, type ForecastInput, type ForecastOptions } from './standingsForecast'
+
+interface WorkerPort {
+  on(event: 'message', listener: (message: { input: ForecastInput; options: ForecastOptions }) => void): void
+  postMessage(message: unknown): void
+}
+
+// Worker loop: { input, options } in, { type: 'progress' | 'done' | 'error' } out.
+// It runs from source text, so it may only use its arguments
+function serveForecasts(port: WorkerPort, run: typeof runForecast) {
+  port.on('message', async ({ input, options }) => {
+    try {
+      const result = await run(input, options, (partial) => {
+        port.postMessage({ type: 'progress', result: partial })
+      })
+      port.postMessage({ type: 'done', result })
+    } catch (error) {
+      port.postMessage({ type: 'error', message: error instanceof Error ? error.message : String(error) })
+    }
+  })
+}
+
+/**
+ * Source of the forecast worker, for `new Worker(source, { eval: true })`.
+ * It is assembled from the compiled simulation functions, which use nothing
+ * else from their module, so no separate worker entry has to be emitted by the
+ * build and it loads the same under Next, vitest and plain Node
+ */
+export function forecastWorkerSource(): string {
+  return [
+    `const ${createRng.name} = ${createRng}`,
+    `const ${ForecastSimulation.name} = ${ForecastSimulation}`,
+    `const ${runForecast.name} = ${runForecast}`,
+    `;(${serveForecasts})(require('worker_threads').parentPort, ${runForecast.name})`
+  ].join('\n')
+}
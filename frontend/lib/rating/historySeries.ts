@@ -0,0 +1,255 @@
+import { supabase } from '../supabase'
+import { createLogger } from '../logger'
+import { metrics } from '../metrics'
+
+const log = createLogger('rating/historySeries')
+
+const seriesLookups = metrics.counter('rating_history_series_lookups_total', 'Downsampled history series lookups', ['result'])
+
+// Raw history rows read per page; a page is downsampled to the requested point count
+const PAGE_ROWS = 5000
+const MAX_CACHED_USERS = 500
+const MAX_CACHED_SERIES_PER_USER = 20
+// Relative ranges ("30d") move with the clock, so cached series also age out
+const SERIES_MAX_AGE_MS = 60 * 60 * 1000
+
+export const HISTORY_RANGES: Record<string, number | null> = {
+  '7d': 7,
+  '30d': 30,
+  '90d': 90,
+  '1y': 365,
+  all: null
+}
+
+export interface HistorySeriesPoint {
+  created_at: string
+  rating: number
+  rd: number
+  volatility: number
+  // Change since the previous point of the series
+  rating_change: number
+  // Rated games folded into this point since the previous one
+  matches_played: number
+}
+
+export interface HistorySeries {
+  points: HistorySeriesPoint[]
+  // Raw history rows the points were chosen from
+  sourceRows: number
+  nextCursor: string | null
+}
+
+export interface HistorySeriesQuery {
+  from?: string | null
+  to?: string | null
+  points: number
+  cursor?: string | null
+}
+
+interface HistoryRow {
+  id: number
+  created_at: string
+  new_rating: number
+  new_rd: number
+  new_volatility: number
+  rating_change: number
+}
+
+// Last raw row of a page: created_at and id
+interface HistoryCursor {
+  t: string
+  i: number
+}
+
+export function encodeHistoryCursor(cursor: HistoryCursor): string {
+  return Buffer.from(JSON.stringify(cursor)).toString('base64url')
+}
+
+/**
+ * Parse a cursor from encodeHistoryCursor; throws on malformed input
+ */
+export function decodeHistoryCursor(value: string): HistoryCursor {
+  const cursor = JSON.parse(Buffer.from(value, 'base64url').toString('utf8'))
+  if (!cursor || typeof cursor.t !== 'string' || !Number.isFinite(cursor.i)) {
+    throw new Error('Invalid history cursor')
+  }
+  return cursor as HistoryCursor
+}
+
+/**
+ * Largest-Triangle-Three-Buckets over several series sharing one x axis.
+ * Each series is scaled to its own range so rating, RD and volatility weigh
+ * equally; returns the kept indexes (first and last are always kept).
+ */
+export function lttbIndexes(x: ArrayLike<number>, series: Array<ArrayLike<number>>, threshold: number): number[] {
+  const n = x.length
+  if (threshold >= n || threshold < 3) {
+    return Array.from({ length: threshold < 3 ? Math.min(n, threshold) : n }, (_, i) => i)
+  }
+
+  const scales = series.map((values) => {
+    let min = Infinity
+    let max = -Infinity
+    for (let i = 0; i < n; i++) {
+      if (values[i] < min) min = values[i]
+      if (values[i] > max) max = values[i]
+    }
+    return max > min ? 1 / (max - min) : 0
+  })
+
+  const kept = [0]
+  const bucketSize = (n - 2) / (threshold - 2)
+  let previous = 0
+
+  for (let bucket = 0; bucket < threshold - 2; bucket++) {
+    const start = Math.floor(bucket * bucketSize) + 1
+    const end = Math.floor((bucket + 1) * bucketSize) + 1
+
+    // Average of the next bucket is the third triangle vertex
+    const nextStart = end
+    const nextEnd = Math.min(Math.floor((bucket + 2) * bucketSize) + 1, n)
+    let avgX = 0
+    for (let i = nextStart; i < nextEnd; i++) avgX += x[i]
+    avgX /= nextEnd - nextStart
+    const avgY = series.map((values) => {
+      let sum = 0
+      for (let i = nextStart; i < nextEnd; i++) sum += values[i]
+      return sum / (nextEnd - nextStart)
+    })
+
+    let best = start
+    let bestArea = -1
+    for (let i = start; i < end; i++) {
+      let area = 0
+      for (let s = 0; s < series.length; s++) {
+        const values = series[s]
+        area += scales[s] * Math.abs(
+          (x[previous] - avgX) * (values[i] - values[previous]) -
+          (x[previous] - x[i]) * (avgY[s] - values[previous])
+        )
+      }
+      if (area > bestArea) {
+        bestArea = area
+        best = i
+      }
+    }
+
+    kept.push(best)
+    previous = best
+  }
+
+  kept.push(n - 1)
+  return kept
+}
+
+/**
+ * Downsample chronological history rows to at most `points` chart points
+ */
+export function downsampleHistory(rows: HistoryRow[], points: number): HistorySeriesPoint[] {
+  const x = rows.map((row) => Date.parse(row.created_at))
+  const kept = lttbIndexes(x, [
+    rows.map((row) => row.new_rating),
+    rows.map((row) => row.new_rd),
+    rows.map((row) => row.new_volatility)
+  ], points)
+
+  return kept.map((index, k) => {
+    const row = rows[index]
+    const previous = k > 0 ? rows[kept[k - 1]] : null
+    return {
+      created_at: row.created_at,
+      rating: row.new_rating,
+      rd: row.new_rd,
+      volatility: row.new_volatility,
+      rating_change: previous ? row.new_rating - previous.new_rating : row.rating_change,
+      matches_played: previous ? index - kept[k - 1] : 1
+    }
+  })
+}
+
+/**
+ * Downsampled rating-history series per user and range, cached until the
+ * user's rating next changes (see RatingService.onRatingWritten)
+ */
+class RatingHistorySeriesCache {
+  private series = new Map<number, Map<string, { value: HistorySeries; at: number }>>()
+  // Bumped on every invalidation so a load that raced with a write is not cached
+  private generation = 0
+
+  async get(userId: number, query: HistorySeriesQuery): Promise<HistorySeries | null> {
+    const key = [query.from ?? '', query.to ?? '', query.points, query.cursor ?? ''].join('|')
+    const cached = this.series.get(userId)?.get(key)
+    if (cached && Date.now() - cached.at < SERIES_MAX_AGE_MS) {
+      seriesLookups.inc({ result: 'hit' })
+      return cached.value
+    }
+    seriesLookups.inc({ result: 'miss' })
+
+    const startedAt = this.generation
+    try {
+      const value = await this.load(userId, query)
+      if (this.generation === startedAt) {
+        this.store(userId, key, value)
+      }
+      return value
+    } catch (error) {
+      log.error('Error loading rating history series', { error })
+      return null
+    }
+  }
+
+  invalidateUser(userId: number): void {
+    this.generation++
+    this.series.delete(userId)
+  }
+
+  private store(userId: number, key: string, value: HistorySeries): void {
+    let entries = this.series.get(userId)
+    if (!entries) {
+      if (this.series.size >= MAX_CACHED_USERS) {
+        this.series.delete(this.series.keys().next().value as number)
+      }
+      entries = new Map()
+      this.series.set(userId, entries)
+    }
+    if (entries.size >= MAX_CACHED_SERIES_PER_USER) {
+      entries.delete(entries.keys().next().value as string)
+    }
+    entries.set(key, { value, at: Date.now() })
+  }
+
+  private async load(userId: number, query: HistorySeriesQuery): Promise<HistorySeries> {
+    const after = query.cursor ? decodeHistoryCursor(query.cursor) : null
+    const from = after ? after.t : query.from
+
+    let request = supabase
+      .from('rating_history')
+      .select('id, created_at, new_rating, new_rd, new_volatility, rating_change')
+      .eq('user_id', userId)
+    if (from) request = request.gte('created_at', from)
+    if (query.to) request = request.lte('created_at', query.to)
+
+    const { data, error } = await request
+      .order('created_at', { ascending: true })
+      .limit(PAGE_ROWS + 1)
+
+    if (error) {
+      throw new Error(`Failed to get rating history: ${error.message}`)
+    }
+
+    // Rows sharing the cursor's timestamp were served unless their id is newer
+    const rows = ((data || []) as HistoryRow[])
+      .filter((row) => !after || row.created_at !== after.t || row.id > after.i)
+    const hasMore = (data || []).length > PAGE_ROWS
+    const page = rows.slice(0, PAGE_ROWS)
+    const last = page[page.length - 1]
+
+    return {
+      points: downsampleHistory(page, query.points),
+      sourceRows: page.length,
+      nextCursor: hasMore && last ? encodeHistoryCursor({ t: last.created_at, i: last.id }) : null
+    }
+  }
+}
+
+export const ratingHistorySeries = new RatingHistorySeriesCache()
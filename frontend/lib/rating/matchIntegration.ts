@@ -2,6 +2,9 @@ import { supabase } from '../supabase'
 import { ratingService } from './ratingService'
 import { type Match, type TournamentParticipant, type User } from '../db'
 import type { RatingHistory } from './ratingService'
+import { createLogger } from '../logger'
+
+const log = createLogger('rating/matchIntegration')
 
 /**
  * Enhanced match result update with rating system integration
@@ -36,7 +39,7 @@ async function getMatchParticipants(matchId: number): Promise<{
       .single()
 
     if (matchError || !matchData) {
-      console.error('Match not found:', matchError)
+      log.error('Match not found', { error: matchError })
       return null
     }
 
@@ -48,7 +51,7 @@ async function getMatchParticipants(matchId: number): Promise<{
     const tournamentId = match.rounds?.[0]?.tournament_id
 
     if (!tournamentId) {
-      console.error('Tournament ID not found in match data')
+      log.error('Tournament ID not found in match data')
       return null
     }
 
@@ -58,7 +61,7 @@ async function getMatchParticipants(matchId: number): Promise<{
       tournamentId
     }
   } catch (error) {
-    console.error('Error getting match participants:', error)
+    log.error('Error getting match participants', { error })
     return null
   }
 }
@@ -121,11 +124,7 @@ export async function processMatchResultWithRatings(
         }
     }
 
-    // Store old ratings for response
-    const oldWhiteRating = await ratingService.getPlayerRating(whiteUserId)
-    const oldBlackRating = await ratingService.getPlayerRating(blackUserId)
-
-    // Update ratings
+    // Update ratings (both players read once and written in one call)
     const ratingUpdate = await ratingService.updateRatingFromMatch({
       whitePlayerId: whiteUserId,
       blackPlayerId: blackUserId,
@@ -134,8 +133,8 @@ export async function processMatchResultWithRatings(
       tournamentId
     })
 
-    if (!ratingUpdate || !ratingUpdate.success) {
-      console.error('Rating update failed:', ratingUpdate?.error)
+    if (!ratingUpdate || !ratingUpdate.success || !ratingUpdate.commit) {
+      log.error('Rating update failed', { matchId, error: ratingUpdate?.error })
       return {
         success: false,
         error: `Rating update failed: ${ratingUpdate?.error || 'Unknown error'}`
@@ -143,23 +142,12 @@ export async function processMatchResultWithRatings(
     }
 
     // Prepare rating updates response
-    const ratingUpdates = []
-    if (oldWhiteRating) {
-      ratingUpdates.push({
-        userId: whiteUserId,
-        oldRating: oldWhiteRating.rating,
-        newRating: ratingUpdate.newRating.rating,
-        change: ratingUpdate.newRating.rating - oldWhiteRating.rating
-      })
-    }
-    if (oldBlackRating) {
-      ratingUpdates.push({
-        userId: blackUserId,
-        oldRating: oldBlackRating.rating,
-        newRating: ratingUpdate.newRating.rating,
-        change: ratingUpdate.newRating.rating - oldBlackRating.rating
-      })
-    }
+    const ratingUpdates = [ratingUpdate.commit.white, ratingUpdate.commit.black].map((side) => ({
+      userId: side.after.user_id,
+      oldRating: side.before.rating,
+      newRating: side.after.rating,
+      change: side.after.rating - side.before.rating
+    }))
 
     return {
       success: true,
@@ -167,7 +155,7 @@ export async function processMatchResultWithRatings(
     }
 
   } catch (error) {
-    console.error('Error processing match result with ratings:', error)
+    log.error('Error processing match result with ratings', { error })
     return {
       success: false,
       error: error instanceof Error ? error.message : 'Unknown error'
@@ -243,7 +231,7 @@ export async function validateRatingEligibility(userId: number): Promise<{
       warnings
     }
   } catch (error) {
-    console.error('Error validating rating eligibility:', error)
+    log.error('Error validating rating eligibility', { error })
     return {
       eligible: false,
       errors: ['Validation error occurred'],
@@ -291,10 +279,10 @@ export async function getUserRatingStats(userId: number): Promise<{
       else if (avgRecent < avgPrevious - 20) ratingTrend = 'down'
     }
 
-    // Get stats from player_rating_stats
+    // Get stats from player_rating_stats (maintained incrementally on every history insert)
     const { data: stats } = await supabase
       .from('player_rating_stats')
-      .select('*')
+      .select('highest_rating, lowest_rating, average_opponent_rating')
       .eq('user_id', userId)
       .single()
 
@@ -310,7 +298,7 @@ export async function getUserRatingStats(userId: number): Promise<{
       ratingTrend
     }
   } catch (error) {
-    console.error('Error getting user rating stats:', error)
+    log.error('Error getting user rating stats', { error })
     return null
   }
 }
\ No newline at end of file
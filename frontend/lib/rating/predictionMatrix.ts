@@ -0,0 +1,195 @@
+import { supabase } from '../supabase'
+import { createLogger } from '../logger'
+
+const log = createLogger('rating/predictionMatrix')
+
+// Glicko-2 scale used by the glicko2 package (rating = 173.7178 * mu + 1500)
+const GLICKO_SCALE = 173.7178
+const GLICKO_BASE = 1500
+
+export interface PredictionInput {
+  user_id: number
+  rating: number
+  rd: number
+}
+
+/**
+ * Win/draw probabilities for every ordered pair of players.
+ *
+ * Row-major n x n: `win[i * n + j]` is the chance that player i beats player j.
+ * The loss probability is the transpose (`win[j * n + i]`) and `draw` is symmetric.
+ */
+export interface PredictionMatrix {
+  userIds: Int32Array
+  win: Float32Array
+  draw: Float32Array
+}
+
+/**
+ * Same draw estimate as RatingService.predictMatchOutcome
+ */
+export function estimateDrawProbability(rating1: number, rating2: number): number {
+  return Math.min(0.3, 0.1 + Math.abs(rating1 - rating2) / 1000)
+}
+
+/**
+ * Compute the full matrix in one pass, matching predictMatchOutcome pair by pair
+ */
+export function computePredictionMatrix(players: PredictionInput[]): PredictionMatrix {
+  const n = players.length
+  const userIds = new Int32Array(n)
+  const mu = new Float64Array(n)
+  const phiSquared = new Float64Array(n)
+  for (let i = 0; i < n; i++) {
+    userIds[i] = players[i].user_id
+    mu[i] = (players[i].rating - GLICKO_BASE) / GLICKO_SCALE
+    const phi = players[i].rd / GLICKO_SCALE
+    phiSquared[i] = phi * phi
+  }
+
+  const win = new Float32Array(n * n)
+  const draw = new Float32Array(n * n)
+  const gFactor = 3 / (Math.PI * Math.PI)
+
+  for (let i = 0; i < n; i++) {
+    for (let j = i + 1; j < n; j++) {
+      const g = 1 / Math.sqrt(1 + gFactor * (phiSquared[i] + phiSquared[j]))
+      const expected = 1 / (1 + Math.exp(-g * (mu[i] - mu[j])))
+      const d = estimateDrawProbability(players[i].rating, players[j].rating)
+
+      win[i * n + j] = expected * (1 - d)
+      win[j * n + i] = (1 - expected) * (1 - d)
+      draw[i * n + j] = d
+      draw[j * n + i] = d
+    }
+  }
+
+  return { userIds, win, draw }
+}
+
+/**
+ * Probabilities for selected pairings, read from a computed matrix
+ */
+export function lookupPairings(
+  matrix: PredictionMatrix,
+  pairings: Array<[number, number]>
+): Array<{
+  player1: number
+  player2: number
+  player1WinProbability: number
+  drawProbability: number
+  player2WinProbability: number
+} | null> {
+  const n = matrix.userIds.length
+  const position = new Map<number, number>()
+  matrix.userIds.forEach((userId, i) => position.set(userId, i))
+
+  return pairings.map(([player1, player2]) => {
+    const i = position.get(player1)
+    const j = position.get(player2)
+    if (i === undefined || j === undefined || i === j) return null
+    return {
+      player1,
+      player2,
+      player1WinProbability: matrix.win[i * n + j],
+      drawProbability: matrix.draw[i * n + j],
+      player2WinProbability: matrix.win[j * n + i]
+    }
+  })
+}
+
+/**
+ * Binary layout: int32 n, int32[n] user ids, float32[n*n] win, float32[n*n] draw
+ * (little-endian, every section 4-byte aligned)
+ */
+export function encodePredictionMatrix(matrix: PredictionMatrix): ArrayBuffer {
+  const n = matrix.userIds.length
+  const buffer = new ArrayBuffer(4 + 4 * n + 8 * n * n)
+  const view = new DataView(buffer)
+  view.setInt32(0, n, true)
+  let offset = 4
+  for (let i = 0; i < n; i++, offset += 4) view.setInt32(offset, matrix.userIds[i], true)
+  for (let k = 0; k < n * n; k++, offset += 4) view.setFloat32(offset, matrix.win[k], true)
+  for (let k = 0; k < n * n; k++, offset += 4) view.setFloat32(offset, matrix.draw[k], true)
+  return buffer
+}
+
+/**
+ * Load ratings for a set of users in one query
+ */
+export async function loadPredictionInputs(userIds: number[]): Promise<PredictionInput[]> {
+  if (userIds.length === 0) return []
+
+  const { data, error } = await supabase
+    .from('player_ratings')
+    .select('user_id, rating, rd')
+    .in('user_id', userIds)
+
+  if (error) {
+    throw new Error(`Failed to load ratings: ${error.message}`)
+  }
+
+  return ((data || []) as PredictionInput[]).sort((a, b) => a.user_id - b.user_id)
+}
+
+/**
+ * Per-tournament prediction matrices, dropped as soon as a participant's rating
+ * changes, including a participant who had no rating yet (and so is missing
+ * from the matrix)
+ */
+class PredictionMatrixCache {
+  private matrices = new Map<number, { matrix: PredictionMatrix; participants: Set<number> }>()
+  private loading = new Map<number, Promise<PredictionMatrix | null>>()
+  private generation = 0
+
+  async get(tournamentId: number): Promise<PredictionMatrix | null> {
+    const cached = this.matrices.get(tournamentId)
+    if (cached) return cached.matrix
+
+    let pending = this.loading.get(tournamentId)
+    if (!pending) {
+      pending = this.build(tournamentId).finally(() => this.loading.delete(tournamentId))
+      this.loading.set(tournamentId, pending)
+    }
+    return pending
+  }
+
+  invalidateUser(userId: number): void {
+    this.generation++
+    for (const [tournamentId, { participants }] of this.matrices) {
+      if (participants.has(userId)) this.matrices.delete(tournamentId)
+    }
+  }
+
+  invalidate(tournamentId: number): void {
+    this.generation++
+    this.matrices.delete(tournamentId)
+  }
+
+  private async build(tournamentId: number): Promise<PredictionMatrix | null> {
+    const startedAt = this.generation
+    try {
+      const { data: participants, error } = await supabase
+        .from('tournament_participants')
+        .select('user_id')
+        .eq('tournament_id', tournamentId)
+
+      if (error) {
+        throw new Error(`Failed to load participants: ${error.message}`)
+      }
+
+      const userIds = new Set(((participants || []) as Array<{ user_id: number }>).map((p) => p.user_id))
+      const matrix = computePredictionMatrix(await loadPredictionInputs([...userIds]))
+
+      if (this.generation === startedAt) {
+        this.matrices.set(tournamentId, { matrix, participants: userIds })
+      }
+      return matrix
+    } catch (error) {
+      log.error('Error building prediction matrix', { error })
+      return null
+    }
+  }
+}
+
+export const predictionMatrices = new PredictionMatrixCache()
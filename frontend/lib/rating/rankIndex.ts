@@ -0,0 +1,258 @@
+import { supabase } from '../supabase'
+import { createLogger } from '../logger'
+import { metrics } from '../metrics'
+
+const log = createLogger('rating/rankIndex')
+
+const rankIndexBuilds = metrics.histogram('rating_rank_index_build_duration_seconds', 'Rank index seed time from the leaderboard', ['outcome'])
+
+// Ratings are bucketed by whole points; anything outside [0, BUCKET_COUNT) is clamped
+const BUCKET_COUNT = 4096
+const SEED_PAGE_SIZE = 1000
+// Reseed periodically so writes made by other server instances are picked up
+const MAX_INDEX_AGE_MS = 5 * 60 * 1000
+
+export interface RankedPlayer {
+  userId: number
+  rating: number
+}
+
+export interface PlayerRank {
+  userId: number
+  rating: number
+  // RANK() semantics, same as the leaderboard: tied ratings share a rank
+  rank: number
+  total: number
+  // Share of ranked players rated strictly lower, 0-100
+  percentile: number
+}
+
+/**
+ * Fenwick (binary indexed) tree of counts
+ */
+class FenwickTree {
+  private tree: Int32Array
+
+  constructor(readonly size: number) {
+    this.tree = new Int32Array(size + 1)
+  }
+
+  add(index: number, delta: number): void {
+    for (let i = index + 1; i <= this.size; i += i & -i) this.tree[i] += delta
+  }
+
+  /**
+   * Sum of counts in [0, index)
+   */
+  prefix(index: number): number {
+    let sum = 0
+    for (let i = index; i > 0; i -= i & -i) sum += this.tree[i]
+    return sum
+  }
+
+  /**
+   * Index holding the `order`-th item (0-based) and the items before that index
+   */
+  findByOrder(order: number): { index: number; before: number } {
+    let position = 0
+    let before = 0
+    for (let step = 1 << Math.floor(Math.log2(this.size)); step > 0; step >>= 1) {
+      const next = position + step
+      if (next <= this.size && before + this.tree[next] <= order) {
+        position = next
+        before += this.tree[next]
+      }
+    }
+    return { index: position, before }
+  }
+}
+
+/**
+ * Order statistics over player ratings: counts per rating bucket in a Fenwick
+ * tree (bucket 0 holds the highest ratings), exact order inside each bucket.
+ * Rank, percentile and position lookups are O(log buckets + bucket size).
+ */
+export class RatingRankIndex {
+  private counts = new FenwickTree(BUCKET_COUNT)
+  // Players of each bucket sorted by rating DESC, user id ASC (leaderboard order)
+  private buckets: RankedPlayer[][] = Array.from({ length: BUCKET_COUNT }, () => [])
+  private ratingByUser = new Map<number, number>()
+
+  constructor(players: RankedPlayer[] = []) {
+    for (const p of players) this.setRating(p.userId, p.rating)
+  }
+
+  get total(): number {
+    return this.ratingByUser.size
+  }
+
+  has(userId: number): boolean {
+    return this.ratingByUser.has(userId)
+  }
+
+  setRating(userId: number, rating: number): void {
+    this.removeRating(userId)
+
+    const bucket = this.buckets[bucketOf(rating)]
+    let at = 0
+    while (at < bucket.length && comparePlayers(bucket[at], { userId, rating }) < 0) at++
+    bucket.splice(at, 0, { userId, rating })
+    this.counts.add(bucketOf(rating), 1)
+    this.ratingByUser.set(userId, rating)
+  }
+
+  removeRating(userId: number): void {
+    const rating = this.ratingByUser.get(userId)
+    if (rating === undefined) return
+
+    const bucket = this.buckets[bucketOf(rating)]
+    bucket.splice(bucket.findIndex((p) => p.userId === userId), 1)
+    this.counts.add(bucketOf(rating), -1)
+    this.ratingByUser.delete(userId)
+  }
+
+  /**
+   * 0-based position in leaderboard order, or -1 when the player is not ranked
+   */
+  positionOf(userId: number): number {
+    const rating = this.ratingByUser.get(userId)
+    if (rating === undefined) return -1
+    const index = bucketOf(rating)
+    return this.counts.prefix(index) + this.buckets[index].findIndex((p) => p.userId === userId)
+  }
+
+  getRank(userId: number): PlayerRank | null {
+    const rating = this.ratingByUser.get(userId)
+    if (rating === undefined) return null
+
+    const index = bucketOf(rating)
+    const bucket = this.buckets[index]
+    const above = this.counts.prefix(index)
+    const firstTie = bucket.findIndex((p) => p.rating === rating)
+    let lastTie = firstTie
+    while (lastTie + 1 < bucket.length && bucket[lastTie + 1].rating === rating) lastTie++
+
+    const total = this.total
+    return {
+      userId,
+      rating,
+      rank: above + firstTie + 1,
+      total,
+      percentile: (100 * (total - (above + lastTie + 1))) / total
+    }
+  }
+
+  /**
+   * Player at a 0-based leaderboard position
+   */
+  at(position: number): RankedPlayer | null {
+    if (position < 0 || position >= this.total) return null
+    const { index, before } = this.counts.findByOrder(position)
+    return this.buckets[index][position - before]
+  }
+
+  /**
+   * The player and up to `radius` players on each side, in leaderboard order
+   */
+  around(userId: number, radius: number): PlayerRank[] {
+    const position = this.positionOf(userId)
+    if (position === -1) return []
+
+    const result: PlayerRank[] = []
+    const last = Math.min(this.total - 1, position + radius)
+    for (let p = Math.max(0, position - radius); p <= last; p++) {
+      result.push(this.getRank(this.at(p)!.userId)!)
+    }
+    return result
+  }
+}
+
+function bucketOf(rating: number): number {
+  const points = Math.min(BUCKET_COUNT - 1, Math.max(0, Math.floor(rating)))
+  return BUCKET_COUNT - 1 - points
+}
+
+function comparePlayers(a: RankedPlayer, b: RankedPlayer): number {
+  return b.rating - a.rating || a.userId - b.userId
+}
+
+/**
+ * Process-wide rank index over ranked players (games_count > 0), seeded once
+ * from the leaderboard and patched by RatingService on every rating write
+ */
+class RatingRankRegistry {
+  private index: RatingRankIndex | null = null
+  private builtAt = 0
+  private loading: Promise<RatingRankIndex | null> | null = null
+  // Writes seen while a seed is in flight, replayed onto the fresh index
+  private pendingWrites: Map<number, { rating: number; gamesCount: number }> | null = null
+
+  async get(): Promise<RatingRankIndex | null> {
+    if (this.index && Date.now() - this.builtAt < MAX_INDEX_AGE_MS) {
+      return this.index
+    }
+    if (!this.loading) {
+      this.loading = this.build().finally(() => { this.loading = null })
+    }
+    // Serve the stale index while a reseed runs
+    return this.index || this.loading
+  }
+
+  updateRating(userId: number, rating: number, gamesCount: number): void {
+    this.pendingWrites?.set(userId, { rating, gamesCount })
+    if (this.index) applyWrite(this.index, userId, rating, gamesCount)
+  }
+
+  clear(): void {
+    this.index = null
+    this.builtAt = 0
+  }
+
+  private async build(): Promise<RatingRankIndex | null> {
+    const stopBuild = rankIndexBuilds.startTimer()
+    this.pendingWrites = new Map()
+    try {
+      const players: RankedPlayer[] = []
+      let after: RankedPlayer | null = null
+      for (;;) {
+        const { data, error } = await supabase.rpc('rating_leaderboard_page', {
+          min_games: 1,
+          page_size: SEED_PAGE_SIZE,
+          after_rating: after ? after.rating : null,
+          after_user_id: after ? after.userId : null
+        })
+
+        if (error) {
+          throw new Error(`Failed to load ratings: ${error.message}`)
+        }
+
+        const rows = (data || []) as Array<{ user_id: number; rating: number }>
+        for (const row of rows) players.push({ userId: row.user_id, rating: row.rating })
+        if (rows.length < SEED_PAGE_SIZE) break
+        after = players[players.length - 1]
+      }
+
+      const index = new RatingRankIndex(players)
+      for (const [userId, write] of this.pendingWrites) {
+        applyWrite(index, userId, write.rating, write.gamesCount)
+      }
+      this.index = index
+      this.builtAt = Date.now()
+      stopBuild({ outcome: 'ok' })
+      return index
+    } catch (error) {
+      log.error('Error building rating rank index', { error })
+      stopBuild({ outcome: 'error' })
+      return this.index
+    } finally {
+      this.pendingWrites = null
+    }
+  }
+}
+
+function applyWrite(index: RatingRankIndex, userId: number, rating: number, gamesCount: number): void {
+  if (gamesCount > 0) index.setRating(userId, rating)
+  else index.removeRating(userId)
+}
+
+export const ratingRanks = new RatingRankRegistry()
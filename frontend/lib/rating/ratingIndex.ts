@@ -0,0 +1,221 @@
+import { supabase } from '../supabase'
+import { createLogger } from '../logger'
+
+const log = createLogger('rating/ratingIndex')
+
+export interface RatedParticipant {
+  userId: number
+  name: string
+  rating: number
+}
+
+/**
+ * Participant ratings of one tournament, kept sorted ascending in typed arrays
+ * so nearest-rating lookups are a binary search plus a two-pointer walk.
+ */
+export class SortedRatingIndex {
+  private ratings: Float64Array
+  private userIds: Int32Array
+  private size = 0
+  // Every participant (rated or not) -> display name
+  private names = new Map<number, string>()
+  private ratingByUser = new Map<number, number>()
+
+  constructor(participants: Array<{ userId: number; name: string; rating: number | null }> = []) {
+    const rated = participants
+      .filter((p): p is RatedParticipant => p.rating !== null)
+      .sort((a, b) => a.rating - b.rating)
+
+    this.ratings = new Float64Array(Math.max(8, rated.length))
+    this.userIds = new Int32Array(this.ratings.length)
+    for (const p of participants) this.names.set(p.userId, p.name)
+    rated.forEach((p, i) => {
+      this.ratings[i] = p.rating
+      this.userIds[i] = p.userId
+      this.ratingByUser.set(p.userId, p.rating)
+    })
+    this.size = rated.length
+  }
+
+  get length(): number {
+    return this.size
+  }
+
+  hasParticipant(userId: number): boolean {
+    return this.names.has(userId)
+  }
+
+  getRating(userId: number): number | null {
+    return this.ratingByUser.get(userId) ?? null
+  }
+
+  /**
+   * Insert or move a participant's rating, keeping the arrays sorted
+   */
+  setRating(userId: number, rating: number): void {
+    this.removeRating(userId)
+
+    if (this.size === this.ratings.length) {
+      const ratings = new Float64Array(this.ratings.length * 2)
+      const userIds = new Int32Array(ratings.length)
+      ratings.set(this.ratings)
+      userIds.set(this.userIds)
+      this.ratings = ratings
+      this.userIds = userIds
+    }
+
+    const at = this.lowerBound(rating)
+    this.ratings.copyWithin(at + 1, at, this.size)
+    this.userIds.copyWithin(at + 1, at, this.size)
+    this.ratings[at] = rating
+    this.userIds[at] = userId
+    this.size++
+    this.ratingByUser.set(userId, rating)
+    if (!this.names.has(userId)) this.names.set(userId, '')
+  }
+
+  removeRating(userId: number): void {
+    const at = this.positionOf(userId)
+    if (at === -1) return
+    this.ratings.copyWithin(at, at + 1, this.size)
+    this.userIds.copyWithin(at, at + 1, this.size)
+    this.size--
+    this.ratingByUser.delete(userId)
+  }
+
+  /**
+   * Up to `k` participants closest to `rating`, nearest first. O(log n + k)
+   */
+  nearest(rating: number, k: number, excludeUserId?: number): RatedParticipant[] {
+    const result: RatedParticipant[] = []
+    let hi = this.lowerBound(rating)
+    let lo = hi - 1
+
+    while (result.length < k && (lo >= 0 || hi < this.size)) {
+      const takeLow = hi >= this.size ||
+        (lo >= 0 && rating - this.ratings[lo] <= this.ratings[hi] - rating)
+      const at = takeLow ? lo-- : hi++
+      const userId = this.userIds[at]
+      if (userId === excludeUserId) continue
+      result.push({ userId, name: this.names.get(userId) || '', rating: this.ratings[at] })
+    }
+
+    return result
+  }
+
+  /**
+   * First position whose rating is >= value
+   */
+  private lowerBound(value: number): number {
+    let lo = 0
+    let hi = this.size
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1
+      if (this.ratings[mid] < value) lo = mid + 1
+      else hi = mid
+    }
+    return lo
+  }
+
+  private positionOf(userId: number): number {
+    const rating = this.ratingByUser.get(userId)
+    if (rating === undefined) return -1
+    for (let i = this.lowerBound(rating); i < this.size && this.ratings[i] === rating; i++) {
+      if (this.userIds[i] === userId) return i
+    }
+    return -1
+  }
+}
+
+/**
+ * Per-tournament rating indexes, built on first use and patched on rating changes
+ */
+class RatingIndexRegistry {
+  private indexes = new Map<number, SortedRatingIndex>()
+  private loading = new Map<number, Promise<SortedRatingIndex | null>>()
+  // Bumped on every change so a build that raced with one is not cached
+  private generation = 0
+
+  async get(tournamentId: number): Promise<SortedRatingIndex | null> {
+    const cached = this.indexes.get(tournamentId)
+    if (cached) return cached
+
+    let pending = this.loading.get(tournamentId)
+    if (!pending) {
+      pending = this.build(tournamentId).finally(() => this.loading.delete(tournamentId))
+      this.loading.set(tournamentId, pending)
+    }
+    return pending
+  }
+
+  /**
+   * Apply a rating change to every index the user participates in
+   */
+  updateRating(userId: number, rating: number): void {
+    this.generation++
+    for (const index of this.indexes.values()) {
+      if (index.hasParticipant(userId)) index.setRating(userId, rating)
+    }
+  }
+
+  invalidate(tournamentId: number): void {
+    this.generation++
+    this.indexes.delete(tournamentId)
+  }
+
+  clear(): void {
+    this.generation++
+    this.indexes.clear()
+  }
+
+  private async build(tournamentId: number): Promise<SortedRatingIndex | null> {
+    const startedAt = this.generation
+    try {
+      const { data: participants, error } = await supabase
+        .from('tournament_participants')
+        .select('user_id, user:users(first_name, last_name)')
+        .eq('tournament_id', tournamentId)
+
+      if (error) {
+        throw new Error(`Failed to load participants: ${error.message}`)
+      }
+
+      const rows = (participants || []) as Array<{
+        user_id: number
+        user?: { first_name?: string; last_name?: string } | null
+      }>
+
+      const ratingByUser = new Map<number, number>()
+      if (rows.length > 0) {
+        const { data: ratings, error: ratingsError } = await supabase
+          .from('player_ratings')
+          .select('user_id, rating')
+          .in('user_id', rows.map((row) => row.user_id))
+
+        if (ratingsError) {
+          throw new Error(`Failed to load ratings: ${ratingsError.message}`)
+        }
+
+        for (const r of (ratings || []) as Array<{ user_id: number; rating: number }>) {
+          ratingByUser.set(r.user_id, r.rating)
+        }
+      }
+
+      const index = new SortedRatingIndex(rows.map((row) => ({
+        userId: row.user_id,
+        name: (row.user?.first_name || '') + ' ' + (row.user?.last_name || ''),
+        rating: ratingByUser.get(row.user_id) ?? null
+      })))
+
+      if (this.generation === startedAt) {
+        this.indexes.set(tournamentId, index)
+      }
+      return index
+    } catch (error) {
+      log.error('Error building rating index', { error })
+      return null
+    }
+  }
+}
+
+export const ratingIndexes = new RatingIndexRegistry()
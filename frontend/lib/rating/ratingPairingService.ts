@@ -1,6 +1,8 @@
 import { supabase } from '../supabase'
 import { type Tournament } from '../db'
 import { ratingService } from './ratingService'
+import { ratingIndexes } from './ratingIndex'
+import { maxWeightMatching, type WeightedEdge } from './weightedMatching'
 import { 
   type PairingConstraints,
   type RatingPairingConfig,
@@ -8,6 +10,9 @@ import {
   type TournamentType
 } from './types'
 import type { TournamentParticipant } from '../db'
+import { createLogger } from '../logger'
+
+const log = createLogger('rating/ratingPairingService')
 
 export interface RatingAwarePairing {
   whiteParticipant: TournamentParticipant
@@ -15,22 +20,66 @@ export interface RatingAwarePairing {
   ratingDifference: number
   qualityScore: number
   colorBalance: number
+  meetsQualityThreshold: boolean
+}
+
+export interface RatingPairingResult {
+  pairings: RatingAwarePairing[]
+  bye: TournamentParticipant | null
+  // Players that could not be paired without breaking the no-rematch rule
+  unpaired: TournamentParticipant[]
+}
+
+// The tournament columns pairing configuration reads
+type TournamentPairingSettings = Pick<Tournament, 'format' | 'forbid_repeat_bye'>
+
+export interface PairingHistory {
+  // Participant id pairs that already met, keyed by pairKey()
+  played: Set<string>
+  // Participant ids that already received a bye
+  hadBye: Set<number>
+}
+
+export function pairKey(a: number, b: number): string {
+  return a < b ? `${a}:${b}` : `${b}:${a}`
 }
 
 export class RatingPairingService {
   private readonly DEFAULT_MAX_RATING_DIFF = 200
   private readonly QUALITY_SCORE_THRESHOLD = 0.6
   private readonly TOP_PLAYER_RATING_THRESHOLD = 2200
+  // Up to this size the candidate graph is complete, so the matching is exact
+  private readonly DENSE_PAIRING_LIMIT = 128
+  // Above it, each player gets edges to this many nearest-rated eligible
+  // opponents, taken from both the higher- and the lower-rated side
+  private readonly CANDIDATE_NEIGHBOURS = 12
+  // Quality scores are scaled to integers so the blossom optimum is exact
+  private readonly WEIGHT_SCALE = 10000
+  // Weight of the bye preference relative to one pairing's quality score
+  private readonly BYE_PREFERENCE = 1
 
   /**
    * Find optimal pairings based on ratings
    */
   async findRatingAwarePairings(
     tournamentId: number,
-    _roundNumber: number, // Currently unused but kept for future round-specific logic
+    roundNumber: number,
     participants: TournamentParticipant[],
     config?: Partial<RatingPairingConfig>
   ): Promise<RatingAwarePairing[]> {
+    const result = await this.findRatingAwareRound(tournamentId, roundNumber, participants, config)
+    return result.pairings
+  }
+
+  /**
+   * Pair a whole round: pairings plus the explicit bye and anyone left unpaired
+   */
+  async findRatingAwareRound(
+    tournamentId: number,
+    _roundNumber: number, // Currently unused but kept for future round-specific logic
+    participants: TournamentParticipant[],
+    config?: Partial<RatingPairingConfig>
+  ): Promise<RatingPairingResult> {
     try {
       // Get tournament configuration
       const tournament = await this.getTournamentConfig(tournamentId)
@@ -43,34 +92,39 @@ export class RatingPairingService {
       const validParticipants = this.filterParticipantsByRating(participants, ratings)
       
       if (validParticipants.length < 2) {
-        return []
+        return { pairings: [], bye: null, unpaired: validParticipants }
       }
 
       // Sort by rating for optimal pairing
       const sortedParticipants = this.sortByRating(validParticipants, ratings)
+
+      // Previous opponents and byes, so rematches and repeat byes are avoided
+      const history = await this.getPairingHistory(tournamentId)
+      if (!tournament?.forbid_repeat_bye) {
+        history.hadBye.clear()
+      }
       
       // Generate pairings
-      const pairings = await this.generateOptimalPairings(
+      return this.generateOptimalPairings(
         sortedParticipants,
         ratings,
-        tournamentConfig
+        tournamentConfig,
+        history
       )
-
-      return pairings
     } catch (error) {
-      console.error('Error finding rating-aware pairings:', error)
-      return []
+      log.error('Error finding rating-aware pairings', { error })
+      return { pairings: [], bye: null, unpaired: [] }
     }
   }
 
   /**
    * Get tournament configuration
    */
-  private async getTournamentConfig(tournamentId: number): Promise<Tournament | null> {
+  private async getTournamentConfig(tournamentId: number): Promise<TournamentPairingSettings | null> {
     try {
       const { data, error } = await supabase
         .from('tournaments')
-        .select('*')
+        .select('format, forbid_repeat_bye')
         .eq('id', tournamentId)
         .single()
 
@@ -78,18 +132,58 @@ export class RatingPairingService {
         throw new Error(`Failed to get tournament: ${error.message}`)
       }
 
-      return data as Tournament
+      return data as TournamentPairingSettings
     } catch (error) {
-      console.error('Error getting tournament config:', error)
+      log.error('Error getting tournament config', { error })
       return null
     }
   }
 
+  /**
+   * Load who has played whom (and who had a bye) in this tournament
+   */
+  private async getPairingHistory(tournamentId: number): Promise<PairingHistory> {
+    const history: PairingHistory = { played: new Set(), hadBye: new Set() }
+    try {
+      const { data: rounds, error: roundsError } = await supabase
+        .from('rounds')
+        .select('id')
+        .eq('tournament_id', tournamentId)
+
+      if (roundsError) {
+        throw new Error(`Failed to get rounds: ${roundsError.message}`)
+      }
+
+      const roundIds = ((rounds || []) as Array<{ id: number }>).map((r) => r.id)
+      if (roundIds.length === 0) return history
+
+      const { data: matches, error: matchesError } = await supabase
+        .from('matches')
+        .select('white_participant_id, black_participant_id, result')
+        .in('round_id', roundIds)
+
+      if (matchesError) {
+        throw new Error(`Failed to get matches: ${matchesError.message}`)
+      }
+
+      for (const m of (matches || []) as Array<{ white_participant_id: number | null; black_participant_id: number | null; result: string }>) {
+        if (m.white_participant_id && m.black_participant_id) {
+          history.played.add(pairKey(m.white_participant_id, m.black_participant_id))
+        } else if (m.white_participant_id && (m.black_participant_id === null || m.result === 'bye')) {
+          history.hadBye.add(m.white_participant_id)
+        }
+      }
+    } catch (error) {
+      log.error('Error getting pairing history', { error })
+    }
+    return history
+  }
+
   /**
    * Get tournament pairing configuration
    */
   private getTournamentPairingConfig(
-    tournament: Tournament | null,
+    tournament: TournamentPairingSettings | null,
     customConfig?: Partial<RatingPairingConfig>
   ): RatingPairingConfig {
     // Determine tournament type based on format
@@ -116,20 +210,21 @@ export class RatingPairingService {
    */
   private async getParticipantRatings(participants: TournamentParticipant[]): Promise<Map<number, number>> {
     const ratings = new Map<number, number>()
-    
+    const existing = await ratingService.getPlayerRatings(participants.map((p) => p.user_id))
+
     for (const participant of participants) {
-      const rating = await ratingService.getPlayerRating(participant.user_id)
+      const rating = existing.get(participant.user_id)
       if (rating) {
         ratings.set(participant.user_id, rating.rating)
-      } else {
-        // Initialize rating if not exists
+      } else if (!ratings.has(participant.user_id)) {
+        // Initialize rating if not exists (first tournament only)
         const newRating = await ratingService.initializePlayerRating(participant.user_id)
         if (newRating) {
           ratings.set(participant.user_id, newRating.rating)
         }
       }
     }
-    
+
     return ratings
   }
 
@@ -162,68 +257,154 @@ export class RatingPairingService {
 
   /**
    * Generate optimal pairings
+   *
+   * Solves a minimum-cost perfect matching (maximum-weight, maximum-cardinality
+   * blossom) over calculatePairingQuality weights. Participants must be sorted
+   * by rating, descending. Odd counts get a virtual bye vertex. Pairs from
+   * `history.played` and pairs further apart than `config.ratingRange.max` are
+   * never offered as edges; players left without an opponent are `unpaired`.
    */
-  private async generateOptimalPairings(
+  generateOptimalPairings(
     participants: TournamentParticipant[],
     ratings: Map<number, number>,
-    config: RatingPairingConfig
-  ): Promise<RatingAwarePairing[]> {
-    const pairings: RatingAwarePairing[] = []
-    const used = new Set<number>()
-
-    // Try to pair participants with similar ratings
-    for (let i = 0; i < participants.length - 1; i++) {
-      if (used.has(participants[i].user_id)) continue
-
-      const player1 = participants[i]
-      const player1Rating = ratings.get(player1.user_id) || 0
-
-      // Find best opponent
-      let bestOpponent: TournamentParticipant | null = null
-      let bestScore = -1
-
-      for (let j = i + 1; j < participants.length; j++) {
-        if (used.has(participants[j].user_id)) continue
+    config: RatingPairingConfig,
+    history: PairingHistory = { played: new Set(), hadBye: new Set() }
+  ): RatingPairingResult {
+    const n = participants.length
+    const ratingOf = (i: number) => ratings.get(participants[i].user_id) || 0
+    const withinRange = (i: number, j: number) => Math.abs(ratingOf(i) - ratingOf(j)) <= config.ratingRange.max
+    const notPlayed = (i: number, j: number) => {
+      const a = participants[i].id
+      const b = participants[j].id
+      return a === undefined || b === undefined || !history.played.has(pairKey(a, b))
+    }
 
-        const player2 = participants[j]
-        const player2Rating = ratings.get(player2.user_id) || 0
-        const ratingDiff = Math.abs(player1Rating - player2Rating)
+    // Virtual bye vertex (index n) for odd counts
+    const byeVertex = n % 2 === 1 ? n : -1
+    const byeEligible = (i: number) => {
+      const id = participants[i].id
+      return id === undefined || !history.hadBye.has(id)
+    }
+    const anyByeEligible = byeVertex !== -1 && participants.some((_, i) => byeEligible(i))
+    const byeScore = this.buildByeScores(n, config)
 
-        // Check rating difference constraint
-        if (ratingDiff > config.ratingRange.max) continue
+    const quality = (i: number, j: number) => {
+      const r1 = ratingOf(i)
+      const r2 = ratingOf(j)
+      return this.calculatePairingQuality(r1, r2, Math.abs(r1 - r2), config)
+    }
 
-        // Calculate pairing quality score
-        const qualityScore = this.calculatePairingQuality(
-          player1Rating,
-          player2Rating,
-          ratingDiff,
-          config
-        )
+    const solve = (vertices: number[], dense: boolean): Map<number, number> => {
+      const candidates: Array<[number, number, number]> = []
+      const offered = new Set<number>()
+      const offer = (a: number, b: number) => {
+        const key = a * vertices.length + b
+        if (offered.has(key)) return
+        offered.add(key)
+        candidates.push([a, b, quality(vertices[a], vertices[b])])
+      }
+      const eligible = (i: number, b: number) => vertices[b] !== byeVertex && notPlayed(i, vertices[b])
+
+      for (let a = 0; a < vertices.length; a++) {
+        const i = vertices[a]
+        if (i === byeVertex) continue
+        if (dense) {
+          for (let b = a + 1; b < vertices.length; b++) {
+            if (eligible(i, b) && withinRange(i, vertices[b])) offer(a, b)
+          }
+          continue
+        }
 
-        if (qualityScore > bestScore) {
-          bestScore = qualityScore
-          bestOpponent = player2
+        // Walk outwards from a in rating order, nearest rating first on either
+        // side; once a side leaves the rating range, everything past it does too
+        let up = a - 1
+        let down = a + 1
+        for (let added = 0; added < this.CANDIDATE_NEIGHBOURS; added++) {
+          while (up >= 0 && !eligible(i, up)) up--
+          while (down < vertices.length && !eligible(i, down)) down++
+          if (up >= 0 && !withinRange(i, vertices[up])) up = -1
+          if (down < vertices.length && !withinRange(i, vertices[down])) down = vertices.length
+          if (up < 0 && down >= vertices.length) break
+
+          const upDiff = up >= 0 ? Math.abs(ratingOf(vertices[up]) - ratingOf(i)) : Infinity
+          const downDiff = down < vertices.length ? Math.abs(ratingOf(vertices[down]) - ratingOf(i)) : Infinity
+          if (upDiff <= downDiff) offer(up--, a)
+          else offer(a, down++)
         }
       }
+      const byeAt = vertices.indexOf(byeVertex)
+      if (byeAt !== -1) {
+        vertices.forEach((i, a) => {
+          if (i !== byeVertex && (!anyByeEligible || byeEligible(i))) {
+            candidates.push([a, byeAt, this.BYE_PREFERENCE * byeScore[i]])
+          }
+        })
+      }
 
-      if (bestOpponent && bestScore >= config.quality.minQualityScore) {
-        const opponentRating = ratings.get(bestOpponent.user_id) || 0
-        const colorBalance = this.calculateColorBalance()
+      // Shift to non-negative integers; every perfect matching has the same edge count
+      let minQuality = 0
+      for (const c of candidates) if (c[2] < minQuality) minQuality = c[2]
+      const edges: WeightedEdge[] = candidates.map(([a, b, q]) => [a, b, Math.round((q - minQuality) * this.WEIGHT_SCALE) + 1])
+
+      const mate = maxWeightMatching(edges, true)
+      const matched = new Map<number, number>()
+      mate.forEach((m, a) => {
+        if (m >= 0) matched.set(vertices[a], vertices[m])
+      })
+      return matched
+    }
+
+    const all = Array.from({ length: byeVertex === -1 ? n : n + 1 }, (_, i) => i)
+    const matched = solve(all, n <= this.DENSE_PAIRING_LIMIT)
 
+    // Sparse candidates can strand a few players behind rematches; re-solve them densely
+    const leftovers = all.filter((i) => !matched.has(i))
+    if (leftovers.length > 1 && leftovers.some((i) => i !== byeVertex)) {
+      for (const [i, j] of solve(leftovers, true)) matched.set(i, j)
+    }
+
+    const pairings: RatingAwarePairing[] = []
+    let bye: TournamentParticipant | null = null
+    const unpaired: TournamentParticipant[] = []
+    for (let i = 0; i < n; i++) {
+      const j = matched.get(i)
+      if (j === undefined) {
+        unpaired.push(participants[i])
+      } else if (j === byeVertex) {
+        bye = participants[i]
+      } else if (i < j) {
+        // Higher-rated player (earlier in the sorted list) takes white
+        const player1Rating = ratingOf(i)
+        const player2Rating = ratingOf(j)
+        const qualityScore = quality(i, j)
         pairings.push({
-          whiteParticipant: player1,
-          blackParticipant: bestOpponent,
-          ratingDifference: Math.abs(player1Rating - opponentRating),
-          qualityScore: bestScore,
-          colorBalance
+          whiteParticipant: participants[i],
+          blackParticipant: participants[j],
+          ratingDifference: Math.abs(player1Rating - player2Rating),
+          qualityScore,
+          colorBalance: this.calculateColorBalance(),
+          meetsQualityThreshold: qualityScore >= config.quality.minQualityScore
         })
-
-        used.add(player1.user_id)
-        used.add(bestOpponent.user_id)
       }
     }
 
-    return pairings
+    return { pairings, bye, unpaired }
+  }
+
+  /**
+   * Bye preference per sorted position (0..1, higher = more deserving of the bye)
+   */
+  private buildByeScores(n: number, config: RatingPairingConfig): number[] {
+    const denom = Math.max(1, n - 1)
+    switch (config.tournament.byesHandling) {
+      case 'highest_rating':
+        return Array.from({ length: n }, (_, i) => 1 - i / denom)
+      case 'random':
+        return Array.from({ length: n }, () => Math.random())
+      case 'lowest_rating':
+      default:
+        return Array.from({ length: n }, (_, i) => i / denom)
+    }
   }
 
   /**
@@ -272,60 +453,38 @@ export class RatingPairingService {
     qualityScore: number
   }>> {
     try {
-      // Get user rating
-      const userRating = await ratingService.getPlayerRating(userId)
-      if (!userRating) {
+      const index = await ratingIndexes.get(tournamentId)
+      if (!index || index.length === 0) {
         return []
       }
 
-      // Get tournament participants
-      const { data: participants } = await supabase
-        .from('tournament_participants')
-        .select('*, user:users(*)')
-        .eq('tournament_id', tournamentId)
-        .neq('user_id', userId)
-
-      if (!participants || participants.length === 0) {
+      // Get user rating (from the index when the user takes part in the tournament)
+      const userRating = index.getRating(userId) ??
+        (await ratingService.getPlayerRatings([userId])).get(userId)?.rating
+      if (userRating === undefined) {
         return []
       }
 
-      const recommendations = []
-
-      for (const participant of participants) {
-        const opponentRating = await ratingService.getPlayerRating(participant.user_id)
-        if (!opponentRating) continue
-
-        const ratingDiff = Math.abs(userRating.rating - opponentRating.rating)
-        const expectedScore = this.calculateExpectedScore(userRating.rating, opponentRating.rating)
-        const qualityScore = this.calculatePairingQuality(
-          userRating.rating,
-          opponentRating.rating,
-          ratingDiff,
-          TOURNAMENT_RATING_CONFIGS.classical // Use default config
-        )
-
-        recommendations.push({
-          opponentId: participant.user_id,
-          opponentName: participant.user.first_name + ' ' + participant.user.last_name,
-          opponentRating: opponentRating.rating,
+      // Nearest ratings first
+      return index.nearest(userRating, maxOpponents, userId).map((opponent) => {
+        const ratingDiff = Math.abs(userRating - opponent.rating)
+        return {
+          opponentId: opponent.userId,
+          opponentName: opponent.name,
+          opponentRating: opponent.rating,
           ratingDifference: ratingDiff,
-          expectedScore,
-          qualityScore
-        })
-      }
-
-      // Sort by quality score and rating difference
-      return recommendations
-        .sort((a, b) => {
-          if (Math.abs(a.qualityScore - b.qualityScore) > 0.1) {
-            return b.qualityScore - a.qualityScore
-          }
-          return a.ratingDifference - b.ratingDifference
-        })
-        .slice(0, maxOpponents)
+          expectedScore: this.calculateExpectedScore(userRating, opponent.rating),
+          qualityScore: this.calculatePairingQuality(
+            userRating,
+            opponent.rating,
+            ratingDiff,
+            TOURNAMENT_RATING_CONFIGS.classical // Use default config
+          )
+        }
+      })
 
     } catch (error) {
-      console.error('Error getting pairing recommendations:', error)
+      log.error('Error getting pairing recommendations', { error })
       return []
     }
   }
@@ -1,6 +1,24 @@
 import { Glicko2, type Player } from 'glicko2'
 import { supabase } from '../supabase'
 import { getUserById, type User } from '../db'
+import { ratingIndexes } from './ratingIndex'
+import { predictionMatrices } from './predictionMatrix'
+import { ratingValidator } from './ratingValidator'
+import { ratingRanks } from './rankIndex'
+import { ratingHistorySeries } from './historySeries'
+import { createLogger } from '../logger'
+import { metrics } from '../metrics'
+import { timeSpan } from '../requestContext'
+
+const log = createLogger('rating/ratingService')
+
+// load: both players' ratings; compute: Glicko-2 for both sides; commit: commit_match_ratings
+const ratingUpdateDuration = metrics.histogram(
+  'rating_update_duration_seconds',
+  'Rating update time per stage for a rated game',
+  ['stage']
+)
+const ratingUpdates = metrics.counter('rating_updates_total', 'Rated game commits by outcome', ['outcome'])
 
 // Types for rating system
 export interface PlayerRating {
@@ -19,6 +37,10 @@ export interface PlayerRating {
   created_at?: string
 }
 
+// A rating as pairing and prediction read it, without counters and timestamps
+export type RatingLite = Pick<PlayerRating, 'user_id' | 'rating' | 'rd' | 'volatility' | 'games_count'>
+const RATING_LITE_COLUMNS = 'user_id, rating, rd, volatility, games_count'
+
 export interface RatingHistory {
   id?: number
   user_id: number
@@ -42,9 +64,15 @@ export interface RatingUpdateResult {
   success: boolean
   newRating: PlayerRating
   historyEntry: RatingHistory
+  commit?: MatchRatingCommit
   error?: string
 }
 
+export interface MatchRatingCommit {
+  white: { before: PlayerRating; after: PlayerRating; history: RatingHistory }
+  black: { before: PlayerRating; after: PlayerRating; history: RatingHistory }
+}
+
 export interface MatchResult {
   whitePlayerId: number
   blackPlayerId: number
@@ -53,6 +81,61 @@ export interface MatchResult {
   tournamentId: number
 }
 
+export interface LeaderboardEntry {
+  id: number
+  username: string | null
+  first_name: string
+  last_name: string
+  rating: number
+  rd: number
+  games_count: number
+  win_rate: number
+  global_rank: number
+}
+
+export interface LeaderboardPage {
+  entries: LeaderboardEntry[]
+  // Opaque keyset cursor for the next page, null on the last page
+  nextCursor: string | null
+  totalEstimate: number | null
+}
+
+// Row of rating_leaderboard_entries
+interface LeaderboardRow {
+  user_id: number
+  username: string | null
+  first_name: string
+  last_name: string
+  rating: number
+  rd: number
+  games_count: number
+  win_rate: number | string
+}
+
+// Last row of a page: rating, user id, rows served so far and that row's rank
+interface LeaderboardCursor {
+  r: number
+  u: number
+  n: number
+  k: number
+}
+
+export function encodeLeaderboardCursor(cursor: LeaderboardCursor): string {
+  return Buffer.from(JSON.stringify(cursor)).toString('base64url')
+}
+
+/**
+ * Parse a cursor from encodeLeaderboardCursor; throws on malformed input
+ */
+export function decodeLeaderboardCursor(value: string): LeaderboardCursor {
+  const cursor = JSON.parse(Buffer.from(value, 'base64url').toString('utf8'))
+  const valid = cursor && ['r', 'u', 'n', 'k'].every((key) => Number.isFinite(cursor[key]))
+  if (!valid) {
+    throw new Error('Invalid leaderboard cursor')
+  }
+  return cursor as LeaderboardCursor
+}
+
 export class RatingService {
   private glicko2: Glicko2
 
@@ -107,9 +190,10 @@ export class RatingService {
         throw new Error(`Failed to initialize player rating: ${error.message}`)
       }
 
+      this.onRatingWritten(userId, data.rating, data.games_count)
       return data as PlayerRating
     } catch (error) {
-      console.error('Error initializing player rating:', error)
+      log.error('Error initializing player rating', { error })
       return null
     }
   }
@@ -161,86 +245,54 @@ export class RatingService {
 
       return data as PlayerRating
     } catch (error) {
-      console.error('Error getting player rating:', error)
+      log.error('Error getting player rating', { error })
       return null
     }
   }
 
   /**
-   * Update player rating based on match result
+   * Ratings of several players in one query, keyed by user id (players
+   * without a rating row are absent)
    */
-  async updateRatingFromMatch(matchResult: MatchResult): Promise<RatingUpdateResult | null> {
+  async getPlayerRatings(userIds: number[]): Promise<Map<number, RatingLite>> {
+    const ratings = new Map<number, RatingLite>()
+    if (userIds.length === 0) return ratings
     try {
-      // Initialize ratings if needed
-      const whiteRating = await this.initializePlayerRating(matchResult.whitePlayerId)
-      const blackRating = await this.initializePlayerRating(matchResult.blackPlayerId)
+      const { data, error } = await supabase
+        .from('player_ratings')
+        .select(RATING_LITE_COLUMNS)
+        .in('user_id', Array.from(new Set(userIds)))
 
-      if (!whiteRating || !blackRating) {
-        throw new Error('Failed to initialize player ratings')
+      if (error) {
+        throw new Error(`Failed to get player ratings: ${error.message}`)
       }
 
-      // Calculate new ratings using Glicko2
-      const whiteUpdate = await this.calculateRatingChange(
-        whiteRating,
-        blackRating,
-        matchResult.result === 'white' ? 1 : matchResult.result === 'draw' ? 0.5 : 0
-      )
-
-      const blackUpdate = await this.calculateRatingChange(
-        blackRating,
-        whiteRating,
-        matchResult.result === 'black' ? 1 : matchResult.result === 'draw' ? 0.5 : 0
-      )
-
-      // Update ratings in database
-      const updatedWhiteRating = await this.updatePlayerRating(whiteUpdate)
-      const updatedBlackRating = await this.updatePlayerRating(blackUpdate)
-
-      if (!updatedWhiteRating || !updatedBlackRating) {
-        throw new Error('Failed to update player ratings')
+      for (const row of (data || []) as RatingLite[]) {
+        ratings.set(row.user_id, row)
       }
+    } catch (error) {
+      log.error('Error getting player ratings', { error })
+    }
+    return ratings
+  }
 
-      // Create history entries
-      const whiteHistory = await this.createRatingHistory({
-        userId: matchResult.whitePlayerId,
-        oldRating: whiteRating.rating,
-        newRating: updatedWhiteRating.rating,
-        oldRd: whiteRating.rd,
-        newRd: updatedWhiteRating.rd,
-        oldVolatility: whiteRating.volatility,
-        newVolatility: updatedWhiteRating.volatility,
-        matchId: matchResult.matchId,
-        tournamentId: matchResult.tournamentId,
-        changeReason: 'match_result',
-        opponentId: matchResult.blackPlayerId,
-        opponentRating: blackRating.rating,
-        gameResult: matchResult.result === 'white' ? 'win' : matchResult.result === 'draw' ? 'draw' : 'loss'
-      })
-
-      // Create history for black player as well
-      await this.createRatingHistory({
-        userId: matchResult.blackPlayerId,
-        oldRating: blackRating.rating,
-        newRating: updatedBlackRating.rating,
-        oldRd: blackRating.rd,
-        newRd: updatedBlackRating.rd,
-        oldVolatility: blackRating.volatility,
-        newVolatility: updatedBlackRating.volatility,
-        matchId: matchResult.matchId,
-        tournamentId: matchResult.tournamentId,
-        changeReason: 'match_result',
-        opponentId: matchResult.whitePlayerId,
-        opponentRating: whiteRating.rating,
-        gameResult: matchResult.result === 'black' ? 'win' : matchResult.result === 'draw' ? 'draw' : 'loss'
-      })
+  /**
+   * Update player rating based on match result
+   */
+  async updateRatingFromMatch(matchResult: MatchResult): Promise<RatingUpdateResult | null> {
+    try {
+      const commit = await timeSpan('rating', () => this.commitMatchResult(matchResult))
+      ratingUpdates.inc({ outcome: 'ok' })
 
       return {
         success: true,
-        newRating: updatedWhiteRating,
-        historyEntry: whiteHistory
+        newRating: commit.white.after,
+        historyEntry: commit.white.history,
+        commit
       }
     } catch (error) {
-      console.error('Error updating rating from match:', error)
+      log.error('Error updating rating from match', { error })
+      ratingUpdates.inc({ outcome: 'error' })
       return {
         success: false,
         newRating: {} as PlayerRating,
@@ -250,6 +302,126 @@ export class RatingService {
     }
   }
 
+  /**
+   * Rate a finished game: one read for both players, one atomic write
+   * (commit_match_ratings) for both ratings and both history rows
+   */
+  async commitMatchResult(matchResult: MatchResult): Promise<MatchRatingCommit> {
+    const { whitePlayerId, blackPlayerId } = matchResult
+    const stopLoad = ratingUpdateDuration.startTimer({ stage: 'load' })
+    const current = await this.loadRatingsForMatch(whitePlayerId, blackPlayerId)
+    stopLoad()
+    const whiteRating = current.get(whitePlayerId)!
+    const blackRating = current.get(blackPlayerId)!
+
+    const whiteScore = matchResult.result === 'white' ? 1 : matchResult.result === 'draw' ? 0.5 : 0
+    const stopCompute = ratingUpdateDuration.startTimer({ stage: 'compute' })
+    const whiteUpdate = await this.calculateRatingChange(whiteRating, blackRating, whiteScore)
+    const blackUpdate = await this.calculateRatingChange(blackRating, whiteRating, 1 - whiteScore)
+    stopCompute()
+
+    const history = [
+      this.buildHistoryRow(whiteRating, whiteUpdate, blackRating, whiteScore, matchResult),
+      this.buildHistoryRow(blackRating, blackUpdate, whiteRating, 1 - whiteScore, matchResult)
+    ]
+
+    const stopCommit = ratingUpdateDuration.startTimer({ stage: 'commit' })
+    const { data, error } = await supabase.rpc('commit_match_ratings', {
+      ratings: [whiteUpdate, blackUpdate].map((r) => ({
+        user_id: r.user_id,
+        rating: r.rating,
+        rd: r.rd,
+        volatility: r.volatility,
+        games_count: r.games_count,
+        wins_count: r.wins_count,
+        losses_count: r.losses_count,
+        draws_count: r.draws_count,
+        last_game_at: r.last_game_at,
+        rating_period_start: r.rating_period_start
+      })),
+      history
+    })
+
+    stopCommit()
+    if (error) {
+      throw new Error(`Failed to commit match ratings: ${error.message}`)
+    }
+
+    const saved = new Map(((data || []) as PlayerRating[]).map((r) => [r.user_id, r]))
+    const whiteAfter = saved.get(whitePlayerId) || whiteUpdate
+    const blackAfter = saved.get(blackPlayerId) || blackUpdate
+    this.onRatingWritten(whitePlayerId, whiteAfter.rating, whiteAfter.games_count)
+    this.onRatingWritten(blackPlayerId, blackAfter.rating, blackAfter.games_count)
+
+    return {
+      white: { before: whiteRating, after: whiteAfter, history: history[0] },
+      black: { before: blackRating, after: blackAfter, history: history[1] }
+    }
+  }
+
+  /**
+   * Both players' current ratings in one query; players without a rating row
+   * get their initial rating (the row is created by the commit)
+   */
+  private async loadRatingsForMatch(whitePlayerId: number, blackPlayerId: number): Promise<Map<number, PlayerRating>> {
+    const { data, error } = await supabase
+      .from('player_ratings')
+      .select('*')
+      .in('user_id', [whitePlayerId, blackPlayerId])
+
+    if (error) {
+      throw new Error(`Failed to get player ratings: ${error.message}`)
+    }
+
+    const ratings = new Map(((data || []) as PlayerRating[]).map((r) => [r.user_id, r]))
+    for (const userId of [whitePlayerId, blackPlayerId]) {
+      if (ratings.has(userId)) continue
+
+      const user = await getUserById(userId)
+      if (!user) {
+        throw new Error(`User with ID ${userId} not found`)
+      }
+      const now = new Date().toISOString()
+      ratings.set(userId, {
+        user_id: userId,
+        ...this.calculateInitialRating(user),
+        games_count: 0,
+        wins_count: 0,
+        losses_count: 0,
+        draws_count: 0,
+        rating_period_start: now,
+        last_updated: now
+      })
+    }
+
+    return ratings
+  }
+
+  private buildHistoryRow(
+    before: PlayerRating,
+    after: PlayerRating,
+    opponent: PlayerRating,
+    score: number,
+    matchResult: MatchResult
+  ): RatingHistory {
+    return {
+      user_id: before.user_id,
+      old_rating: before.rating,
+      new_rating: after.rating,
+      old_rd: before.rd,
+      new_rd: after.rd,
+      old_volatility: before.volatility,
+      new_volatility: after.volatility,
+      rating_change: after.rating - before.rating,
+      match_id: matchResult.matchId || null,
+      tournament_id: matchResult.tournamentId || null,
+      change_reason: 'match_result',
+      opponent_id: opponent.user_id,
+      opponent_rating: opponent.rating,
+      game_result: score === 1 ? 'win' : score === 0.5 ? 'draw' : 'loss'
+    }
+  }
+
   /**
    * Calculate rating change using Glicko2 algorithm
    */
@@ -290,91 +462,42 @@ export class RatingService {
         last_updated: new Date().toISOString()
       }
     } catch (error) {
-      console.error('Error calculating rating change:', error)
+      log.error('Error calculating rating change', { error })
       throw error
     }
   }
 
   /**
-   * Update player rating in database
+   * Keep in-memory rating views in step with a stored rating
+   * (call after writing player_ratings outside this service)
    */
-  private async updatePlayerRating(updatedRating: PlayerRating): Promise<PlayerRating | null> {
-    try {
-      const { data, error } = await supabase
-        .from('player_ratings')
-        .update({
-          rating: updatedRating.rating,
-          rd: updatedRating.rd,
-          volatility: updatedRating.volatility,
-          games_count: updatedRating.games_count,
-          wins_count: updatedRating.wins_count,
-          losses_count: updatedRating.losses_count,
-          draws_count: updatedRating.draws_count,
-          last_game_at: updatedRating.last_game_at,
-          last_updated: updatedRating.last_updated
-        })
-        .eq('user_id', updatedRating.user_id)
-        .select()
-        .single()
-
-      if (error) {
-        throw new Error(`Failed to update player rating: ${error.message}`)
-      }
-
-      return data as PlayerRating
-    } catch (error) {
-      console.error('Error updating player rating in database:', error)
-      return null
-    }
+  onRatingWritten(userId: number, rating: number, gamesCount: number): void {
+    ratingIndexes.updateRating(userId, rating)
+    ratingRanks.updateRating(userId, rating, gamesCount)
+    predictionMatrices.invalidateUser(userId)
+    ratingValidator.invalidateHistory(userId)
+    ratingHistorySeries.invalidateUser(userId)
   }
 
   /**
-   * Create rating history entry
+   * Recompute player_rating_stats from full rating history (one user, or
+   * everyone when omitted). Normal writes keep stats current incrementally;
+   * this is for backfills and repairs. Returns the number of players rebuilt.
    */
-  private async createRatingHistory(history: {
-    userId: number
-    oldRating: number
-    newRating: number
-    oldRd: number
-    newRd: number
-    oldVolatility: number
-    newVolatility: number
-    matchId?: number | null
-    tournamentId?: number | null
-    changeReason: string
-    opponentId?: number | null
-    opponentRating?: number | null
-    gameResult?: string | null
-  }): Promise<RatingHistory> {
+  async rebuildRatingStats(userId?: number): Promise<number | null> {
     try {
-      const { data, error } = await supabase
-        .from('rating_history')
-        .insert({
-          user_id: history.userId,
-          old_rating: history.oldRating,
-          new_rating: history.newRating,
-          old_rd: history.oldRd,
-          new_rd: history.newRd,
-          old_volatility: history.oldVolatility,
-          new_volatility: history.newVolatility,
-          match_id: history.matchId || null,
-          tournament_id: history.tournamentId || null,
-          change_reason: history.changeReason,
-          opponent_id: history.opponentId || null,
-          opponent_rating: history.opponentRating || null,
-          game_result: history.gameResult || null
-        })
-        .select()
-        .single()
+      const { data, error } = await supabase.rpc('rebuild_player_rating_stats', {
+        user_id_param: userId ?? null
+      })
 
       if (error) {
-        throw new Error(`Failed to create rating history: ${error.message}`)
+        throw new Error(`Failed to rebuild rating stats: ${error.message}`)
       }
 
-      return data as RatingHistory
+      return Number(data ?? 0)
     } catch (error) {
-      console.error('Error creating rating history:', error)
-      throw error
+      log.error('Error rebuilding rating stats', { error })
+      return null
     }
   }
 
@@ -396,49 +519,83 @@ export class RatingService {
 
       return (data || []) as RatingHistory[]
     } catch (error) {
-      console.error('Error getting rating history:', error)
+      log.error('Error getting rating history', { error })
       return []
     }
   }
 
   /**
-   * Get leaderboard
+   * Get the first page of the leaderboard
    */
-  async getLeaderboard(limit: number = 100): Promise<Array<{
-    id: number
-    username: string | null
-    first_name: string
-    last_name: string
-    rating: number
-    rd: number
-    games_count: number
-    win_rate: number
-    global_rank: number
-  }>> {
-    try {
-      const { data, error } = await supabase
-        .from('rating_leaderboard')
-        .select('*')
-        .limit(limit)
+  async getLeaderboard(limit: number = 100): Promise<LeaderboardEntry[]> {
+    const page = await this.getLeaderboardPage({ limit })
+    return page.entries
+  }
 
-      if (error) {
-        throw new Error(`Failed to get leaderboard: ${error.message}`)
+  /**
+   * Get one leaderboard page after `cursor`, ordered by (rating DESC, user_id).
+   * Pages come from the indexed rating_leaderboard_entries table, so deep pages
+   * cost the same as the first one; ranks are carried in the cursor.
+   */
+  async getLeaderboardPage(options: {
+    limit?: number
+    minGames?: number
+    cursor?: string | null
+  } = {}): Promise<LeaderboardPage> {
+    const limit = options.limit ?? 100
+    const minGames = options.minGames ?? 0
+    const after = options.cursor ? decodeLeaderboardCursor(options.cursor) : null
+    try {
+      // Fetch one extra row to know whether another page exists
+      const [pageResult, countResult] = await Promise.all([
+        supabase.rpc('rating_leaderboard_page', {
+          min_games: minGames,
+          page_size: limit + 1,
+          after_rating: after ? after.r : null,
+          after_user_id: after ? after.u : null
+        }),
+        supabase.rpc('rating_leaderboard_count', { min_games: minGames })
+      ])
+
+      if (pageResult.error) {
+        throw new Error(`Failed to get leaderboard: ${pageResult.error.message}`)
       }
 
-      return (data || []) as Array<{
-        id: number
-        username: string | null
-        first_name: string
-        last_name: string
-        rating: number
-        rd: number
-        games_count: number
-        win_rate: number
-        global_rank: number
-      }>
+      const rows = (pageResult.data || []) as LeaderboardRow[]
+      const hasMore = rows.length > limit
+      let position = after ? after.n : 0
+      let rank = after ? after.k : 0
+      let previousRating = after ? after.r : null
+
+      // RANK() semantics: tied ratings share the rank of the first of them
+      const entries = rows.slice(0, limit).map((row) => {
+        position++
+        if (row.rating !== previousRating) rank = position
+        previousRating = row.rating
+        return {
+          id: row.user_id,
+          username: row.username,
+          first_name: row.first_name,
+          last_name: row.last_name,
+          rating: row.rating,
+          rd: row.rd,
+          games_count: row.games_count,
+          win_rate: Number(row.win_rate),
+          global_rank: rank
+        }
+      })
+
+      const last = entries[entries.length - 1]
+      return {
+        entries,
+        nextCursor: hasMore && last
+          ? encodeLeaderboardCursor({ r: last.rating, u: last.id, n: position, k: rank })
+          : null,
+        totalEstimate: countResult.error ? null : Number(countResult.data ?? 0)
+      }
     } catch (error) {
-      console.error('Error getting leaderboard:', error)
-      return []
+      log.error('Error getting leaderboard', { error })
+      return { entries: [], nextCursor: null, totalEstimate: null }
     }
   }
 
@@ -488,7 +645,7 @@ export class RatingService {
         player2WinProbability: adjustedPlayer2Win
       }
     } catch (error) {
-      console.error('Error predicting match outcome:', error)
+      log.error('Error predicting match outcome', { error })
       return {
         player1WinProbability: 0.5,
         drawProbability: 0.1,
@@ -0,0 +1,111 @@
+// Incremental player_rating_stats maintenance. Pure so the in-memory Supabase
+// client can run it as its rating_history trigger; the Postgres equivalent is
+// apply_rating_history_to_stats() in database/migrations.
+
+export interface PlayerRatingStats {
+  id?: number
+  user_id: number
+  highest_rating: number | null
+  highest_rating_date: string | null
+  lowest_rating: number | null
+  lowest_rating_date: string | null
+  best_win_opponent_rating: number | null
+  best_win_date: string | null
+  // Positive for a win streak, negative for a loss streak, 0 after a draw
+  current_streak: number
+  longest_win_streak: number
+  longest_loss_streak: number
+  wins_count: number
+  losses_count: number
+  draws_count: number
+  // Running sum and count behind average_opponent_rating
+  opponent_rating_sum: number
+  opponent_games: number
+  average_opponent_rating: number | null
+  updated_at?: string
+}
+
+export interface StatsHistoryRow {
+  user_id: number
+  new_rating: number
+  opponent_rating?: number | null
+  game_result?: string | null
+  created_at: string
+}
+
+export function emptyRatingStats(userId: number): PlayerRatingStats {
+  return {
+    user_id: userId,
+    highest_rating: null,
+    highest_rating_date: null,
+    lowest_rating: null,
+    lowest_rating_date: null,
+    best_win_opponent_rating: null,
+    best_win_date: null,
+    current_streak: 0,
+    longest_win_streak: 0,
+    longest_loss_streak: 0,
+    wins_count: 0,
+    losses_count: 0,
+    draws_count: 0,
+    opponent_rating_sum: 0,
+    opponent_games: 0,
+    average_opponent_rating: null
+  }
+}
+
+/**
+ * Fold one new history row into a player's stats in O(1)
+ */
+export function applyRatingHistoryToStats(
+  stats: PlayerRatingStats | null,
+  row: StatsHistoryRow
+): PlayerRatingStats {
+  const next = { ...(stats || emptyRatingStats(row.user_id)) }
+
+  // Latest date of the peak, earliest date of the low (as the full recompute did)
+  if (next.highest_rating === null || row.new_rating >= next.highest_rating) {
+    next.highest_rating = row.new_rating
+    next.highest_rating_date = row.created_at
+  }
+  if (next.lowest_rating === null || row.new_rating < next.lowest_rating) {
+    next.lowest_rating = row.new_rating
+    next.lowest_rating_date = row.created_at
+  }
+
+  if (row.opponent_rating !== null && row.opponent_rating !== undefined) {
+    next.opponent_rating_sum += row.opponent_rating
+    next.opponent_games++
+    next.average_opponent_rating = next.opponent_rating_sum / next.opponent_games
+  }
+
+  if (row.game_result === 'win') {
+    next.wins_count++
+    next.current_streak = next.current_streak > 0 ? next.current_streak + 1 : 1
+    next.longest_win_streak = Math.max(next.longest_win_streak, next.current_streak)
+    const opponent = row.opponent_rating ?? null
+    if (opponent !== null && (next.best_win_opponent_rating === null || opponent > next.best_win_opponent_rating)) {
+      next.best_win_opponent_rating = opponent
+      next.best_win_date = row.created_at
+    }
+  } else if (row.game_result === 'loss') {
+    next.losses_count++
+    next.current_streak = next.current_streak < 0 ? next.current_streak - 1 : -1
+    next.longest_loss_streak = Math.max(next.longest_loss_streak, -next.current_streak)
+  } else if (row.game_result === 'draw') {
+    next.draws_count++
+    next.current_streak = 0
+  }
+
+  return next
+}
+
+/**
+ * Rebuild stats from a player's full history (chronological order);
+ * null when the player has no history
+ */
+export function rebuildRatingStats(rows: StatsHistoryRow[]): PlayerRatingStats | null {
+  let stats: PlayerRatingStats | null = null
+  for (const row of rows) stats = applyRatingHistoryToStats(stats, row)
+  return stats
+}
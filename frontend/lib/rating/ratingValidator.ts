@@ -2,6 +2,11 @@ import { supabase } from '../supabase'
 import { getUserById } from '../db'
 import type { User } from '../db'
 import type { RatingValidationResult, RatingHistory } from './types'
+import { createLogger } from '../logger'
+
+const log = createLogger('rating/ratingValidator')
+
+type HistoryWindowRow = Required<Pick<RatingHistory, 'created_at' | 'rating_change'>>
 
 export class RatingValidator {
   private readonly MIN_RATING_FOR_TOURNAMENT = 800
@@ -9,6 +14,14 @@ export class RatingValidator {
   private readonly MAX_RATING_CHANGE = 200
   private readonly MIN_TIME_BETWEEN_UPDATES = 60 // seconds
   private readonly SUSPICIOUS_ACTIVITY_THRESHOLD = 10 // matches per hour
+  private readonly RAPID_CHANGE_SAMPLE = 5 // latest games averaged by checkRapidRatingChange
+  private readonly HISTORY_WINDOW_TTL = 5000 // ms
+
+  // Recent rating_history rows per user, newest first
+  private historyWindows = new Map<number, { rows: HistoryWindowRow[]; fetchedAt: number }>()
+  private pendingWindows = new Map<number, Promise<HistoryWindowRow[]>>()
+  // Bumped on every invalidation so a load that raced with a write is not cached
+  private historyGeneration = 0
 
   /**
    * Validate user eligibility for rated tournaments
@@ -56,7 +69,7 @@ export class RatingValidator {
         requiresReview: warnings.length > 2
       }
     } catch (_error) {
-      console.error('Error validating tournament eligibility:', _error)
+      log.error('Error validating tournament eligibility', { error: _error })
       return {
         isValid: false,
         errors: ['Validation error occurred'],
@@ -111,7 +124,7 @@ export class RatingValidator {
         requiresReview: warnings.length > 2 || errors.length > 0
       }
     } catch (_error) {
-      console.error('Error validating rating update:', _error)
+      log.error('Error validating rating update', { error: _error })
       return {
         isValid: false,
         errors: ['Rating validation error occurred'],
@@ -167,7 +180,7 @@ export class RatingValidator {
         suggestions
       }
     } catch (error) {
-      console.error('Error validating profile completeness:', error)
+      log.error('Error validating profile completeness', { error })
       return {
         complete: false,
         missingFields: ['validation_error'],
@@ -198,6 +211,57 @@ export class RatingValidator {
     return true
   }
 
+  /**
+   * Latest history rows for a user: enough to answer every check (the hourly
+   * activity count needs threshold + 1 rows, the rapid-change average needs 5).
+   * Cached briefly and shared by concurrent validations.
+   */
+  private async getHistoryWindow(userId: number): Promise<HistoryWindowRow[]> {
+    const cached = this.historyWindows.get(userId)
+    if (cached && Date.now() - cached.fetchedAt < this.HISTORY_WINDOW_TTL) {
+      return cached.rows
+    }
+
+    let pending = this.pendingWindows.get(userId)
+    if (!pending) {
+      const startedAt = this.historyGeneration
+      const load: Promise<HistoryWindowRow[]> = (async () => {
+        const { data, error } = await supabase
+          .from('rating_history')
+          .select('created_at, rating_change')
+          .eq('user_id', userId)
+          .order('created_at', { ascending: false })
+          .limit(Math.max(this.SUSPICIOUS_ACTIVITY_THRESHOLD + 1, this.RAPID_CHANGE_SAMPLE))
+
+        if (error) {
+          throw new Error(`Failed to load rating history: ${error.message}`)
+        }
+
+        const rows = (data || []) as HistoryWindowRow[]
+        if (this.historyGeneration === startedAt) {
+          this.historyWindows.set(userId, { rows, fetchedAt: Date.now() })
+        }
+        return rows
+      })().finally(() => {
+        // An invalidation may already have replaced this load
+        if (this.pendingWindows.get(userId) === load) this.pendingWindows.delete(userId)
+      })
+      pending = load
+      this.pendingWindows.set(userId, pending)
+    }
+    return pending
+  }
+
+  /**
+   * Drop a cached window, e.g. after a new rating_history row was written;
+   * a load already in flight is neither shared nor cached any more
+   */
+  invalidateHistory(userId: number): void {
+    this.historyGeneration++
+    this.historyWindows.delete(userId)
+    this.pendingWindows.delete(userId)
+  }
+
   /**
    * Check for suspicious activity patterns
    */
@@ -206,16 +270,13 @@ export class RatingValidator {
     details: string
   }> {
     try {
-      const oneHourAgo = new Date(Date.now() - 60 * 60 * 1000)
-      
+      const oneHourAgo = Date.now() - 60 * 60 * 1000
+
       // Check recent rating history
-      const { data: recentHistory } = await supabase
-        .from('rating_history')
-        .select('created_at')
-        .eq('user_id', userId)
-        .gte('created_at', oneHourAgo.toISOString())
+      const history = await this.getHistoryWindow(userId)
+      const recentHistory = history.filter((h) => new Date(h.created_at).getTime() >= oneHourAgo)
 
-      if (recentHistory && recentHistory.length > this.SUSPICIOUS_ACTIVITY_THRESHOLD) {
+      if (recentHistory.length > this.SUSPICIOUS_ACTIVITY_THRESHOLD) {
         return {
           isSuspicious: true,
           details: `${recentHistory.length} обновлений рейтинга за последний час`
@@ -227,7 +288,7 @@ export class RatingValidator {
         details: ''
       }
     } catch (error) {
-      console.error('Error checking suspicious activity:', error)
+      log.error('Error checking suspicious activity', { error })
       return {
         isSuspicious: false,
         details: ''
@@ -248,7 +309,7 @@ export class RatingValidator {
       
       return timeDiff < this.MIN_TIME_BETWEEN_UPDATES
     } catch (error) {
-      console.error('Error checking update frequency:', error)
+      log.error('Error checking update frequency', { error })
       return false
     }
   }
@@ -258,15 +319,8 @@ export class RatingValidator {
    */
   private async getLastRatingUpdate(userId: number): Promise<Date | null> {
     try {
-      const { data } = await supabase
-        .from('rating_history')
-        .select('created_at')
-        .eq('user_id', userId)
-        .order('created_at', { ascending: false })
-        .limit(1)
-        .single()
-
-      return data ? new Date(data.created_at) : null
+      const [latest] = await this.getHistoryWindow(userId)
+      return latest ? new Date(latest.created_at) : null
     } catch {
       return null
     }
@@ -295,15 +349,10 @@ export class RatingValidator {
       }
 
       // Check recent changes pattern
-      const { data: recentHistory } = await supabase
-        .from('rating_history')
-        .select('rating_change')
-        .eq('user_id', userId)
-        .order('created_at', { ascending: false })
-        .limit(5)
-
-      if (recentHistory && recentHistory.length >= 3) {
-        const avgChange = recentHistory.reduce((sum: number, h: RatingHistory) => sum + Math.abs(h.rating_change), 0) / recentHistory.length
+      const recentHistory = (await this.getHistoryWindow(userId)).slice(0, this.RAPID_CHANGE_SAMPLE)
+
+      if (recentHistory.length >= 3) {
+        const avgChange = recentHistory.reduce((sum, h) => sum + Math.abs(h.rating_change), 0) / recentHistory.length
         if (avgChange > 50) {
           return {
             isRapid: true,
@@ -317,7 +366,7 @@ export class RatingValidator {
         details: ''
       }
     } catch (error) {
-      console.error('Error checking rapid rating change:', error)
+      log.error('Error checking rapid rating change', { error })
       return {
         isRapid: false,
         details: ''
@@ -365,7 +414,7 @@ export class RatingValidator {
         errors
       }
     } catch (error) {
-      console.error('Error validating match context:', error)
+      log.error('Error validating match context', { error })
       return {
         isValid: false,
         errors: ['Ошибка валидации матча']
@@ -386,9 +435,9 @@ export class RatingValidator {
       })
 
       // TODO: Send notification to admins
-      console.warn(`Suspicious activity flagged for user ${userId}: ${reason}`)
+      log.warn('Suspicious activity flagged', { userId, reason })
     } catch (error) {
-      console.error('Error flagging suspicious activity:', error)
+      log.error('Error flagging suspicious activity', { error })
     }
   }
 }
@@ -0,0 +1,262 @@
+// Monte Carlo forecast of final standings. Pure and dependency-free so it can
+// run inside a worker thread (see forecastWorker.ts) or inline.
+
+export type ForecastPairingMode = 'swiss' | 'rating'
+
+export interface ForecastPlayer {
+  participantId: number
+  nickname: string
+  points: number
+  rating: number
+}
+
+export interface ForecastInput {
+  players: ForecastPlayer[]
+  // Row-major n x n probabilities in `players` order (see PredictionMatrix)
+  win: Float32Array
+  draw: Float32Array
+  // Player index pairs that already met, and players that already had a bye
+  played: Array<[number, number]>
+  byes: number[]
+  // Unfinished games of the current round (player indexes)
+  pending: Array<[number, number]>
+  remainingRounds: number
+  scoring: { win: number; draw: number; loss: number; bye: number }
+  pairing: ForecastPairingMode
+  topN: number
+}
+
+export interface ForecastOptions {
+  seed: number
+  iterations: number
+  timeBudgetMs: number
+  // Iterations between progress reports
+  chunkSize: number
+}
+
+export interface PlayerForecast {
+  participantId: number
+  nickname: string
+  currentPoints: number
+  expectedPoints: number
+  expectedRank: number
+  winProbability: number
+  topProbability: number
+}
+
+export interface ForecastResult {
+  iterations: number
+  complete: boolean
+  seed: number
+  topN: number
+  players: PlayerForecast[]
+}
+
+export const DEFAULT_FORECAST_OPTIONS: ForecastOptions = {
+  seed: 1,
+  iterations: 5000,
+  timeBudgetMs: 2000,
+  chunkSize: 250
+}
+
+/**
+ * mulberry32: small, fast, seedable PRNG returning floats in [0, 1)
+ */
+export function createRng(seed: number): () => number {
+  let state = seed >>> 0
+  return () => {
+    state = (state + 0x6d2b79f5) >>> 0
+    let t = state
+    t = Math.imul(t ^ (t >>> 15), t | 1)
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61)
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296
+  }
+}
+
+/**
+ * Accumulates simulated continuations; run in chunks and snapshot any time
+ */
+export class ForecastSimulation {
+  private readonly n: number
+  private readonly rng: () => number
+  private readonly met: Uint8Array
+  private readonly hadBye: Uint8Array
+  private readonly points: Float64Array
+  private readonly paired: Uint8Array
+  private readonly firstCount: Float64Array
+  private readonly topCount: Float64Array
+  private readonly pointsSum: Float64Array
+  private readonly rankSum: Float64Array
+  private iterations = 0
+
+  constructor(private readonly input: ForecastInput, readonly seed: number) {
+    const n = input.players.length
+    this.n = n
+    this.rng = createRng(seed)
+    this.met = new Uint8Array(n * n)
+    this.hadBye = new Uint8Array(n)
+    for (const [i, j] of input.played) {
+      this.met[i * n + j] = 1
+      this.met[j * n + i] = 1
+    }
+    for (const i of input.byes) this.hadBye[i] = 1
+    this.points = new Float64Array(n)
+    this.paired = new Uint8Array(n)
+    this.firstCount = new Float64Array(n)
+    this.topCount = new Float64Array(n)
+    this.pointsSum = new Float64Array(n)
+    this.rankSum = new Float64Array(n)
+  }
+
+  get completed(): number {
+    return this.iterations
+  }
+
+  run(count: number): void {
+    for (let k = 0; k < count; k++) this.simulateOnce()
+  }
+
+  snapshot(complete: boolean): ForecastResult {
+    const runs = Math.max(1, this.iterations)
+    const players = this.input.players.map((p, i) => ({
+      participantId: p.participantId,
+      nickname: p.nickname,
+      currentPoints: p.points,
+      expectedPoints: this.pointsSum[i] / runs,
+      expectedRank: this.rankSum[i] / runs,
+      winProbability: this.firstCount[i] / runs,
+      topProbability: this.topCount[i] / runs
+    }))
+    players.sort((a, b) => a.expectedRank - b.expectedRank)
+
+    return { iterations: this.iterations, complete, seed: this.seed, topN: this.input.topN, players }
+  }
+
+  private simulateOnce(): void {
+    const { n, points, input } = this
+    const added: number[] = []
+    const byes: number[] = []
+    for (let i = 0; i < n; i++) points[i] = input.players[i].points
+
+    for (const [i, j] of input.pending) this.playGame(i, j)
+    for (let round = 0; round < input.remainingRounds; round++) {
+      this.pairRound(added, byes)
+    }
+
+    // Rank with a random tie-break so shared places split the probability
+    const key = new Float64Array(n)
+    for (let i = 0; i < n; i++) key[i] = points[i] + this.rng() * 1e-6
+    const ranked = Array.from({ length: n }, (_, i) => i).sort((a, b) => key[b] - key[a])
+    for (let rank = 0; rank < n; rank++) {
+      const i = ranked[rank]
+      this.pointsSum[i] += points[i]
+      this.rankSum[i] += rank + 1
+      if (rank === 0) this.firstCount[i]++
+      if (rank < input.topN) this.topCount[i]++
+    }
+
+    // Undo this continuation's pairings
+    for (const cell of added) this.met[cell] = 0
+    for (const i of byes) this.hadBye[i] = 0
+    this.iterations++
+  }
+
+  /**
+   * Fast simplified pairing: walk the field in order and pair each player with
+   * the next one they have not met (score groups for Swiss, rating otherwise)
+   */
+  private pairRound(added: number[], byes: number[]): void {
+    const { n, points, input, paired, met } = this
+    const players = Array.from({ length: n }, (_, i) => i)
+    if (input.pairing === 'swiss') {
+      players.sort((a, b) => points[b] - points[a] || input.players[b].rating - input.players[a].rating)
+    } else {
+      players.sort((a, b) => input.players[b].rating - input.players[a].rating)
+    }
+    paired.fill(0)
+
+    if (n % 2 === 1) {
+      let bye = -1
+      for (let k = n - 1; k >= 0 && bye === -1; k--) {
+        if (!this.hadBye[players[k]]) bye = players[k]
+      }
+      if (bye === -1) bye = players[n - 1]
+      paired[bye] = 1
+      points[bye] += input.scoring.bye
+      if (!this.hadBye[bye]) {
+        this.hadBye[bye] = 1
+        byes.push(bye)
+      }
+    }
+
+    for (let a = 0; a < n; a++) {
+      const i = players[a]
+      if (paired[i]) continue
+      let fallback = -1
+      let opponent = -1
+      for (let b = a + 1; b < n; b++) {
+        const j = players[b]
+        if (paired[j]) continue
+        if (fallback === -1) fallback = j
+        if (!met[i * n + j]) {
+          opponent = j
+          break
+        }
+      }
+      if (opponent === -1) opponent = fallback
+      if (opponent === -1) continue
+
+      paired[i] = 1
+      paired[opponent] = 1
+      if (!met[i * n + opponent]) {
+        met[i * n + opponent] = 1
+        met[opponent * n + i] = 1
+        added.push(i * n + opponent, opponent * n + i)
+      }
+      this.playGame(i, opponent)
+    }
+  }
+
+  private playGame(i: number, j: number): void {
+    const { n, points, input } = this
+    const roll = this.rng()
+    const win = input.win[i * n + j]
+    const draw = input.draw[i * n + j]
+    if (roll < win) {
+      points[i] += input.scoring.win
+      points[j] += input.scoring.loss
+    } else if (roll < win + draw) {
+      points[i] += input.scoring.draw
+      points[j] += input.scoring.draw
+    } else {
+      points[i] += input.scoring.loss
+      points[j] += input.scoring.win
+    }
+  }
+}
+
+/**
+ * Run chunks until the iteration target or the time budget is reached,
+ * reporting a partial result after every chunk; rejects once `signal` aborts
+ */
+export async function runForecast(
+  input: ForecastInput,
+  options: ForecastOptions,
+  onProgress?: (partial: ForecastResult) => void,
+  signal?: AbortSignal
+): Promise<ForecastResult> {
+  const simulation = new ForecastSimulation(input, options.seed)
+  const deadline = Date.now() + options.timeBudgetMs
+
+  while (simulation.completed < options.iterations && Date.now() < deadline) {
+    signal?.throwIfAborted()
+    simulation.run(Math.min(options.chunkSize, options.iterations - simulation.completed))
+    if (simulation.completed < options.iterations) {
+      onProgress?.(simulation.snapshot(false))
+      // Let other work (I/O, message delivery) through between chunks
+      await new Promise((resolve) => setTimeout(resolve, 0))
+    }
+  }
+
+  return simulation.snapshot(simulation.completed >= options.iterations)
+}
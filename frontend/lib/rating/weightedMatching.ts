@@ -0,0 +1,490 @@
+/**
+ * Maximum-weight general matching (Edmonds' blossom algorithm with
+ * Galil's O(n^3) dual bookkeeping).
+ *
+ * Port of the well-known primal-dual implementation by Joris van Rantwijk.
+ * Vertices are numbered 0..n-1, edges are [u, v, weight] triples.
+ * Weights should be integers so the optimum is exact (no float drift).
+ *
+ * With `maxCardinality` the result is a maximum-cardinality matching that has
+ * maximum weight among all maximum-cardinality matchings — which is how a
+ * minimum-cost perfect matching is obtained: weight = C - cost.
+ */
+
+export type WeightedEdge = [number, number, number]
+
+/**
+ * Compute a maximum-weight matching.
+ * Returns `mate`, where mate[v] is the vertex matched to v or -1.
+ */
+export function maxWeightMatching(edges: WeightedEdge[], maxCardinality = false): number[] {
+  const nedge = edges.length
+  if (nedge === 0) return []
+
+  let nvertex = 0
+  let maxWeight = 0
+  for (const [i, j, w] of edges) {
+    if (i >= nvertex) nvertex = i + 1
+    if (j >= nvertex) nvertex = j + 1
+    if (w > maxWeight) maxWeight = w
+  }
+
+  // Edge k has endpoints 2k (u) and 2k+1 (v); endpoint[p] is the vertex at p
+  const edgeU = new Int32Array(nedge)
+  const edgeV = new Int32Array(nedge)
+  const edgeW = new Float64Array(nedge)
+  const endpoint = new Int32Array(2 * nedge)
+  const degree = new Int32Array(nvertex + 1)
+  for (let k = 0; k < nedge; k++) {
+    const [i, j, w] = edges[k]
+    edgeU[k] = i
+    edgeV[k] = j
+    edgeW[k] = w
+    endpoint[2 * k] = i
+    endpoint[2 * k + 1] = j
+    degree[i + 1]++
+    degree[j + 1]++
+  }
+
+  // neighbend (CSR): remote endpoints of the edges incident to v live in
+  // neighbend[neighStart[v] .. neighStart[v + 1])
+  const neighStart = degree
+  for (let v = 0; v < nvertex; v++) neighStart[v + 1] += neighStart[v]
+  const neighbend = new Int32Array(2 * nedge)
+  const fillPos = neighStart.slice(0, nvertex)
+  for (let k = 0; k < nedge; k++) {
+    neighbend[fillPos[edgeU[k]]++] = 2 * k + 1
+    neighbend[fillPos[edgeV[k]]++] = 2 * k
+  }
+
+  const mate = new Int32Array(nvertex).fill(-1)
+  // Labels: 0 = free, 1 = S, 2 = T (5 is a transient scan marker)
+  const label = new Int32Array(2 * nvertex)
+  const labelend = new Int32Array(2 * nvertex).fill(-1)
+  const inblossom = new Int32Array(nvertex)
+  for (let v = 0; v < nvertex; v++) inblossom[v] = v
+  const blossomparent = new Int32Array(2 * nvertex).fill(-1)
+  const blossomchilds: Array<number[] | null> = new Array(2 * nvertex).fill(null)
+  const blossombase = new Int32Array(2 * nvertex).fill(-1)
+  for (let v = 0; v < nvertex; v++) blossombase[v] = v
+  const blossomendps: Array<number[] | null> = new Array(2 * nvertex).fill(null)
+  const bestedge = new Int32Array(2 * nvertex).fill(-1)
+  const blossombestedges: Array<number[] | null> = new Array(2 * nvertex).fill(null)
+  const unusedblossoms: number[] = []
+  for (let b = 2 * nvertex - 1; b >= nvertex; b--) unusedblossoms.push(b)
+  const dualvar = new Float64Array(2 * nvertex)
+  dualvar.fill(maxWeight, 0, nvertex)
+  const allowedge = new Uint8Array(nedge)
+  // Scratch buffer for addBlossom (least-slack edge per neighbouring S-blossom)
+  const bestedgeto = new Int32Array(2 * nvertex).fill(-1)
+  let queue: number[] = []
+
+  const slack = (k: number): number => dualvar[edgeU[k]] + dualvar[edgeV[k]] - 2 * edgeW[k]
+
+  const blossomLeaves = (b: number, out: number[] = []): number[] => {
+    if (b < nvertex) {
+      out.push(b)
+    } else {
+      for (const t of blossomchilds[b]!) {
+        if (t < nvertex) out.push(t)
+        else blossomLeaves(t, out)
+      }
+    }
+    return out
+  }
+
+  // Python-style index into a blossom's child/endpoint ring
+  const at = (arr: number[], j: number): number => arr[((j % arr.length) + arr.length) % arr.length]
+
+  const assignLabel = (w: number, t: number, p: number): void => {
+    const b = inblossom[w]
+    label[w] = label[b] = t
+    labelend[w] = labelend[b] = p
+    bestedge[w] = bestedge[b] = -1
+    if (t === 1) {
+      blossomLeaves(b, queue)
+    } else if (t === 2) {
+      const base = blossombase[b]
+      assignLabel(endpoint[mate[base]], 1, mate[base] ^ 1)
+    }
+  }
+
+  // Trace back from v and w to discover a new blossom or an augmenting path
+  const scanBlossom = (vStart: number, wStart: number): number => {
+    const path: number[] = []
+    let base = -1
+    let v = vStart
+    let w = wStart
+    while (v !== -1 || w !== -1) {
+      let b = inblossom[v]
+      if (label[b] & 4) {
+        base = blossombase[b]
+        break
+      }
+      path.push(b)
+      label[b] = 5
+      if (labelend[b] === -1) {
+        v = -1
+      } else {
+        v = endpoint[labelend[b]]
+        b = inblossom[v]
+        v = endpoint[labelend[b]]
+      }
+      if (w !== -1) {
+        const tmp = v
+        v = w
+        w = tmp
+      }
+    }
+    for (const b of path) label[b] = 1
+    return base
+  }
+
+  const addBlossom = (base: number, k: number): void => {
+    let v = edgeU[k]
+    let w = edgeV[k]
+    const bb = inblossom[base]
+    let bv = inblossom[v]
+    let bw = inblossom[w]
+    const b = unusedblossoms.pop()!
+    blossombase[b] = base
+    blossomparent[b] = -1
+    blossomparent[bb] = b
+    const path: number[] = []
+    const endps: number[] = []
+    while (bv !== bb) {
+      blossomparent[bv] = b
+      path.push(bv)
+      endps.push(labelend[bv])
+      v = endpoint[labelend[bv]]
+      bv = inblossom[v]
+    }
+    path.push(bb)
+    path.reverse()
+    endps.reverse()
+    endps.push(2 * k)
+    while (bw !== bb) {
+      blossomparent[bw] = b
+      path.push(bw)
+      endps.push(labelend[bw] ^ 1)
+      w = endpoint[labelend[bw]]
+      bw = inblossom[w]
+    }
+    blossomchilds[b] = path
+    blossomendps[b] = endps
+    label[b] = 1
+    labelend[b] = labelend[bb]
+    dualvar[b] = 0
+    for (const leaf of blossomLeaves(b)) {
+      if (label[inblossom[leaf]] === 2) queue.push(leaf)
+      inblossom[leaf] = b
+    }
+
+    // Compute the least-slack edges from the new blossom to each S-blossom
+    const touched: number[] = []
+    for (const sub of path) {
+      let nblists: number[][]
+      if (blossombestedges[sub] === null) {
+        nblists = blossomLeaves(sub).map((leaf) => {
+          const ks: number[] = []
+          for (let q = neighStart[leaf]; q < neighStart[leaf + 1]; q++) ks.push(neighbend[q] >> 1)
+          return ks
+        })
+      } else {
+        nblists = [blossombestedges[sub]!]
+      }
+      for (const nblist of nblists) {
+        for (const kk of nblist) {
+          let j = edgeV[kk]
+          if (inblossom[j] === b) j = edgeU[kk]
+          const bj = inblossom[j]
+          if (bj !== b && label[bj] === 1) {
+            if (bestedgeto[bj] === -1) {
+              touched.push(bj)
+              bestedgeto[bj] = kk
+            } else if (slack(kk) < slack(bestedgeto[bj])) {
+              bestedgeto[bj] = kk
+            }
+          }
+        }
+      }
+      blossombestedges[sub] = null
+      bestedge[sub] = -1
+    }
+    touched.sort((x, y) => x - y)
+    const best = touched.map((bj) => bestedgeto[bj])
+    for (const bj of touched) bestedgeto[bj] = -1
+    blossombestedges[b] = best
+    bestedge[b] = -1
+    for (const kk of best) {
+      if (bestedge[b] === -1 || slack(kk) < slack(bestedge[b])) bestedge[b] = kk
+    }
+  }
+
+  const expandBlossom = (b: number, endstage: boolean): void => {
+    const childs = blossomchilds[b]!
+    const endps = blossomendps[b]!
+    for (const s of childs) {
+      blossomparent[s] = -1
+      if (s < nvertex) {
+        inblossom[s] = s
+      } else if (endstage && dualvar[s] === 0) {
+        expandBlossom(s, endstage)
+      } else {
+        for (const leaf of blossomLeaves(s)) inblossom[leaf] = s
+      }
+    }
+
+    if (!endstage && label[b] === 2) {
+      // Relabel sub-blossoms along the even-length path from entry child to base
+      const entrychild = inblossom[endpoint[labelend[b] ^ 1]]
+      let j = childs.indexOf(entrychild)
+      let jstep: number
+      let endptrick: number
+      if (j & 1) {
+        j -= childs.length
+        jstep = 1
+        endptrick = 0
+      } else {
+        jstep = -1
+        endptrick = 1
+      }
+      let p = labelend[b]
+      while (j !== 0) {
+        label[endpoint[p ^ 1]] = 0
+        label[endpoint[at(endps, j - endptrick) ^ endptrick ^ 1]] = 0
+        assignLabel(endpoint[p ^ 1], 2, p)
+        allowedge[at(endps, j - endptrick) >> 1] = 1
+        j += jstep
+        p = at(endps, j - endptrick) ^ endptrick
+        allowedge[p >> 1] = 1
+        j += jstep
+      }
+      const bv = at(childs, j)
+      label[endpoint[p ^ 1]] = label[bv] = 2
+      labelend[endpoint[p ^ 1]] = labelend[bv] = p
+      bestedge[bv] = -1
+      j += jstep
+      while (at(childs, j) !== entrychild) {
+        const sub = at(childs, j)
+        if (label[sub] === 1) {
+          j += jstep
+          continue
+        }
+        let reached = -1
+        for (const leaf of blossomLeaves(sub)) {
+          if (label[leaf] !== 0) {
+            reached = leaf
+            break
+          }
+        }
+        if (reached !== -1) {
+          label[reached] = 0
+          label[endpoint[mate[blossombase[sub]]]] = 0
+          assignLabel(reached, 2, labelend[reached])
+        }
+        j += jstep
+      }
+    }
+
+    label[b] = labelend[b] = -1
+    blossomchilds[b] = blossomendps[b] = null
+    blossombase[b] = -1
+    blossombestedges[b] = null
+    bestedge[b] = -1
+    unusedblossoms.push(b)
+  }
+
+  // Swap matched/unmatched edges along the alternating path through blossom b to v
+  const augmentBlossom = (b: number, v: number): void => {
+    let t = v
+    while (blossomparent[t] !== b) t = blossomparent[t]
+    if (t >= nvertex) augmentBlossom(t, v)
+    const childs = blossomchilds[b]!
+    const endps = blossomendps[b]!
+    const i = childs.indexOf(t)
+    let j = i
+    let jstep: number
+    let endptrick: number
+    if (i & 1) {
+      j -= childs.length
+      jstep = 1
+      endptrick = 0
+    } else {
+      jstep = -1
+      endptrick = 1
+    }
+    while (j !== 0) {
+      j += jstep
+      t = at(childs, j)
+      const p = at(endps, j - endptrick) ^ endptrick
+      if (t >= nvertex) augmentBlossom(t, endpoint[p])
+      j += jstep
+      t = at(childs, j)
+      if (t >= nvertex) augmentBlossom(t, endpoint[p ^ 1])
+      mate[endpoint[p]] = p ^ 1
+      mate[endpoint[p ^ 1]] = p
+    }
+    blossomchilds[b] = childs.slice(i).concat(childs.slice(0, i))
+    blossomendps[b] = endps.slice(i).concat(endps.slice(0, i))
+    blossombase[b] = blossombase[blossomchilds[b]![0]]
+  }
+
+  const augmentMatching = (k: number): void => {
+    const starts: Array<[number, number]> = [[edgeU[k], 2 * k + 1], [edgeV[k], 2 * k]]
+    for (const [s0, p0] of starts) {
+      let s = s0
+      let p = p0
+      for (;;) {
+        const bs = inblossom[s]
+        if (bs >= nvertex) augmentBlossom(bs, s)
+        mate[s] = p
+        if (labelend[bs] === -1) break
+        const t = endpoint[labelend[bs]]
+        const bt = inblossom[t]
+        s = endpoint[labelend[bt]]
+        const j = endpoint[labelend[bt] ^ 1]
+        if (bt >= nvertex) augmentBlossom(bt, j)
+        mate[j] = labelend[bt]
+        p = labelend[bt] ^ 1
+      }
+    }
+  }
+
+  for (let stage = 0; stage < nvertex; stage++) {
+    label.fill(0)
+    bestedge.fill(-1)
+    for (let b = nvertex; b < 2 * nvertex; b++) blossombestedges[b] = null
+    allowedge.fill(0)
+    queue = []
+
+    for (let v = 0; v < nvertex; v++) {
+      if (mate[v] === -1 && label[inblossom[v]] === 0) assignLabel(v, 1, -1)
+    }
+
+    let augmented = false
+    for (;;) {
+      while (queue.length > 0 && !augmented) {
+        const v = queue.pop()!
+        for (let q = neighStart[v]; q < neighStart[v + 1]; q++) {
+          const p = neighbend[q]
+          const k = p >> 1
+          const w = endpoint[p]
+          if (inblossom[v] === inblossom[w]) continue
+          let kslack = 0
+          if (!allowedge[k]) {
+            kslack = slack(k)
+            if (kslack <= 0) allowedge[k] = 1
+          }
+          if (allowedge[k]) {
+            if (label[inblossom[w]] === 0) {
+              assignLabel(w, 2, p ^ 1)
+            } else if (label[inblossom[w]] === 1) {
+              const base = scanBlossom(v, w)
+              if (base >= 0) {
+                addBlossom(base, k)
+              } else {
+                augmentMatching(k)
+                augmented = true
+                break
+              }
+            } else if (label[w] === 0) {
+              label[w] = 2
+              labelend[w] = p ^ 1
+            }
+          } else if (label[inblossom[w]] === 1) {
+            const b = inblossom[v]
+            if (bestedge[b] === -1 || kslack < slack(bestedge[b])) bestedge[b] = k
+          } else if (label[w] === 0) {
+            if (bestedge[w] === -1 || kslack < slack(bestedge[w])) bestedge[w] = k
+          }
+        }
+      }
+      if (augmented) break
+
+      // No augmenting path under the current duals: compute the dual step
+      let deltatype = -1
+      let delta = 0
+      let deltaedge = -1
+      let deltablossom = -1
+
+      if (!maxCardinality) {
+        deltatype = 1
+        delta = Infinity
+        for (let v = 0; v < nvertex; v++) if (dualvar[v] < delta) delta = dualvar[v]
+      }
+      for (let v = 0; v < nvertex; v++) {
+        if (label[inblossom[v]] === 0 && bestedge[v] !== -1) {
+          const d = slack(bestedge[v])
+          if (deltatype === -1 || d < delta) {
+            delta = d
+            deltatype = 2
+            deltaedge = bestedge[v]
+          }
+        }
+      }
+      for (let b = 0; b < 2 * nvertex; b++) {
+        if (blossomparent[b] === -1 && label[b] === 1 && bestedge[b] !== -1) {
+          const d = slack(bestedge[b]) / 2
+          if (deltatype === -1 || d < delta) {
+            delta = d
+            deltatype = 3
+            deltaedge = bestedge[b]
+          }
+        }
+      }
+      for (let b = nvertex; b < 2 * nvertex; b++) {
+        if (blossombase[b] >= 0 && blossomparent[b] === -1 && label[b] === 2 && (deltatype === -1 || dualvar[b] < delta)) {
+          delta = dualvar[b]
+          deltatype = 4
+          deltablossom = b
+        }
+      }
+      if (deltatype === -1) {
+        // Max-cardinality mode and no further progress possible
+        deltatype = 1
+        let minDual = Infinity
+        for (let v = 0; v < nvertex; v++) if (dualvar[v] < minDual) minDual = dualvar[v]
+        delta = Math.max(0, minDual)
+      }
+
+      for (let v = 0; v < nvertex; v++) {
+        const l = label[inblossom[v]]
+        if (l === 1) dualvar[v] -= delta
+        else if (l === 2) dualvar[v] += delta
+      }
+      for (let b = nvertex; b < 2 * nvertex; b++) {
+        if (blossombase[b] >= 0 && blossomparent[b] === -1) {
+          if (label[b] === 1) dualvar[b] += delta
+          else if (label[b] === 2) dualvar[b] -= delta
+        }
+      }
+
+      if (deltatype === 1) {
+        break
+      } else if (deltatype === 2) {
+        allowedge[deltaedge] = 1
+        const i = label[inblossom[edgeU[deltaedge]]] === 0 ? edgeV[deltaedge] : edgeU[deltaedge]
+        queue.push(i)
+      } else if (deltatype === 3) {
+        allowedge[deltaedge] = 1
+        queue.push(edgeU[deltaedge])
+      } else if (deltatype === 4) {
+        expandBlossom(deltablossom, false)
+      }
+    }
+
+    if (!augmented) break
+
+    // End of stage: expand S-blossoms whose dual dropped to zero
+    for (let b = nvertex; b < 2 * nvertex; b++) {
+      if (blossomparent[b] === -1 && blossombase[b] >= 0 && label[b] === 1 && dualvar[b] === 0) {
+        expandBlossom(b, true)
+      }
+    }
+  }
+
+  const result = new Array<number>(nvertex)
+  for (let v = 0; v < nvertex; v++) result[v] = mate[v] >= 0 ? endpoint[mate[v]] : -1
+  return result
+}
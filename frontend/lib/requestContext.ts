@@ -0,0 +1,240 @@
+import { AsyncLocalStorage } from 'async_hooks'
+import { createLogger, requestIdFrom, runWithLogContext } from './logger'
+import { metrics } from './metrics'
+
+// Per-request accounting for the API route handlers. Every Supabase call made
+// while a request is being handled is counted and timed against it, as are
+// named spans (bbp, rating, ...). The totals go out in a Server-Timing header,
+// so devtools shows where the time went, and requests slower than
+// SLOW_REQUEST_LOG_MS (unset: off) are logged with their query list.
+//
+// Queries are also fingerprinted by shape (table, operation and filtered
+// columns, without values). A shape repeated REPEATED_QUERY_THRESHOLD times in
+// one request is the signature of a query in a loop (N+1) and is logged once
+// per request; countQueries() exposes the same accounting to tests, so hot
+// paths can be held to a query budget.
+
+const log = createLogger('request')
+
+// Queries kept per request for the slow-request log; the counters go on past it
+const MAX_RECORDED_QUERIES = 200
+
+function repeatedQueryThreshold(): number {
+  const value = Number(process.env.REPEATED_QUERY_THRESHOLD)
+  return Number.isFinite(value) && value > 1 ? value : 5
+}
+
+export interface QueryRecord {
+  table: string
+  op: string
+  // e.g. "select matches eq(round_id)"
+  shape: string
+  durationMs: number
+  status: string
+}
+
+export interface RequestContext {
+  requestId: string
+  route: string
+  method: string
+  // performance.now() when the handler was entered
+  startedAt: number
+  queryCount: number
+  queryMs: number
+  queries: QueryRecord[]
+  // Calls per query shape
+  shapes: Map<string, number>
+  spans: Map<string, { durationMs: number; count: number }>
+}
+
+const httpRequests = metrics.counter('http_requests_total', 'API requests by route, method and status', ['route', 'method', 'status'])
+const httpRequestDuration = metrics.histogram('http_request_duration_seconds', 'API request latency by route and method', ['route', 'method'])
+const httpRequestQueries = metrics.counter('http_request_supabase_calls_total', 'Supabase calls made while handling API requests, by route', ['route'])
+const repeatedQueryShapes = metrics.counter(
+  'http_request_repeated_query_shapes_total',
+  'Query shapes repeated past REPEATED_QUERY_THRESHOLD within one request (likely N+1), by route',
+  ['route']
+)
+
+const storage = new AsyncLocalStorage<RequestContext>()
+
+export function getRequestContext(): RequestContext | undefined {
+  return storage.getStore()
+}
+
+/**
+ * Count a finished Supabase call against the current request (no-op outside one)
+ */
+export function recordRequestQuery(query: QueryRecord): void {
+  const context = storage.getStore()
+  if (!context) return
+  context.queryCount++
+  context.queryMs += query.durationMs
+  if (context.queries.length < MAX_RECORDED_QUERIES) context.queries.push(query)
+
+  const count = (context.shapes.get(query.shape) ?? 0) + 1
+  context.shapes.set(query.shape, count)
+  if (count === repeatedQueryThreshold() && context.route) {
+    repeatedQueryShapes.inc({ route: context.route })
+    log.warn('Repeated query shape', { route: context.route, shape: query.shape, count })
+  }
+}
+
+/**
+ * Query shapes issued at least `min` times in the request, most frequent first
+ */
+export function repeatedShapes(context: RequestContext, min: number = 2): Array<{ shape: string; count: number }> {
+  return Array.from(context.shapes, ([shape, count]) => ({ shape, count }))
+    .filter((entry) => entry.count >= min)
+    .sort((a, b) => b.count - a.count)
+}
+
+/**
+ * Add `durationMs` to the named span of the current request
+ */
+export function recordSpan(name: string, durationMs: number): void {
+  const context = storage.getStore()
+  if (!context) return
+  const span = context.spans.get(name)
+  if (span) {
+    span.durationMs += durationMs
+    span.count++
+  } else {
+    context.spans.set(name, { durationMs, count: 1 })
+  }
+}
+
+/**
+ * Run `fn` and add its duration to the named span (queries it makes are also
+ * counted under db)
+ */
+export async function timeSpan<T>(name: string, fn: () => Promise<T>): Promise<T> {
+  if (!storage.getStore()) return fn()
+  const started = performance.now()
+  try {
+    return await fn()
+  } finally {
+    recordSpan(name, performance.now() - started)
+  }
+}
+
+function formatMs(ms: number): string {
+  return ms.toFixed(1)
+}
+
+/**
+ * Server-Timing header value: db (Supabase calls), each span, and total
+ */
+export function serverTimingHeader(context: RequestContext, totalMs: number): string {
+  const entries = [`db;dur=${formatMs(context.queryMs)};desc="${context.queryCount} Supabase calls"`]
+  for (const [name, span] of context.spans) {
+    entries.push(`${name};dur=${formatMs(span.durationMs)}`)
+  }
+  entries.push(`total;dur=${formatMs(totalMs)}`)
+  return entries.join(', ')
+}
+
+function slowRequestThreshold(): number {
+  const value = Number(process.env.SLOW_REQUEST_LOG_MS)
+  return process.env.SLOW_REQUEST_LOG_MS && Number.isFinite(value) ? value : Infinity
+}
+
+function finishRequest<R extends Response>(context: RequestContext, response: R | undefined): R | undefined {
+  const totalMs = performance.now() - context.startedAt
+  const status = response?.status ?? 500
+
+  httpRequests.inc({ route: context.route, method: context.method, status })
+  httpRequestDuration.observe(totalMs, { route: context.route, method: context.method })
+  if (context.queryCount > 0) httpRequestQueries.inc({ route: context.route }, context.queryCount)
+
+  if (totalMs >= slowRequestThreshold()) {
+    log.warn('Slow request', () => ({
+      route: context.route,
+      method: context.method,
+      status,
+      durationMs: Math.round(totalMs),
+      queryCount: context.queryCount,
+      queryMs: Math.round(context.queryMs),
+      spans: Object.fromEntries(Array.from(context.spans, ([name, span]) => [name, Math.round(span.durationMs)])),
+      queries: context.queries.map((q) => `${q.shape} ${formatMs(q.durationMs)}ms${q.status === 'ok' ? '' : ` (${q.status})`}`),
+      repeated: repeatedShapes(context)
+    }))
+  }
+
+  if (!response) return response
+  const header = serverTimingHeader(context, totalMs)
+  try {
+    response.headers.set('Server-Timing', header)
+    return response
+  } catch {
+    // Immutable headers (e.g. a proxied fetch response): copy the response
+    const copy = new Response(response.body, response)
+    copy.headers.set('Server-Timing', header)
+    return copy as R
+  }
+}
+
+function createContext(requestId: string, route: string, method: string): RequestContext {
+  return {
+    requestId,
+    route,
+    method,
+    startedAt: performance.now(),
+    queryCount: 0,
+    queryMs: 0,
+    queries: [],
+    shapes: new Map(),
+    spans: new Map()
+  }
+}
+
+/**
+ * Wrap a route handler so its Supabase calls and spans are accounted per
+ * request and reported in a Server-Timing header; `route` is the route
+ * pattern, e.g. "/api/tournaments/[id]/leaderboard"
+ */
+export function withRequestContext<A extends unknown[], R extends Response>(
+  route: string,
+  handler: (...args: A) => Promise<R>
+): (...args: A) => Promise<R> {
+  return (...args: A) => {
+    const req = args[0] as Request | undefined
+    const headers = typeof req?.headers?.get === 'function' ? req.headers : new Headers()
+    const context = createContext(requestIdFrom(headers), route, req?.method || 'GET')
+
+    return runWithLogContext({ requestId: context.requestId, route }, () =>
+      storage.run(context, async () => {
+        let response: R | undefined
+        try {
+          response = await handler(...args)
+        } finally {
+          response = finishRequest(context, response)
+        }
+        return response as R
+      })
+    )
+  }
+}
+
+export interface QueryCount<T> {
+  result: T
+  queryCount: number
+  queries: QueryRecord[]
+  // Shapes issued more than once, most frequent first
+  repeated: Array<{ shape: string; count: number }>
+}
+
+/**
+ * Run `fn` in a request context of its own and report the Supabase calls it
+ * made (for query budget tests)
+ */
+export async function countQueries<T>(fn: () => Promise<T>): Promise<QueryCount<T>> {
+  const context = createContext('count-queries', '', 'TEST')
+  const result = await storage.run(context, fn)
+  return {
+    result,
+    queryCount: context.queryCount,
+    queries: context.queries,
+    repeated: repeatedShapes(context)
+  }
+}
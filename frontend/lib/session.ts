@@ -0,0 +1,177 @@
+import crypto from "crypto"
+import type { TelegramUser } from "./telegram"
+import { createLogger } from "./logger"
+import { metrics } from "./metrics"
+import { supabase } from "./supabase"
+
+const log = createLogger("session")
+
+const sessionChecks = metrics.counter(
+  "session_token_checks_total",
+  "Session token verifications by outcome",
+  ["result"]
+)
+
+// Short-lived signed session tokens issued by /api/auth/telegram in exchange for
+// validated initData. Route handlers verify them without re-checking initData
+// or looking up the role; only the session version is read, and that is cached.
+//
+// Format: "v1.<base64url(JSON claims)>.<base64url(HMAC-SHA256)>"
+
+const TOKEN_PREFIX = "v1"
+export const SESSION_TTL_SECONDS = 15 * 60
+
+export interface SessionClaims {
+  // Telegram user id
+  sub: number
+  // users.id, when the user is registered
+  uid: number | null
+  role: string
+  first_name: string
+  last_name?: string
+  username?: string
+  // users.session_version at issue time (see isCurrentVersion)
+  ver: number
+  iat: number
+  exp: number
+}
+
+let sessionSecret: Buffer | null = null
+
+// updateUserRole bumps users.session_version, which makes every token issued
+// before the change stale. Each instance caches the versions it has read for
+// SESSION_VERSION_CACHE_MS, so a role change reaches all instances within that
+// window (the instance that made the change sees it at once).
+export const SESSION_VERSION_CACHE_MS = 30 * 1000
+const sessionVersions = new Map<number, { version: number; readAt: number }>()
+
+function getSessionSecret(): Buffer {
+  if (!sessionSecret) {
+    const configured = process.env.SESSION_SECRET
+    const botToken = process.env.TELEGRAM_BOT_TOKEN
+    if (configured) {
+      sessionSecret = Buffer.from(configured)
+    } else if (botToken) {
+      sessionSecret = crypto.createHmac("sha256", "SessionToken").update(botToken).digest()
+    } else {
+      // Dev without configuration: tokens are valid for this process only
+      sessionSecret = crypto.randomBytes(32)
+    }
+  }
+  return sessionSecret
+}
+
+async function currentVersion(telegramId: number): Promise<number> {
+  const cached = sessionVersions.get(telegramId)
+  if (cached && Date.now() - cached.readAt < SESSION_VERSION_CACHE_MS) {
+    return cached.version
+  }
+
+  const { data, error } = await supabase
+    .from("users")
+    .select("session_version")
+    .eq("telegram_id", telegramId)
+    .limit(1)
+  if (error) throw error
+  const version = Number(data?.[0]?.session_version ?? 0)
+  sessionVersions.set(telegramId, { version, readAt: Date.now() })
+  return version
+}
+
+function sign(payload: string): string {
+  return crypto.createHmac("sha256", getSessionSecret()).update(payload).digest("base64url")
+}
+
+/**
+ * Issue a token for a validated Telegram user and their resolved role
+ */
+export function createSessionToken(
+  user: Pick<TelegramUser, "id" | "first_name" | "last_name" | "username">,
+  role: string,
+  uid: number | null = null,
+  version = 0
+): { token: string; claims: SessionClaims } {
+  const iat = Math.floor(Date.now() / 1000)
+  const claims: SessionClaims = {
+    sub: user.id,
+    uid,
+    role,
+    first_name: user.first_name,
+    last_name: user.last_name,
+    username: user.username,
+    ver: version,
+    iat,
+    exp: iat + SESSION_TTL_SECONDS
+  }
+  const payload = `${TOKEN_PREFIX}.${Buffer.from(JSON.stringify(claims)).toString("base64url")}`
+  return { token: `${payload}.${sign(payload)}`, claims }
+}
+
+export function isSessionToken(value: string): boolean {
+  return value.startsWith(`${TOKEN_PREFIX}.`) && value.split(".").length === 3
+}
+
+/**
+ * Verify signature, expiry and session version; null when invalid
+ */
+export async function verifySessionToken(token: string): Promise<SessionClaims | null> {
+  let claims = readSessionToken(token)
+  if (claims && !(await isCurrentVersion(claims))) {
+    claims = null
+  }
+  sessionChecks.inc({ result: claims ? "valid" : "invalid" })
+  return claims
+}
+
+async function isCurrentVersion(claims: SessionClaims): Promise<boolean> {
+  try {
+    return claims.ver >= await currentVersion(claims.sub)
+  } catch (error) {
+    log.error("Error reading session version", { error, telegramId: claims.sub })
+    return false
+  }
+}
+
+function readSessionToken(token: string): SessionClaims | null {
+  try {
+    if (!isSessionToken(token)) return null
+    const [prefix, body, signature] = token.split(".")
+
+    const expected = Buffer.from(sign(`${prefix}.${body}`), "base64url")
+    const provided = Buffer.from(signature, "base64url")
+    if (provided.length !== expected.length || !crypto.timingSafeEqual(provided, expected)) {
+      return null
+    }
+
+    const claims = JSON.parse(Buffer.from(body, "base64url").toString("utf8")) as SessionClaims
+    if (claims.exp <= Math.floor(Date.now() / 1000)) {
+      return null
+    }
+    return claims
+  } catch (error) {
+    log.error("Error verifying session token", { error })
+    return null
+  }
+}
+
+/**
+ * Record a new users.session_version for a Telegram user (after updateUserRole
+ * bumped it), so this instance rejects their older tokens at once
+ */
+export function revokeSessions(telegramId: number, version: number): void {
+  sessionVersions.set(telegramId, { version, readAt: Date.now() })
+}
+
+/**
+ * Telegram user view of verified claims, for handlers that expect TelegramUser
+ */
+export function sessionUser(claims: SessionClaims): TelegramUser {
+  return {
+    id: claims.sub,
+    first_name: claims.first_name,
+    last_name: claims.last_name,
+    username: claims.username,
+    auth_date: claims.iat,
+    hash: ""
+  }
+}
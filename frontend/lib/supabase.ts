@@ -1,5 +1,11 @@
 /* eslint-disable @typescript-eslint/no-explicit-any */
 import { createClient } from '@supabase/supabase-js'
+import { applyRatingHistoryToStats, rebuildRatingStats, type PlayerRatingStats } from './rating/ratingStats'
+import { createLogger } from './logger'
+import { metrics } from './metrics'
+import { recordRequestQuery } from './requestContext'
+
+const log = createLogger('supabase')
 
 // Supabase configuration
 const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL || ''
@@ -17,6 +23,11 @@ interface MemStore {
   rounds: MemRow[]
   matches: MemRow[]
   leaderboard: MemRow[]
+  player_ratings: MemRow[]
+  rating_history: MemRow[]
+  player_rating_stats: MemRow[]
+  calendar_sync_state: MemRow[]
+  idempotency_keys: MemRow[]
   counters: Record<string, number>
 }
 
@@ -30,12 +41,115 @@ function getGlobalStore(): MemStore {
       rounds: [],
       matches: [],
       leaderboard: [],
-      counters: { users: 0, tournaments: 0, tournament_participants: 0, rounds: 0, matches: 0, leaderboard: 0 }
+      player_ratings: [],
+      rating_history: [],
+      player_rating_stats: [],
+      calendar_sync_state: [],
+      idempotency_keys: [],
+      counters: {
+        users: 0,
+        tournaments: 0,
+        tournament_participants: 0,
+        rounds: 0,
+        matches: 0,
+        leaderboard: 0,
+        player_ratings: 0,
+        rating_history: 0,
+        player_rating_stats: 0,
+        calendar_sync_state: 0,
+        idempotency_keys: 0
+      }
     } as MemStore
   }
   return g.__MEM_SUPABASE_STORE__ as MemStore
 }
 
+// PostgREST-style select clauses for the in-memory client: "*", columns,
+// "alias:column" and embeds "alias:table!hint(...)". A many-to-one embed
+// follows the hinted (or "<table>_id") column and yields an object or null;
+// otherwise the embedded table is matched on "<this table>_id" and yields an
+// array. "!inner" drops rows whose embed is empty.
+type SelectField =
+  | { kind: 'all' }
+  | { kind: 'column'; alias: string; column: string }
+  | { kind: 'embed'; alias: string; table: string; hint: string | null; inner: boolean; fields: SelectField[] }
+
+const parsedSelects = new Map<string, SelectField[]>()
+
+function splitSelect(clause: string): string[] {
+  const parts: string[] = []
+  let depth = 0
+  let start = 0
+  for (let i = 0; i < clause.length; i++) {
+    const ch = clause[i]
+    if (ch === '(') depth++
+    else if (ch === ')') depth--
+    else if (ch === ',' && depth === 0) {
+      parts.push(clause.slice(start, i))
+      start = i + 1
+    }
+  }
+  parts.push(clause.slice(start))
+  return parts.map((part) => part.trim()).filter(Boolean)
+}
+
+function parseSelect(clause: string): SelectField[] {
+  const cached = parsedSelects.get(clause)
+  if (cached) return cached
+  const fields = splitSelect(clause).map((part): SelectField => {
+    if (part === '*') return { kind: 'all' }
+    const open = part.indexOf('(')
+    const head = (open === -1 ? part : part.slice(0, open)).trim()
+    const colon = head.indexOf(':')
+    const alias = colon === -1 ? null : head.slice(0, colon).trim()
+    const name = colon === -1 ? head : head.slice(colon + 1).trim()
+    if (open === -1) return { kind: 'column', alias: alias || name, column: name }
+    const [table, ...hints] = name.split('!')
+    return {
+      kind: 'embed',
+      alias: alias || table,
+      table,
+      hint: hints.find((h) => h !== 'inner' && h !== 'left') ?? null,
+      inner: hints.includes('inner'),
+      fields: parseSelect(part.slice(open + 1, part.lastIndexOf(')')))
+    }
+  })
+  parsedSelects.set(clause, fields)
+  return fields
+}
+
+function singularTable(table: string): string {
+  return /(ch|sh|x)es$/.test(table) ? table.slice(0, -2) : table.replace(/s$/, '')
+}
+
+function projectRow(store: MemStore, table: string, row: MemRow, fields: SelectField[]): MemRow | null {
+  const out: MemRow = {}
+  for (const field of fields) {
+    if (field.kind === 'all') {
+      Object.assign(out, row)
+    } else if (field.kind === 'column') {
+      out[field.alias] = row[field.column] ?? null
+    } else {
+      const embedded = (store as any)[field.table] as MemRow[] | undefined
+      const fk = field.hint ?? `${singularTable(field.table)}_id`
+      let value: MemRow | MemRow[] | null
+      if (fk in row) {
+        const target = row[fk] == null ? undefined : embedded?.find((r) => r.id === row[fk])
+        value = target ? projectRow(store, field.table, target, field.fields) : null
+      } else {
+        const back = field.hint ?? `${singularTable(table)}_id`
+        value = (embedded || [])
+          .filter((r) => r[back] === row.id)
+          .map((r) => projectRow(store, field.table, r, field.fields))
+          .filter((r): r is MemRow => r !== null)
+      }
+      if (field.inner && (value === null || (Array.isArray(value) && value.length === 0))) return null
+      out[field.alias] = value
+    }
+  }
+  return out
+}
+
 class QueryBuilder {
   private table: keyof MemStore
   private store: MemStore
@@ -54,7 +168,7 @@ class QueryBuilder {
   }
 
   select(clause: string = '*') {
-    this.action = 'select'
+    // After insert/update/delete this only asks for the affected rows back
     this.selectClause = clause
     return this
   }
@@ -81,6 +195,27 @@ class QueryBuilder {
     return this
   }
 
+  neq(column: string, value: any) {
+    this.filters.push((row) => (row as any)[column] !== value)
+    return this
+  }
+
+  in(column: string, values: any[]) {
+    const set = new Set(values)
+    this.filters.push((row) => set.has((row as any)[column]))
+    return this
+  }
+
+  gte(column: string, value: any) {
+    this.filters.push((row) => (row as any)[column] >= value)
+    return this
+  }
+
+  lte(column: string, value: any) {
+    this.filters.push((row) => (row as any)[column] <= value)
+    return this
+  }
+
   ilike(column: string, pattern: string) {
     const needle = String(pattern).replace(/%/g, '').toLowerCase()
     this.filters.push((row) => {
@@ -132,6 +267,10 @@ class QueryBuilder {
     if (!this.insertValues) return { data: null, error: null }
     const arr = Array.isArray(this.insertValues) ? this.insertValues : [this.insertValues]
     const target = (this.store[this.table] as MemRow[])
+    const unique = memoryUniqueKeys[this.table]
+    if (unique && arr.some((row) => target.some((existing) => unique.every((column) => existing[column] === row[column])))) {
+      return { data: null, error: { code: '23505', message: `duplicate key value violates unique constraint on ${String(this.table)}` } }
+    }
     const counterKey = this.table as string
     for (const row of arr) {
       const id = ++this.store.counters[counterKey]
@@ -140,9 +279,12 @@ class QueryBuilder {
         ...row,
         created_at: row.created_at ?? nowIso()
       }
+      memoryGeneratedColumns[this.table]?.(data)
       target.push(data)
+      memoryTriggers[this.table]?.(this.store, data)
     }
     const inserted = arr.length === 1 ? target[target.length - 1] : arr.map((_, i) => target[target.length - arr.length + i])
+    bumpMemoryRevisions(this.store, this.table, 'insert', Array.isArray(inserted) ? inserted : [inserted])
     return { data: inserted, error: null }
   }
 
@@ -150,11 +292,21 @@ class QueryBuilder {
     const target = (this.store[this.table] as MemRow[])
     const rows = this.applyFilters(target)
     if (!rows.length) return { data: null, error: null }
+    const before = rows.map((r) => ({ ...r }))
     const updated = rows.map((r) => {
       const newRow = { ...r, ...this.updateValues }
+      memoryGeneratedColumns[this.table]?.(newRow)
       Object.assign(r, newRow)
       return newRow
     })
+    if (this.table === 'tournaments' && !('revision' in (this.updateValues || {}))) {
+      rows.forEach((r, i) => {
+        r.revision = (before[i].revision ?? 0) + 1
+        updated[i].revision = r.revision
+      })
+    } else {
+      bumpMemoryRevisions(this.store, this.table, 'update', [...before, ...updated])
+    }
     const data = this.wantSingle ? updated[0] : updated
     return { data, error: null }
   }
@@ -163,7 +315,9 @@ class QueryBuilder {
     const target = (this.store[this.table] as MemRow[])
     const before = target.length
     const kept = target.filter((r) => !this.applyFilters([r]).length)
+    const removed = target.filter((r) => this.applyFilters([r]).length)
     ;(this.store[this.table] as MemRow[]) = kept
+    bumpMemoryRevisions(this.store, this.table, 'delete', removed)
     const deleted = before - kept.length
     return { data: { deleted }, error: null }
   }
@@ -171,6 +325,13 @@ class QueryBuilder {
   private execSelect(): { data: any; error: any } {
     let rows = this.applyFilters(this.store[this.table] as MemRow[])
     rows = this.sortRows(rows)
+    const clause = this.selectClause?.trim()
+    if (clause && clause !== '*') {
+      const fields = parseSelect(clause)
+      rows = rows
+        .map((row) => projectRow(this.store, this.table, row, fields))
+        .filter((row): row is MemRow => row !== null)
+    }
     rows = this.takeLimit(rows)
 
     if (this.wantSingle) {
@@ -184,42 +345,314 @@ class QueryBuilder {
     return { data: rows, error: null }
   }
 
+  private execute(): { data: any; error: any } {
+    switch (this.action) {
+      case 'insert':
+        return this.execInsert()
+      case 'update':
+        return this.execUpdate()
+      case 'delete':
+        return this.execDelete()
+      default:
+        return this.execSelect()
+    }
+  }
+
   // Emulate Supabase promise behavior
   then(onFulfilled: (value: { data: any; error: any }) => any, onRejected?: (reason: any) => any) {
+    if (process.env.MEM_SUPABASE_LATENCY_MS) {
+      return memoryLatency().then(() => this.execute()).then(onFulfilled, onRejected)
+    }
     try {
-      let result: { data: any; error: any }
-      switch (this.action) {
-        case 'insert':
-          result = this.execInsert()
-          break
-        case 'update':
-          result = this.execUpdate()
-          break
-        case 'delete':
-          result = this.execDelete()
-          break
-        default:
-          result = this.execSelect()
-      }
-      return Promise.resolve(onFulfilled(result))
+      return Promise.resolve(onFulfilled(this.execute()))
     } catch (err) {
       return onRejected ? Promise.resolve(onRejected(err)) : Promise.reject(err)
     }
   }
 }
 
+// Optional artificial round-trip delay so latency work can be measured without a database
+function memoryLatency(): Promise<void> {
+  const ms = Number(process.env.MEM_SUPABASE_LATENCY_MS || 0)
+  return ms > 0 ? new Promise((resolve) => setTimeout(resolve, ms)) : Promise.resolve()
+}
+
+// Unique keys the in-memory client enforces on insert (others are not checked)
+const memoryUniqueKeys: Partial<Record<keyof MemStore, string[]>> = {
+  idempotency_keys: ['scope', 'key']
+}
+
+// Generated (STORED) columns, computed on insert and update
+const memoryGeneratedColumns: Partial<Record<keyof MemStore, (row: MemRow) => void>> = {
+  // 20241127_users_username_lower.sql
+  users(row) {
+    row.username_lower = typeof row.username === 'string' ? row.username.toLowerCase() : null
+  }
+}
+
+// In-memory equivalents of the row triggers in database/migrations (run after insert)
+const memoryTriggers: Partial<Record<keyof MemStore, (store: MemStore, row: MemRow) => void>> = {
+  // Mirrors trigger_update_stats_after_rating_change
+  rating_history(store, row) {
+    const index = store.player_rating_stats.findIndex((s) => s.user_id === row.user_id)
+    const current = index === -1 ? null : (store.player_rating_stats[index] as PlayerRatingStats)
+    const next = { ...applyRatingHistoryToStats(current, row as any), updated_at: nowIso() }
+    if (index === -1) {
+      store.player_rating_stats.push({ id: ++store.counters.player_rating_stats, ...next })
+    } else {
+      store.player_rating_stats[index] = next
+    }
+  }
+}
+
+// Mirrors the tournament revision triggers (20241124_tournament_revision.sql):
+// one bump per affected tournament per statement
+const REVISION_TABLES = new Set<keyof MemStore>(['tournament_participants', 'rounds', 'matches', 'leaderboard'])
+// trigger_revision_update on users fires only when one of these changes
+const USER_REVISION_COLUMNS = ['username', 'first_name', 'last_name', 'rating']
+
+function bumpMemoryRevisions(store: MemStore, table: keyof MemStore, op: 'insert' | 'update' | 'delete', rows: MemRow[]) {
+  const tournamentIds = new Set<unknown>()
+  if (REVISION_TABLES.has(table)) {
+    for (const row of rows) {
+      if (table === 'matches') {
+        tournamentIds.add(store.rounds.find((r) => r.id === row.round_id)?.tournament_id)
+      } else {
+        tournamentIds.add(row.tournament_id)
+      }
+    }
+  } else if (table === 'users' && op === 'update') {
+    // execUpdate passes the old rows followed by the new ones
+    const half = rows.length / 2
+    const userIds = new Set(rows
+      .slice(half)
+      .filter((row, k) => USER_REVISION_COLUMNS.some((column) => (row[column] ?? null) !== (rows[k][column] ?? null)))
+      .map((row) => row.id))
+    for (const p of store.tournament_participants) {
+      if (userIds.has(p.user_id)) tournamentIds.add(p.tournament_id)
+    }
+  }
+  if (tournamentIds.size === 0) return
+  for (const tournament of store.tournaments) {
+    if (tournamentIds.has(tournament.id)) tournament.revision = (tournament.revision ?? 0) + 1
+  }
+}
+
+// In-memory equivalents of the Postgres functions in database/migrations
+const memoryFunctions: Record<string, (store: MemStore, args: any) => { data: any; error: any }> = {
+  // Mirrors commit_match_ratings(): upsert ratings by user_id and append history rows
+  commit_match_ratings(store, args: { ratings: MemRow[]; history: MemRow[] }) {
+    const now = nowIso()
+    const saved = (args.ratings || []).map((row) => {
+      const existing = store.player_ratings.find((r) => r.user_id === row.user_id)
+      if (existing) {
+        return Object.assign(existing, row, {
+          rating_period_start: existing.rating_period_start,
+          last_updated: now
+        })
+      }
+      const created = {
+        id: ++store.counters.player_ratings,
+        ...row,
+        rating_period_start: row.rating_period_start ?? now,
+        last_updated: now,
+        created_at: now
+      }
+      store.player_ratings.push(created)
+      return created
+    })
+    for (const row of args.history || []) {
+      const inserted = {
+        id: ++store.counters.rating_history,
+        ...row,
+        rating_change: row.new_rating - row.old_rating,
+        created_at: now
+      }
+      store.rating_history.push(inserted)
+      memoryTriggers.rating_history?.(store, inserted)
+    }
+    return { data: saved.map((row) => ({ ...row })), error: null }
+  },
+
+  // Mirrors rebuild_player_rating_stats(): replay history, one user or everyone
+  rebuild_player_rating_stats(store, args: { user_id_param?: number | null }) {
+    const userId = args?.user_id_param ?? null
+    const byUser = new Map<number, MemRow[]>()
+    for (const row of store.rating_history) {
+      if (userId !== null && row.user_id !== userId) continue
+      const rows = byUser.get(row.user_id) || []
+      rows.push(row)
+      byUser.set(row.user_id, rows)
+    }
+
+    store.player_rating_stats = store.player_rating_stats
+      .filter((s) => userId !== null && s.user_id !== userId)
+    for (const rows of byUser.values()) {
+      rows.sort((a, b) => (a.created_at < b.created_at ? -1 : a.created_at > b.created_at ? 1 : a.id - b.id))
+      const stats = rebuildRatingStats(rows as any)
+      if (stats) {
+        store.player_rating_stats.push({ id: ++store.counters.player_rating_stats, ...stats, updated_at: nowIso() })
+      }
+    }
+    return { data: byUser.size, error: null }
+  },
+
+  // Mirrors rating_leaderboard_page(): keyset page over (rating DESC, user_id)
+  rating_leaderboard_page(store, args: { min_games: number; page_size: number; after_rating?: number | null; after_user_id?: number | null }) {
+    const afterRating = args.after_rating ?? null
+    const afterUserId = args.after_user_id ?? 0
+    const rows = memoryLeaderboardEntries(store, args.min_games)
+      .filter((row) => afterRating === null ||
+        row.rating < afterRating || (row.rating === afterRating && row.user_id > afterUserId))
+      .slice(0, args.page_size)
+    return { data: rows, error: null }
+  },
+
+  // Mirrors rating_leaderboard_count()
+  rating_leaderboard_count(store, args: { min_games: number }) {
+    return { data: memoryLeaderboardEntries(store, args.min_games).length, error: null }
+  }
+}
+
+// Rows of rating_leaderboard_entries, derived from player_ratings and users
+function memoryLeaderboardEntries(store: MemStore, minGames: number): MemRow[] {
+  const users = new Map(store.users.map((u) => [u.id, u]))
+  return store.player_ratings
+    .filter((r) => r.games_count > 0 && r.games_count >= minGames)
+    .map((r) => {
+      const user = users.get(r.user_id)
+      return {
+        user_id: r.user_id,
+        username: user?.username ?? null,
+        first_name: user?.first_name ?? null,
+        last_name: user?.last_name ?? null,
+        rating: r.rating,
+        rd: r.rd,
+        games_count: r.games_count,
+        wins_count: r.wins_count,
+        losses_count: r.losses_count,
+        draws_count: r.draws_count,
+        win_rate: Math.round((r.wins_count / r.games_count) * 10000) / 100,
+        last_game_at: r.last_game_at ?? null
+      }
+    })
+    .sort((a, b) => b.rating - a.rating || a.user_id - b.user_id)
+}
+
 function createMemoryClient() {
   const store = getGlobalStore()
   return {
     from(table: keyof MemStore) {
       return new QueryBuilder(table, store)
+    },
+    async rpc(fn: string, args: any) {
+      await memoryLatency()
+      const impl = memoryFunctions[fn]
+      if (!impl) {
+        return { data: null, error: { code: '42883', message: `function ${fn} does not exist` } }
+      }
+      return impl(store, args)
     }
   } as any
 }
 
+const supabaseQueries = metrics.counter(
+  'supabase_queries_total',
+  'Supabase calls by table (or rpc function), operation and outcome',
+  ['table', 'op', 'status']
+)
+const supabaseQueryDuration = metrics.histogram(
+  'supabase_query_duration_seconds',
+  'Supabase call latency by table (or rpc function) and operation',
+  ['table', 'op']
+)
+
+const WRITE_OPS = new Set(['insert', 'update', 'upsert', 'delete'])
+const FILTER_OPS = new Set([
+  'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'is', 'in',
+  'contains', 'containedBy', 'match', 'not', 'or', 'filter', 'textSearch'
+])
+
+interface QueryState {
+  op: string
+  // Filter calls without their values, e.g. "eq(tournament_id)"
+  filters: string[]
+}
+
+function filterShape(method: string, args: any[]): string {
+  if (method === 'match') return `match(${Object.keys(args[0] || {}).sort().join(',')})`
+  if (method === 'or') return 'or'
+  return `${method}(${args[0]})`
+}
+
+function recordQuery(table: string, state: QueryState, durationMs: number, error: any) {
+  const { op } = state
+  const status = !error ? 'ok' : error.code === 'PGRST116' ? 'not_found' : 'error'
+  supabaseQueries.inc({ table, op, status })
+  supabaseQueryDuration.observe(durationMs, { table, op })
+  // Same shape = same table, operation and filtered columns, whatever the values
+  const shape = state.filters.length ? `${op} ${table} ${state.filters.slice().sort().join(' ')}` : `${op} ${table}`
+  recordRequestQuery({ table, op, shape, durationMs, status })
+}
+
+// Times a query builder chain from the moment it is awaited (when the request
+// is actually sent) until the result arrives
+function instrumentQuery(builder: any, table: string, state: QueryState): any {
+  const proxy: any = new Proxy(builder, {
+    get(target, prop) {
+      const value = Reflect.get(target, prop)
+      if (typeof value !== 'function') return value
+
+      if (prop === 'then') {
+        return (onFulfilled?: (value: any) => any, onRejected?: (reason: any) => any) => {
+          const started = performance.now()
+          return value.call(
+            target,
+            (result: any) => {
+              recordQuery(table, state, performance.now() - started, result?.error)
+              return onFulfilled ? onFulfilled(result) : result
+            },
+            (reason: any) => {
+              recordQuery(table, state, performance.now() - started, reason || { code: 'exception' })
+              if (onRejected) return onRejected(reason)
+              throw reason
+            }
+          )
+        }
+      }
+
+      return (...args: any[]) => {
+        if (WRITE_OPS.has(prop as string)) state.op = prop as string
+        else if (FILTER_OPS.has(prop as string)) state.filters.push(filterShape(prop as string, args))
+        const result = value.apply(target, args)
+        if (result === target) return proxy
+        if (result && typeof result.then === 'function') return instrumentQuery(result, table, state)
+        return result
+      }
+    }
+  })
+  return proxy
+}
+
+function instrumentClient(client: any): any {
+  return new Proxy(client, {
+    get(target, prop) {
+      if (prop === 'from') {
+        return (table: string) => instrumentQuery(target.from(table), table, { op: 'select', filters: [] })
+      }
+      if (prop === 'rpc') {
+        return (fn: string, args?: any, options?: any) =>
+          instrumentQuery(target.rpc(fn, args, options), fn, { op: 'rpc', filters: [] })
+      }
+      return Reflect.get(target, prop)
+    }
+  })
+}
+
 // Create Supabase client with service role key for server-side operations
 // If env vars are present, use real client; otherwise fall back to in-memory client.
-export const supabase: any = (() => {
+// Either way calls are counted and timed (supabase_* metrics and the current request's Server-Timing).
+export const supabase: any = instrumentClient((() => {
   const hasReal = !!(supabaseUrl && supabaseServiceKey)
   if (hasReal) {
     return createClient(supabaseUrl, supabaseServiceKey, {
@@ -230,9 +663,9 @@ export const supabase: any = (() => {
     })
   }
   // Dev/testing fallback
-  console.warn('[supabase] Using in-memory fallback. Provide NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY to use a real database.')
+  log.warn('Using in-memory fallback. Provide NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY to use a real database.')
   return createMemoryClient()
-})()
+})())
 
 // Types matching our database schema
 export interface Database {
@@ -1,6 +1,17 @@
 import crypto from "crypto"
+import { isSessionToken, sessionUser, verifySessionToken, type SessionClaims } from "./session"
+import { createLogger } from "./logger"
+import { metrics } from "./metrics"
 
-interface TelegramUser {
+const log = createLogger("telegram")
+
+const initDataChecks = metrics.counter(
+  "telegram_init_data_checks_total",
+  "initData validations by outcome (cached = answered from the verified-initData cache)",
+  ["result"]
+)
+
+export interface TelegramUser {
   id: number
   first_name: string
   last_name?: string
@@ -10,6 +21,41 @@ interface TelegramUser {
   hash: string
 }
 
+// initData older than this is rejected
+const AUTH_MAX_AGE_SECONDS = 86400
+// Verified initData without auth_date is trusted from cache for at most this long
+const UNDATED_CACHE_MS = 60 * 60 * 1000
+const MAX_VERIFIED_INIT_DATA = 1000
+
+// HMAC-SHA256("WebAppData", botToken), derived once per token
+const secretKeys = new Map<string, Buffer>()
+
+// Recently verified initData -> user, least recently used first. The Mini App
+// sends the same initData with every request, so most checks are a lookup.
+const verifiedInitData = new Map<string, {
+  secretKey: Buffer
+  user: TelegramUser
+  expiresAt: number
+}>()
+
+function getSecretKey(botToken: string): Buffer {
+  let secretKey = secretKeys.get(botToken)
+  if (!secretKey) {
+    secretKey = crypto.createHmac("sha256", "WebAppData").update(botToken).digest()
+    secretKeys.clear()
+    secretKeys.set(botToken, secretKey)
+  }
+  return secretKey
+}
+
+/**
+ * Drop cached verification results (e.g. after rotating the bot token)
+ */
+export function clearTelegramAuthCache(): void {
+  secretKeys.clear()
+  verifiedInitData.clear()
+}
+
 /**
  * Validates Telegram Web App initData
  * @param initData - The initData string from Telegram Web App
@@ -21,12 +67,29 @@ export function validateTelegramWebAppData(
   botToken: string
 ): TelegramUser | null {
   try {
+    const secretKey = getSecretKey(botToken)
+    const now = Date.now()
+
+    const cached = verifiedInitData.get(initData)
+    if (cached && cached.secretKey === secretKey) {
+      verifiedInitData.delete(initData)
+      if (now > cached.expiresAt) {
+        initDataChecks.inc({ result: "expired" })
+        log.warn("Telegram WebApp data validation failed: auth_date too old", undefined, { sample: 0.1 })
+        return null
+      }
+      verifiedInitData.set(initData, cached)
+      initDataChecks.inc({ result: "cached" })
+      return cached.user
+    }
+
     // Parse the initData string
     const urlParams = new URLSearchParams(initData)
     const hash = urlParams.get("hash")
     const userParam = urlParams.get("user")
 
     if (!hash || !userParam) {
+      initDataChecks.inc({ result: "invalid" })
       return null
     }
 
@@ -41,21 +104,17 @@ export function validateTelegramWebAppData(
     dataCheckArr.sort()
     const dataCheckString = dataCheckArr.join("\n")
 
-    // Create secret key
-    const secretKey = crypto
-      .createHmac("sha256", "WebAppData")
-      .update(botToken)
-      .digest()
-
     // Calculate hash
     const calculatedHash = crypto
       .createHmac("sha256", secretKey)
       .update(dataCheckString)
-      .digest("hex")
+      .digest()
 
-    // Verify hash
-    if (calculatedHash !== hash) {
-      console.error("Telegram WebApp data validation failed: hash mismatch")
+    // Verify hash (constant time)
+    const providedHash = /^[0-9a-f]{64}$/i.test(hash) ? Buffer.from(hash, "hex") : null
+    if (!providedHash || !crypto.timingSafeEqual(calculatedHash, providedHash)) {
+      initDataChecks.inc({ result: "invalid" })
+      log.warn("Telegram WebApp data validation failed: hash mismatch", undefined, { sample: 0.1 })
       return null
     }
 
@@ -63,22 +122,31 @@ export function validateTelegramWebAppData(
     const user: TelegramUser = JSON.parse(userParam)
 
     // Check if auth_date is not too old (e.g., within 24 hours)
+    let expiresAt = now + UNDATED_CACHE_MS
     const authDate = urlParams.get("auth_date")
     if (authDate) {
       const authTimestamp = parseInt(authDate, 10)
-      const currentTimestamp = Math.floor(Date.now() / 1000)
+      const currentTimestamp = Math.floor(now / 1000)
       const timeDiff = currentTimestamp - authTimestamp
 
       // Allow 24 hours
-      if (timeDiff > 86400) {
-        console.error("Telegram WebApp data validation failed: auth_date too old")
+      if (timeDiff > AUTH_MAX_AGE_SECONDS) {
+        initDataChecks.inc({ result: "expired" })
+        log.warn("Telegram WebApp data validation failed: auth_date too old", undefined, { sample: 0.1 })
         return null
       }
+      expiresAt = (authTimestamp + AUTH_MAX_AGE_SECONDS) * 1000
+    }
+
+    if (verifiedInitData.size >= MAX_VERIFIED_INIT_DATA) {
+      verifiedInitData.delete(verifiedInitData.keys().next().value as string)
     }
+    verifiedInitData.set(initData, { secretKey, user, expiresAt })
+    initDataChecks.inc({ result: "verified" })
 
     return user
   } catch (error) {
-    console.error("Error validating Telegram WebApp data:", error)
+    log.error("Error validating Telegram WebApp data", { error })
     return null
   }
 }
@@ -99,21 +167,29 @@ export function parseTelegramWebAppData(initData: string): TelegramUser | null {
     const user: TelegramUser = JSON.parse(userParam)
     return user
   } catch (error) {
-    console.error("Error parsing Telegram WebApp data:", error)
+    log.error("Error parsing Telegram WebApp data", { error })
     return null
   }
 }
 
+/**
+ * Verified session token from the Authorization header, if one was sent
+ */
+export async function getSessionFromHeaders(headers: Headers): Promise<SessionClaims | null> {
+  const credential = (headers.get("authorization") || "").replace("Bearer ", "")
+  return isSessionToken(credential) ? verifySessionToken(credential) : null
+}
+
 /**
  * Get Telegram user from request headers
- * Expects initData to be passed in Authorization header
+ * Expects initData (or a session token from /api/auth/telegram) to be passed in Authorization header
  */
-export function getTelegramUserFromHeaders(
+export async function getTelegramUserFromHeaders(
   headers: Headers
-): TelegramUser | null {
+): Promise<TelegramUser | null> {
   const authHeader = headers.get("authorization")
   if (!authHeader) {
-    console.error("No authorization header found")
+    log.debug("No authorization header found")
     return null
   }
 
@@ -121,22 +197,30 @@ export function getTelegramUserFromHeaders(
   const initData = authHeader.replace("Bearer ", "")
 
   if (!initData || initData === "Bearer") {
-    console.error("initData is empty")
+    log.debug("initData is empty")
     return null
   }
-  console.log("Processing Telegram auth, NODE_ENV:", process.env.NODE_ENV)
+
+  if (isSessionToken(initData)) {
+    const claims = await verifySessionToken(initData)
+    if (!claims) {
+      log.warn("Session token is invalid or expired", undefined, { sample: 0.1 })
+      return null
+    }
+    return sessionUser(claims)
+  }
 
   // In production, use full validation
   if (process.env.NODE_ENV === "production") {
     const botToken = process.env.TELEGRAM_BOT_TOKEN
     if (!botToken) {
-      console.error("TELEGRAM_BOT_TOKEN not configured")
+      log.error("TELEGRAM_BOT_TOKEN not configured")
       return null
     }
 
     const user = validateTelegramWebAppData(initData, botToken)
     if (!user) {
-      console.error("Failed to validate Telegram data in production")
+      log.warn("Failed to validate Telegram data in production", undefined, { sample: 0.1 })
     }
     return user
   }
@@ -144,38 +228,41 @@ export function getTelegramUserFromHeaders(
   // In development, allow simplified parsing
   const user = parseTelegramWebAppData(initData)
   if (!user) {
-    console.error("Failed to parse Telegram data in development")
+    log.error("Failed to parse Telegram data in development")
   } else {
-    console.log("Successfully parsed Telegram user:", user.id, user.first_name)
+    log.debug("Parsed Telegram user", { telegramId: user.id })
   }
   return user
 }
 
+export function isAdminRole(role: string | null | undefined): boolean {
+  return role === 'admin' || role === 'moderator'
+}
+
 /**
- * Check if Telegram user is an admin based on database role
- * Checks the 'role' field in the users table
+ * Resolve a Telegram user's role from the database
  * Falls back to ADMIN_TELEGRAM_ID env variable if user not found in database
  */
-export async function isAdmin(user: TelegramUser | null): Promise<boolean> {
-  if (!user) return false
-
+export async function resolveUserRole(
+  user: TelegramUser
+): Promise<{ role: string; userId: number | null; sessionVersion: number }> {
   // Import db functions dynamically to avoid circular dependencies
   const { getUserByTelegramId } = await import("./db")
 
   // Check database role first
   const dbUser = await getUserByTelegramId(user.id)
   if (dbUser) {
-    return dbUser.role === 'admin' || dbUser.role === 'moderator'
+    return { role: dbUser.role || 'user', userId: dbUser.id ?? null, sessionVersion: dbUser.session_version ?? 0 }
   }
 
   // Fallback to env variable for backwards compatibility
   const raw = (process.env.ADMIN_TELEGRAM_ID || "").trim()
-  if (!raw) return false
+  if (!raw) return { role: 'user', userId: null, sessionVersion: 0 }
 
   const entries = raw.split(",").map((s) => s.trim()).filter(Boolean)
   const username = (user.username || "").toLowerCase()
 
-  return entries.some((entry) => {
+  const listed = entries.some((entry) => {
     if (!entry) return false
     if (entry.startsWith("@")) {
       const target = entry.slice(1).toLowerCase()
@@ -184,6 +271,18 @@ export async function isAdmin(user: TelegramUser | null): Promise<boolean> {
     const idNum = Number(entry)
     return Number.isFinite(idNum) && idNum === user.id
   })
+  return { role: listed ? 'admin' : 'user', userId: null, sessionVersion: 0 }
+}
+
+/**
+ * Check if Telegram user is an admin based on database role
+ * Checks the 'role' field in the users table
+ * Falls back to ADMIN_TELEGRAM_ID env variable if user not found in database
+ */
+export async function isAdmin(user: TelegramUser | null): Promise<boolean> {
+  if (!user) return false
+  const { role } = await resolveUserRole(user)
+  return isAdminRole(role)
 }
 
 /**
@@ -196,7 +295,7 @@ export async function requireAdmin(headers: Headers): Promise<TelegramUser | nul
   const enforceStrictInDev = isDev && (testStrict === '1' || testStrict === 'true' || testStrict === 'yes')
 
   if (isDev && !enforceStrictInDev) {
-    const user = getTelegramUserFromHeaders(headers)
+    const user = await getTelegramUserFromHeaders(headers)
     return (
       user || {
         id: 0,
@@ -210,8 +309,14 @@ export async function requireAdmin(headers: Headers): Promise<TelegramUser | nul
     )
   }
 
-  // Production or strict dev: strict admin check
-  const user = getTelegramUserFromHeaders(headers)
+  // Production or strict dev: strict admin check.
+  // A session token already carries the role, so no database lookup is needed
+  const session = await getSessionFromHeaders(headers)
+  if (session) {
+    return isAdminRole(session.role) ? sessionUser(session) : null
+  }
+
+  const user = await getTelegramUserFromHeaders(headers)
   if (!user) return null
   const userIsAdmin = await isAdmin(user)
   return userIsAdmin ? user : null
@@ -0,0 +1,775 @@
+import { supabase } from './supabase'
+import { createLogger } from './logger'
+import { metrics } from './metrics'
+import { CsvFormatError, CsvReader } from './csv'
+import { deleteAllRoundsForTournament, deleteTournament, type Tournament } from './db'
+
+// Tournament export and import (/api/tournaments/[id]/export, /api/tournaments/import).
+// An archive is a sequence of flat records: the tournament, then participants,
+// rounds, matches and the final standings. Records refer to each other by
+// participant number (participants in id order, i.e. the order their rows were
+// inserted; import inserts them by number, so the order survives a round trip)
+// and round number, never by database id, so an archive loads into any instance
+// and re-exports byte for byte. JSON Lines and CSV carry every record and stream
+// in keyset pages; TRF is an export-only report (it has no user identities) in
+// the FIDE TRF-16 layout.
+
+const log = createLogger('tournamentArchive')
+
+// Rows per keyset page on export and per insert on import
+const PAGE_SIZE = 1000
+const IMPORT_BATCH = 500
+
+const archiveRows = metrics.counter('tournament_archive_records_total', 'Archive records exported or imported, by direction and format', ['direction', 'format'])
+
+export type ArchiveFormat = 'trf' | 'jsonl' | 'csv'
+
+export const ARCHIVE_FORMATS: Record<ArchiveFormat, { contentType: string; extension: string }> = {
+  trf: { contentType: 'text/plain; charset=utf-8', extension: 'trf' },
+  jsonl: { contentType: 'application/x-ndjson; charset=utf-8', extension: 'jsonl' },
+  csv: { contentType: 'text/csv; charset=utf-8', extension: 'csv' }
+}
+
+export function isArchiveFormat(value: string | null): value is ArchiveFormat {
+  return value !== null && Object.prototype.hasOwnProperty.call(ARCHIVE_FORMATS, value)
+}
+
+export type ArchivedTournament = { type: 'tournament' } & Omit<Tournament, 'id'>
+
+export interface ArchivedParticipant {
+  type: 'participant'
+  no: number
+  nickname: string
+  user_id: number
+  telegram_id: number | null
+  // The user's rating at export time (informational, not imported)
+  rating: number | null
+  created_at: string | null
+}
+
+export interface ArchivedRound {
+  type: 'round'
+  number: number
+  status: string
+  created_at: string | null
+  paired_at: string | null
+  locked_at: string | null
+}
+
+export interface ArchivedMatch {
+  type: 'match'
+  round: number
+  board_no: number | null
+  // Participant numbers; null for the missing side of a bye
+  white: number | null
+  black: number | null
+  result: string
+  score_white: number
+  score_black: number
+  source: string | null
+  notes: string | null
+}
+
+export interface ArchivedStanding {
+  type: 'standing'
+  participant: number
+  nickname: string
+  points: number
+  rank: number
+}
+
+export type ArchiveRecord = ArchivedTournament | ArchivedParticipant | ArchivedRound | ArchivedMatch | ArchivedStanding
+type ArchiveRecordType = ArchiveRecord['type']
+
+type FieldKind = 'number' | 'text'
+
+// Field order of every record type: JSON key order, CSV columns and the
+// tournament columns read on export
+const RECORD_FIELDS: Record<ArchiveRecordType, Record<string, FieldKind>> = {
+  tournament: {
+    title: 'text',
+    format: 'text',
+    points_win: 'number',
+    points_loss: 'number',
+    points_draw: 'number',
+    bye_points: 'number',
+    rounds: 'number',
+    tiebreakers: 'text',
+    team_mode: 'text',
+    allow_join: 'number',
+    allow_edit_results: 'number',
+    allow_danger_changes: 'number',
+    forbid_repeat_bye: 'number',
+    late_join_points: 'number',
+    hide_rating: 'number',
+    hide_new_rating: 'number',
+    compute_performance: 'number',
+    hide_color_names: 'number',
+    show_opponent_names: 'number',
+    creator_telegram_id: 'number',
+    archived: 'number',
+    created_at: 'text'
+  },
+  participant: { no: 'number', nickname: 'text', user_id: 'number', telegram_id: 'number', rating: 'number', created_at: 'text' },
+  round: { number: 'number', status: 'text', created_at: 'text', paired_at: 'text', locked_at: 'text' },
+  match: {
+    round: 'number',
+    board_no: 'number',
+    white: 'number',
+    black: 'number',
+    result: 'text',
+    score_white: 'number',
+    score_black: 'number',
+    source: 'text',
+    notes: 'text'
+  },
+  standing: { participant: 'number', nickname: 'text', points: 'number', rank: 'number' }
+}
+
+// Fields that may not be null
+const REQUIRED_FIELDS: Record<ArchiveRecordType, string[]> = {
+  tournament: ['title'],
+  participant: ['no', 'nickname', 'user_id'],
+  round: ['number', 'status'],
+  match: ['round', 'result', 'score_white', 'score_black'],
+  standing: ['participant', 'nickname', 'points', 'rank']
+}
+
+// Records must come in this order (matches refer to participants and rounds)
+const RECORD_ORDER: ArchiveRecordType[] = ['tournament', 'participant', 'round', 'match', 'standing']
+
+const CSV_COLUMNS = ['type', ...new Set(RECORD_ORDER.flatMap((type) => Object.keys(RECORD_FIELDS[type])))]
+
+// A malformed archive (answered with 400, unlike database failures)
+class ArchiveFormatError extends Error {}
+
+function isRecordType(value: unknown): value is ArchiveRecordType {
+  return typeof value === 'string' && Object.prototype.hasOwnProperty.call(RECORD_FIELDS, value)
+}
+
+/**
+ * Build a record of `type` from `get(field)`, checking every field's kind
+ */
+function toRecord(type: ArchiveRecordType, get: (field: string) => unknown, where: string): ArchiveRecord {
+  const record: Record<string, unknown> = { type }
+  for (const [field, kind] of Object.entries(RECORD_FIELDS[type])) {
+    let value = get(field) ?? null
+    if (value !== null && kind === 'number') {
+      value = typeof value === 'string' && value.trim() !== '' ? Number(value) : value
+      if (typeof value !== 'number' || !Number.isFinite(value)) {
+        throw new ArchiveFormatError(`${where}: ${field} must be a number`)
+      }
+    } else if (value !== null && typeof value !== 'string') {
+      throw new ArchiveFormatError(`${where}: ${field} must be a string`)
+    }
+    if (value === null && REQUIRED_FIELDS[type].includes(field)) {
+      throw new ArchiveFormatError(`${where}: ${field} is required`)
+    }
+    record[field] = value
+  }
+  return record as unknown as ArchiveRecord
+}
+
+// ===== EXPORT =====
+
+/**
+ * Every record of a tournament, a keyset page at a time. Only the
+ * participant-number and round-number maps grow with the tournament.
+ */
+export async function* archiveRecords(tournamentId: number): AsyncGenerator<ArchiveRecord[]> {
+  const { data: tournament, error } = await supabase
+    .from('tournaments')
+    .select(Object.keys(RECORD_FIELDS.tournament).join(', '))
+    .eq('id', tournamentId)
+    .single()
+
+  if (error || !tournament) {
+    throw new Error(`Tournament ${tournamentId} not found`)
+  }
+  yield [toRecord('tournament', (field) => (tournament as Record<string, unknown>)[field], 'tournament')]
+
+  const participantNo = new Map<number, number>()
+  for (let after = 0; ;) {
+    const { data, error: pageError } = await supabase
+      .from('tournament_participants')
+      .select('id, user_id, nickname, created_at, user:users(telegram_id, rating)')
+      .eq('tournament_id', tournamentId)
+      .gte('id', after + 1)
+      .order('id', { ascending: true })
+      .limit(PAGE_SIZE)
+
+    if (pageError) {
+      throw new Error(`Failed to load participants: ${pageError.message}`)
+    }
+
+    const rows = (data || []) as Array<{
+      id: number
+      user_id: number
+      nickname: string
+      created_at: string | null
+      user?: { telegram_id: number | null; rating: number | null } | null
+    }>
+    yield rows.map((row) => {
+      const no = participantNo.size + 1
+      participantNo.set(row.id, no)
+      return {
+        type: 'participant',
+        no,
+        nickname: row.nickname,
+        user_id: row.user_id,
+        telegram_id: row.user?.telegram_id ?? null,
+        rating: row.user?.rating ?? null,
+        created_at: row.created_at ?? null
+      }
+    })
+    if (rows.length < PAGE_SIZE) break
+    after = rows[rows.length - 1].id
+  }
+
+  const { data: rounds, error: roundsError } = await supabase
+    .from('rounds')
+    .select('id, number, status, created_at, paired_at, locked_at')
+    .eq('tournament_id', tournamentId)
+    .order('number', { ascending: true })
+
+  if (roundsError) {
+    throw new Error(`Failed to load rounds: ${roundsError.message}`)
+  }
+
+  const roundRows = (rounds || []) as Array<Omit<ArchivedRound, 'type'> & { id: number }>
+  const roundNumber = new Map(roundRows.map((round) => [round.id, round.number]))
+  yield roundRows.map((round) => ({
+    type: 'round',
+    number: round.number,
+    status: round.status,
+    created_at: round.created_at ?? null,
+    paired_at: round.paired_at ?? null,
+    locked_at: round.locked_at ?? null
+  }))
+
+  for (let after = 0; roundRows.length > 0;) {
+    const { data, error: pageError } = await supabase
+      .from('matches')
+      .select('id, round_id, board_no, white_participant_id, black_participant_id, result, score_white, score_black, source, notes')
+      .in('round_id', roundRows.map((round) => round.id))
+      .gte('id', after + 1)
+      .order('id', { ascending: true })
+      .limit(PAGE_SIZE)
+
+    if (pageError) {
+      throw new Error(`Failed to load matches: ${pageError.message}`)
+    }
+
+    const rows = (data || []) as Array<{
+      id: number
+      round_id: number
+      board_no: number | null
+      white_participant_id: number | null
+      black_participant_id: number | null
+      result: string
+      score_white: number
+      score_black: number
+      source: string | null
+      notes: string | null
+    }>
+    yield rows.map((row) => ({
+      type: 'match',
+      round: roundNumber.get(row.round_id)!,
+      board_no: row.board_no ?? null,
+      white: row.white_participant_id === null ? null : participantNo.get(row.white_participant_id) ?? null,
+      black: row.black_participant_id === null ? null : participantNo.get(row.black_participant_id) ?? null,
+      result: row.result,
+      score_white: row.score_white,
+      score_black: row.score_black,
+      source: row.source ?? null,
+      notes: row.notes ?? null
+    }))
+    if (rows.length < PAGE_SIZE) break
+    after = rows[rows.length - 1].id
+  }
+
+  const { data: standings, error: standingsError } = await supabase
+    .from('leaderboard')
+    .select('participant_id, nickname, points, rank')
+    .eq('tournament_id', tournamentId)
+    .order('rank', { ascending: true })
+
+  if (standingsError) {
+    throw new Error(`Failed to load standings: ${standingsError.message}`)
+  }
+
+  yield ((standings || []) as Array<{ participant_id: number; nickname: string; points: number; rank: number }>)
+    .filter((row) => participantNo.has(row.participant_id))
+    .map((row) => ({
+      type: 'standing',
+      participant: participantNo.get(row.participant_id)!,
+      nickname: row.nickname,
+      points: row.points,
+      rank: row.rank
+    }))
+}
+
+function csvCell(value: unknown): string {
+  if (value === null || value === undefined) return ''
+  // Strings are always quoted, so an empty string stays distinct from null
+  return typeof value === 'string' ? `"${value.replace(/"/g, '""')}"` : String(value)
+}
+
+function csvLine(record: ArchiveRecord): string {
+  const fields = record as unknown as Record<string, unknown>
+  const own = RECORD_FIELDS[record.type]
+  return CSV_COLUMNS.map((column) => (column === 'type' || column in own ? csvCell(fields[column]) : '')).join(',') + '\n'
+}
+
+async function* jsonlChunks(tournamentId: number): AsyncGenerator<string> {
+  for await (const page of archiveRecords(tournamentId)) {
+    archiveRows.inc({ direction: 'export', format: 'jsonl' }, page.length)
+    yield page.map((record) => JSON.stringify(record) + '\n').join('')
+  }
+}
+
+async function* csvChunks(tournamentId: number): AsyncGenerator<string> {
+  yield CSV_COLUMNS.join(',') + '\n'
+  for await (const page of archiveRecords(tournamentId)) {
+    archiveRows.inc({ direction: 'export', format: 'csv' }, page.length)
+    yield page.map(csvLine).join('')
+  }
+}
+
+// Result codes of a TRF round block, from the white player's side
+const TRF_WHITE_RESULT: Record<string, string> = {
+  white: '1',
+  black: '0',
+  draw: '=',
+  forfeit_white: '-',
+  forfeit_black: '+',
+  bye: 'U'
+}
+const TRF_BLACK_RESULT: Record<string, string> = {
+  white: '0',
+  black: '1',
+  draw: '=',
+  forfeit_white: '+',
+  forfeit_black: '-'
+}
+
+// A round block is 10 columns: two blanks, then the opponent's starting rank,
+// colour and result, so round 1 starts at column 92, round 2 at 102 and so on
+function trfRoundBlock(opponent: number | null, color: 'w' | 'b' | '-', result: string): string {
+  return `  ${opponent === null ? '0000' : String(opponent).padStart(4, ' ')} ${color} ${result}`
+}
+
+/**
+ * A TRF-16 player section (001): starting rank in columns 5-8, name 15-47,
+ * rating 49-52, points 81-84, rank 86-89, then the round blocks. Sex, title,
+ * federation, FIDE id and birth date are left blank
+ */
+function trfPlayerRecord(
+  no: number,
+  name: string,
+  rating: number | null,
+  points: number,
+  rank: number,
+  rounds: string[]
+): string {
+  const nameField = name.replace(/\s+/g, ' ').trim().slice(0, 33).padEnd(33, ' ')
+  const ratingField = rating === null ? '    ' : String(Math.max(0, Math.min(9999, Math.round(rating)))).padStart(4, ' ')
+  return '001 ' + String(no).padStart(4, ' ') + ' '.repeat(6) + nameField + ' ' + ratingField +
+    ' '.repeat(28) + points.toFixed(1).padStart(4, ' ') + ' ' + String(rank).padStart(4, ' ') + rounds.join('')
+}
+
+/**
+ * TRF is player-major (a player's line holds all their rounds), so this
+ * format keeps one short block per player and round until the last match
+ */
+async function* trfChunks(tournamentId: number): AsyncGenerator<string> {
+  const players: Array<{ no: number; nickname: string; rating: number | null }> = []
+  const roundNumbers: number[] = []
+  const blocks = new Map<number, Map<number, string>>()
+  const points = new Map<number, number>()
+  const addBlock = (player: number, round: number, block: string, score: number) => {
+    let byRound = blocks.get(player)
+    if (!byRound) {
+      byRound = new Map()
+      blocks.set(player, byRound)
+    }
+    byRound.set(round, block)
+    points.set(player, (points.get(player) || 0) + score)
+  }
+
+  let title = ''
+  let plannedRounds = 0
+  let records = 0
+  for await (const page of archiveRecords(tournamentId)) {
+    records += page.length
+    for (const record of page) {
+      if (record.type === 'tournament') {
+        title = record.title.replace(/\s+/g, ' ').trim()
+        plannedRounds = Number(record.rounds) || 0
+      } else if (record.type === 'participant') {
+        players.push({ no: record.no, nickname: record.nickname, rating: record.rating })
+      } else if (record.type === 'round') {
+        roundNumbers.push(record.number)
+      } else if (record.type === 'match') {
+        if (record.white !== null) {
+          addBlock(record.white, record.round, record.black === null
+            ? trfRoundBlock(null, '-', TRF_WHITE_RESULT[record.result] ?? ' ')
+            : trfRoundBlock(record.black, 'w', TRF_WHITE_RESULT[record.result] ?? ' '), record.score_white)
+        }
+        if (record.black !== null) {
+          addBlock(record.black, record.round, trfRoundBlock(record.white, 'b', TRF_BLACK_RESULT[record.result] ?? ' '), record.score_black)
+        }
+      }
+    }
+  }
+  archiveRows.inc({ direction: 'export', format: 'trf' }, records)
+
+  // Rank by the points written on the lines, ties by starting rank
+  const rankOf = new Map(players
+    .map((player) => ({ no: player.no, points: points.get(player.no) || 0 }))
+    .sort((a, b) => b.points - a.points || a.no - b.no)
+    .map((player, i) => [player.no, i + 1]))
+
+  // 012 tournament name, 062 number of players; XXR (planned rounds) is the
+  // pairing-engine extension BBP and JaVaFo read
+  const header = [`012 ${title}`, `062 ${players.length}`]
+  if (plannedRounds > 0) header.push(`XXR ${plannedRounds}`)
+  yield header.map((line) => line + '\n').join('')
+  for (let i = 0; i < players.length; i += PAGE_SIZE) {
+    yield players.slice(i, i + PAGE_SIZE).map((player) => {
+      const byRound = blocks.get(player.no)
+      const rounds = roundNumbers.map((round) => byRound?.get(round) ?? ' '.repeat(10))
+      return trfPlayerRecord(player.no, player.nickname, player.rating, points.get(player.no) || 0, rankOf.get(player.no)!, rounds).trimEnd() + '\n'
+    }).join('')
+  }
+}
+
+/**
+ * Stream a tournament in `format`; pages are read as the client consumes them
+ */
+export function exportTournament(tournamentId: number, format: ArchiveFormat): ReadableStream<Uint8Array> {
+  const encoder = new TextEncoder()
+  const chunks = format === 'trf' ? trfChunks(tournamentId) : format === 'csv' ? csvChunks(tournamentId) : jsonlChunks(tournamentId)
+
+  return new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      try {
+        const { value, done } = await chunks.next()
+        if (done) {
+          controller.close()
+        } else {
+          controller.enqueue(encoder.encode(value))
+        }
+      } catch (error) {
+        log.error('Tournament export failed', { tournamentId, format, error })
+        controller.error(error)
+      }
+    },
+    async cancel() {
+      await chunks.return(undefined)
+    }
+  })
+}
+
+// ===== IMPORT =====
+
+async function* decodeText(body: ReadableStream<Uint8Array>): AsyncGenerator<string> {
+  const reader = body.getReader()
+  const decoder = new TextDecoder()
+  try {
+    for (;;) {
+      const { value, done } = await reader.read()
+      if (done) break
+      yield decoder.decode(value, { stream: true })
+    }
+    const tail = decoder.decode()
+    if (tail) yield tail
+  } finally {
+    reader.releaseLock()
+  }
+}
+
+async function* jsonlRecords(text: AsyncIterable<string>): AsyncGenerator<ArchiveRecord> {
+  let buffer = ''
+  let lineNo = 0
+  const parse = (line: string): ArchiveRecord | null => {
+    lineNo++
+    if (!line.trim()) return null
+    let value: unknown
+    try {
+      value = JSON.parse(line)
+    } catch {
+      throw new ArchiveFormatError(`line ${lineNo}: invalid JSON`)
+    }
+    const type = (value as { type?: unknown } | null)?.type
+    if (!isRecordType(type)) {
+      throw new ArchiveFormatError(`line ${lineNo}: unknown record type`)
+    }
+    return toRecord(type, (field) => (value as Record<string, unknown>)[field], `line ${lineNo}`)
+  }
+
+  for await (const chunk of text) {
+    buffer += chunk
+    let newline = buffer.indexOf('\n')
+    while (newline !== -1) {
+      const record = parse(buffer.slice(0, newline))
+      if (record) yield record
+      buffer = buffer.slice(newline + 1)
+      newline = buffer.indexOf('\n')
+    }
+  }
+  const last = parse(buffer)
+  if (last) yield last
+}
+
+async function* csvRecords(text: AsyncIterable<string>): AsyncGenerator<ArchiveRecord> {
+  const reader = new CsvReader()
+  let columns: Map<string, number> | null = null
+  let rowNo = 0
+
+  function* toRecords(rows: Array<Array<string | null>>): Generator<ArchiveRecord> {
+    for (const cells of rows) {
+      rowNo++
+      if (!columns) {
+        columns = new Map(cells.map((name, i) => [String(name ?? '').trim(), i]))
+        if (!columns.has('type')) throw new ArchiveFormatError('CSV header has no type column')
+        continue
+      }
+      const header = columns
+      const type = cells[header.get('type')!]
+      if (!isRecordType(type)) {
+        throw new ArchiveFormatError(`row ${rowNo}: unknown record type`)
+      }
+      yield toRecord(type, (field) => (header.has(field) ? cells[header.get(field)!] : null), `row ${rowNo}`)
+    }
+  }
+
+  for await (const chunk of text) {
+    yield* toRecords(reader.push(chunk))
+  }
+  yield* toRecords(reader.end())
+}
+
+/**
+ * Records of an archive body as they arrive
+ */
+export function readArchive(body: ReadableStream<Uint8Array>, format: Exclude<ArchiveFormat, 'trf'>): AsyncGenerator<ArchiveRecord> {
+  const text = decodeText(body)
+  return format === 'csv' ? csvRecords(text) : jsonlRecords(text)
+}
+
+export type ArchiveImportResult =
+  | { ok: true; tournamentId: number; participants: number; rounds: number; matches: number; standings: number }
+  | { ok: false; error: string }
+
+function insertedRows<T>(data: unknown): T[] {
+  return (Array.isArray(data) ? data : data ? [data] : []) as T[]
+}
+
+/**
+ * Load an archive as a new tournament, in batches of IMPORT_BATCH rows.
+ * Participants are matched to existing users by Telegram id (else by user
+ * id); on any failure the partly imported tournament is removed.
+ */
+export async function importTournament(records: AsyncIterable<ArchiveRecord>, format: Exclude<ArchiveFormat, 'trf'> = 'jsonl'): Promise<ArchiveImportResult> {
+  let tournamentId: number | null = null
+  let stage = 0
+  const participantIds = new Map<number, number>()
+  const roundIds = new Map<number, number>()
+  const counts = { participants: 0, rounds: 0, matches: 0, standings: 0 }
+  const pending = {
+    participant: [] as ArchivedParticipant[],
+    round: [] as ArchivedRound[],
+    match: [] as ArchivedMatch[],
+    standing: [] as ArchivedStanding[]
+  }
+
+  const flush = async (type: Exclude<ArchiveRecordType, 'tournament'>) => {
+    const batch = pending[type]
+    if (batch.length === 0) return
+    pending[type] = []
+    if (type === 'participant') await insertParticipants(tournamentId!, batch as ArchivedParticipant[], participantIds)
+    else if (type === 'round') await insertRounds(tournamentId!, batch as ArchivedRound[], roundIds)
+    else if (type === 'match') await insertMatches(batch as ArchivedMatch[], participantIds, roundIds)
+    else await insertStandings(tournamentId!, batch as ArchivedStanding[], participantIds)
+    archiveRows.inc({ direction: 'import', format }, batch.length)
+  }
+
+  try {
+    for await (const record of records) {
+      const recordStage = RECORD_ORDER.indexOf(record.type)
+      if (record.type === 'tournament' && tournamentId !== null) {
+        throw new ArchiveFormatError('The archive has more than one tournament record')
+      }
+      if (recordStage < stage) {
+        throw new ArchiveFormatError(`${record.type} records must come before ${RECORD_ORDER[stage]} records`)
+      }
+      if (record.type === 'tournament') {
+        tournamentId = await insertTournament(record)
+        stage = 1
+        continue
+      }
+      if (tournamentId === null) {
+        throw new ArchiveFormatError('The archive must start with the tournament record')
+      }
+      // Everything a later record may refer to is written first
+      for (; stage < recordStage; stage++) {
+        const previous = RECORD_ORDER[stage]
+        if (previous !== 'tournament') await flush(previous)
+      }
+
+      const batch = pending[record.type] as ArchiveRecord[]
+      batch.push(record)
+      counts[`${record.type}s` as keyof typeof counts]++
+      if (batch.length >= IMPORT_BATCH) await flush(record.type)
+    }
+
+    if (tournamentId === null) {
+      throw new ArchiveFormatError('The archive is empty')
+    }
+    for (const type of ['participant', 'round', 'match', 'standing'] as const) {
+      await flush(type)
+    }
+    return { ok: true, tournamentId, ...counts }
+  } catch (error) {
+    if (tournamentId !== null) await removeImported(tournamentId)
+    if (error instanceof ArchiveFormatError || error instanceof CsvFormatError) {
+      return { ok: false, error: error.message }
+    }
+    throw error
+  }
+}
+
+async function insertTournament(record: ArchivedTournament): Promise<number> {
+  // Columns left out get their database defaults
+  const fields = record as unknown as Record<string, unknown>
+  const row = Object.fromEntries(
+    Object.keys(RECORD_FIELDS.tournament).filter((field) => fields[field] !== null).map((field) => [field, fields[field]])
+  )
+  const { data, error } = await supabase
+    .from('tournaments')
+    .insert(row)
+    .select('id')
+    .single()
+
+  if (error || !data) {
+    throw new Error(`Failed to create tournament: ${error?.message}`)
+  }
+  return (data as { id: number }).id
+}
+
+async function insertParticipants(tournamentId: number, batch: ArchivedParticipant[], participantIds: Map<number, number>): Promise<void> {
+  const telegramIds = batch.filter((p) => p.telegram_id !== null).map((p) => p.telegram_id!)
+  const userIds = batch.filter((p) => p.telegram_id === null).map((p) => p.user_id)
+  const [byTelegram, byId] = await Promise.all([
+    telegramIds.length > 0
+      ? supabase.from('users').select('id, telegram_id').in('telegram_id', telegramIds)
+      : Promise.resolve({ data: [], error: null }),
+    userIds.length > 0
+      ? supabase.from('users').select('id').in('id', userIds)
+      : Promise.resolve({ data: [], error: null })
+  ])
+  if (byTelegram.error || byId.error) {
+    throw new Error(`Failed to resolve users: ${(byTelegram.error || byId.error)?.message}`)
+  }
+  const userOfTelegram = new Map(((byTelegram.data || []) as Array<{ id: number; telegram_id: number }>).map((u) => [Number(u.telegram_id), u.id]))
+  const knownUsers = new Set(((byId.data || []) as Array<{ id: number }>).map((u) => u.id))
+
+  const rows = batch.map((p) => {
+    if (participantIds.has(p.no)) {
+      throw new ArchiveFormatError(`participant ${p.no} appears twice`)
+    }
+    const userId = p.telegram_id !== null ? userOfTelegram.get(Number(p.telegram_id)) : knownUsers.has(p.user_id) ? p.user_id : undefined
+    if (userId === undefined) {
+      throw new ArchiveFormatError(`participant ${p.no} (${p.nickname}): user not found`)
+    }
+    participantIds.set(p.no, -1)
+    return { tournament_id: tournamentId, user_id: userId, nickname: p.nickname, ...(p.created_at ? { created_at: p.created_at } : {}) }
+  })
+
+  const { data, error } = await supabase.from('tournament_participants').insert(rows).select('id')
+  if (error) {
+    throw new Error(`Failed to insert participants: ${error.message}`)
+  }
+  insertedRows<{ id: number }>(data).forEach((row, i) => participantIds.set(batch[i].no, row.id))
+}
+
+async function insertRounds(tournamentId: number, batch: ArchivedRound[], roundIds: Map<number, number>): Promise<void> {
+  const rows = batch.map((round) => {
+    if (roundIds.has(round.number)) {
+      throw new ArchiveFormatError(`round ${round.number} appears twice`)
+    }
+    roundIds.set(round.number, -1)
+    return {
+      tournament_id: tournamentId,
+      number: round.number,
+      status: round.status,
+      paired_at: round.paired_at,
+      locked_at: round.locked_at,
+      ...(round.created_at ? { created_at: round.created_at } : {})
+    }
+  })
+
+  const { data, error } = await supabase.from('rounds').insert(rows).select('id')
+  if (error) {
+    throw new Error(`Failed to insert rounds: ${error.message}`)
+  }
+  insertedRows<{ id: number }>(data).forEach((row, i) => roundIds.set(batch[i].number, row.id))
+}
+
+function participantId(no: number | null, participantIds: Map<number, number>, where: string): number | null {
+  if (no === null) return null
+  const id = participantIds.get(no)
+  if (id === undefined) throw new ArchiveFormatError(`${where}: unknown participant ${no}`)
+  return id
+}
+
+async function insertMatches(batch: ArchivedMatch[], participantIds: Map<number, number>, roundIds: Map<number, number>): Promise<void> {
+  const rows = batch.map((match) => {
+    const where = `round ${match.round} board ${match.board_no ?? '?'}`
+    const roundId = roundIds.get(match.round)
+    if (roundId === undefined) throw new ArchiveFormatError(`${where}: unknown round`)
+    return {
+      round_id: roundId,
+      board_no: match.board_no,
+      white_participant_id: participantId(match.white, participantIds, where),
+      black_participant_id: participantId(match.black, participantIds, where),
+      result: match.result,
+      score_white: match.score_white,
+      score_black: match.score_black,
+      source: match.source,
+      notes: match.notes
+    }
+  })
+
+  const { error } = await supabase.from('matches').insert(rows)
+  if (error) {
+    throw new Error(`Failed to insert matches: ${error.message}`)
+  }
+}
+
+async function insertStandings(tournamentId: number, batch: ArchivedStanding[], participantIds: Map<number, number>): Promise<void> {
+  const rows = batch.map((standing) => ({
+    tournament_id: tournamentId,
+    participant_id: participantId(standing.participant, participantIds, `standing ${standing.rank}`),
+    nickname: standing.nickname,
+    points: standing.points,
+    rank: standing.rank
+  }))
+
+  const { error } = await supabase.from('leaderboard').insert(rows)
+  if (error) {
+    throw new Error(`Failed to insert standings: ${error.message}`)
+  }
+}
+
+async function removeImported(tournamentId: number): Promise<void> {
+  try {
+    await supabase.from('leaderboard').delete().eq('tournament_id', tournamentId)
+    await deleteAllRoundsForTournament(tournamentId)
+    await supabase.from('tournament_participants').delete().eq('tournament_id', tournamentId)
+    await deleteTournament(tournamentId)
+  } catch (error) {
+    log.error('Failed to remove partly imported tournament', { tournamentId, error })
+  }
+}
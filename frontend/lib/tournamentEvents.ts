@@ -0,0 +1,172 @@
+import { createLogger } from './logger'
+import { metrics } from './metrics'
+import { supabase } from './supabase'
+
+// Live tournament updates. lib/db.ts (and the BBP insert) publish typed events
+// after their writes; /api/tournaments/[id]/events streams them to the admin
+// pages as Server-Sent Events. Delivery is in-process; with an adapter (e.g.
+// Supabase Realtime broadcast, TOURNAMENT_EVENTS_REALTIME=1) events written on
+// one instance also reach streams held open by the others.
+
+const log = createLogger('tournamentEvents')
+
+export interface MatchResultChange {
+  id: number
+  round_id: number
+  white_participant_id: number | null
+  black_participant_id: number | null
+  result: string
+  score_white: number
+  score_black: number
+}
+
+export type TournamentEvent =
+  | { type: 'result_updated'; tournamentId: number; roundId: number; match: MatchResultChange }
+  | { type: 'round_locked'; tournamentId: number; roundId: number }
+  | { type: 'pairings_ready'; tournamentId: number; roundId: number; matchCount: number }
+  // Points gained (or lost, when a result is corrected) per participant
+  | { type: 'standings_delta'; tournamentId: number; changes: Array<{ participant_id: number; points: number }> }
+
+export type TournamentEventType = TournamentEvent['type']
+
+type Listener = (event: TournamentEvent) => void
+
+/**
+ * Carries events between instances; events it delivers are not re-published
+ */
+export interface TournamentEventAdapter {
+  publish(event: TournamentEvent): Promise<void> | void
+  subscribe(onEvent: Listener): () => void
+}
+
+const eventsPublished = metrics.counter('tournament_events_published_total', 'Tournament events published by type', ['type'])
+const eventSubscribers = metrics.gauge('tournament_event_subscribers', 'Open tournament event subscriptions (SSE streams)')
+
+export class TournamentEventBus {
+  private listeners = new Map<number, Set<Listener>>()
+  private adapter: TournamentEventAdapter | null = null
+  private detachAdapter: (() => void) | null = null
+
+  /**
+   * Listen to one tournament's events; returns the unsubscribe function
+   */
+  subscribe(tournamentId: number, listener: Listener): () => void {
+    let set = this.listeners.get(tournamentId)
+    if (!set) {
+      set = new Set()
+      this.listeners.set(tournamentId, set)
+    }
+    set.add(listener)
+    eventSubscribers.inc()
+
+    let active = true
+    return () => {
+      if (!active) return
+      active = false
+      eventSubscribers.dec()
+      set.delete(listener)
+      if (set.size === 0 && this.listeners.get(tournamentId) === set) {
+        this.listeners.delete(tournamentId)
+      }
+    }
+  }
+
+  subscriberCount(tournamentId: number): number {
+    return this.listeners.get(tournamentId)?.size ?? 0
+  }
+
+  /**
+   * Deliver to local subscribers and hand to the adapter; never throws
+   */
+  publish(event: TournamentEvent): void {
+    eventsPublished.inc({ type: event.type })
+    this.deliver(event)
+    if (!this.adapter) return
+    try {
+      Promise.resolve(this.adapter.publish(event)).catch((error) => {
+        log.warn('Failed to forward tournament event', { type: event.type, error }, { sample: 0.1 })
+      })
+    } catch (error) {
+      log.warn('Failed to forward tournament event', { type: event.type, error }, { sample: 0.1 })
+    }
+  }
+
+  /**
+   * Replace the cross-instance adapter (null: in-process only)
+   */
+  setAdapter(adapter: TournamentEventAdapter | null): void {
+    this.detachAdapter?.()
+    this.adapter = adapter
+    this.detachAdapter = adapter ? adapter.subscribe((event) => this.deliver(event)) : null
+  }
+
+  private deliver(event: TournamentEvent): void {
+    const set = this.listeners.get(event.tournamentId)
+    if (!set) return
+    for (const listener of Array.from(set)) {
+      try {
+        listener(event)
+      } catch (error) {
+        log.error('Tournament event listener failed', { type: event.type, error })
+      }
+    }
+  }
+}
+
+// The part of the Supabase Realtime client the broadcast adapter uses
+interface RealtimeChannel {
+  on(type: 'broadcast', filter: { event: string }, callback: (message: { payload: TournamentEvent }) => void): RealtimeChannel
+  subscribe(): unknown
+  send(message: { type: 'broadcast'; event: string; payload: TournamentEvent }): Promise<unknown>
+}
+
+interface RealtimeClient {
+  channel(name: string): RealtimeChannel
+}
+
+/**
+ * Adapter over a Supabase Realtime broadcast channel (the sender does not
+ * receive its own broadcasts, so local delivery is not duplicated)
+ */
+export function supabaseBroadcastAdapter(client: RealtimeClient, channelName: string = 'tournament-events'): TournamentEventAdapter {
+  let onEvent: Listener | null = null
+  const channel = client.channel(channelName)
+  channel
+    .on('broadcast', { event: 'tournament' }, (message) => onEvent?.(message.payload))
+    .subscribe()
+
+  return {
+    async publish(event) {
+      await channel.send({ type: 'broadcast', event: 'tournament', payload: event })
+    },
+    subscribe(listener) {
+      onEvent = listener
+      return () => {
+        onEvent = null
+      }
+    }
+  }
+}
+
+/**
+ * SSE wire format for one event
+ */
+export function formatServerSentEvent(event: TournamentEvent): string {
+  return `event: ${event.type}\ndata: ${JSON.stringify(event)}\n\n`
+}
+
+function createEventBus(): TournamentEventBus {
+  const bus = new TournamentEventBus()
+  if (process.env.TOURNAMENT_EVENTS_REALTIME === '1') {
+    if (typeof supabase?.channel === 'function') {
+      bus.setAdapter(supabaseBroadcastAdapter(supabase as RealtimeClient))
+    } else {
+      log.warn('TOURNAMENT_EVENTS_REALTIME is set but the Supabase client has no Realtime; events stay in-process')
+    }
+  }
+  return bus
+}
+
+// One bus per process, even if this module is bundled into several routes
+const globalBus = globalThis as typeof globalThis & { __TOURNAMENT_EVENTS__?: TournamentEventBus }
+export const tournamentEvents = globalBus.__TOURNAMENT_EVENTS__ ??= createEventBus()
@@ -0,0 +1,355 @@
+import { supabase } from './supabase'
+import { createLogger } from './logger'
+import { metrics } from './metrics'
+
+const log = createLogger('userSearch')
+
+// User typeahead (participants page, /api/users/search, /api/user/search).
+// Answers come from an in-process index over username, first and last name:
+// a prefix trie over their words plus a trigram index for substring and typo
+// matches. The index is seeded once, patched by lib/db.ts on user writes and
+// reseeded periodically for writes made by other instances.
+// If seeding fails, queries go to Postgres, where pg_trgm indexes keep the
+// ILIKE scans indexed (migration 20241125_user_search_trgm.sql).
+
+const searchDuration = metrics.histogram('user_search_duration_seconds', 'User search latency by source', ['source'])
+const searchCoalesced = metrics.counter('user_search_coalesced_total', 'User searches answered by an identical in-flight search')
+const indexBuilds = metrics.histogram('user_search_index_build_duration_seconds', 'User search index seed time', ['outcome'])
+
+const SEED_PAGE_SIZE = 1000
+// Reseed periodically so writes made by other server instances are picked up
+const MAX_INDEX_AGE_MS = 5 * 60 * 1000
+// Prefix candidates collected before ranking; enough for any typeahead page
+const MAX_PREFIX_CANDIDATES = 500
+// Minimum share of the query trigrams a fuzzy match must contain (pg_trgm's default)
+const SIMILARITY_THRESHOLD = 0.3
+
+export interface SearchableUser {
+  id: number
+  telegram_id: number
+  username: string | null
+  first_name: string | null
+  last_name: string | null
+  rating?: number | null
+}
+
+export type UserSearchHit = SearchableUser
+
+interface TrieNode {
+  children: Map<string, TrieNode>
+  // Users with a word ending here
+  ids: Set<number>
+}
+
+interface IndexedUser {
+  user: SearchableUser
+  username: string
+  first: string
+  last: string
+  words: string[]
+  trigrams: Set<string>
+}
+
+export function normalizeSearchText(text: string | null | undefined): string {
+  return (text || '').trim().toLowerCase().replace(/ё/g, 'е').replace(/^@/, '')
+}
+
+function wordsOf(text: string): string[] {
+  return text.split(/[\s._\-]+/).filter((word) => word.length > 0)
+}
+
+function trigramsOf(text: string): Set<string> {
+  const grams = new Set<string>()
+  for (let i = 0; i + 3 <= text.length; i++) grams.add(text.slice(i, i + 3))
+  return grams
+}
+
+function newNode(): TrieNode {
+  return { children: new Map(), ids: new Set() }
+}
+
+/**
+ * Ranked search over users: exact and prefix username matches first, then
+ * name prefixes, substrings, and finally trigram-similar (misspelt) matches
+ */
+export class UserSearchIndex {
+  private root = newNode()
+  private users = new Map<number, IndexedUser>()
+  private byTelegramId = new Map<number, number>()
+  private trigramIndex = new Map<string, Set<number>>()
+
+  constructor(users: SearchableUser[] = []) {
+    for (const user of users) this.upsert(user)
+  }
+
+  get size(): number {
+    return this.users.size
+  }
+
+  upsert(user: SearchableUser): void {
+    this.remove(user.id)
+
+    const username = normalizeSearchText(user.username)
+    const first = normalizeSearchText(user.first_name)
+    const last = normalizeSearchText(user.last_name)
+    const words = Array.from(new Set([username, ...wordsOf(username), ...wordsOf(first), ...wordsOf(last)].filter(Boolean)))
+    const trigrams = new Set<string>()
+    for (const field of [username, first, last]) {
+      for (const gram of trigramsOf(field)) trigrams.add(gram)
+    }
+
+    for (const word of words) {
+      let node = this.root
+      for (const ch of word) {
+        let next = node.children.get(ch)
+        if (!next) {
+          next = newNode()
+          node.children.set(ch, next)
+        }
+        node = next
+      }
+      node.ids.add(user.id)
+    }
+    for (const gram of trigrams) {
+      let ids = this.trigramIndex.get(gram)
+      if (!ids) {
+        ids = new Set()
+        this.trigramIndex.set(gram, ids)
+      }
+      ids.add(user.id)
+    }
+
+    this.users.set(user.id, { user: { ...user }, username, first, last, words, trigrams })
+    this.byTelegramId.set(Number(user.telegram_id), user.id)
+  }
+
+  remove(userId: number): void {
+    const indexed = this.users.get(userId)
+    if (!indexed) return
+
+    for (const word of indexed.words) {
+      const node = this.find(word)
+      node?.ids.delete(userId)
+    }
+    for (const gram of indexed.trigrams) {
+      const ids = this.trigramIndex.get(gram)
+      ids?.delete(userId)
+      if (ids && ids.size === 0) this.trigramIndex.delete(gram)
+    }
+    this.users.delete(userId)
+    this.byTelegramId.delete(Number(indexed.user.telegram_id))
+  }
+
+  /**
+   * Merge `fields` into the user with this Telegram id, if indexed
+   */
+  patchByTelegramId(telegramId: number, fields: Partial<Omit<SearchableUser, 'id' | 'telegram_id'>>): void {
+    const userId = this.byTelegramId.get(Number(telegramId))
+    const indexed = userId === undefined ? undefined : this.users.get(userId)
+    if (indexed) this.upsert({ ...indexed.user, ...fields })
+  }
+
+  search(query: string, limit: number = 10): UserSearchHit[] {
+    const q = normalizeSearchText(query)
+    if (!q || limit <= 0) return []
+    const queryWords = wordsOf(q)
+
+    const candidates = new Set<number>()
+    // Prefix candidates of the first word; the other words are checked per user
+    this.collect(this.find(queryWords[0] || q), candidates)
+    const queryTrigrams = trigramsOf(q)
+    const trigramHits = new Map<number, number>()
+    for (const gram of queryTrigrams) {
+      for (const id of this.trigramIndex.get(gram) ?? []) {
+        trigramHits.set(id, (trigramHits.get(id) ?? 0) + 1)
+      }
+    }
+    for (const [id, hits] of trigramHits) {
+      if (hits / queryTrigrams.size >= SIMILARITY_THRESHOLD) candidates.add(id)
+    }
+
+    const ranked: Array<{ indexed: IndexedUser; score: number }> = []
+    for (const id of candidates) {
+      const indexed = this.users.get(id)
+      if (!indexed) continue
+      const score = scoreMatch(indexed, q, queryWords, queryTrigrams.size ? (trigramHits.get(id) ?? 0) / queryTrigrams.size : 0)
+      if (score > 0) ranked.push({ indexed, score })
+    }
+
+    ranked.sort((a, b) =>
+      b.score - a.score ||
+      a.indexed.username.length - b.indexed.username.length ||
+      a.indexed.user.id - b.indexed.user.id
+    )
+    return ranked.slice(0, limit).map(({ indexed }) => ({ ...indexed.user }))
+  }
+
+  private find(word: string): TrieNode | null {
+    let node: TrieNode | undefined = this.root
+    for (const ch of word) {
+      node = node.children.get(ch)
+      if (!node) return null
+    }
+    return node
+  }
+
+  private collect(node: TrieNode | null, into: Set<number>): void {
+    if (!node) return
+    const stack = [node]
+    while (stack.length > 0 && into.size < MAX_PREFIX_CANDIDATES) {
+      const current = stack.pop()!
+      for (const id of current.ids) into.add(id)
+      for (const child of current.children.values()) stack.push(child)
+    }
+  }
+}
+
+function scoreMatch(indexed: IndexedUser, q: string, queryWords: string[], similarity: number): number {
+  const { username, first, last, words } = indexed
+  if (username === q) return 100
+  if (username.startsWith(q)) return 90
+  if (first.startsWith(q) || last.startsWith(q) || `${first} ${last}`.startsWith(q) || `${last} ${first}`.startsWith(q)) return 80
+  // "ivan pet": every word of the query starts some word of the user
+  if (queryWords.length > 1 && queryWords.every((qw) => words.some((word) => word.startsWith(qw)))) return 70
+  if (queryWords.length === 1 && words.some((word) => word.startsWith(q))) return 65
+  if (username.includes(q) || first.includes(q) || last.includes(q)) return 60
+  return similarity >= SIMILARITY_THRESHOLD ? 40 * similarity : 0
+}
+
+/**
+ * Process-wide search index, seeded lazily; concurrent identical searches
+ * (rapid typeahead from several tabs) share one lookup
+ */
+class UserSearchRegistry {
+  private index: UserSearchIndex | null = null
+  private builtAt = 0
+  private loading: Promise<UserSearchIndex | null> | null = null
+  // Writes seen while a seed is in flight, replayed onto the fresh index
+  private pendingWrites: Array<(index: UserSearchIndex) => void> | null = null
+  private inflight = new Map<string, Promise<UserSearchHit[]>>()
+
+  search(query: string, limit: number = 10): Promise<UserSearchHit[]> {
+    const q = normalizeSearchText(query)
+    if (!q) return Promise.resolve([])
+
+    const key = `${limit}:${q}`
+    const pending = this.inflight.get(key)
+    if (pending) {
+      searchCoalesced.inc()
+      return pending
+    }
+    const lookup = this.lookup(q, limit).finally(() => this.inflight.delete(key))
+    this.inflight.set(key, lookup)
+    return lookup
+  }
+
+  upsert(user: SearchableUser): void {
+    this.write((index) => index.upsert(user))
+  }
+
+  patchByTelegramId(telegramId: number, fields: Partial<Omit<SearchableUser, 'id' | 'telegram_id'>>): void {
+    this.write((index) => index.patchByTelegramId(telegramId, fields))
+  }
+
+  remove(userId: number): void {
+    this.write((index) => index.remove(userId))
+  }
+
+  clear(): void {
+    this.index = null
+    this.builtAt = 0
+  }
+
+  private write(apply: (index: UserSearchIndex) => void): void {
+    this.pendingWrites?.push(apply)
+    if (this.index) apply(this.index)
+  }
+
+  private async lookup(q: string, limit: number): Promise<UserSearchHit[]> {
+    const stopSearch = searchDuration.startTimer()
+    const index = await this.get()
+    if (index) {
+      const hits = index.search(q, limit)
+      stopSearch({ source: 'index' })
+      return hits
+    }
+    const hits = await searchUsersInDatabase(q, limit)
+    stopSearch({ source: 'database' })
+    return hits
+  }
+
+  private async get(): Promise<UserSearchIndex | null> {
+    if (this.index && Date.now() - this.builtAt < MAX_INDEX_AGE_MS) {
+      return this.index
+    }
+    if (!this.loading) {
+      this.loading = this.build().finally(() => { this.loading = null })
+    }
+    // Serve the stale index while a reseed runs
+    return this.index || this.loading
+  }
+
+  private async build(): Promise<UserSearchIndex | null> {
+    const stopBuild = indexBuilds.startTimer()
+    this.pendingWrites = []
+    try {
+      const index = new UserSearchIndex()
+      let after = 0
+      for (;;) {
+        const { data, error } = await supabase
+          .from('users')
+          .select('id, telegram_id, username, first_name, last_name, rating')
+          .gte('id', after + 1)
+          .order('id', { ascending: true })
+          .limit(SEED_PAGE_SIZE)
+
+        if (error) {
+          throw new Error(`Failed to load users: ${error.message}`)
+        }
+
+        const rows = (data || []) as SearchableUser[]
+        for (const row of rows) index.upsert(row)
+        if (rows.length < SEED_PAGE_SIZE) break
+        after = rows[rows.length - 1].id
+      }
+
+      for (const apply of this.pendingWrites) apply(index)
+      this.index = index
+      this.builtAt = Date.now()
+      stopBuild({ outcome: 'ok' })
+      return index
+    } catch (error) {
+      log.error('Error building user search index', { error })
+      stopBuild({ outcome: 'error' })
+      return this.index
+    } finally {
+      this.pendingWrites = null
+    }
+  }
+}
+
+/**
+ * Fallback when no index is available: ILIKE over the trigram-indexed columns
+ */
+async function searchUsersInDatabase(q: string, limit: number): Promise<UserSearchHit[]> {
+  // Characters with a meaning in LIKE patterns or PostgREST filter lists
+  const term = q.replace(/[%_,()*\\]/g, ' ').trim()
+  if (!term) return []
+
+  let query = supabase
+    .from('users')
+    .select('id, telegram_id, username, first_name, last_name, rating')
+  query = typeof query.or === 'function'
+    ? query.or(`username.ilike.%${term}%,first_name.ilike.%${term}%,last_name.ilike.%${term}%`)
+    : query.ilike('username', `%${term}%`)
+  const { data, error } = await query.limit(limit * 4)
+
+  if (error) {
+    log.error('Error searching users', { error })
+    return []
+  }
+  // Rank the page the same way the index would
+  return new UserSearchIndex((data || []) as SearchableUser[]).search(q, limit)
+}
+
+export const userSearch = new UserSearchRegistry()